@@ -13,13 +13,14 @@ import time
 import urllib.parse
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import pandas as pd
 import yaml
 import os
 
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 
+from api.app.storage.market_snapshot import MarketSnapshotStore, MARKET_SNAPSHOT_COLLECTION
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -158,6 +159,7 @@ class StockAnalyzer:
         self.client = None
         self.db = None
         self.kline_collection = None
+        self.snapshot_store = None
 
     def connect(self):
         """连接MongoDB"""
@@ -173,7 +175,8 @@ class StockAnalyzer:
             self.client.server_info()
 
             self.db = self.client[self.mongodb_config.get('database', 'eastmoney_news')]
-            self.kline_collection = self.db.get('stock_kline', self.db.get('kline', self.db['stocks']))
+            self.kline_collection = self.db['stock_kline']
+            self.snapshot_store = MarketSnapshotStore(self.db[MARKET_SNAPSHOT_COLLECTION], self.kline_collection)
 
             logger.info(f"MongoDB连接成功: {self.mongodb_config.get('host')}:{self.mongodb_config.get('port')}")
             return True
@@ -236,54 +239,30 @@ class StockAnalyzer:
 
             logger.info(f"开始分析市场概览，日期: {date}")
 
-            # 获取当日所有股票数据
-            cursor = self.kline_collection.find({'date': date})
-            df = pd.DataFrame(list(cursor))
+            # 读取预先汇总的市场快照
+            snapshot = self.snapshot_store.get(date)
 
-            if df.empty:
+            if not snapshot:
                 logger.warning(f"日期 {date} 没有数据")
                 return {}
 
-            # 基础统计
-            total_stocks = len(df)
-            up_stocks = len(df[df['pct_chg'] > 0])
-            down_stocks = len(df[df['pct_chg'] < 0])
-            flat_stocks = len(df[df['pct_chg'] == 0])
-
-            # 涨跌停统计
-            limit_up = len(df[df['pct_chg'] >= 9.9])  # 接近涨停
-            limit_down = len(df[df['pct_chg'] <= -9.9])  # 接近跌停
-
-            # 涨跌幅分布
-            pct_chg = df['pct_chg']
-            avg_change = pct_chg.mean()
-            median_change = pct_chg.median()
-
-            # 成交额统计
-            if 'amount' in df.columns:
-                total_amount = df['amount'].sum() / 1e8  # 转换为亿元
-            else:
-                total_amount = 0
-
-            # 振幅统计
-            if 'high' in df.columns and 'low' in df.columns:
-                df['amplitude'] = (df['high'] - df['low']) / df['close'].shift(1) * 100
-                avg_amplitude = df['amplitude'].mean()
-            else:
-                avg_amplitude = 0
+            stats = snapshot['overview']
+            total_stocks = stats['total_stocks']
+            up_stocks = stats['up_stocks']
+            down_stocks = stats['down_stocks']
 
             overview = {
                 'date': date,
                 'total_stocks': total_stocks,
                 'up_stocks': up_stocks,
                 'down_stocks': down_stocks,
-                'flat_stocks': flat_stocks,
-                'limit_up': limit_up,
-                'limit_down': limit_down,
-                'avg_change': round(avg_change, 2),
-                'median_change': round(median_change, 2),
-                'total_amount': round(total_amount, 2),
-                'avg_amplitude': round(avg_amplitude, 2)
+                'flat_stocks': stats['flat_stocks'],
+                'limit_up': stats['limit_up'],
+                'limit_down': stats['limit_down'],
+                'avg_change': round(stats.get('avg_change') or 0, 2),
+                'median_change': round(stats.get('median_change') or 0, 2),
+                'total_amount': round((stats.get('total_amount') or 0) / 1e8, 2),  # 转换为亿元
+                'avg_amplitude': round(stats.get('avg_amplitude') or 0, 2)
             }
 
             logger.info(f"市场概览分析完成: 总{total_stocks}只，涨{up_stocks}只，跌{down_stocks}只")
@@ -312,36 +291,28 @@ class StockAnalyzer:
 
             logger.info(f"分析表现最佳股票，日期: {date}")
 
-            # 获取当日数据
-            cursor = self.kline_collection.find({'date': date}).sort('pct_chg', -1)
-            df = pd.DataFrame(list(cursor))
+            # top_n 超过快照保存的榜单长度时改为实时聚合
+            snapshot = self.snapshot_store.get(date, top_n=top_n)
 
-            if df.empty:
+            if not snapshot:
                 logger.warning(f"日期 {date} 没有数据")
                 return {}
 
-            # 涨幅榜
-            top_gainers = df.nlargest(top_n, 'pct_chg')[['code', 'name', 'close', 'pct_chg', 'amount', 'volume']].to_dict('records')
-            for item in top_gainers:
-                item['pct_chg'] = round(item['pct_chg'], 2)
-                if 'amount' in item and item['amount']:
-                    item['amount'] = round(item['amount'] / 1e8, 2)  # 转换为亿元
-
-            # 跌幅榜
-            top_losers = df.nsmallest(top_n, 'pct_chg')[['code', 'name', 'close', 'pct_chg', 'amount', 'volume']].to_dict('records')
-            for item in top_losers:
-                item['pct_chg'] = round(item['pct_chg'], 2)
-                if 'amount' in item and item['amount']:
-                    item['amount'] = round(item['amount'] / 1e8, 2)
-
-            # 成交额榜
-            if 'amount' in df.columns and df['amount'].sum() > 0:
-                top_volume = df.nlargest(top_n, 'amount')[['code', 'name', 'close', 'pct_chg', 'amount', 'volume']].to_dict('records')
-                for item in top_volume:
-                    item['pct_chg'] = round(item['pct_chg'], 2)
-                    item['amount'] = round(item['amount'] / 1e8, 2)
-            else:
-                top_volume = []
+            def format_rank(items):
+                ranked = []
+                for item in items[:top_n]:
+                    item = dict(item)
+                    pct_chg = item.get('pct_chg')
+                    item['pct_chg'] = None if pct_chg is None else round(pct_chg, 2)
+                    if item.get('amount'):
+                        item['amount'] = round(item['amount'] / 1e8, 2)  # 转换为亿元
+                    ranked.append(item)
+                return ranked
+
+            # 涨幅榜 / 跌幅榜 / 成交额榜
+            top_gainers = format_rank(snapshot['top_gainers'])
+            top_losers = format_rank(snapshot['top_losers'])
+            top_volume = format_rank(snapshot['top_amount'])
 
             return {
                 'date': date,
@@ -372,36 +343,30 @@ class StockAnalyzer:
 
             logger.info(f"分析行业表现，日期: {date}")
 
-            cursor = self.kline_collection.find({'date': date})
-            df = pd.DataFrame(list(cursor))
+            snapshot = self.snapshot_store.get(date)
 
-            if df.empty:
+            if not snapshot:
                 return {}
 
             # 检查是否有行业字段
-            if 'industry' not in df.columns or 'sector' not in df.columns:
+            if not snapshot['sectors']:
                 logger.info("数据中没有行业分类字段，跳过行业分析")
                 return {}
 
-            industry_col = 'industry' if 'industry' in df.columns else 'sector'
-
-            # 按行业统计
-            sector_stats = df.groupby(industry_col).agg({
-                'pct_chg': ['mean', 'median', 'count'],
-                'amount': 'sum'
-            }).reset_index()
-
-            sector_stats.columns = ['sector', 'avg_change', 'median_change', 'stock_count', 'total_amount']
-            sector_stats['avg_change'] = sector_stats['avg_change'].round(2)
-            sector_stats['median_change'] = sector_stats['median_change'].round(2)
-            sector_stats['total_amount'] = (sector_stats['total_amount'] / 1e8).round(2)
-
-            # 按平均涨幅排序
-            sector_stats = sector_stats.sort_values('avg_change', ascending=False)
+            sector_stats = [
+                {
+                    'sector': item['sector'],
+                    'avg_change': round(item.get('avg_change') or 0, 2),
+                    'median_change': round(item.get('median_change') or 0, 2),
+                    'stock_count': item['stock_count'],
+                    'total_amount': round((item.get('total_amount') or 0) / 1e8, 2)
+                }
+                for item in snapshot['sectors']
+            ]
 
             return {
                 'date': date,
-                'sector_performance': sector_stats.to_dict('records')
+                'sector_performance': sector_stats
             }
 
         except Exception as e:
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import Optional
 import logging
 
-from ...storage import MongoStorage
+from ...storage import AsyncMongoStorage, get_default_async_storage
 from ...scheduler import AfterMarketJob
 from ...core.config import settings
 
@@ -11,36 +11,25 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/after-market", tags=["盘后信息"])
 
 
-def get_storage() -> MongoStorage:
-    storage = MongoStorage(
-        settings.mongodb_host,
-        settings.mongodb_port,
-        settings.mongodb_database,
-        settings.mongodb_username,
-        settings.mongodb_password
-    )
-    storage.connect()
-    try:
-        yield storage
-    finally:
-        storage.close()
+def get_storage() -> AsyncMongoStorage:
+    return get_default_async_storage()
 
 
 @router.get("")
-def get_after_market_list(limit: int = 50, storage: MongoStorage = Depends(get_storage)):
+async def get_after_market_list(limit: int = 50, storage: AsyncMongoStorage = Depends(get_storage)):
     """获取盘后信息列表"""
     try:
-        return storage.get_all(limit)
+        return await storage.get_all(limit)
     except Exception as e:
         logger.error(f"Failed to get list: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{date}")
-def get_after_market_by_date(date: str, storage: MongoStorage = Depends(get_storage)):
+async def get_after_market_by_date(date: str, storage: AsyncMongoStorage = Depends(get_storage)):
     """根据日期获取盘后信息"""
     try:
-        data = storage.get_by_date(date)
+        data = await storage.get_by_date(date)
         if not data:
             raise HTTPException(status_code=404, detail="Not found")
         return data
@@ -52,10 +41,10 @@ def get_after_market_by_date(date: str, storage: MongoStorage = Depends(get_stor
 
 
 @router.delete("/{date}")
-def delete_after_market(date: str, storage: MongoStorage = Depends(get_storage)):
+async def delete_after_market(date: str, storage: AsyncMongoStorage = Depends(get_storage)):
     """删除盘后信息"""
     try:
-        count = storage.delete(date)
+        count = await storage.delete(date)
         if count == 0:
             raise HTTPException(status_code=404, detail="Not found")
         return {"deleted": count}
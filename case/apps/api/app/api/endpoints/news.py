@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, Query
 from typing import Optional
+import asyncio
 from datetime import datetime, timedelta
 from app.core.database import mongodb
 from app.api.middleware.auth import get_current_user
@@ -42,7 +43,7 @@ def format_date_for_mongo(dt):
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
 @router.get("/daily", response_model=NewsListResponse)
-def get_daily_news(
+async def get_daily_news(
     date: Optional[str] = Query(None, description="查询日期，格式：YYYY-MM-DD"),
     limit: int = Query(10, ge=1, le=100, description="返回数量限制"),
     offset: int = Query(0, ge=0, description="分页偏移量"),
@@ -51,7 +52,7 @@ def get_daily_news(
     """查询当日新闻"""
     try:
         start_date, end_date = get_date_range("daily", date)
-        collection = mongodb.get_collection()
+        collection = mongodb.get_async_collection()
         
         # 构建查询条件
         query = {
@@ -61,11 +62,11 @@ def get_daily_news(
             }
         }
         
-        # 查询总数
-        total = collection.count_documents(query)
-        
-        # 查询数据
-        news_list = list(collection.find(query).skip(offset).limit(limit).sort("showTime", -1))
+        # 并发查询总数和数据
+        total, news_list = await asyncio.gather(
+            collection.count_documents(query),
+            collection.find(query).skip(offset).limit(limit).sort("showTime", -1).to_list()
+        )
         
         # 转换为响应模型
         items = []
@@ -92,7 +93,7 @@ def get_daily_news(
         raise
 
 @router.get("/weekly", response_model=NewsListResponse)
-def get_weekly_news(
+async def get_weekly_news(
     date: Optional[str] = Query(None, description="查询日期，格式：YYYY-MM-DD"),
     limit: int = Query(10, ge=1, le=100, description="返回数量限制"),
     offset: int = Query(0, ge=0, description="分页偏移量"),
@@ -101,7 +102,7 @@ def get_weekly_news(
     """查询本周新闻"""
     try:
         start_date, end_date = get_date_range("weekly", date)
-        collection = mongodb.get_collection()
+        collection = mongodb.get_async_collection()
         
         # 构建查询条件
         query = {
@@ -111,11 +112,11 @@ def get_weekly_news(
             }
         }
         
-        # 查询总数
-        total = collection.count_documents(query)
-        
-        # 查询数据
-        news_list = list(collection.find(query).skip(offset).limit(limit).sort("showTime", -1))
+        # 并发查询总数和数据
+        total, news_list = await asyncio.gather(
+            collection.count_documents(query),
+            collection.find(query).skip(offset).limit(limit).sort("showTime", -1).to_list()
+        )
         
         # 转换为响应模型
         items = []
@@ -142,7 +143,7 @@ def get_weekly_news(
         raise
 
 @router.get("/monthly", response_model=NewsListResponse)
-def get_monthly_news(
+async def get_monthly_news(
     date: Optional[str] = Query(None, description="查询日期，格式：YYYY-MM-DD"),
     limit: int = Query(10, ge=1, le=100, description="返回数量限制"),
     offset: int = Query(0, ge=0, description="分页偏移量"),
@@ -151,7 +152,7 @@ def get_monthly_news(
     """查询本月新闻"""
     try:
         start_date, end_date = get_date_range("monthly", date)
-        collection = mongodb.get_collection()
+        collection = mongodb.get_async_collection()
         
         # 构建查询条件
         query = {
@@ -161,11 +162,11 @@ def get_monthly_news(
             }
         }
         
-        # 查询总数
-        total = collection.count_documents(query)
-        
-        # 查询数据
-        news_list = list(collection.find(query).skip(offset).limit(limit).sort("showTime", -1))
+        # 并发查询总数和数据
+        total, news_list = await asyncio.gather(
+            collection.count_documents(query),
+            collection.find(query).skip(offset).limit(limit).sort("showTime", -1).to_list()
+        )
         
         # 转换为响应模型
         items = []
@@ -1,22 +1,29 @@
 """
 股票数据API端点 - 重构版本
-优化大数据量查询性能，支持分页、流式传输和数据导出
+优化大数据量查询性能，支持游标分页、流式传输和数据导出
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, Header
 from fastapi.responses import StreamingResponse
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 import logging
 import pandas as pd
+import codecs
+import itertools
 import io
 import csv
 import json
 
-from ...storage import MongoStorage
+from ...storage import MongoStorage, AsyncMongoStorage, get_default_storage, get_default_async_storage
+from ...storage.mongo_client import KLINE_FIELDS
+from ...storage import arrow_codec
 from ...core.config import settings
+from ...monitor.async_data_source import get_async_data_source_manager
+from ...monitor.analysis.technical import TechnicalAnalyzer
+from ...indicators import IndicatorCache
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +34,10 @@ class ExportFormat(str, Enum):
     """数据导出格式"""
     CSV = "csv"
     JSON = "json"
+    NDJSON = "ndjson"
     EXCEL = "excel"
+    PARQUET = "parquet"
+    ARROW = "arrow"
 
 
 @dataclass
@@ -43,32 +53,31 @@ class QueryConfig:
     # 流式查询每批大小
     STREAM_BATCH_SIZE = 1000
     
-    # 导出功能最大记录数
+    # 导出功能最大记录数（仅Excel导出需要整体物化，受此限制）
     MAX_EXPORT_RECORDS = 1000000
     
+    # 批量读取单次最多股票数
+    MAX_BULK_CODES = 6000
+    
+    # 实时行情单次最多股票数
+    MAX_REALTIME_CODES = 2000
+    
     # 查询超时时间（秒）
     QUERY_TIMEOUT = 30
 
 
 @dataclass
 class PaginationParams:
-    """分页参数"""
-    page: int = 1
+    """游标分页参数"""
+    cursor: Optional[str] = None
     page_size: int = QueryConfig.DEFAULT_PAGE_SIZE
     
     def __post_init__(self):
         """验证和修正参数"""
-        if self.page < 1:
-            self.page = 1
         if self.page_size < 1:
             self.page_size = QueryConfig.DEFAULT_PAGE_SIZE
         if self.page_size > QueryConfig.MAX_PAGE_SIZE:
             self.page_size = QueryConfig.MAX_PAGE_SIZE
-    
-    @property
-    def skip(self) -> int:
-        """计算跳过的记录数"""
-        return (self.page - 1) * self.page_size
 
 
 class DataValidator:
@@ -142,23 +151,21 @@ class ResponseBuilder:
     
     @staticmethod
     def build_paginated_response(
-        data: List[Dict],
-        total: int,
+        page: Dict,
         pagination: PaginationParams,
         params: Dict = None
     ) -> Dict:
-        """构建分页响应"""
-        total_pages = (total + pagination.page_size - 1) // pagination.page_size
+        """构建游标分页响应"""
+        data = page["data"]
+        next_cursor = page["next_cursor"]
         
         response = {
             "success": True,
             "count": len(data),
-            "total": total,
-            "page": pagination.page,
             "page_size": pagination.page_size,
-            "total_pages": total_pages,
-            "has_next": pagination.page < total_pages,
-            "has_prev": pagination.page > 1,
+            "cursor": pagination.cursor,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
             "data": data
         }
         
@@ -178,51 +185,142 @@ class ResponseBuilder:
 
 
 class DataExporter:
-    """数据导出器"""
+    """数据导出器
+    
+    CSV/JSON/NDJSON 从游标逐批编码并流式输出，内存占用与总行数无关；
+    Excel 需要整体写入工作簿，仍会物化全部数据
+    """
     
     @staticmethod
-    def export_to_csv(data: List[Dict], filename: str = None) -> StreamingResponse:
-        """导出为CSV格式"""
-        if not data:
+    def _ensure_not_empty(rows: Iterable[Dict]) -> Iterator[Dict]:
+        """预取第一条记录，没有数据时返回404"""
+        rows = iter(rows)
+        try:
+            first = next(rows)
+        except StopIteration:
             raise HTTPException(status_code=404, detail="没有数据可导出")
-        
-        output = io.StringIO()
-        
-        if data:
-            writer = csv.DictWriter(output, fieldnames=data[0].keys())
-            writer.writeheader()
-            writer.writerows(data)
-        
-        output.seek(0)
-        
-        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
+        return itertools.chain([first], rows)
+    
+    @staticmethod
+    def _batched(lines: Iterable[str]) -> Iterator[bytes]:
+        """按 STREAM_BATCH_SIZE 行合并编码后输出"""
+        buffer = []
+        for line in lines:
+            buffer.append(line)
+            if len(buffer) >= QueryConfig.STREAM_BATCH_SIZE:
+                yield "".join(buffer).encode('utf-8')
+                buffer = []
+        if buffer:
+            yield "".join(buffer).encode('utf-8')
+    
+    @staticmethod
+    def _streaming_response(body: Iterator[bytes], media_type: str, filename: str) -> StreamingResponse:
         return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8-sig')),
-            media_type='text/csv; charset=utf-8-sig',
+            body,
+            media_type=media_type,
             headers={
                 'Content-Disposition': f'attachment; filename="{filename}"'
             }
         )
     
     @staticmethod
-    def export_to_json(data: List[Dict], filename: str = None) -> StreamingResponse:
-        """导出为JSON格式"""
-        if not data:
-            raise HTTPException(status_code=404, detail="没有数据可导出")
+    def export_to_csv(
+        rows: Iterable[Dict],
+        fieldnames: List[str],
+        filename: str = None,
+        trailer: bool = True
+    ) -> StreamingResponse:
+        """
+        流式导出为CSV格式
+        
+        trailer为True时末尾追加 "# row_count=N" 行，客户端可据此校验导出是否完整
+        """
+        rows = DataExporter._ensure_not_empty(rows)
+        
+        def lines() -> Iterator[str]:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            count = 0
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+            if trailer:
+                buffer.write(f"# row_count={count}\r\n")
+            yield buffer.getvalue()
+        
+        def body() -> Iterator[bytes]:
+            yield codecs.BOM_UTF8
+            yield from DataExporter._batched(lines())
         
-        output = io.StringIO()
-        json.dump(data, output, ensure_ascii=False, indent=2)
-        output.seek(0)
+        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return DataExporter._streaming_response(body(), 'text/csv; charset=utf-8-sig', filename)
+    
+    @staticmethod
+    def export_to_json(rows: Iterable[Dict], filename: str = None) -> StreamingResponse:
+        """流式导出为JSON数组"""
+        rows = DataExporter._ensure_not_empty(rows)
         
-        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        def lines() -> Iterator[str]:
+            yield "["
+            for i, row in enumerate(rows):
+                prefix = "\n" if i == 0 else ",\n"
+                yield prefix + json.dumps(row, ensure_ascii=False, default=str)
+            yield "\n]"
         
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            media_type='application/json; charset=utf-8',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"'
-            }
+        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        return DataExporter._streaming_response(
+            DataExporter._batched(lines()), 'application/json; charset=utf-8', filename
+        )
+    
+    @staticmethod
+    def export_to_ndjson(rows: Iterable[Dict], filename: str = None, trailer: bool = True) -> StreamingResponse:
+        """
+        流式导出为NDJSON（每行一个JSON对象）
+        
+        trailer为True时最后一行为 {"_meta": {"row_count": N}}
+        """
+        rows = DataExporter._ensure_not_empty(rows)
+        
+        def lines() -> Iterator[str]:
+            count = 0
+            for row in rows:
+                count += 1
+                yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+            if trailer:
+                yield json.dumps({"_meta": {"row_count": count}}) + "\n"
+        
+        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+        return DataExporter._streaming_response(
+            DataExporter._batched(lines()), 'application/x-ndjson; charset=utf-8', filename
+        )
+    
+    @staticmethod
+    def _require_pyarrow():
+        if not arrow_codec.PYARROW_AVAILABLE:
+            raise HTTPException(status_code=501, detail="服务端未安装pyarrow，不支持Arrow/Parquet导出")
+    
+    @staticmethod
+    def export_to_arrow(rows: Iterable[Dict], fieldnames: List[str], filename: str = None) -> StreamingResponse:
+        """流式导出为Arrow IPC流，每批编码为一个RecordBatch"""
+        DataExporter._require_pyarrow()
+        rows = DataExporter._ensure_not_empty(rows)
+        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.arrows"
+        return DataExporter._streaming_response(
+            arrow_codec.iter_arrow_stream(rows, fieldnames), arrow_codec.ARROW_STREAM_MEDIA_TYPE, filename
+        )
+    
+    @staticmethod
+    def export_to_parquet(rows: Iterable[Dict], fieldnames: List[str], filename: str = None) -> StreamingResponse:
+        """流式导出为Parquet，每批写一个row group"""
+        DataExporter._require_pyarrow()
+        rows = DataExporter._ensure_not_empty(rows)
+        filename = filename or f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        return DataExporter._streaming_response(
+            arrow_codec.iter_parquet(rows, fieldnames), arrow_codec.PARQUET_MEDIA_TYPE, filename
         )
     
     @staticmethod
@@ -231,7 +329,7 @@ class DataExporter:
         if not data:
             raise HTTPException(status_code=404, detail="没有数据可导出")
         
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(list(data))
         output = io.BytesIO()
         
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
@@ -251,36 +349,78 @@ class DataExporter:
 
 
 def get_storage() -> MongoStorage:
-    """获取MongoDB存储实例"""
-    storage = MongoStorage(
-        settings.mongodb_host,
-        settings.mongodb_port,
-        settings.mongodb_database,
-        settings.mongodb_username,
-        settings.mongodb_password
-    )
-    storage.connect()
-    try:
-        yield storage
-    finally:
-        storage.close()
+    """获取MongoDB存储实例（进程级共享，底层使用连接池）"""
+    return get_default_storage()
+
+
+def get_async_storage() -> AsyncMongoStorage:
+    """获取异步MongoDB存储实例，供 async 端点在事件循环上等待查询，不占用线程池"""
+    return get_default_async_storage()
+
+
+_indicator_analyzer: Optional[TechnicalAnalyzer] = None
+
+
+def get_indicator_analyzer() -> TechnicalAnalyzer:
+    """
+    看板用的技术指标分析器（进程级共享）
+
+    日线指标序列缓存在 indicator_cache 集合，与选股、盯盘共用；未启用时只缓存在进程内
+    """
+    global _indicator_analyzer
+    if _indicator_analyzer is None:
+        storage = get_default_storage()
+        cache = IndicatorCache(
+            storage if settings.indicator_cache_enabled else None,
+            lambda code, start_date, end_date: storage.get_klines_bulk([code], start_date=start_date, end_date=end_date),
+        )
+        _indicator_analyzer = TechnicalAnalyzer(cache)
+    return _indicator_analyzer
+
+
+def _tail(values, days: int) -> List[Optional[float]]:
+    """序列最后 days 个值，NaN 转为 None"""
+    return [None if pd.isna(value) else float(value) for value in values[-days:]]
 
 
 def parse_pagination_params(
-    page: int = Query(1, ge=1, description="页码，从1开始"),
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页返回的 next_cursor，首页不传"),
     page_size: int = Query(QueryConfig.DEFAULT_PAGE_SIZE, ge=1, le=QueryConfig.MAX_PAGE_SIZE, description="每页数量")
 ) -> PaginationParams:
     """解析分页参数"""
-    return PaginationParams(page=page, page_size=page_size)
+    return PaginationParams(cursor=cursor, page_size=page_size)
+
+
+def _export_klines(
+    rows: Iterator[Dict],
+    format: ExportFormat,
+    basename: str,
+    trailer: bool
+) -> StreamingResponse:
+    """按格式导出K线迭代器，Excel 物化后受导出上限约束，其余格式均流式输出"""
+    if format == ExportFormat.CSV:
+        return DataExporter.export_to_csv(rows, KLINE_FIELDS, f"{basename}.csv", trailer=trailer)
+    if format == ExportFormat.JSON:
+        return DataExporter.export_to_json(rows, f"{basename}.json")
+    if format == ExportFormat.NDJSON:
+        return DataExporter.export_to_ndjson(rows, f"{basename}.ndjson", trailer=trailer)
+    if format == ExportFormat.PARQUET:
+        return DataExporter.export_to_parquet(rows, KLINE_FIELDS, f"{basename}.parquet")
+    if format == ExportFormat.ARROW:
+        return DataExporter.export_to_arrow(rows, KLINE_FIELDS, f"{basename}.arrows")
+    
+    results = list(itertools.islice(rows, QueryConfig.MAX_EXPORT_RECORDS + 1))
+    DataValidator.validate_export_limit(len(results))
+    return DataExporter.export_to_excel(results, f"{basename}.xlsx")
 
 
 @router.get("/kline/{code}")
-def get_stock_kline(
+async def get_stock_kline(
     code: str,
     start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
     limit: int = Query(100, ge=1, le=QueryConfig.MAX_SINGLE_QUERY_RECORDS, description="返回数量"),
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
     获取股票K线数据
@@ -302,7 +442,7 @@ def get_stock_kline(
         limit = DataValidator.validate_limit(limit)
         
         # 查询数据
-        results = storage.get_kline(code, start_date, end_date, limit)
+        results = await storage.get_kline(code, start_date, end_date, limit)
         
         logger.info(f"获取股票 {code} K线数据: {len(results)} 条记录")
         
@@ -320,65 +460,63 @@ def get_stock_kline(
 
 
 @router.get("/kline/{code}/paginated")
-def get_stock_kline_paginated(
+async def get_stock_kline_paginated(
     code: str,
     start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
     pagination: PaginationParams = Depends(parse_pagination_params),
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
-    获取股票K线数据（分页）
+    获取股票K线数据（游标分页）
     
-    适用于数据量较大的情况，避免一次性返回过多数据
+    按日期降序，使用 next_cursor 翻页，任意深度的页面耗时一致
     
     参数:
         code: 股票代码
         start_date: 开始日期 (YYYY-MM-DD)
         end_date: 结束日期 (YYYY-MM-DD)
-        page: 页码，从1开始
+        cursor: 分页游标，首页不传
         page_size: 每页数量 (1-1000)
     
     返回:
-        分页的股票K线数据
+        分页的股票K线数据及 next_cursor
     """
     try:
         # 验证日期范围
         DataValidator.validate_date_range(start_date, end_date)
         
-        # 查询数据（带分页）
-        results = storage.get_kline(
-            code, 
-            start_date, 
-            end_date, 
-            limit=pagination.page_size,
-            skip=pagination.skip
+        # 查询数据（游标分页）
+        page = await storage.get_kline_page(
+            code,
+            start_date,
+            end_date,
+            page_size=pagination.page_size,
+            cursor=pagination.cursor
         )
         
-        # 获取总数（可能需要额外查询）
-        total = len(results)  # 这里简化处理，实际可能需要count查询
-        
-        logger.info(f"获取股票 {code} K线数据 (分页): 页码={pagination.page}, 每页={pagination.page_size}, 返回={len(results)}条")
+        logger.info(f"获取股票 {code} K线数据 (分页): 每页={pagination.page_size}, 返回={len(page['data'])}条")
         
         return ResponseBuilder.build_paginated_response(
-            data=results,
-            total=total,
+            page=page,
             pagination=pagination,
             params={"code": code, "start_date": start_date, "end_date": end_date}
         )
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取分页K线数据失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/kline/all/{date}")
-def get_all_stocks_kline(
+async def get_all_stocks_kline(
     date: str,
     limit: int = Query(1000, ge=1, le=QueryConfig.MAX_SINGLE_QUERY_RECORDS, description="返回数量"),
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
     获取指定日期所有股票的K线数据
@@ -395,7 +533,7 @@ def get_all_stocks_kline(
         limit = DataValidator.validate_limit(limit)
         
         # 查询数据
-        results = storage.get_all_kline_by_date(date, limit)
+        results = await storage.get_all_kline_by_date(date, limit)
         
         logger.info(f"获取 {date} 全部股票K线数据: {len(results)} 条记录")
         
@@ -413,56 +551,91 @@ def get_all_stocks_kline(
 
 
 @router.get("/kline/all/{date}/paginated")
-def get_all_stocks_kline_paginated(
+async def get_all_stocks_kline_paginated(
     date: str,
     pagination: PaginationParams = Depends(parse_pagination_params),
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
-    获取指定日期所有股票的K线数据（分页）
+    获取指定日期所有股票的K线数据（游标分页）
     
-    适用于股票数量较多的情况
+    按股票代码升序，使用 next_cursor 翻页
     
     参数:
         date: 日期 (YYYY-MM-DD)
-        page: 页码，从1开始
+        cursor: 分页游标，首页不传
         page_size: 每页数量 (1-1000)
     
     返回:
-        分页的股票K线数据
+        分页的股票K线数据及 next_cursor
     """
     try:
-        # 查询数据（带分页）
-        results = storage.get_all_kline_by_date(
+        # 查询数据（游标分页）
+        page = await storage.get_all_kline_by_date_page(
             date,
-            limit=pagination.page_size,
-            skip=pagination.skip
+            page_size=pagination.page_size,
+            cursor=pagination.cursor
         )
         
-        # 获取总数
-        total = len(results)  # 这里简化处理，实际可能需要count查询
-        
-        logger.info(f"获取 {date} 全部股票K线数据 (分页): 页码={pagination.page}, 每页={pagination.page_size}, 返回={len(results)}条")
+        logger.info(f"获取 {date} 全部股票K线数据 (分页): 每页={pagination.page_size}, 返回={len(page['data'])}条")
         
         return ResponseBuilder.build_paginated_response(
-            data=results,
-            total=total,
+            page=page,
             pagination=pagination,
             params={"date": date}
         )
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取分页全部K线数据失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/kline/{code}/export")
+def export_stock_kline(
+    code: str,
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    format: ExportFormat = Query(ExportFormat.CSV, description="导出格式"),
+    trailer: bool = Query(True, description="CSV/NDJSON 末尾是否追加行数标记"),
+    storage: MongoStorage = Depends(get_storage)
+):
+    """
+    导出指定股票的K线数据
+    
+    参数:
+        code: 股票代码
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        format: 导出格式 (csv/json/ndjson/excel/parquet/arrow)
+        trailer: CSV/NDJSON 末尾是否追加行数标记
+    
+    返回:
+        文件下载流
+    """
+    try:
+        # 验证日期范围
+        DataValidator.validate_date_range(start_date, end_date)
+        
+        logger.info(f"导出股票 {code} K线数据, 格式={format}")
+        rows = storage.iter_klines(code, start_date, end_date)
+        return _export_klines(rows, format, f"{code}_kline", trailer)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"导出K线数据失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/kline/{code}/{date}")
-def get_stock_kline_by_date(
+async def get_stock_kline_by_date(
     code: str,
     date: str,
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
     获取指定日期的股票K线数据
@@ -475,7 +648,7 @@ def get_stock_kline_by_date(
         指定日期的股票K线数据
     """
     try:
-        result = storage.get_kline_by_date(code, date)
+        result = await storage.get_kline_by_date(code, date)
         
         if not result:
             raise HTTPException(status_code=404, detail="数据不存在")
@@ -495,11 +668,11 @@ def get_stock_kline_by_date(
 
 
 @router.get("/klines")
-def get_all_stocks_klines(
+async def get_all_stocks_klines(
     start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
     limit: Optional[int] = Query(None, ge=1, description="返回数量限制"),
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
     获取所有股票的K线数据（用于计算技术指标）
@@ -522,7 +695,7 @@ def get_all_stocks_klines(
         limit = DataValidator.validate_limit(limit)
         
         # 查询数据
-        results = storage.get_all_klines(start_date, end_date, limit)
+        results = await storage.get_all_klines(start_date, end_date, limit)
         
         if not results:
             return {
@@ -571,53 +744,126 @@ def get_all_stocks_klines(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/klines/bulk")
+async def get_klines_bulk(
+    codes: str = Query(..., description="股票代码，逗号分隔"),
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，默认全部K线字段"),
+    format: Optional[str] = Query(None, description="返回格式 json/arrow，默认按Accept头协商"),
+    accept: Optional[str] = Header(None),
+    storage: AsyncMongoStorage = Depends(get_async_storage)
+):
+    """
+    批量获取多只股票的K线数据（列式返回）
+    
+    单次 $in 查询，返回 {字段: 列数组}，适合全市场筛选和指标计算。
+    format=arrow 或 Accept 为 application/vnd.apache.arrow.stream 时返回 Arrow IPC 流
+    
+    参数:
+        codes: 股票代码，逗号分隔
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        fields: 返回字段，逗号分隔
+        format: 返回格式 (json/arrow)
+    
+    返回:
+        列式K线数据
+    """
+    try:
+        DataValidator.validate_date_range(start_date, end_date)
+        
+        code_list = [c.strip() for c in codes.split(",") if c.strip()]
+        if not code_list:
+            raise HTTPException(status_code=400, detail="codes不能为空")
+        if len(code_list) > QueryConfig.MAX_BULK_CODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"股票数量 {len(code_list)} 超过最大限制 {QueryConfig.MAX_BULK_CODES}"
+            )
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        
+        if format not in (None, "json", "arrow"):
+            raise HTTPException(status_code=400, detail=f"不支持的返回格式: {format}")
+        want_arrow = format == "arrow" or (
+            format is None and arrow_codec.ARROW_STREAM_MEDIA_TYPE in (accept or "")
+        )
+        if want_arrow:
+            DataExporter._require_pyarrow()
+        
+        columns = await storage.get_klines_bulk(
+            code_list, start_date, end_date, fields=field_list, as_frame=False
+        )
+        count = len(next(iter(columns.values()))) if columns else 0
+        
+        logger.info(f"批量获取K线数据: {len(code_list)} 只股票, {count} 条记录")
+        
+        if want_arrow:
+            return Response(
+                content=arrow_codec.columns_to_arrow_stream(columns),
+                media_type=arrow_codec.ARROW_STREAM_MEDIA_TYPE
+            )
+        
+        return {
+            "success": True,
+            "count": count,
+            "columns": columns,
+            "params": {"codes": code_list, "start_date": start_date, "end_date": end_date}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"批量获取K线数据失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/klines/paginated")
-def get_all_stocks_klines_paginated(
+async def get_all_stocks_klines_paginated(
     start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
     pagination: PaginationParams = Depends(parse_pagination_params),
-    storage: MongoStorage = Depends(get_storage)
+    storage: AsyncMongoStorage = Depends(get_async_storage)
 ):
     """
-    获取所有股票的K线数据（分页）
+    获取所有股票的K线数据（游标分页）
     
-    适用于数据量较大的情况，推荐使用此接口
+    适用于数据量较大的情况，推荐使用此接口导出全量历史；
+    按日期、代码降序，使用 next_cursor 翻页，任意深度的页面耗时一致
     
     参数:
         start_date: 开始日期 (YYYY-MM-DD)
         end_date: 结束日期 (YYYY-MM-DD)
-        page: 页码，从1开始
+        cursor: 分页游标，首页不传
         page_size: 每页数量 (1-1000)
     
     返回:
-        分页的股票K线数据
+        分页的股票K线数据及 next_cursor
     """
     try:
         # 验证日期范围
         DataValidator.validate_date_range(start_date, end_date)
         
-        # 查询数据（带分页）
-        results = storage.get_all_klines(
-            start_date, 
-            end_date, 
-            limit=pagination.page_size,
-            skip=pagination.skip
+        # 查询数据（游标分页）
+        page = await storage.get_all_klines_page(
+            start_date,
+            end_date,
+            page_size=pagination.page_size,
+            cursor=pagination.cursor
         )
         
-        # 获取总数
-        total = len(results)  # 这里简化处理，实际可能需要count查询
-        
-        logger.info(f"获取全部股票K线数据 (分页): 页码={pagination.page}, 每页={pagination.page_size}, 返回={len(results)}条")
+        logger.info(f"获取全部股票K线数据 (分页): 每页={pagination.page_size}, 返回={len(page['data'])}条")
         
         return ResponseBuilder.build_paginated_response(
-            data=results,
-            total=total,
+            page=page,
             pagination=pagination,
             params={"start_date": start_date, "end_date": end_date}
         )
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取分页全部K线数据失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -628,17 +874,20 @@ def export_all_stocks_klines(
     start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
     format: ExportFormat = Query(ExportFormat.CSV, description="导出格式"),
+    trailer: bool = Query(True, description="CSV/NDJSON 末尾是否追加行数标记"),
     storage: MongoStorage = Depends(get_storage)
 ):
     """
     导出所有股票的K线数据
     
-    支持导出为CSV、JSON或Excel格式，适用于大数据量场景
+    CSV/JSON/NDJSON/Parquet/Arrow 直接从数据库游标流式输出，不受导出条数限制；
+    Excel 需要整体生成，超过 MAX_EXPORT_RECORDS 条时返回400
     
     参数:
         start_date: 开始日期 (YYYY-MM-DD)
         end_date: 结束日期 (YYYY-MM-DD)
-        format: 导出格式 (csv/json/excel)
+        format: 导出格式 (csv/json/ndjson/excel/parquet/arrow)
+        trailer: CSV/NDJSON 末尾是否追加行数标记，缺失说明导出被中断
     
     返回:
         文件下载流
@@ -647,79 +896,134 @@ def export_all_stocks_klines(
         # 验证日期范围
         DataValidator.validate_date_range(start_date, end_date)
         
-        # 查询数据（不限制数量，但需要验证）
-        results = storage.get_all_klines(start_date, end_date, limit=None)
+        logger.info(f"导出股票K线数据: {start_date} ~ {end_date}, 格式={format}")
+        rows = storage.iter_klines(None, start_date, end_date)
+        basename = f"stock_kline_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return _export_klines(rows, format, basename, trailer)
         
-        if not results:
-            raise HTTPException(status_code=404, detail="没有数据可导出")
-        
-        # 验证导出数据量
-        DataValidator.validate_export_limit(len(results))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"导出K线数据失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/realtime")
+async def get_realtime_quotes(
+    codes: str = Query(..., description="股票代码，逗号分隔，如 600000,sz000001")
+):
+    """
+    批量获取实时行情
+    
+    东方财富 / 新浪异步批量接口，每个数据源按单次请求上限分片并发请求，
+    未取到的代码再交给同步的多数据源管理器
+    
+    参数:
+        codes: 股票代码，逗号分隔
+    
+    返回:
+        {股票代码: 行情}
+    """
+    code_list = [c.strip() for c in codes.split(",") if c.strip()]
+    if not code_list:
+        raise HTTPException(status_code=400, detail="codes不能为空")
+    if len(code_list) > QueryConfig.MAX_REALTIME_CODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"股票数量 {len(code_list)} 超过最大限制 {QueryConfig.MAX_REALTIME_CODES}"
+        )
+    
+    try:
+        data = await get_async_data_source_manager().get_stock_data_batch(code_list)
+        return {
+            "success": True,
+            "count": len(data),
+            "missing": [code for code in code_list if code not in data],
+            "data": data,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"批量获取实时行情失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/market/snapshot")
+async def get_market_snapshot(
+    date: Optional[str] = Query(None, description="交易日 YYYY-MM-DD，默认最新交易日"),
+    storage: AsyncMongoStorage = Depends(get_async_storage)
+):
+    """
+    获取市场快照
+    
+    返回预先汇总的涨跌家数、涨跌停数、成交额、涨跌幅榜和行业均值
+    
+    参数:
+        date: 交易日 (YYYY-MM-DD)
+    
+    返回:
+        市场快照
+    """
+    try:
+        if date:
+            DataValidator.validate_date_range(date, date)
         
-        logger.info(f"导出股票K线数据: {len(results)} 条记录, 格式={format}")
+        snapshot = await storage.get_market_snapshot(date)
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="没有该日期的K线数据")
         
-        # 根据格式导出
-        if format == ExportFormat.CSV:
-            return DataExporter.export_to_csv(results)
-        elif format == ExportFormat.JSON:
-            return DataExporter.export_to_json(results)
-        elif format == ExportFormat.EXCEL:
-            return DataExporter.export_to_excel(results)
+        return {
+            "success": True,
+            "data": snapshot
+        }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"导出K线数据失败: {e}")
+        logger.error(f"获取市场快照失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/kline/{code}/export")
-def export_stock_kline(
+@router.get("/indicators/{code}")
+def get_stock_indicators(
     code: str,
-    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
-    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
-    format: ExportFormat = Query(ExportFormat.CSV, description="导出格式"),
-    storage: MongoStorage = Depends(get_storage)
+    days: int = Query(60, ge=1, le=500, description="返回最近多少根日K线的指标序列"),
+    analyzer: TechnicalAnalyzer = Depends(get_indicator_analyzer)
 ):
     """
-    导出指定股票的K线数据
+    获取日线技术指标（看板）
+    
+    指标序列取自指标缓存，只计算缓存之后新增的K线
     
     参数:
         code: 股票代码
-        start_date: 开始日期 (YYYY-MM-DD)
-        end_date: 结束日期 (YYYY-MM-DD)
-        format: 导出格式 (csv/json/excel)
+        days: 指标序列长度
     
     返回:
-        文件下载流
+        最新一根日K线的 RSI/MACD/KDJ/布林带，以及最近 days 根K线的指标序列
     """
     try:
-        # 验证日期范围
-        DataValidator.validate_date_range(start_date, end_date)
-        
-        # 查询数据
-        results = storage.get_kline(code, start_date, end_date, limit=None)
-        
-        if not results:
-            raise HTTPException(status_code=404, detail="没有数据可导出")
-        
-        # 验证导出数据量
-        DataValidator.validate_export_limit(len(results))
-        
-        logger.info(f"导出股票 {code} K线数据: {len(results)} 条记录, 格式={format}")
+        series = analyzer.lookup_series(code)
+        if series is None:
+            raise HTTPException(status_code=404, detail="没有该股票的K线数据")
+        
+        data = {
+            "latest": analyzer.lookup(code),
+            "dates": list(series["dates"][-days:]),
+            "rsi": _tail(series["rsi"], days),
+        }
+        for name in ("macd", "kdj", "bollinger"):
+            data[name] = {key: _tail(values, days) for key, values in series[name].items()}
         
-        # 根据格式导出
-        if format == ExportFormat.CSV:
-            return DataExporter.export_to_csv(results, f"{code}_kline.csv")
-        elif format == ExportFormat.JSON:
-            return DataExporter.export_to_json(results, f"{code}_kline.json")
-        elif format == ExportFormat.EXCEL:
-            return DataExporter.export_to_excel(results, f"{code}_kline.xlsx")
+        return {
+            "success": True,
+            "code": code,
+            "data": data
+        }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"导出K线数据失败: {e}")
+        logger.error(f"获取技术指标失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -745,3 +1049,28 @@ def get_data_stats(
     except Exception as e:
         logger.error(f"获取统计信息失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats")
+def get_cache_stats(
+    storage: MongoStorage = Depends(get_storage)
+):
+    """
+    获取K线/资金流向查询缓存的命中统计
+    
+    返回:
+        各集合的命中、未命中、失效次数及当前条目数
+    """
+    if storage.cache is None:
+        return {
+            "success": True,
+            "enabled": False,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    return {
+        "success": True,
+        "enabled": True,
+        "stats": storage.cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
@@ -0,0 +1,246 @@
+"""
+Baostock 多进程批量K线下载
+
+baostock 每个进程只有一个 socket，单进程内只能串行请求；全市场几千只股票逐只下载要几十分钟。
+这里把代码列表切分成分片，交给进程池并行下载：
+- 每个工作进程持有自己的 baostock 会话（见 baostock_session.py），进程启动时登录
+- 每个进程按 rate_limit / workers 限速，整体请求频率不超过 rate_limit
+- 分片完成时汇报进度；查询出错的代码收集起来，全部分片结束后重试 retries 轮
+- 结果合并成一个 DataFrame，列与 BaostockKlineFetcher.get_kline 一致，另加 name 列
+
+工作进程使用 spawn 启动，避免在多线程的 API 进程里 fork 出持有锁的子进程。
+"""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# (已完成代码数, 总代码数, 失败代码数)
+ProgressCallback = Callable[[int, int, int], None]
+
+
+class RateLimiter:
+    """单进程内的最小请求间隔限速"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+# 工作进程内的限速器（每个进程一个）
+_worker_limiter: Optional[RateLimiter] = None
+
+
+def _init_worker(rate: float):
+    """工作进程初始化：登录 baostock 并创建本进程的限速器"""
+    global _worker_limiter
+    from .baostock_session import get_baostock_session
+
+    _worker_limiter = RateLimiter(rate)
+    try:
+        get_baostock_session().login()
+    except Exception as e:
+        # 首次查询时会再次尝试登录
+        logger.warning(f"工作进程登录 baostock 失败: {e}")
+
+
+def _fetch_kline(code: str, start_date: str, end_date: str, frequency: str, adjustflag: str):
+    from .baostock_kline_fetcher import query_kline
+
+    return query_kline(code, start_date, end_date, frequency, adjustflag)
+
+
+def _download_shard(
+    codes: List[str],
+    start_date: str,
+    end_date: str,
+    frequency: str,
+    adjustflag: str,
+    fetch: Callable = None,
+) -> Tuple[Optional[pd.DataFrame], List[str]]:
+    """
+    下载一个分片（在工作进程或当前进程内执行）
+
+    Returns:
+        (合并后的 DataFrame 或 None, 查询出错需要重试的代码)
+    """
+    fetch = fetch or _fetch_kline
+    limiter = _worker_limiter or RateLimiter(0)
+    frames, failed = [], []
+    for code in codes:
+        limiter.wait()
+        try:
+            df = fetch(code, start_date, end_date, frequency, adjustflag)
+        except Exception as e:
+            logger.warning(f"获取 {code} K线数据失败: {e}")
+            failed.append(code)
+            continue
+        if df is not None and not df.empty:
+            df['name'] = code
+            frames.append(df)
+    if not frames:
+        return None, failed
+    return pd.concat(frames, ignore_index=True), failed
+
+
+def shard_codes(codes: List[str], shard_size: int) -> List[List[str]]:
+    """按 shard_size 切分代码列表"""
+    shard_size = max(1, shard_size)
+    return [codes[i:i + shard_size] for i in range(0, len(codes), shard_size)]
+
+
+class BaostockBatchDownloader:
+    """分片 + 进程池的 baostock 批量K线下载器"""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        rate_limit: float = 20.0,
+        retries: int = 2,
+        shard_size: int = 50,
+        progress: ProgressCallback = None,
+        fetch: Callable = None,
+    ):
+        """
+        Args:
+            workers: 工作进程数，<=1 时在当前进程内串行下载
+            rate_limit: 所有进程合计每秒最多请求数，<=0 不限速
+            retries: 失败代码的重试轮数
+            shard_size: 每个分片的代码数
+            progress: 进度回调 (已完成, 总数, 失败数)
+            fetch: 单只股票的下载函数（需可被子进程 pickle），默认 query_kline
+        """
+        self.workers = max(1, workers)
+        self.rate_limit = rate_limit
+        self.retries = max(0, retries)
+        self.shard_size = shard_size
+        self.progress = progress
+        self.fetch = fetch
+        self.failed: List[str] = []  # 最近一次 download 重试后仍失败的代码
+
+    @classmethod
+    def from_settings(cls, **kwargs) -> "BaostockBatchDownloader":
+        from app.core.config import settings
+
+        options = dict(
+            workers=settings.baostock_workers,
+            rate_limit=settings.baostock_rate_limit,
+            retries=settings.baostock_retries,
+            shard_size=settings.baostock_shard_size,
+        )
+        options.update(kwargs)
+        return cls(**options)
+
+    def _per_worker_rate(self, workers: int) -> float:
+        return self.rate_limit / workers if self.rate_limit and self.rate_limit > 0 else 0.0
+
+    def _run_round(
+        self, codes: List[str], args: tuple, done: int, total: int
+    ) -> Tuple[List[pd.DataFrame], List[str]]:
+        """下载一轮，返回 (结果分片, 失败代码)"""
+        shards = shard_codes(codes, self.shard_size)
+        workers = min(self.workers, len(shards))
+        frames: List[pd.DataFrame] = []
+        failed: List[str] = []
+
+        def collect(shard: List[str], result):
+            nonlocal done
+            df, shard_failed = result
+            if df is not None:
+                frames.append(df)
+            failed.extend(shard_failed)
+            done += len(shard) - len(shard_failed)
+            logger.info(f"Baostock 批量下载进度: {done}/{total}，失败 {len(failed)}")
+            if self.progress:
+                self.progress(done, total, len(failed))
+
+        if workers <= 1:
+            global _worker_limiter
+            previous, _worker_limiter = _worker_limiter, RateLimiter(self._per_worker_rate(1))
+            try:
+                for shard in shards:
+                    collect(shard, _download_shard(shard, *args, fetch=self.fetch))
+            finally:
+                _worker_limiter = previous
+            return frames, failed
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._per_worker_rate(workers),),
+        ) as pool:
+            futures = {
+                pool.submit(_download_shard, shard, *args, fetch=self.fetch): shard for shard in shards
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"分片下载失败 ({len(shard)} 只股票): {e}")
+                    result = (None, list(shard))
+                collect(shard, result)
+        return frames, failed
+
+    def download(
+        self,
+        codes: List[str],
+        start_date: str,
+        end_date: str,
+        frequency: str = "d",
+        adjustflag: str = "3",
+    ) -> pd.DataFrame:
+        """
+        批量下载K线
+
+        Args:
+            codes: 股票代码列表，格式如 sh.600000
+            start_date: 开始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+            frequency: 数据频率
+            adjustflag: 复权类型
+
+        Returns:
+            合并后的K线 DataFrame，全部失败时返回空 DataFrame
+        """
+        codes = list(dict.fromkeys(codes))
+        total = len(codes)
+        args = (start_date, end_date, frequency, adjustflag)
+        started = time.monotonic()
+
+        frames, failed = self._run_round(codes, args, 0, total)
+        for attempt in range(self.retries):
+            if not failed:
+                break
+            logger.info(f"重试 {len(failed)} 只下载失败的股票（第 {attempt + 1} 轮）")
+            retry_frames, failed = self._run_round(failed, args, total - len(failed), total)
+            frames.extend(retry_frames)
+
+        self.failed = failed
+        if failed:
+            logger.warning(f"{len(failed)} 只股票重试后仍然失败: {failed[:20]}")
+        if not frames:
+            return pd.DataFrame()
+
+        result = pd.concat(frames, ignore_index=True)
+        logger.info(
+            f"批量获取K线数据完成，{total - len(failed)}/{total} 只股票，"
+            f"共 {len(result)} 条记录，耗时 {time.monotonic() - started:.1f}s"
+        )
+        return result
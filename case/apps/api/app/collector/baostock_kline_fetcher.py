@@ -2,26 +2,72 @@
 import baostock as bs
 import pandas as pd
 import logging
-from typing import List, Optional
+from typing import Callable, List, Optional
 from datetime import datetime, timedelta
 
+from .baostock_session import get_baostock_session
+
 logger = logging.getLogger(__name__)
 
+KLINE_FIELDS = "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,peTTM,pbMRQ,psTTM,pcfNcfTTM,isST"
+NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg', 'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM']
+# 重命名列以匹配MongoDB格式
+KLINE_RENAME = {
+    'code': 'symbol',
+    'pctChg': 'change_pct',
+    'turn': 'turnover_rate',
+    'tradestatus': 'trade_status'
+}
+
+
+def query_kline(
+    code: str,
+    start_date: str,
+    end_date: str,
+    frequency: str = "d",
+    adjustflag: str = "3"
+) -> Optional[pd.DataFrame]:
+    """
+    查询一只股票的K线（使用进程内共享的 baostock 会话）
+
+    Returns:
+        K线数据DataFrame，无数据时返回None
+
+    Raises:
+        BaostockError: 登录或查询失败
+    """
+    df = get_baostock_session().query(
+        bs.query_history_k_data_plus,
+        code,
+        KLINE_FIELDS,
+        start_date=start_date,
+        end_date=end_date,
+        frequency=frequency,
+        adjustflag=adjustflag
+    )
+    if df.empty:
+        return None
+
+    # 转换数据类型
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+
+    return df.rename(columns=KLINE_RENAME)
+
 
 class BaostockKlineFetcher:
     """Baostock K线数据获取器"""
     
-    def __init__(self):
-        self._connected = False
-    
-    def _ensure_connected(self):
-        """确保已连接到baostock"""
-        if not self._connected:
-            lg = bs.login()
-            if lg.error_code != '0':
-                raise Exception(f"Baostock登录失败: {lg.error_msg}")
-            self._connected = True
-            logger.info("Baostock登录成功")
+    def __init__(self, progress: Callable[[int, int, int], None] = None):
+        """
+        Args:
+            progress: 批量下载进度回调 (已完成, 总数, 失败数)
+        """
+        self.progress = progress
     
     def get_kline(
         self,
@@ -45,54 +91,17 @@ class BaostockKlineFetcher:
             K线数据DataFrame，如果失败返回None
         """
         try:
-            self._ensure_connected()
-            
-            rs = bs.query_history_k_data_plus(
-                code,
-                "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,peTTM,pbMRQ,psTTM,pcfNcfTTM,isST",
-                start_date=start_date,
-                end_date=end_date,
-                frequency=frequency,
-                adjustflag=adjustflag
-            )
-            
-            if rs.error_code != '0':
-                logger.error(f"获取 {code} K线数据失败: {rs.error_msg}")
-                return None
-            
-            data_list = []
-            while (rs.error_code == '0') & rs.next():
-                data_list.append(rs.get_row_data())
-            
-            if not data_list:
-                logger.warning(f"{code} 无K线数据")
-                return None
-            
-            df = pd.DataFrame(data_list, columns=rs.fields)
-            
-            # 转换数据类型
-            numeric_cols = ['open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg', 'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM']
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-            
-            # 重命名列以匹配MongoDB格式
-            df = df.rename(columns={
-                'code': 'symbol',
-                'pctChg': 'change_pct',
-                'turn': 'turnover_rate',
-                'tradestatus': 'trade_status'
-            })
-            
-            logger.info(f"获取 {code} K线数据成功，共 {len(df)} 条")
-            return df
-            
+            df = query_kline(code, start_date, end_date, frequency, adjustflag)
         except Exception as e:
-            logger.error(f"获取 {code} K线数据异常: {e}")
+            logger.error(f"获取 {code} K线数据失败: {e}")
+            return None
+
+        if df is None:
+            logger.warning(f"{code} 无K线数据")
             return None
+
+        logger.info(f"获取 {code} K线数据成功，共 {len(df)} 条")
+        return df
     
     def get_klines_batch(
         self,
@@ -113,33 +122,15 @@ class BaostockKlineFetcher:
             adjustflag: 复权类型
         
         Returns:
-            合并后的K线数据DataFrame
+            合并后的K线数据DataFrame（按配置分片到多个进程并行下载，失败的代码会重试）
         """
-        all_data = []
-        
-        for code in codes:
-            try:
-                df = self.get_kline(code, start_date, end_date, frequency, adjustflag)
-                if df is not None and not df.empty:
-                    df['name'] = code
-                    all_data.append(df)
-            except Exception as e:
-                logger.warning(f"获取 {code} K线数据失败: {e}")
-                continue
-        
-        if not all_data:
-            return pd.DataFrame()
-        
-        result = pd.concat(all_data, ignore_index=True)
-        logger.info(f"批量获取K线数据完成，共 {len(result)} 条记录")
-        return result
+        from .baostock_downloader import BaostockBatchDownloader
+
+        downloader = BaostockBatchDownloader.from_settings(progress=self.progress)
+        return downloader.download(codes, start_date, end_date, frequency, adjustflag)
     
     def close(self):
-        """关闭连接"""
-        if self._connected:
-            bs.logout()
-            self._connected = False
-            logger.info("Baostock连接已关闭")
+        """关闭获取器（baostock 会话归进程所有，进程退出时登出）"""
     
     def __enter__(self):
         """上下文管理器入口"""
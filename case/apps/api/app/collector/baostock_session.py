@@ -0,0 +1,107 @@
+"""
+Baostock 登录会话管理
+
+baostock 客户端是进程全局的单个 socket，login/logout 作用于整个进程且不是线程安全的。
+此前获取器、选股、数据源适配器各自 login/logout，互相登出对方的会话，并发调用时数据串包。
+这里每个进程只维护一个会话：
+- 首次查询时登录，之后一直复用，进程退出时登出
+- 所有查询在同一把锁内执行，保证同一时刻只有一个请求使用 socket
+- fork 出的子进程（如批量下载的工作进程）按 pid 判断，会在子进程内重新登录
+- 查询返回错误（如会话过期被服务端踢出）时重新登录并重试一次
+"""
+
+import atexit
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import baostock as bs
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class BaostockError(Exception):
+    """baostock 登录或查询失败"""
+
+
+class BaostockSession:
+    """进程内唯一的 baostock 会话"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = None  # 已登录的进程 id
+
+    @property
+    def logged_in(self) -> bool:
+        return self._pid == os.getpid()
+
+    def login(self, force: bool = False):
+        """登录（已登录时跳过，force 时重新登录）"""
+        with self._lock:
+            if self.logged_in and not force:
+                return
+            lg = bs.login()
+            if lg.error_code != '0':
+                self._pid = None
+                raise BaostockError(f"Baostock登录失败: {lg.error_msg}")
+            self._pid = os.getpid()
+            logger.info(f"Baostock登录成功 (pid={self._pid})")
+
+    def logout(self):
+        with self._lock:
+            if not self.logged_in:
+                return
+            try:
+                bs.logout()
+            except Exception as e:
+                logger.debug(f"Baostock登出失败: {e}")
+            self._pid = None
+            logger.info("Baostock连接已关闭")
+
+    @contextmanager
+    def session(self) -> Iterator:
+        """持锁并确保已登录，块内可直接调用 baostock 模块"""
+        with self._lock:
+            self.login()
+            yield bs
+
+    def query(self, func: Callable, *args, **kwargs) -> pd.DataFrame:
+        """
+        执行一次 baostock 查询并读完全部分页
+
+        Args:
+            func: baostock 查询函数，如 bs.query_stock_industry
+            *args, **kwargs: 查询参数
+
+        Returns:
+            查询结果 DataFrame（列为 rs.fields）
+
+        Raises:
+            BaostockError: 重新登录后仍然失败
+        """
+        error_msg = ""
+        for attempt in range(2):
+            with self.session():
+                rs = func(*args, **kwargs)
+                rows = []
+                while (rs.error_code == '0') & rs.next():
+                    rows.append(rs.get_row_data())
+                if rs.error_code == '0':
+                    return pd.DataFrame(rows, columns=rs.fields)
+                error_msg = rs.error_msg
+                if attempt == 0:
+                    logger.warning(f"Baostock查询失败，重新登录后重试: {error_msg}")
+                    self.login(force=True)
+        raise BaostockError(f"Baostock查询失败: {error_msg}")
+
+
+_session = BaostockSession()
+atexit.register(_session.logout)
+
+
+def get_baostock_session() -> BaostockSession:
+    """当前进程的 baostock 会话"""
+    return _session
@@ -117,7 +117,8 @@ class StockAnalyzer:
             # 保存新闻分析股票到单独的collection
             try:
                 from app.storage.mongo_client import MongoStorage
-                mongo = MongoStorage(**self.mongo_config)
+                from app.storage.query_cache import get_query_cache
+                mongo = MongoStorage(**self.mongo_config, cache=get_query_cache())
                 mongo.connect()
                 
                 # 转换股票格式，添加必要的字段
@@ -221,33 +222,25 @@ class StockAnalyzer:
     def _get_capital_flow_data(self, names: List[str], days: int = 10) -> pd.DataFrame:
         """从MongoDB获取资金流向数据（baostock不提供资金流向数据）"""
         from app.storage.mongo_client import MongoStorage
+        from app.storage.query_cache import get_query_cache
 
         end_date = datetime.now().strftime("%Y-%m-%d")
         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
 
         try:
-            mongo = MongoStorage(**self.mongo_config)
+            mongo = MongoStorage(**self.mongo_config, cache=get_query_cache())
             mongo.connect()
+            try:
+                result = mongo.get_capital_flow_bulk(
+                    names, start_date=start_date, end_date=end_date
+                )
+            finally:
+                mongo.close()
 
-            all_data = []
-            for symbol in names:
-                try:
-                    data = mongo.get_capital_flow(
-                        symbol, start_date=start_date, end_date=end_date, limit=10
-                    )
-                    if data:
-                        df = pd.DataFrame(data)
-                        df["symbol"] = symbol
-                        all_data.append(df)
-                except Exception as e:
-                    logger.warning(f"获取 {symbol} 资金流向失败: {e}")
-
-            mongo.close()
-
-            if not all_data:
+            if result.empty:
                 return pd.DataFrame()
 
-            result = pd.concat(all_data, ignore_index=True)
+            result["symbol"] = result["name"]
 
             numeric_cols = [
                 "main_net_inflow",
@@ -7,6 +7,8 @@ from typing import Dict, List, Tuple
 from datetime import datetime, timedelta
 import baostock as bs
 
+from .baostock_session import get_baostock_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,22 +59,8 @@ class StockBatchFilter:
 
         # 从 baostock 获取
         logger.info("从 baostock 获取行业数据...")
-        lg = bs.login()
-        if lg.error_code != "0":
-            raise Exception(f"登录失败: {lg.error_msg}")
-
-        rs = bs.query_stock_industry()
-        if rs.error_code != "0":
-            bs.logout()
-            raise Exception(f"查询失败: {rs.error_msg}")
-
-        industry_list = []
-        while rs.next():
-            industry_list.append(rs.get_row_data())
-
-        result = pd.DataFrame(industry_list, columns=rs.fields)
+        result = get_baostock_session().query(bs.query_stock_industry)
         result.to_csv(csv_path, encoding="utf-8", index=False)
-        bs.logout()
 
         self._industry_df = result
         return result
@@ -174,40 +162,23 @@ class StockBatchFilter:
     def get_kline_data_batch(self, symbols: List[str], days: int = 30) -> pd.DataFrame:
         """批量获取K线数据"""
         from app.storage.mongo_client import MongoStorage
+        from app.storage.query_cache import get_query_cache
 
         end_date = datetime.now().strftime("%Y-%m-%d")
         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
 
-        mongo = MongoStorage(**self.mongo_config)
+        mongo = MongoStorage(**self.mongo_config, cache=get_query_cache())
         mongo.connect()
 
-        all_data = []
-        batch_size = 100  # 分批查询，避免一次查询太多
-
-        for i in range(0, len(symbols), batch_size):
-            batch = symbols[i : i + batch_size]
-            logger.info(
-                f"正在获取批次 {i // batch_size + 1}/{(len(symbols) + batch_size - 1) // batch_size} ({len(batch)} 只股票)"
-            )
-
-            for symbol in batch:
-                try:
-                    data = mongo.get_kline(
-                        symbol, start_date=start_date, end_date=end_date, limit=days
-                    )
-                    if data:
-                        df = pd.DataFrame(data)
-                        df["symbol"] = symbol
-                        all_data.append(df)
-                except Exception as e:
-                    logger.warning(f"获取 {symbol} K线失败: {e}")
-
-        mongo.close()
-
-        if not all_data:
+        logger.info(f"正在批量获取 {len(symbols)} 只股票的K线数据")
+        try:
+            result = mongo.get_klines_bulk(symbols, start_date=start_date, end_date=end_date)
+        finally:
+            mongo.close()
+
+        if result.empty:
             return pd.DataFrame()
 
-        result = pd.concat(all_data, ignore_index=True)
         result = result.rename(
             columns={
                 "code": "symbol",
@@ -270,9 +241,22 @@ class StockBatchFilter:
 
         # 步骤3: 计算技术指标
         logger.info("正在计算技术指标...")
+        from app.core.config import settings
         from .technical_indicators import TechnicalIndicators
 
-        kline_df = TechnicalIndicators.calculate_all(kline_df)
+        if settings.indicator_cache_enabled:
+            # 缓存中已有的历史K线不再重算，只补齐新增的K线
+            from app.indicators import IndicatorCache
+            from app.storage.mongo_client import MongoStorage
+            from app.storage.query_cache import get_query_cache
+
+            mongo = MongoStorage(**self.mongo_config, cache=get_query_cache())
+            try:
+                kline_df = TechnicalIndicators.calculate_cached(kline_df, IndicatorCache(mongo))
+            finally:
+                mongo.close()
+        else:
+            kline_df = TechnicalIndicators.calculate_all(kline_df)
 
         # 步骤4: 筛选和评分
         logger.info("正在筛选股票...")
@@ -18,6 +18,7 @@ class StockDataFetcher:
     def load_daily_data(self, date: str) -> pd.DataFrame:
         """加载指定日期的股票数据"""
         from app.storage.mongo_client import MongoStorage
+        from app.storage.query_cache import get_query_cache
         from app.core.config import settings
 
         mongo = MongoStorage(
@@ -26,6 +27,7 @@ class StockDataFetcher:
             db_name=settings.mongodb_database,
             username=settings.mongodb_username,
             password=settings.mongodb_password,
+            cache=get_query_cache(),
         )
         mongo.connect()
 
@@ -59,6 +61,7 @@ class StockDataFetcher:
     def load_klines(self, symbols: List[str], days: int = 60) -> pd.DataFrame:
         """批量加载K线数据"""
         from app.storage.mongo_client import MongoStorage
+        from app.storage.query_cache import get_query_cache
         from app.core.config import settings
 
         end_date = datetime.now().strftime("%Y-%m-%d")
@@ -70,28 +73,18 @@ class StockDataFetcher:
             db_name=settings.mongodb_database,
             username=settings.mongodb_username,
             password=settings.mongodb_password,
+            cache=get_query_cache(),
         )
         mongo.connect()
+        try:
+            result = mongo.get_klines_bulk(symbols, start_date=start_date, end_date=end_date)
+        finally:
+            mongo.close()
 
-        all_data = []
-        for symbol in symbols:
-            try:
-                data = mongo.get_kline(
-                    symbol, start_date=start_date, end_date=end_date, limit=100
-                )
-                if data:
-                    df = pd.DataFrame(data)
-                    df["symbol"] = symbol
-                    all_data.append(df)
-            except Exception as e:
-                logger.warning(f"获取 {symbol} K线失败: {e}")
-
-        mongo.close()
-
-        if not all_data:
+        if result.empty:
             return pd.DataFrame()
 
-        result = pd.concat(all_data, ignore_index=True)
+        result["symbol"] = result["code"]
         result = result.rename(
             columns={"pct_chg": "change_pct", "turnover": "turnover_rate"}
         )
@@ -163,6 +156,7 @@ class StockDataFetcher:
         """
         try:
             from app.storage.mongo_client import MongoStorage
+            from app.storage.query_cache import get_query_cache
             from app.core.config import settings
             
             # 获取当前日期
@@ -174,6 +168,7 @@ class StockDataFetcher:
                 db_name=settings.mongodb_database,
                 username=settings.mongodb_username,
                 password=settings.mongodb_password,
+                cache=get_query_cache(),
             )
             mongo.connect()
             
@@ -214,6 +209,7 @@ class StockDataFetcher:
         """
         try:
             from app.storage.mongo_client import MongoStorage
+            from app.storage.query_cache import get_query_cache
             from app.core.config import settings
             
             end_date = datetime.now().strftime("%Y-%m-%d")
@@ -225,6 +221,7 @@ class StockDataFetcher:
                 db_name=settings.mongodb_database,
                 username=settings.mongodb_username,
                 password=settings.mongodb_password,
+                cache=get_query_cache(),
             )
             mongo.connect()
             
@@ -1,16 +1,25 @@
 """技术指标计算模块"""
 
+import numpy as np
 import pandas as pd
 import logging
 
+from app.indicators import IndicatorCache, IndicatorPanel
+
 logger = logging.getLogger(__name__)
 
 
 class TechnicalIndicators:
-    """技术指标计算器"""
+    """
+    技术指标计算器
+
+    指标由 app.indicators 计算：长表一次转成 (股票 × K线) 面板，所有股票同时按数组运算。
+    calculate_all 只建一次面板；单独调用 calculate_* 时各自建面板。
+    calculate_cached 结果与 calculate_all 相同，均线和 RSI 改用持久化的指标缓存，每只股票只计算缓存之后新增的K线。
+    """
     
     @staticmethod
-    def calculate_ma(df: pd.DataFrame, window: int = 5) -> pd.DataFrame:
+    def calculate_ma(df: pd.DataFrame, window: int = 5, panel: IndicatorPanel = None) -> pd.DataFrame:
         if 'close' not in df.columns:
             logger.warning("缺少close列，无法计算MA")
             return df
@@ -19,45 +28,29 @@ class TechnicalIndicators:
         if column_name in df.columns:
             return df
         
-        symbol_counts = df.groupby('symbol').size()
-        valid_symbols = symbol_counts[symbol_counts >= window].index
-        
-        if len(valid_symbols) == 0:
+        panel = panel or IndicatorPanel(df)
+        if panel.width < window:
             logger.warning(f"没有股票有足够的数据（{len(df)} 条），无法计算 MA{window}")
             df[column_name] = None
             return df
         
-        logger.info(f"计算MA{window}: 总数据{len(df)}条, 股票数{len(symbol_counts)}只, 有效股票{len(valid_symbols)}只")
-        
-        df[column_name] = df.groupby('symbol')['close'].transform(
-            lambda x: x.rolling(window=window, min_periods=window).mean() if len(x) >= window else None
-        )
+        logger.info(f"计算MA{window}: 总数据{len(df)}条, 股票数{len(panel.symbols)}只, 有效股票{int((panel.lengths >= window).sum())}只")
+        df[column_name] = panel.unpivot(panel.ma(panel.pivot(df['close']), window))
         logger.info(f"MA{window}计算完成")
         return df
     
     @staticmethod
-    def calculate_rsi(df: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    def calculate_rsi(df: pd.DataFrame, window: int = 14, panel: IndicatorPanel = None) -> pd.DataFrame:
         if 'close' not in df.columns or 'rsi' in df.columns:
             return df
         
-        symbol_counts = df.groupby('symbol').size()
-        valid_symbols = symbol_counts[symbol_counts >= window].index
-        
-        if len(valid_symbols) == 0:
+        panel = panel or IndicatorPanel(df)
+        if panel.width < window:
             logger.warning(f"没有股票有足够的数据（{len(df)} 条），无法计算 RSI")
             df['rsi'] = None
             return df
         
-        def rsi_series(series: pd.Series, period: int = 14) -> pd.Series:
-            delta = series.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss.replace(0, float('inf'))
-            return 100 - (100 / (1 + rs))
-        
-        df['rsi'] = df.groupby('symbol')['close'].transform(
-            lambda x: rsi_series(x, period=window) if len(x) >= window else None
-        )
+        df['rsi'] = panel.unpivot(panel.rsi(panel.pivot(df['close']), window))
         return df
     
     @staticmethod
@@ -72,7 +65,10 @@ class TechnicalIndicators:
         return df
     
     @staticmethod
-    def calculate_macd(df: pd.DataFrame, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> pd.DataFrame:
+    def calculate_macd(
+        df: pd.DataFrame, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9,
+        panel: IndicatorPanel = None
+    ) -> pd.DataFrame:
         if 'close' not in df.columns:
             logger.warning("缺少close列，无法计算MACD")
             return df
@@ -80,33 +76,18 @@ class TechnicalIndicators:
         if 'macd' in df.columns:
             return df
         
-        symbol_counts = df.groupby('symbol').size()
-        valid_symbols = symbol_counts[symbol_counts >= slow_period + signal_period].index
-        
-        if len(valid_symbols) == 0:
+        panel = panel or IndicatorPanel(df)
+        if panel.width < slow_period + signal_period:
             logger.warning(f"没有股票有足够的数据（{len(df)} 条），无法计算 MACD")
             df['macd'] = None
             df['macd_signal'] = None
             df['macd_hist'] = None
             return df
         
-        def macd_line(series: pd.Series) -> pd.Series:
-            ema_fast = series.ewm(span=fast_period, adjust=False).mean()
-            ema_slow = series.ewm(span=slow_period, adjust=False).mean()
-            return ema_fast - ema_slow
-        
-        def macd_signal(series: pd.Series) -> pd.Series:
-            return series.ewm(span=signal_period, adjust=False).mean()
-        
-        df['macd'] = df.groupby('symbol')['close'].transform(
-            lambda x: macd_line(x) if len(x) >= slow_period + signal_period else None
-        )
-        
-        df['macd_signal'] = df.groupby('symbol')['macd'].transform(
-            lambda x: macd_signal(x) if len(x) >= signal_period else None
-        )
-        
-        df['macd_hist'] = df['macd'] - df['macd_signal']
+        macd, signal, hist = panel.macd(panel.pivot(df['close']), fast_period, slow_period, signal_period)
+        df['macd'] = panel.unpivot(macd)
+        df['macd_signal'] = panel.unpivot(signal)
+        df['macd_hist'] = panel.unpivot(hist)
         
         logger.info("MACD计算完成")
         return df
@@ -117,9 +98,50 @@ class TechnicalIndicators:
             ma_windows = [5, 10, 20]
         
         df = cls.calculate_amplitude(df)
+        panel = IndicatorPanel(df) if 'symbol' in df.columns else None
         for window in ma_windows:
-            df = cls.calculate_ma(df, window)
-        df = cls.calculate_rsi(df, rsi_window)
-        df = cls.calculate_macd(df)
+            df = cls.calculate_ma(df, window, panel)
+        df = cls.calculate_rsi(df, rsi_window, panel)
+        df = cls.calculate_macd(df, panel=panel)
+        
+        return df
+    
+    @classmethod
+    def calculate_cached(cls, df: pd.DataFrame, cache: IndicatorCache) -> pd.DataFrame:
+        """
+        与 calculate_all 结果相同，均线和 RSI 取自指标缓存，df 中的K线只用于补齐各股票缓存之后的部分
+        
+        均线窗口、RSI 周期、MACD 参数取 cache.params，df 中每只股票的K线按日期升序。
+        只有与 df 起始日期无关的值取自缓存：
+        - 均线、RSI 在每只股票前 window 根K线之后只取决于最近 window 根K线，取缓存的值；
+          之前的预热期与 calculate_all 一样按 df 计算（均线为 NaN，RSI 第一根K线的涨跌按 0 计）
+        - MACD 以 df 中第一根K线为 EMA 初值，随 df 的起始日期变化，按面板整段计算
+        close 为 NaN 的行不进入缓存，这些行及其之后一个窗口内的均线、RSI 可能与 calculate_all 不同。
+        """
+        if not {'symbol', 'date', 'close'}.issubset(df.columns):
+            return cls.calculate_all(df)
+        
+        params = cache.params
+        df = cls.calculate_amplitude(df)
+        panel = IndicatorPanel(df)
+        df = cls.calculate_macd(df, *params['macd'], panel=panel)
         
+        names = [f'ma{window}' for window in params['ma'] if f'ma{window}' not in df.columns]
+        names += ['rsi'] if 'rsi' not in df.columns else []
+        if not names:
+            return df
+        values = cache.lookup_frame(df, names)
+        logger.info(f"指标缓存: 股票数{len(panel.symbols)}只")
+        
+        close = panel.pivot(df['close'])
+        for window in params['ma']:
+            column = f'ma{window}'
+            if column in names:
+                ma = panel.splice_head(panel.ma(close[:, :window - 1], window), values[column])
+                df[column] = ma if panel.width >= window else None
+        
+        period = params['rsi']
+        if 'rsi' in names:
+            rsi = panel.splice_head(panel.rsi(close[:, :period], period), values['rsi'])
+            df['rsi'] = rsi if panel.width >= period else None
         return df
@@ -17,6 +17,24 @@ class Settings(BaseSettings):
     mongodb_database: str = "news_db"
     mongodb_dbname: str = "news_db"  # 兼容旧代码
     mongodb_collection: str = "news"
+    # MongoDB连接池配置
+    mongodb_max_pool_size: int = 50
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: int = 300000
+    mongodb_server_selection_timeout_ms: int = 30000
+    mongodb_connect_timeout_ms: int = 20000
+    
+    # 查询缓存配置（K线/资金流向读缓存）
+    query_cache_enabled: bool = True
+    query_cache_max_size: int = 2048  # 每个集合最多缓存的查询数
+    query_cache_kline_ttl: int = 300  # 秒
+    query_cache_capital_flow_ttl: int = 300  # 秒
+    query_cache_redis_url: str = ""  # 配置后使用Redis作为共享缓存
+    query_cache_invalidation_poll_interval: float = 2.0  # 拉取写入失效事件的最小间隔（秒）
+    # 日线指标序列缓存（indicator_cache 集合），选股、盯盘、看板共用
+    indicator_cache_enabled: bool = True
+    indicator_cache_max_bars: int = 500  # 每只股票每组参数保留的最近K线数
+    indicator_cache_history_days: int = 400  # 没有缓存时取回的K线自然日数
     
     # JWT配置
     jwt_secret_key: str = "your-secret-key-here"
@@ -42,6 +60,7 @@ class Settings(BaseSettings):
     monitor_enabled: bool = True
     monitor_interval: int = 300  # 监控间隔（秒）
     monitor_scheduler_time: str = "09:30"  # 盯盘开始时间
+    monitor_indicator_warmup_days: int = 120  # 没有指标状态检查点时预热的K线自然日数
     monitor_stocks: list = [
         {
             "code": "600519",
@@ -80,6 +99,27 @@ class Settings(BaseSettings):
     # 数据源配置 (akshare 或 tushare)
     data_source: str = "akshare"
     tushare_token: str = ""
+    # 统一数据源并发对冲（实时行情/资金流向）
+    data_source_fanout_enabled: bool = True
+    data_source_fanout_size: int = 2  # 同时查询的数据源数
+    data_source_hedge_delay_ms: int = 150  # 首选数据源未返回时，启动下一个数据源前的等待时间
+    data_source_adapter_timeout_ms: int = 3000  # 单个数据源的默认截止时间
+    # 数据源健康统计与熔断
+    data_source_health_window: int = 20  # 统计最近多少次调用
+    data_source_breaker_min_calls: int = 5  # 至少多少次调用才判断失败率
+    data_source_breaker_failure_rate: float = 0.5  # 打开熔断器的失败率
+    data_source_breaker_cooldown: float = 30.0  # 熔断后多久半开探测（秒）
+    data_source_spot_snapshot_ttl: float = 5.0  # 全市场行情快照的刷新间隔（秒）
+    data_source_tdx_pool_size: int = 4  # 通达信长连接数
+    data_source_tdx_checkout_timeout: float = 10.0  # 连接全部借出时的等待时间（秒）
+    data_source_kline_writeback: bool = True  # 远程K线写回 MongoDB，之后只补取缺失区间
+    data_source_http_concurrency: int = 4  # 异步行情源同时在途的请求数
+    data_source_http_timeout: float = 5.0  # 异步行情源单次请求超时（秒）
+    # Baostock 批量K线下载
+    baostock_workers: int = 4  # 下载进程数，1 为当前进程内串行
+    baostock_rate_limit: float = 20.0  # 所有进程合计每秒最多请求数，0 不限速
+    baostock_retries: int = 2  # 失败代码的重试轮数
+    baostock_shard_size: int = 50  # 每个分片的股票数
     
     class Config:
         env_file = ".env"
@@ -104,6 +144,20 @@ def load_config() -> Settings:
             mongodb_username=config_data.get("mongodb", {}).get("username", ""),
             mongodb_password=config_data.get("mongodb", {}).get("password", ""),
             mongodb_dbname=config_data.get("mongodb", {}).get("database", "news_db"),
+            mongodb_max_pool_size=config_data.get("mongodb", {}).get("max_pool_size", 50),
+            mongodb_min_pool_size=config_data.get("mongodb", {}).get("min_pool_size", 0),
+            mongodb_max_idle_time_ms=config_data.get("mongodb", {}).get("max_idle_time_ms", 300000),
+            mongodb_server_selection_timeout_ms=config_data.get("mongodb", {}).get("server_selection_timeout_ms", 30000),
+            mongodb_connect_timeout_ms=config_data.get("mongodb", {}).get("connect_timeout_ms", 20000),
+            query_cache_enabled=config_data.get("query_cache", {}).get("enabled", True),
+            query_cache_max_size=config_data.get("query_cache", {}).get("max_size", 2048),
+            query_cache_kline_ttl=config_data.get("query_cache", {}).get("kline_ttl", 300),
+            query_cache_capital_flow_ttl=config_data.get("query_cache", {}).get("capital_flow_ttl", 300),
+            query_cache_redis_url=config_data.get("query_cache", {}).get("redis_url", ""),
+            query_cache_invalidation_poll_interval=config_data.get("query_cache", {}).get("invalidation_poll_interval", 2.0),
+            indicator_cache_enabled=config_data.get("indicator_cache", {}).get("enabled", True),
+            indicator_cache_max_bars=config_data.get("indicator_cache", {}).get("max_bars", 500),
+            indicator_cache_history_days=config_data.get("indicator_cache", {}).get("history_days", 400),
             jwt_secret_key=config_data.get("jwt", {}).get("secret_key", "your-secret-key-here"),
             jwt_algorithm=config_data.get("jwt", {}).get("algorithm", "HS256"),
             jwt_access_token_expire_minutes=config_data.get("jwt", {}).get("access_token_expire_minutes", 30),
@@ -119,6 +173,24 @@ def load_config() -> Settings:
             llm_base_url=config_data.get("llm", {}).get("base_url", "https://api.deepseek.com"),
             data_source=config_data.get("data_source", {}).get("provider", "akshare"),
             tushare_token=config_data.get("data_source", {}).get("tushare_token", ""),
+            data_source_fanout_enabled=config_data.get("data_source", {}).get("fanout_enabled", True),
+            data_source_fanout_size=config_data.get("data_source", {}).get("fanout_size", 2),
+            data_source_hedge_delay_ms=config_data.get("data_source", {}).get("hedge_delay_ms", 150),
+            data_source_adapter_timeout_ms=config_data.get("data_source", {}).get("adapter_timeout_ms", 3000),
+            data_source_health_window=config_data.get("data_source", {}).get("health_window", 20),
+            data_source_breaker_min_calls=config_data.get("data_source", {}).get("breaker_min_calls", 5),
+            data_source_breaker_failure_rate=config_data.get("data_source", {}).get("breaker_failure_rate", 0.5),
+            data_source_breaker_cooldown=config_data.get("data_source", {}).get("breaker_cooldown", 30.0),
+            data_source_spot_snapshot_ttl=config_data.get("data_source", {}).get("spot_snapshot_ttl", 5.0),
+            data_source_tdx_pool_size=config_data.get("data_source", {}).get("tdx_pool_size", 4),
+            data_source_tdx_checkout_timeout=config_data.get("data_source", {}).get("tdx_checkout_timeout", 10.0),
+            data_source_kline_writeback=config_data.get("data_source", {}).get("kline_writeback", True),
+            data_source_http_concurrency=config_data.get("data_source", {}).get("http_concurrency", 4),
+            data_source_http_timeout=config_data.get("data_source", {}).get("http_timeout", 5.0),
+            baostock_workers=config_data.get("baostock", {}).get("workers", 4),
+            baostock_rate_limit=config_data.get("baostock", {}).get("rate_limit", 20.0),
+            baostock_retries=config_data.get("baostock", {}).get("retries", 2),
+            baostock_shard_size=config_data.get("baostock", {}).get("shard_size", 50),
             after_market_news_api_url=config_data.get("after_market", {}).get("news_api_url", "http://life233.top"),
             after_market_news_api_username=config_data.get("after_market", {}).get("news_api_username", "admin"),
             after_market_news_api_password=config_data.get("after_market", {}).get("news_api_password", "admin"),
@@ -131,6 +203,7 @@ def load_config() -> Settings:
             monitor_enabled=config_data.get("monitor", {}).get("enabled", True),
             monitor_interval=config_data.get("monitor", {}).get("interval", 300),
             monitor_scheduler_time=config_data.get("monitor", {}).get("scheduler_time", "09:30"),
+            monitor_indicator_warmup_days=config_data.get("monitor", {}).get("indicator_warmup_days", 120),
             monitor_stocks=config_data.get("monitor", {}).get("stocks", []),
         )
     else:
@@ -1,6 +1,7 @@
-from pymongo import MongoClient
 from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
 from app.core.config import settings
+from app.storage.client_registry import client_registry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,16 +11,18 @@ class MongoDB:
         self.client = None
         self.db = None
         self.collection = None
+        self.async_collection = None
     
     def connect(self):
         """连接MongoDB"""
         try:
             logger.info(f"尝试连接MongoDB: {settings.mongodb_host}:{settings.mongodb_port},{settings.mongodb_username}, {settings.mongodb_password}")
-            self.client = MongoClient(
-                host=settings.mongodb_host,
-                port=settings.mongodb_port,
-                username=settings.mongodb_username,
-                password=settings.mongodb_password
+            self.client = client_registry.get_client(
+                settings.mongodb_host,
+                settings.mongodb_port,
+                settings.mongodb_username,
+                settings.mongodb_password,
+                ping=False
             )
             self.db = self.client[settings.mongodb_database]
             self.collection = self.db[settings.mongodb_collection]
@@ -30,16 +33,31 @@ class MongoDB:
             return False
     
     def close(self):
-        """关闭MongoDB连接"""
+        """释放MongoDB连接（共享客户端由 client_registry 统一关闭）"""
         if self.client:
-            self.client.close()
-            logger.info("MongoDB连接已关闭")
+            self.client = None
+            self.db = None
+            self.collection = None
+            self.async_collection = None
+            logger.info("MongoDB连接已释放")
     
     def get_collection(self) -> Collection:
         """获取集合"""
         if self.collection is None:
             self.connect()
         return self.collection
+    
+    def get_async_collection(self) -> AsyncCollection:
+        """获取异步集合（供 async 端点使用，共享客户端由 client_registry 统一关闭）"""
+        if self.async_collection is None:
+            client = client_registry.get_async_client(
+                settings.mongodb_host,
+                settings.mongodb_port,
+                settings.mongodb_username,
+                settings.mongodb_password
+            )
+            self.async_collection = client[settings.mongodb_database][settings.mongodb_collection]
+        return self.async_collection
 
 # 创建全局MongoDB实例
 mongodb = MongoDB()
@@ -1,6 +1,10 @@
 from .interface import IDataSource
 from .models import StockKLine, StockInfo, DataSourceConfig, DataSourceType
+from .kline_frame import KLineFrame
 from .manager import DataSourceManager
+from .hedging import HedgeConfig
+from .health import HealthTracker, BreakerConfig, get_health_tracker
+from .spot_snapshot import SpotSnapshot, get_spot_snapshot
 
 __all__ = [
     "IDataSource",
@@ -8,5 +12,12 @@ __all__ = [
     "StockInfo",
     "DataSourceConfig",
     "DataSourceType",
-    "DataSourceManager"
+    "KLineFrame",
+    "DataSourceManager",
+    "HedgeConfig",
+    "HealthTracker",
+    "BreakerConfig",
+    "get_health_tracker",
+    "SpotSnapshot",
+    "get_spot_snapshot"
 ]
@@ -6,15 +6,25 @@ import pandas as pd
 
 from ..interface import IDataSource
 from ..models import StockKLine, StockInfo
+from ..kline_frame import KLineFrame
+from ..spot_snapshot import SpotSnapshot, get_spot_snapshot
 
 logger = logging.getLogger(__name__)
 
+# stock_zh_a_hist 列名 -> KLineFrame 列
+HIST_COLUMNS = {
+    '日期': 'date', '开盘': 'open', '最高': 'high', '最低': 'low', '收盘': 'close',
+    '成交量': 'volume', '成交额': 'amount', '换手率': 'turnover_rate', '涨跌幅': 'change_pct',
+}
+
 class AkshareAdapter(IDataSource):
     """Akshare数据源适配器"""
     
-    def __init__(self):
+    def __init__(self, spot_snapshot: SpotSnapshot = None):
         self._name = "Akshare"
         self._provider = "akshare"
+        # 实时行情/股票信息都从共享的全市场快照读取
+        self._spot = spot_snapshot or get_spot_snapshot()
     
     @property
     def name(self) -> str:
@@ -31,7 +41,7 @@ class AkshareAdapter(IDataSource):
         end_date: str,
         frequency: str = "d",
         adjust_flag: str = "3"
-    ) -> List[StockKLine]:
+    ) -> KLineFrame:
         try:
             # 转换代码格式 sh.600000 -> 600000
             stock_code = code.split('.')[-1] if '.' in code else code
@@ -45,22 +55,7 @@ class AkshareAdapter(IDataSource):
                 adjust="qfq" if adjust_flag == "1" else "hfq" if adjust_flag == "2" else ""
             )
             
-            data_list = []
-            for _, row in df.iterrows():
-                kline = StockKLine(
-                    code=code,
-                    date=str(row['日期']),
-                    open=float(row['开盘']),
-                    high=float(row['最高']),
-                    low=float(row['最低']),
-                    close=float(row['收盘']),
-                    volume=int(row['成交量']),
-                    amount=float(row['成交额']),
-                    change_pct=float(row['涨跌幅']) if '涨跌幅' in df.columns else None
-                )
-                data_list.append(kline)
-            
-            return data_list
+            return KLineFrame.from_frame(df, code, rename=HIST_COLUMNS)
             
         except Exception as e:
             logger.error(f"获取K线数据异常: {e}")
@@ -72,13 +67,12 @@ class AkshareAdapter(IDataSource):
             stock_code = code.split('.')[-1] if '.' in code else code
             
             # 从实时数据获取基本信息
-            df = ak.stock_zh_a_spot_em()
-            stock_data = df[df['代码'] == stock_code]
+            rows, _ = self._spot.lookup([stock_code])
             
-            if not stock_data.empty:
+            if stock_code in rows:
                 return StockInfo(
                     code=code,
-                    name=stock_data.iloc[0]['名称'],
+                    name=rows[stock_code]['名称'],
                     exchange=code[:2] if '.' in code else "SH"
                 )
             return None
@@ -89,11 +83,10 @@ class AkshareAdapter(IDataSource):
     
     def get_stock_list(self) -> List[StockInfo]:
         try:
-            df = ak.stock_zh_a_spot_em()
+            rows, _ = self._spot.lookup()
             stock_list = []
             
-            for _, row in df.iterrows():
-                code = row['代码']
+            for code, row in rows.items():
                 exchange = "SH" if code.startswith('6') else "SZ"
                 stock_list.append(StockInfo(
                     code=f"{exchange}.{code}",
@@ -107,29 +100,44 @@ class AkshareAdapter(IDataSource):
             logger.error(f"获取股票列表失败: {e}")
             return []
     
+    @staticmethod
+    def _quote_from_row(code: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """stock_zh_a_spot_em 的一行 -> 统一实时数据字典"""
+        return {
+            "code": code,
+            "name": row['名称'],
+            "price": row['最新价'],
+            "change": row['涨跌额'],
+            "change_pct": row['涨跌幅'],
+            "volume": row['成交量'],
+            "amount": row['成交额'],
+            "open": row['今开'],
+            "high": row['最高'],
+            "low": row['最低'],
+            "close": row['最新价']
+        }
+    
     def get_realtime_data(self, code: str) -> Dict[str, Any]:
+        return self.get_realtime_batch([code]).get(code, {})
+    
+    def get_realtime_batch(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取实时数据 - 从全市场快照按代码挑选，附带快照时间和是否过期"""
+        if not codes:
+            return {}
+        
         try:
-            stock_code = code.split('.')[-1] if '.' in code else code
+            wanted = {}
+            for code in codes:
+                stock_code = code.split('.')[-1] if '.' in code else code
+                wanted.setdefault(stock_code, []).append(code)
             
-            df = ak.stock_zh_a_spot_em()
-            stock_data = df[df['代码'] == stock_code]
-            
-            if not stock_data.empty:
-                row = stock_data.iloc[0]
-                return {
-                    "code": code,
-                    "name": row['名称'],
-                    "price": row['最新价'],
-                    "change": row['涨跌额'],
-                    "change_pct": row['涨跌幅'],
-                    "volume": row['成交量'],
-                    "amount": row['成交额'],
-                    "open": row['开盘'],
-                    "high": row['最高'],
-                    "low": row['最低'],
-                    "close": row['最新价']
-                }
-            return {}
+            rows, meta = self._spot.lookup(wanted)
+            
+            result = {}
+            for stock_code, row in rows.items():
+                for code in wanted[stock_code]:
+                    result[code] = {**self._quote_from_row(code, row), **meta}
+            return result
             
         except Exception as e:
             logger.error(f"获取实时数据失败: {e}")
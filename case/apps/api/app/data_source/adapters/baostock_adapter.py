@@ -3,16 +3,19 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 import baostock as bs
 
+from ...collector.baostock_session import get_baostock_session
 from ..interface import IDataSource
-from ..models import StockKLine, StockInfo
+from ..kline_frame import KLineFrame
+from ..models import StockInfo
 
 logger = logging.getLogger(__name__)
 
+KLINE_RENAME = {"turn": "turnover_rate", "pctChg": "change_pct"}
+
 class BaostockAdapter(IDataSource):
     """Baostock数据源适配器"""
     
     def __init__(self):
-        self._connected = False
         self._name = "Baostock"
         self._provider = "baostock"
     
@@ -24,15 +27,6 @@ class BaostockAdapter(IDataSource):
     def provider(self) -> str:
         return self._provider
     
-    def _ensure_connected(self):
-        """确保已连接到baostock"""
-        if not self._connected:
-            lg = bs.login()
-            if lg.error_code != '0':
-                raise Exception(f"Baostock登录失败: {lg.error_msg}")
-            self._connected = True
-            logger.info("Baostock登录成功")
-    
     def get_kline(
         self,
         code: str,
@@ -40,11 +34,10 @@ class BaostockAdapter(IDataSource):
         end_date: str,
         frequency: str = "d",
         adjust_flag: str = "3"
-    ) -> List[StockKLine]:
+    ) -> KLineFrame:
         try:
-            self._ensure_connected()
-            
-            rs = bs.query_history_k_data_plus(
+            df = get_baostock_session().query(
+                bs.query_history_k_data_plus,
                 code,
                 "date,code,open,high,low,close,volume,amount,adjustflag,turn,tradestatus,pctChg",
                 start_date=start_date,
@@ -52,50 +45,24 @@ class BaostockAdapter(IDataSource):
                 frequency=frequency,
                 adjustflag=adjust_flag
             )
-            
-            if rs.error_code != '0':
-                logger.error(f"获取 {code} K线数据失败: {rs.error_msg}")
-                return []
-            
-            data_list = []
-            while (rs.error_code == '0') & rs.next():
-                row = rs.get_row_data()
-                kline = StockKLine(
-                    code=row[1],
-                    date=row[0],
-                    open=float(row[2]),
-                    high=float(row[3]),
-                    low=float(row[4]),
-                    close=float(row[5]),
-                    volume=int(row[6]),
-                    amount=float(row[7]),
-                    turnover_rate=float(row[9]) if row[9] else None,
-                    change_pct=float(row[11]) if row[11] else None
-                )
-                data_list.append(kline)
-            
-            return data_list
+            return KLineFrame.from_frame(df, code, rename=KLINE_RENAME)
             
         except Exception as e:
-            logger.error(f"获取K线数据异常: {e}")
-            return []
+            logger.error(f"获取 {code} K线数据失败: {e}")
+            return KLineFrame()
     
     def get_stock_info(self, code: str) -> Optional[StockInfo]:
         try:
-            self._ensure_connected()
-            
-            rs = bs.query_stock_basic(code)
-            if rs.error_code != '0':
+            df = get_baostock_session().query(bs.query_stock_basic, code)
+            if df.empty:
                 return None
             
-            if rs.next():
-                row = rs.get_row_data()
-                return StockInfo(
-                    code=row[0],
-                    name=row[1],
-                    exchange=row[2][:2] if row[2] else "SH"
-                )
-            return None
+            row = df.iloc[0]
+            return StockInfo(
+                code=row["code"],
+                name=row["code_name"],
+                exchange=row["code"][:2]
+            )
             
         except Exception as e:
             logger.error(f"获取股票信息失败: {e}")
@@ -103,21 +70,12 @@ class BaostockAdapter(IDataSource):
     
     def get_stock_list(self) -> List[StockInfo]:
         try:
-            self._ensure_connected()
-            
-            rs = bs.query_all_stock()
-            stock_list = []
-            
-            while rs.next():
-                row = rs.get_row_data()
-                if row[1] == "1":  # 交易状态正常
-                    stock_list.append(StockInfo(
-                        code=row[0],
-                        name=row[2],
-                        exchange=row[0][:2]
-                    ))
-            
-            return stock_list
+            df = get_baostock_session().query(bs.query_all_stock)
+            df = df[df["tradeStatus"] == "1"]  # 交易状态正常
+            return [
+                StockInfo(code=code, name=name, exchange=code[:2])
+                for code, name in zip(df["code"], df["code_name"])
+            ]
             
         except Exception as e:
             logger.error(f"获取股票列表失败: {e}")
@@ -132,12 +90,4 @@ class BaostockAdapter(IDataSource):
         return []
     
     def close(self):
-        """关闭Baostock连接"""
-        if self._connected:
-            bs.logout()
-            self._connected = False
-            logger.info("Baostock连接已关闭")
-    
-    def __del__(self):
-        """析构函数中关闭连接"""
-        self.close()
+        """baostock 会话归进程所有（见 BaostockSession），进程退出时登出"""
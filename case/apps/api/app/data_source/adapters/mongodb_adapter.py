@@ -4,7 +4,10 @@ from datetime import datetime, timedelta
 
 from ..interface import IDataSource
 from ..models import StockKLine, StockInfo
+from ..kline_frame import KLineFrame
+from ..kline_tier import MONGO_KLINE_FIELDS
 from ...storage.mongo_client import MongoStorage
+from ...storage.query_cache import get_query_cache
 from ...core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -26,7 +29,8 @@ class MongoDBAdapter(IDataSource):
                 port=settings.mongodb_port,
                 db_name=settings.mongodb_database,
                 username=settings.mongodb_username,
-                password=settings.mongodb_password
+                password=settings.mongodb_password,
+                cache=get_query_cache()
             )
             self.storage.connect()
         except Exception as e:
@@ -48,7 +52,7 @@ class MongoDBAdapter(IDataSource):
         end_date: str,
         frequency: str = "d",
         adjust_flag: str = "3"
-    ) -> List[StockKLine]:
+    ) -> KLineFrame:
         if not self.storage:
             return []
         
@@ -60,23 +64,7 @@ class MongoDBAdapter(IDataSource):
                 limit=1000
             )
             
-            data_list = []
-            for item in kline_data:
-                kline = StockKLine(
-                    code=item.get('code', code),
-                    date=item.get('date', ''),
-                    open=float(item.get('open', 0)),
-                    high=float(item.get('high', 0)),
-                    low=float(item.get('low', 0)),
-                    close=float(item.get('close', 0)),
-                    volume=int(item.get('volume', 0)),
-                    amount=float(item.get('amount', 0)),
-                    turnover_rate=float(item.get('turnover', 0)) if item.get('turnover') else None,
-                    change_pct=float(item.get('pct_chg', 0)) if item.get('pct_chg') else None
-                )
-                data_list.append(kline)
-            
-            return data_list
+            return KLineFrame.from_records(kline_data, code, rename=MONGO_KLINE_FIELDS)
             
         except Exception as e:
             logger.error(f"获取MongoDB K线数据失败: {e}")
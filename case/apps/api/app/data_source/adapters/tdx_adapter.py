@@ -15,28 +15,39 @@ except ImportError:
 
 from ..interface import IDataSource
 from ..models import StockKLine, StockInfo
+from ..kline_frame import KLineFrame
+from ..tdx_pool import TDXConnectionPool
 
 class TDXAdapter(IDataSource):
     """通达信（TDX）数据源适配器"""
     
-    def __init__(self):
+    # bars() 不支持起始日期，只返回最近约 800 根K线
+    honours_start_date = False
+    
+    def __init__(self, pool: TDXConnectionPool = None):
         self._name = "通达信"
         self._provider = "tdx"
-        self._client = None
+        self._pool = pool
         self._init_client()
     
     def _init_client(self):
-        """初始化通达信客户端"""
+        """初始化通达信连接池（连接在首次请求时建立）"""
+        if self._pool is not None:
+            return
         if not MOOTDX_AVAILABLE:
             logger.warning("mootdx library not available")
             return
         
         try:
-            # mootdx不需要显式初始化客户端，每次使用时创建
+            self._pool = TDXConnectionPool.from_settings()
             logger.info("通达信适配器初始化成功")
         except Exception as e:
             logger.error(f"初始化通达信适配器失败: {e}")
     
+    @property
+    def available(self) -> bool:
+        return self._pool is not None
+    
     @property
     def name(self) -> str:
         return self._name
@@ -52,9 +63,9 @@ class TDXAdapter(IDataSource):
         end_date: str,
         frequency: str = "d",
         adjust_flag: str = "3"
-    ) -> List[StockKLine]:
+    ) -> KLineFrame:
         """获取K线数据 - 使用mootdx"""
-        if not MOOTDX_AVAILABLE:
+        if not self.available:
             logger.warning("mootdx库不可用，无法获取K线数据")
             return []
         
@@ -70,63 +81,20 @@ class TDXAdapter(IDataSource):
             else:
                 market = 1  # 深市
             
-            # 初始化行情客户端
-            client = Quotes.factory(market='std', multithread=True, heartbeat=True)
-            
             # 获取K线数据
             # 使用 bars 方法获取K线数据
-            df = client.bars(symbol=stock_code, frequency=frequency, market=market)
+            df = self._pool.call(
+                lambda client: client.bars(symbol=stock_code, frequency=frequency, market=market)
+            )
             
             if df is None or df.empty:
                 logger.warning(f"未获取到 {code} 的K线数据")
                 return []
             
-            # 转换为统一格式
-            data_list = []
-            for _, row in df.iterrows():
-                # 处理日期
-                date_str = str(row.get('datetime', ''))
-                if not date_str:
-                    continue
-                
-                # 解析日期
-                try:
-                    if len(date_str) == 8:  # YYYYMMDD
-                        date = datetime.strptime(date_str, '%Y%m%d')
-                    elif len(date_str) == 14:  # YYYYMMDD HHMMSS
-                        date = datetime.strptime(date_str[:8], '%Y%m%d')
-                    else:
-                        continue
-                except:
-                    continue
-                
-                # 筛选日期范围
-                if start_date:
-                    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-                    if date < start_dt:
-                        continue
-                if end_date:
-                    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-                    if date > end_dt:
-                        continue
-                
-                kline = StockKLine(
-                    code=code,
-                    date=date.strftime('%Y-%m-%d'),
-                    open=float(row.get('open', 0)),
-                    high=float(row.get('high', 0)),
-                    low=float(row.get('low', 0)),
-                    close=float(row.get('close', 0)),
-                    volume=int(row.get('volume', 0)),
-                    amount=float(row.get('amount', 0)),
-                    turnover_rate=None,  # 可选字段
-                    change_pct=None      # 可选字段
-                )
-                data_list.append(kline)
-            
-            # 按日期排序
-            data_list.sort(key=lambda x: x.date)
-            return data_list
+            # 向量化转换为统一格式：解析 datetime 列、筛选日期范围、按日期排序
+            return KLineFrame.from_frame(
+                df, code, date_column='datetime', start_date=start_date, end_date=end_date
+            )
             
         except Exception as e:
             logger.error(f"获取K线数据异常: {e}")
@@ -134,7 +102,7 @@ class TDXAdapter(IDataSource):
     
     def get_stock_info(self, code: str) -> Optional[StockInfo]:
         """获取股票基本信息"""
-        if not MOOTDX_AVAILABLE:
+        if not self.available:
             return None
         
         try:
@@ -147,11 +115,8 @@ class TDXAdapter(IDataSource):
             else:
                 market = 1  # 深市
             
-            # 初始化行情客户端
-            client = Quotes.factory(market='std', multithread=True, heartbeat=True)
-            
             # 获取实时数据
-            data = client.quotes(symbol=stock_code, market=market)
+            data = self._pool.call(lambda client: client.quotes(symbol=stock_code, market=market))
             
             if data is not None and len(data) > 0:
                 row = data.iloc[0]
@@ -159,13 +124,13 @@ class TDXAdapter(IDataSource):
                 # 确定交易所
                 exchange = "SH" if market == 0 else "SZ"
                 
-                    return StockInfo(
-                        code=code,
-                        name=stock_code,  # 通达信不提供股票名称，使用代码
-                        exchange=exchange,
-                        industry=None,
-                        market_value=None
-                    )
+                return StockInfo(
+                    code=code,
+                    name=stock_code,  # 通达信不提供股票名称，使用代码
+                    exchange=exchange,
+                    industry=None,
+                    market_value=None
+                )
             return None
             
         except Exception as e:
@@ -177,54 +142,63 @@ class TDXAdapter(IDataSource):
         logger.info("通达信不支持批量获取股票列表，建议使用其他数据源")
         return []
     
+    @staticmethod
+    def _split_code(code: str):
+        """sh.600000 / 600000 -> (600000, 市场代码, 交易所)"""
+        stock_code = code.split('.')[-1] if '.' in code else code
+        # 沪市：60开头、688科创板、900开头（B股）；其余为深市
+        market = 0 if stock_code.startswith('6') or stock_code.startswith('9') else 1
+        return stock_code, market, "SH" if market == 0 else "SZ"
+    
+    @staticmethod
+    def _quote_from_row(stock_code: str, exchange: str, row) -> Dict[str, Any]:
+        """mootdx quotes 的一行 -> 统一实时数据字典"""
+        price = float(row.get('price', 0))
+        last_close = float(row.get('last_close', 0))
+        change = price - last_close
+        change_pct = (change / last_close * 100) if last_close != 0 else 0
+        
+        return {
+            "code": f"{exchange}.{stock_code}",
+            "name": stock_code,
+            "price": price,
+            "change": change,
+            "change_pct": change_pct,
+            "volume": int(row.get('volume', 0)),
+            "amount": float(row.get('amount', 0)) if 'amount' in row else 0,
+            "open": float(row.get('open', 0)),
+            "high": float(row.get('high', 0)),
+            "low": float(row.get('low', 0)),
+            "close": price,
+            "last_close": last_close
+        }
+    
     def get_realtime_data(self, code: str) -> Dict[str, Any]:
         """获取实时数据 - 通达信的主要功能"""
-        if not MOOTDX_AVAILABLE:
+        return self.get_realtime_batch([code]).get(code, {})
+    
+    def get_realtime_batch(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取实时数据 - 一次 quotes 请求传入全部代码"""
+        if not self.available or not codes:
             return {}
         
         try:
-            # 转换代码格式
-            stock_code = code.split('.')[-1] if '.' in code else code
-            
-            # 判断市场代码
-            if stock_code.startswith('6') or stock_code.startswith('9'):
-                market = 0  # 沪市
-            else:
-                market = 1  # 深市
+            wanted = {}
+            for code in codes:
+                stock_code, _, exchange = self._split_code(code)
+                wanted.setdefault(stock_code, []).append((code, exchange))
             
-            # 初始化行情客户端
-            client = Quotes.factory(market='std', multithread=True, heartbeat=True)
-            
-            # 获取实时数据
-            data = client.quotes(symbol=stock_code, market=market)
+            # 传入代码列表时 mootdx 按代码自动判断市场
+            symbols = list(wanted)
+            data = self._pool.call(lambda client: client.quotes(symbol=symbols))
             
+            result = {}
             if data is not None and len(data) > 0:
-                row = data.iloc[0]
-                
-                # 确定交易所
-                exchange = "SH" if market == 0 else "SZ"
-                
-                # 计算涨跌幅
-                price = float(row.get('price', 0))
-                last_close = float(row.get('last_close', 0))
-                change = price - last_close
-                change_pct = (change / last_close * 100) if last_close != 0 else 0
-                
-                return {
-                    "code": f"{exchange}.{stock_code}",
-                    "name": stock_code,
-                    "price": price,
-                    "change": change,
-                    "change_pct": change_pct,
-                    "volume": int(row.get('volume', 0)),
-                    "amount": float(row.get('amount', 0)) if 'amount' in row else 0,
-                    "open": float(row.get('open', 0)),
-                    "high": float(row.get('high', 0)),
-                    "low": float(row.get('low', 0)),
-                    "close": price,
-                    "last_close": last_close
-                }
-            return {}
+                for _, row in data.iterrows():
+                    stock_code = str(row.get('code', '')).zfill(6)
+                    for code, exchange in wanted.get(stock_code, []):
+                        result[code] = self._quote_from_row(stock_code, exchange, row)
+            return result
             
         except Exception as e:
             logger.error(f"获取实时数据失败: {e}")
@@ -234,8 +208,12 @@ class TDXAdapter(IDataSource):
         """通达信不直接提供资金流向数据"""
         return []
     
+    def pool_stats(self) -> Optional[Dict[str, Any]]:
+        """连接池状态"""
+        return self._pool.stats() if self._pool else None
+    
     def close(self):
-        """关闭通达信连接"""
-        if self._client:
-            # mootdx不需要显式关闭
+        """关闭通达信连接池"""
+        if self._pool:
+            self._pool.close()
             logger.info("通达信客户端已关闭")
@@ -0,0 +1,263 @@
+"""
+数据源健康度与熔断器
+
+按 (数据源, 操作) 统计最近 N 次调用的耗时和失败率：
+- 失败包括异常、超时和空结果（适配器内部吞掉异常后返回空，如未安装 mootdx 的 TDX）
+- 失败率超过阈值时熔断器打开 (open)，冷却期内直接跳过该数据源
+- 冷却期结束进入半开 (half_open)，只放行一次探测调用，成功则关闭，失败则重新打开
+- 路由顺序 = 静态优先级 + 失败率和耗时惩罚，健康的数据源自动排到前面
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# 路由惩罚：失败率 100% 相当于优先级后移 ERROR_PENALTY 位，
+# 平均耗时每达到一个 LATENCY_BUDGET 后移一位
+ERROR_PENALTY = 10.0
+LATENCY_BUDGET = 1.0  # 秒
+
+
+@dataclass
+class BreakerConfig:
+    """健康统计与熔断参数"""
+    window: int = 20  # 统计最近多少次调用
+    min_calls: int = 5  # 窗口内至少多少次调用才判断失败率
+    failure_rate: float = 0.5  # 打开熔断器的失败率阈值
+    cooldown: float = 30.0  # 秒，打开后多久进入半开
+
+    @classmethod
+    def from_settings(cls) -> "BreakerConfig":
+        from app.core.config import settings
+
+        return cls(
+            window=settings.data_source_health_window,
+            min_calls=settings.data_source_breaker_min_calls,
+            failure_rate=settings.data_source_breaker_failure_rate,
+            cooldown=settings.data_source_breaker_cooldown,
+        )
+
+
+class AdapterHealth:
+    """单个 (数据源, 操作) 的滚动统计和熔断状态（由 HealthTracker 加锁访问）"""
+
+    def __init__(self, config: BreakerConfig):
+        self.config = config
+        # (ok, latency, 失败类型)
+        self.calls: deque = deque(maxlen=config.window)
+        self.state = CIRCUIT_CLOSED
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.total = 0
+        self.failures = {"error": 0, "timeout": 0, "empty": 0}
+
+    @property
+    def failure_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for ok, _, _ in self.calls if not ok) / len(self.calls)
+
+    @property
+    def avg_latency(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(latency for _, latency, _ in self.calls) / len(self.calls)
+
+    def current_state(self, now: float) -> str:
+        if self.state == CIRCUIT_OPEN and now - self.opened_at >= self.config.cooldown:
+            self.state = CIRCUIT_HALF_OPEN
+            self.probe_started = None
+        return self.state
+
+    def allow(self, now: float) -> bool:
+        state = self.current_state(now)
+        if state == CIRCUIT_CLOSED:
+            return True
+        # 探测调用可能被对冲取消而从未执行，超过冷却期未回报则允许重新探测
+        if state == CIRCUIT_HALF_OPEN and (
+            self.probe_started is None or now - self.probe_started >= self.config.cooldown
+        ):
+            self.probe_started = now
+            return True
+        return False
+
+    def record(self, ok: bool, latency: float, kind: Optional[str], now: float) -> Optional[str]:
+        """记录一次调用，返回状态变化后的新状态（无变化返回 None）"""
+        self.calls.append((ok, latency, kind))
+        self.total += 1
+        if not ok:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+
+        state = self.current_state(now)
+        if state == CIRCUIT_HALF_OPEN:
+            self.probe_started = None
+            if ok:
+                self.state = CIRCUIT_CLOSED
+                self.calls.clear()
+            else:
+                self.state = CIRCUIT_OPEN
+                self.opened_at = now
+            return self.state
+
+        if (
+            state == CIRCUIT_CLOSED
+            and len(self.calls) >= self.config.min_calls
+            and self.failure_rate >= self.config.failure_rate
+        ):
+            self.state = CIRCUIT_OPEN
+            self.opened_at = now
+            return self.state
+        return None
+
+    def penalty(self) -> float:
+        return self.failure_rate * ERROR_PENALTY + self.avg_latency / LATENCY_BUDGET
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        latencies = sorted(latency for _, latency, _ in self.calls)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return {
+            "state": self.current_state(now),
+            "calls": self.total,
+            "window_calls": len(self.calls),
+            "failure_rate": round(self.failure_rate, 4),
+            "avg_latency_ms": round(self.avg_latency * 1000, 2),
+            "p95_latency_ms": round(p95 * 1000, 2),
+            "failures": dict(self.failures),
+            "retry_in_s": (
+                round(max(0.0, self.config.cooldown - (now - self.opened_at)), 1)
+                if self.state == CIRCUIT_OPEN else 0.0
+            ),
+        }
+
+
+class CallGuard:
+    """保证一次调用只被记录一次（截止时间回调与调用自身返回可能都会尝试记录）"""
+
+    def __init__(self):
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    def claim(self) -> bool:
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            return True
+
+
+class HealthTracker:
+    """全部数据源的健康统计（线程安全）"""
+
+    def __init__(self, config: BreakerConfig = None):
+        self.config = config or BreakerConfig()
+        self._health: Dict[Tuple[str, str], AdapterHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, provider: str, operation: str) -> AdapterHealth:
+        key = (provider, operation)
+        health = self._health.get(key)
+        if health is None:
+            health = self._health[key] = AdapterHealth(self.config)
+        return health
+
+    def allow(self, provider: str, operation: str) -> bool:
+        """熔断器是否放行本次调用（半开状态只放行一次探测）"""
+        with self._lock:
+            return self._get(provider, operation).allow(time.monotonic())
+
+    def record(self, provider: str, operation: str, ok: bool, latency: float, kind: str = None):
+        """
+        记录一次调用结果
+
+        参数:
+            provider: 数据源
+            operation: 操作（适配器方法名）
+            ok: 是否返回了有效数据
+            latency: 耗时（秒）
+            kind: 失败类型 error/timeout/empty
+        """
+        with self._lock:
+            new_state = self._get(provider, operation).record(ok, latency, kind, time.monotonic())
+        if new_state == CIRCUIT_OPEN:
+            logger.warning(f"数据源 {provider}.{operation} 熔断器打开，{self.config.cooldown:.0f}s 内跳过")
+        elif new_state == CIRCUIT_CLOSED:
+            logger.info(f"数据源 {provider}.{operation} 熔断器关闭，恢复路由")
+
+    def call(
+        self,
+        provider: str,
+        operation: str,
+        func: Callable[[], Any],
+        timeout: float = None,
+        guard: CallGuard = None,
+    ) -> Any:
+        """
+        执行调用并记录耗时与结果（异常会继续抛出）
+
+        参数:
+            timeout: 截止时间（秒），超过截止时间才返回的调用记为 timeout
+            guard: 与 record_timeout 共用，避免同一次调用被重复记录
+        """
+        start = time.monotonic()
+        try:
+            result = func()
+        except Exception:
+            if guard is None or guard.claim():
+                self.record(provider, operation, False, time.monotonic() - start, "error")
+            raise
+        latency = time.monotonic() - start
+        if guard is None or guard.claim():
+            if timeout is not None and latency >= timeout:
+                self.record(provider, operation, False, latency, "timeout")
+            else:
+                ok = bool(result)
+                self.record(provider, operation, ok, latency, None if ok else "empty")
+        return result
+
+    def record_timeout(self, provider: str, operation: str, timeout: float, guard: CallGuard = None):
+        """调用到达截止时间仍未返回时记录超时（卡死的调用可能永远不会自己回报）"""
+        if guard is None or guard.claim():
+            self.record(provider, operation, False, timeout, "timeout")
+
+    def rank(self, provider: str, operation: str, priority: int) -> Tuple[int, float]:
+        """路由排序键：熔断器打开的排最后，其余按 优先级 + 健康惩罚"""
+        with self._lock:
+            health = self._get(provider, operation)
+            is_open = health.current_state(time.monotonic()) == CIRCUIT_OPEN
+            return (1 if is_open else 0, priority + health.penalty())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """{provider: {operation: 统计}}"""
+        now = time.monotonic()
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for (provider, operation), health in sorted(self._health.items()):
+                result.setdefault(provider, {})[operation] = health.snapshot(now)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._health.clear()
+
+
+_health_tracker: Optional[HealthTracker] = None
+_health_tracker_lock = threading.Lock()
+
+
+def get_health_tracker() -> HealthTracker:
+    """进程级健康统计，盯盘、Brain 分析器等各自创建的 DataSourceManager 共用"""
+    global _health_tracker
+    if _health_tracker is None:
+        with _health_tracker_lock:
+            if _health_tracker is None:
+                _health_tracker = HealthTracker(BreakerConfig.from_settings())
+    return _health_tracker
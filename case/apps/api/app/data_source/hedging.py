@@ -0,0 +1,141 @@
+"""
+数据源并发对冲（hedged request）
+
+按优先级依次启动适配器调用：首选数据源在 hedge_delay 内没有返回有效结果时，
+启动下一个数据源，同时在途的调用不超过 fanout 个；某个调用失败或超时则立即补位。
+返回最先到达的有效结果，尚未开始的调用被取消，仍在执行的调用结果直接丢弃。
+这样单个慢速/卡死的数据源不会拖住整个盯盘周期，延迟由最快的健康数据源决定。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 对冲调用共用的线程池大小；超时的调用仍会占用线程直到适配器自身返回
+HEDGE_MAX_WORKERS = 16
+
+
+@dataclass
+class HedgeConfig:
+    """并发对冲参数"""
+    enabled: bool = True
+    fanout: int = 2  # 同时在途的适配器调用数
+    hedge_delay: float = 0.15  # 秒，启动下一个数据源前等待首选数据源的时间
+    timeout: float = 3.0  # 秒，单个适配器调用的默认截止时间
+
+    @classmethod
+    def from_settings(cls) -> "HedgeConfig":
+        from app.core.config import settings
+
+        return cls(
+            enabled=settings.data_source_fanout_enabled,
+            fanout=max(1, settings.data_source_fanout_size),
+            hedge_delay=settings.data_source_hedge_delay_ms / 1000.0,
+            timeout=settings.data_source_adapter_timeout_ms / 1000.0,
+        )
+
+
+@dataclass
+class HedgeCandidate:
+    """一次对冲中的候选调用"""
+    provider: str
+    call: Callable[[], Any]
+    timeout: float
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """进程级共享线程池（懒加载）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="datasource-hedge"
+                )
+    return _executor
+
+
+def hedged_call(
+    candidates: List[HedgeCandidate],
+    is_valid: Callable[[Any], bool],
+    config: HedgeConfig,
+    executor: ThreadPoolExecutor = None,
+    on_timeout: Callable[[str, float], None] = None,
+) -> Tuple[Optional[str], Any]:
+    """
+    按优先级对冲调用多个数据源，返回第一个有效结果
+
+    参数:
+        candidates: 按优先级排列的候选调用
+        is_valid: 判断结果是否有效（如非空）
+        config: 对冲参数
+        executor: 线程池，默认使用共享线程池
+        on_timeout: 调用超过截止时间时的回调 (provider, timeout)
+
+    返回:
+        (provider, result)，全部失败或超时时返回 (None, None)
+    """
+    executor = executor or get_hedge_executor()
+    queue = deque(candidates)
+    # future -> (provider, 截止时间, 超时秒数)
+    pending: Dict[Future, Tuple[str, float, float]] = {}
+    next_launch = 0.0
+
+    def launch(now: float):
+        candidate = queue.popleft()
+        future = executor.submit(candidate.call)
+        pending[future] = (candidate.provider, now + candidate.timeout, candidate.timeout)
+
+    def discard_pending():
+        for future, (provider, _, _) in pending.items():
+            if not future.cancel():
+                logger.debug(f"丢弃数据源 {provider} 的在途调用")
+        pending.clear()
+
+    while pending or queue:
+        now = time.monotonic()
+        if queue and len(pending) < config.fanout and (not pending or now >= next_launch):
+            launch(now)
+            next_launch = now + config.hedge_delay
+            continue
+
+        wake_at = min(deadline for _, deadline, _ in pending.values())
+        if queue and len(pending) < config.fanout:
+            wake_at = min(wake_at, next_launch)
+        done, _ = wait(list(pending), timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            provider, _, _ = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"数据源 {provider} 调用失败: {e}")
+                next_launch = 0.0
+                continue
+            if is_valid(result):
+                discard_pending()
+                return provider, result
+            # 空结果同样视为失败，立即补位下一个数据源
+            next_launch = 0.0
+
+        now = time.monotonic()
+        for future, (provider, deadline, timeout) in list(pending.items()):
+            if now >= deadline:
+                pending.pop(future)
+                future.cancel()
+                logger.warning(f"数据源 {provider} 超过 {timeout:.2f}s 未返回，已丢弃")
+                if on_timeout:
+                    on_timeout(provider, timeout)
+                next_launch = 0.0
+
+    return None, None
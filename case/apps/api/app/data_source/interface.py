@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
 from .models import StockKLine, StockInfo
 
 class IDataSource(ABC):
@@ -8,6 +8,10 @@ class IDataSource(ABC):
     所有数据源必须实现此接口
     """
     
+    # get_kline 是否按 start_date 向远程请求；为 False 时只能取到最近一段连续的K线再按日期过滤，
+    # K线写回只把第一根K线之后记为已覆盖，更早的日期向其他数据源补取
+    honours_start_date: bool = True
+    
     @abstractmethod
     def get_kline(
         self,
@@ -16,7 +20,7 @@ class IDataSource(ABC):
         end_date: str,
         frequency: str = "d",
         adjust_flag: str = "3"
-    ) -> List[StockKLine]:
+    ) -> Sequence[StockKLine]:
         """
         获取K线数据
         
@@ -28,7 +32,7 @@ class IDataSource(ABC):
             adjust_flag: 复权类型 1=后复权, 2=前复权, 3=不复权
         
         Returns:
-            K线数据列表
+            K线数据列表，或列式的 KLineFrame（推荐，避免逐行构造模型）
         """
         pass
     
@@ -68,6 +72,25 @@ class IDataSource(ABC):
         """
         pass
     
+    def get_realtime_batch(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时数据
+        
+        默认逐个调用 get_realtime_data，支持批量查询的数据源应覆盖为单次请求
+        
+        Args:
+            codes: 股票代码列表
+        
+        Returns:
+            {请求中的股票代码: 实时数据字典}，未取到的代码不出现在结果中
+        """
+        result = {}
+        for code in codes:
+            data = self.get_realtime_data(code)
+            if data:
+                result[code] = data
+        return result
+    
     @abstractmethod
     def get_capital_flow(self, code: str, days: int = 5) -> List[Dict[str, Any]]:
         """
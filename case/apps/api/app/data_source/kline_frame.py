@@ -0,0 +1,194 @@
+"""
+列式K线结果
+
+适配器取回的K线通常已经是 DataFrame / 文档列表，逐行 iterrows + strptime + pydantic 校验
+在多年日线上要几百毫秒。KLineFrame 用一个规范化的 DataFrame 保存结果：
+- 日期解析、范围过滤、类型转换全部向量化
+- 仍然是 Sequence[StockKLine]：迭代、下标、len/bool 与原来的列表用法一致，
+  StockKLine 只在调用方取元素时按行构造（model_construct，不重复校验）
+- column() / frame 直接返回列数据，指标计算无需构造对象
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .models import StockKLine
+
+KLINE_COLUMNS = [
+    "code", "date", "open", "high", "low", "close",
+    "volume", "amount", "turnover_rate", "change_pct",
+]
+PRICE_COLUMNS = ["open", "high", "low", "close", "amount"]
+OPTIONAL_COLUMNS = ["turnover_rate", "change_pct"]
+
+
+def _normalize_dates(values: pd.Series) -> pd.Series:
+    """YYYYMMDD / YYYYMMDDHHMMSS / YYYY-MM-DD[ HH:MM] / datetime -> YYYY-MM-DD，无法解析的为 NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+    digits = values.astype(str).str.replace(r"[^0-9]", "", regex=True).str[:8]
+    return pd.to_datetime(digits, format="%Y%m%d", errors="coerce")
+
+
+class KLineFrame(Sequence):
+    """按日期升序的列式K线集合"""
+
+    __slots__ = ("_df", "_arrays")
+
+    def __init__(self, df: pd.DataFrame = None):
+        """
+        Args:
+            df: 已规范化的 DataFrame（列为 KLINE_COLUMNS，date 为 YYYY-MM-DD 字符串），
+                外部数据请使用 from_frame / from_records / from_klines
+        """
+        self._df = df if df is not None else pd.DataFrame(columns=KLINE_COLUMNS)
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: Optional[pd.DataFrame],
+        code: str,
+        date_column: str = "date",
+        rename: Mapping[str, str] = None,
+        start_date: str = None,
+        end_date: str = None,
+    ) -> "KLineFrame":
+        """
+        从数据源返回的 DataFrame 构造（向量化解析日期、过滤范围、转换类型）
+
+        Args:
+            df: 原始 DataFrame
+            code: 股票代码（统一使用调用方的代码格式，忽略原始数据中的 code 列）
+            date_column: 日期列名
+            rename: 原始列名 -> KLINE_COLUMNS 列名
+            start_date: 开始日期 YYYY-MM-DD（含）
+            end_date: 结束日期 YYYY-MM-DD（含）
+        """
+        if df is None or len(df) == 0:
+            return cls()
+        if rename:
+            df = df.rename(columns=dict(rename))
+
+        if date_column in df.columns:
+            raw_dates = df[date_column]
+        elif isinstance(df.index, pd.DatetimeIndex):
+            raw_dates = df.index.to_series()
+        else:
+            return cls()
+        dates = _normalize_dates(raw_dates.reset_index(drop=True))
+        df = df.reset_index(drop=True)
+
+        mask = dates.notna()
+        if start_date:
+            mask &= dates >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= dates <= pd.Timestamp(end_date)
+        mask = mask.to_numpy()
+
+        out = pd.DataFrame({"date": dates[mask].dt.strftime("%Y-%m-%d").to_numpy()})
+        out["code"] = code
+        for column in PRICE_COLUMNS:
+            if column in df.columns:
+                out[column] = pd.to_numeric(df[column], errors="coerce").fillna(0.0).to_numpy(float)[mask]
+            else:
+                out[column] = 0.0
+        if "volume" in df.columns:
+            out["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).to_numpy()[mask].astype(np.int64)
+        else:
+            out["volume"] = np.int64(0)
+        for column in OPTIONAL_COLUMNS:
+            if column in df.columns:
+                out[column] = pd.to_numeric(df[column], errors="coerce").to_numpy(float)[mask]
+            else:
+                out[column] = np.nan
+
+        out = out[KLINE_COLUMNS].sort_values("date", kind="stable").reset_index(drop=True)
+        return cls(out)
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Dict[str, Any]], code: str, rename: Mapping[str, str] = None
+    ) -> "KLineFrame":
+        """从文档列表（如 MongoDB 查询结果）构造"""
+        records = list(records)
+        if not records:
+            return cls()
+        return cls.from_frame(pd.DataFrame.from_records(records), code, rename=rename)
+
+    @classmethod
+    def from_klines(cls, klines: Iterable[StockKLine]) -> "KLineFrame":
+        """从 StockKLine 列表构造"""
+        klines = list(klines)
+        if not klines:
+            return cls()
+        records = [kline.model_dump() for kline in klines]
+        return cls.from_frame(pd.DataFrame.from_records(records), klines[0].code)
+
+    @classmethod
+    def coerce(cls, klines: Union["KLineFrame", Iterable[StockKLine], None]) -> "KLineFrame":
+        """适配器可能返回列表或 KLineFrame，统一为 KLineFrame"""
+        if isinstance(klines, KLineFrame):
+            return klines
+        return cls.from_klines(klines or [])
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """底层 DataFrame（只读使用）"""
+        return self._df
+
+    def column(self, name: str) -> np.ndarray:
+        """某一列的 numpy 数组"""
+        return self._df[name].to_numpy()
+
+    def to_records(self, rename: Mapping[str, str] = None, drop: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        转为字典列表，NaN 转为 None
+
+        Args:
+            rename: 列名映射
+            drop: 不输出的列
+        """
+        df = self._df.drop(columns=list(drop)) if drop else self._df
+        if rename:
+            df = df.rename(columns=dict(rename))
+        df = df.astype(object).where(df.notna(), None)
+        return df.to_dict("records")
+
+    def to_list(self) -> List[StockKLine]:
+        return list(self)
+
+    def _build(self, position: int) -> StockKLine:
+        if self._arrays is None:
+            self._arrays = {column: self._df[column].to_numpy() for column in KLINE_COLUMNS}
+        row = {column: values[position] for column, values in self._arrays.items()}
+        for column in PRICE_COLUMNS:
+            row[column] = float(row[column])
+        row["volume"] = int(row["volume"])
+        for column in OPTIONAL_COLUMNS:
+            value = row[column]
+            row[column] = None if pd.isna(value) else float(value)
+        return StockKLine.model_construct(**row)
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return KLineFrame(self._df.iloc[index].reset_index(drop=True))
+        if index < 0:
+            index += len(self._df)
+        if not 0 <= index < len(self._df):
+            raise IndexError("KLineFrame index out of range")
+        return self._build(index)
+
+    def __iter__(self) -> Iterator[StockKLine]:
+        for position in range(len(self._df)):
+            yield self._build(position)
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return "KLineFrame(empty)"
+        return f"KLineFrame({len(self)} rows, {self._df['date'].iat[0]}~{self._df['date'].iat[-1]})"
@@ -0,0 +1,184 @@
+"""
+K线分层读取：MongoDB 作为远程数据源（TDX / Baostock / Akshare）的写回缓存
+
+- 每只股票在 kline_writeback_coverage 集合记录已完整取回的日期区间（含非交易日）
+- 查询时先用覆盖区间计算缺失的日期段，只向远程数据源请求缺失部分
+- 远程结果 bulk upsert 到 stock_kline_unadjusted 并合并覆盖区间，最后统一从 MongoDB 读取
+- 当天的K线可能还在变化，覆盖区间最多记到前一天；不含工作日的缺口（周末）直接跳过
+
+只缓存日线不复权数据：前/后复权价格会随除权除息整体变化，不适合写回。
+爬虫写入 stock_kline 的是前复权K线，写回使用单独的 stock_kline_unadjusted 集合，
+两种复权方式的价格不会混在同一序列中
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Tuple, Union
+
+from .kline_frame import KLineFrame
+from .models import StockKLine
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# 允许写回的 (frequency, adjust_flag)
+WRITEBACK_FREQUENCY = "d"
+WRITEBACK_ADJUST_FLAG = "3"
+
+# stock_kline 文档字段 -> KLineFrame 列（其余字段同名，与爬虫一致）
+MONGO_KLINE_FIELDS = {"turnover": "turnover_rate", "pct_chg": "change_pct"}
+_FRAME_TO_MONGO = {column: field for field, column in MONGO_KLINE_FIELDS.items()}
+
+
+def _parse(value: str) -> date:
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+def _format(value: date) -> str:
+    return value.strftime(DATE_FORMAT)
+
+
+def merge_ranges(ranges: List[Tuple[str, str]]) -> List[List[str]]:
+    """合并重叠或相邻（相差一天）的日期区间"""
+    merged: List[List[date]] = []
+    for start, end in sorted((_parse(s), _parse(e)) for s, e in ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [[_format(s), _format(e)] for s, e in merged]
+
+
+def missing_ranges(start_date: str, end_date: str, covered: List[List[str]]) -> List[Tuple[str, str]]:
+    """[start_date, end_date] 中未被 covered 覆盖的日期段"""
+    start, end = _parse(start_date), _parse(end_date)
+    gaps = []
+    cursor = start
+    for range_start, range_end in merge_ranges(covered):
+        range_start, range_end = _parse(range_start), _parse(range_end)
+        if range_end < cursor:
+            continue
+        if range_start > end:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start - timedelta(days=1)))
+        cursor = max(cursor, range_end + timedelta(days=1))
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return [(_format(s), _format(e)) for s, e in gaps]
+
+
+def _has_weekday(start_date: str, end_date: str) -> bool:
+    start, end = _parse(start_date), _parse(end_date)
+    return (end - start).days >= 6 or any(
+        (start + timedelta(days=i)).weekday() < 5 for i in range((end - start).days + 1)
+    )
+
+
+class KLineWriteBack:
+    """基于 MongoStorage 的K线写回缓存"""
+
+    def __init__(self, storage, today: Callable[[], date] = None):
+        """
+        Args:
+            storage: MongoStorage（需要 get_writeback_klines / upsert_klines / get/set_kline_coverage）
+            today: 返回当天日期的函数，便于测试
+        """
+        self.storage = storage
+        self._today = today or date.today
+
+    @staticmethod
+    def supports(frequency: str, adjust_flag: str) -> bool:
+        return frequency == WRITEBACK_FREQUENCY and adjust_flag == WRITEBACK_ADJUST_FLAG
+
+    def plan(self, code: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        计算需要向远程数据源请求的日期段
+
+        Args:
+            code: 股票代码
+            start_date: 开始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD（晚于今天的部分忽略）
+
+        Returns:
+            [(start_date, end_date), ...]
+        """
+        end_date = min(end_date, _format(self._today()))
+        if start_date > end_date:
+            return []
+        covered = self.storage.get_kline_coverage(code)
+        return [gap for gap in missing_ranges(start_date, end_date, covered) if _has_weekday(*gap)]
+
+    def write(
+        self,
+        code: str,
+        start_date: str,
+        end_date: str,
+        klines: Union[KLineFrame, List[StockKLine]],
+        complete: bool = True,
+    ) -> int:
+        """
+        写回远程取到的K线，并记录已覆盖的日期区间（不含今天）
+
+        覆盖区间从实际返回的第一根K线开始（之前只有非交易日时仍从 start_date 开始）。
+        数据源没有按 start_date 请求（complete=False，如通达信只返回最近一段连续的K线）时
+        只记录第一根K线到 end_date，之前的日期见 leading_gap
+
+        Args:
+            code: 股票代码
+            start_date: 请求的开始日期
+            end_date: 请求的结束日期
+            klines: 远程返回的K线
+            complete: 数据源是否按 start_date 请求
+
+        Returns:
+            写入条数
+        """
+        frame = KLineFrame.coerce(klines)
+        docs = frame.to_records(rename=_FRAME_TO_MONGO, drop=["code"])
+        written = self.storage.upsert_klines(code, docs)
+        if not len(frame):
+            return written
+
+        first_date = min(frame.column("date"))
+        if first_date > start_date and (not complete or self.leading_gap(start_date, frame) is not None):
+            start_date = first_date
+        end_date = min(end_date, _format(self._today() - timedelta(days=1)))
+        if start_date <= end_date:
+            covered = self.storage.get_kline_coverage(code)
+            self.storage.set_kline_coverage(code, merge_ranges(covered + [[start_date, end_date]]))
+        logger.debug(f"写回K线 {code} {start_date}~{end_date}: {written} 条")
+        return written
+
+    @staticmethod
+    def leading_gap(
+        start_date: str, klines: Union[KLineFrame, List[StockKLine]]
+    ) -> Optional[Tuple[str, str]]:
+        """
+        start_date 到第一根K线之前、含工作日的日期段
+
+        Returns:
+            (start_date, 第一根K线的前一天)；没有K线或之前只有非交易日时返回 None
+        """
+        frame = KLineFrame.coerce(klines)
+        if not len(frame):
+            return None
+        head_end = _format(_parse(min(frame.column("date"))) - timedelta(days=1))
+        if start_date <= head_end and _has_weekday(start_date, head_end):
+            return start_date, head_end
+        return None
+
+    def read(self, code: str, start_date: str, end_date: str) -> KLineFrame:
+        """从 MongoDB 读取日期范围内的K线（按日期升序）"""
+        docs = self.storage.get_writeback_klines(code, start_date, end_date)
+        return KLineFrame.from_records(docs, code, rename=MONGO_KLINE_FIELDS)
+
+
+def get_kline_writeback(storage) -> Optional[KLineWriteBack]:
+    """按配置为 MongoDB 适配器的存储创建写回缓存，未启用或存储不可用时返回 None"""
+    from app.core.config import settings
+
+    if not settings.data_source_kline_writeback or storage is None:
+        return None
+    return KLineWriteBack(storage)
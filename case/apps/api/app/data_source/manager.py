@@ -1,9 +1,13 @@
 import logging
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Sequence, Tuple
 from contextlib import contextmanager
 
 from .interface import IDataSource
 from .models import DataSourceConfig, StockKLine, StockInfo
+from .hedging import HedgeConfig, HedgeCandidate, hedged_call
+from .health import CallGuard, HealthTracker, get_health_tracker
+from .kline_frame import KLineFrame
+from .kline_tier import KLineWriteBack, get_kline_writeback
 from .adapters.baostock_adapter import BaostockAdapter
 from .adapters.mongodb_adapter import MongoDBAdapter
 from .adapters.akshare_adapter import AkshareAdapter
@@ -11,16 +15,40 @@ from .adapters.tdx_adapter import TDXAdapter
 
 logger = logging.getLogger(__name__)
 
+# get_best_adapter 的数据类型 -> 适配器方法
+DATA_TYPE_METHODS = {
+    "kline": "get_kline",
+    "realtime": "get_realtime_data",
+    "realtime_batch": "get_realtime_batch",
+    "capital_flow": "get_capital_flow",
+}
+
 class DataSourceManager:
     """
     数据源管理器
     负责管理多个数据源适配器，提供统一的数据访问接口
+    
+    实时行情和资金流向默认按优先级并发对冲查询（见 hedging.py），
+    hedge.enabled=False 时按优先级逐个尝试；
+    路由顺序由静态优先级和观测到的健康度共同决定，熔断中的数据源被跳过（见 health.py）；
+    日线K线以 MongoDB 作为远程数据源的写回缓存，只向远程请求缺失的日期段（见 kline_tier.py）
     """
     
-    def __init__(self, config: List[DataSourceConfig] = None):
+    def __init__(
+        self,
+        config: List[DataSourceConfig] = None,
+        hedge: HedgeConfig = None,
+        health: HealthTracker = None,
+        kline_tier: KLineWriteBack = None
+    ):
         self._adapters: Dict[str, IDataSource] = {}
         self._config = config or self._get_default_config()
+        self._hedge = hedge or HedgeConfig.from_settings()
+        self._health = health or get_health_tracker()
         self._initialize_adapters()
+        if kline_tier is None and "mongodb" in self._adapters:
+            kline_tier = get_kline_writeback(getattr(self._adapters["mongodb"], "storage", None))
+        self._kline_tier = kline_tier
     
     def _get_default_config(self) -> List[DataSourceConfig]:
         """获取默认数据源配置"""
@@ -92,23 +120,23 @@ class DataSourceManager:
     def get_best_adapter(self, data_type: str = "kline") -> Optional[IDataSource]:
         """
         获取最适合的数据源适配器
-        根据优先级和数据类型选择
+        按健康度调整后的优先级选择，跳过熔断中的数据源
         """
-        # 按优先级排序
-        sorted_adapters = sorted(
-            self._adapters.items(),
-            key=lambda x: self._get_adapter_priority(x[0])
+        selected = self._select_adapter(DATA_TYPE_METHODS.get(data_type, data_type))
+        return selected[1] if selected else None
+    
+    def _ranked_adapters(self, method: str) -> List[tuple]:
+        """支持该方法的适配器，按 (熔断状态, 优先级 + 健康惩罚) 排序"""
+        return sorted(
+            ((provider, adapter) for provider, adapter in self._adapters.items() if hasattr(adapter, method)),
+            key=lambda x: self._health.rank(x[0], method, self._get_adapter_priority(x[0]))
         )
-        
-        for provider, adapter in sorted_adapters:
-            # 根据数据类型选择合适的数据源
-            if data_type == "kline" and hasattr(adapter, 'get_kline'):
-                return adapter
-            elif data_type == "realtime" and hasattr(adapter, 'get_realtime_data'):
-                return adapter
-            elif data_type == "capital_flow" and hasattr(adapter, 'get_capital_flow'):
-                return adapter
-        
+    
+    def _select_adapter(self, method: str) -> Optional[tuple]:
+        """返回第一个熔断器放行的 (provider, adapter)"""
+        for provider, adapter in self._ranked_adapters(method):
+            if self._health.allow(provider, method):
+                return provider, adapter
         return None
     
     def _get_adapter_priority(self, provider: str) -> int:
@@ -118,6 +146,71 @@ class DataSourceManager:
                 return config.priority
         return 999
     
+    def _get_adapter_timeout(self, provider: str) -> float:
+        """获取适配器截止时间（秒），未单独配置时使用全局值"""
+        for config in self._config:
+            if config.provider == provider and config.timeout_ms:
+                return config.timeout_ms / 1000.0
+        return self._hedge.timeout
+    
+    def _query_first_valid(self, method: str, args: tuple, default: Any) -> Any:
+        """
+        按优先级查询各数据源，返回第一个非空结果
+        
+        Args:
+            method: 适配器方法名
+            args: 调用参数
+            default: 全部失败时的返回值
+        """
+        provider, data = self._first_valid(method, args)
+        return data if provider else default
+    
+    def _first_valid(self, method: str, args: tuple, exclude: set = ()) -> tuple:
+        """
+        按健康度排序后逐个或并发对冲查询，返回 (provider, 第一个非空结果)
+        
+        Args:
+            method: 适配器方法名
+            args: 调用参数
+            exclude: 不参与本次查询的数据源
+        
+        Returns:
+            全部失败时返回 (None, None)
+        """
+        adapters = [
+            (provider, adapter) for provider, adapter in self._ranked_adapters(method)
+            if provider not in exclude and self._health.allow(provider, method)
+        ]
+        
+        if not self._hedge.enabled:
+            for provider, adapter in adapters:
+                data = self._health.call(provider, method, lambda: getattr(adapter, method)(*args))
+                if data:
+                    return provider, data
+            return None, None
+        
+        candidates = []
+        guards = {}
+        for provider, adapter in adapters:
+            timeout = self._get_adapter_timeout(provider)
+            guard = guards[provider] = CallGuard()
+            candidates.append(HedgeCandidate(
+                provider=provider,
+                call=lambda provider=provider, adapter=adapter, timeout=timeout, guard=guard: self._health.call(
+                    provider, method, lambda: getattr(adapter, method)(*args), timeout, guard
+                ),
+                timeout=timeout
+            ))
+        provider, data = hedged_call(
+            candidates, bool, self._hedge,
+            on_timeout=lambda provider, timeout: self._health.record_timeout(
+                provider, method, timeout, guards[provider]
+            )
+        )
+        if provider:
+            logger.debug(f"{method} 由数据源 {provider} 返回")
+        return provider, data
+    
     # 统一数据访问接口
     
     def get_kline(
@@ -128,7 +221,7 @@ class DataSourceManager:
         frequency: str = "d",
         adjust_flag: str = "3",
         provider: str = None
-    ) -> List[StockKLine]:
+    ) -> KLineFrame:
         """
         获取K线数据
         
@@ -141,19 +234,99 @@ class DataSourceManager:
             provider: 指定数据源，None则自动选择
         
         Returns:
-            K线数据列表
+            按日期升序的 KLineFrame（可像 StockKLine 列表一样迭代，也可按列读取）
         """
+        if (
+            not provider
+            and self._kline_tier is not None
+            and start_date
+            and end_date
+            and self._kline_tier.supports(frequency, adjust_flag)
+        ):
+            return KLineFrame.coerce(self._get_kline_tiered(code, start_date, end_date, frequency, adjust_flag))
+        
         if provider:
             adapter = self._adapters.get(provider)
-            if adapter:
-                return adapter.get_kline(code, start_date, end_date, frequency, adjust_flag)
         else:
-            # 自动选择最佳数据源
-            adapter = self.get_best_adapter("kline")
-            if adapter:
-                return adapter.get_kline(code, start_date, end_date, frequency, adjust_flag)
+            # 自动选择最健康的数据源
+            selected = self._select_adapter("get_kline")
+            provider, adapter = selected if selected else (None, None)
         
-        return []
+        if adapter:
+            return KLineFrame.coerce(self._health.call(
+                provider, "get_kline",
+                lambda: adapter.get_kline(code, start_date, end_date, frequency, adjust_flag)
+            ))
+        return KLineFrame()
+    
+    def _fetch_remote_kline(
+        self, code: str, start_date: str, end_date: str, frequency: str, adjust_flag: str
+    ) -> Sequence[StockKLine]:
+        """按健康度依次尝试 MongoDB 以外的数据源，返回第一个非空结果"""
+        return self._fetch_remote_kline_from(code, start_date, end_date, frequency, adjust_flag)[0]
+    
+    def _fetch_remote_kline_from(
+        self, code: str, start_date: str, end_date: str, frequency: str, adjust_flag: str,
+        honours_start_date: bool = False,
+    ) -> Tuple[Sequence[StockKLine], Optional[IDataSource]]:
+        """
+        同 _fetch_remote_kline，同时返回取到数据的适配器（没有数据时为 None）
+
+        Args:
+            honours_start_date: 只使用按 start_date 请求的数据源（用于补取较早的日期）
+        """
+        for provider, adapter in self._ranked_adapters("get_kline"):
+            if provider == "mongodb" or not self._health.allow(provider, "get_kline"):
+                continue
+            if honours_start_date and not getattr(adapter, "honours_start_date", True):
+                continue
+            klines = self._health.call(
+                provider, "get_kline",
+                lambda: adapter.get_kline(code, start_date, end_date, frequency, adjust_flag)
+            )
+            if klines:
+                return klines, adapter
+        return [], None
+    
+    def _get_kline_tiered(
+        self, code: str, start_date: str, end_date: str, frequency: str, adjust_flag: str
+    ) -> Sequence[StockKLine]:
+        """先查 MongoDB 覆盖区间，只远程补取缺失日期段并写回，最后统一从 MongoDB 读取"""
+        tier = self._kline_tier
+        try:
+            gaps = tier.plan(code, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"读取K线覆盖区间失败，直接请求远程数据源: {e}")
+            return self._fetch_remote_kline(code, start_date, end_date, frequency, adjust_flag)
+        
+        for gap_start, gap_end in gaps:
+            klines, adapter = self._fetch_remote_kline_from(code, gap_start, gap_end, frequency, adjust_flag)
+            if not klines:
+                logger.warning(f"远程数据源未返回 {code} {gap_start}~{gap_end} 的K线")
+                continue
+            complete = getattr(adapter, "honours_start_date", True)
+            try:
+                tier.write(code, gap_start, gap_end, klines, complete=complete)
+                # 通达信等只返回最近一段K线，更早的日期向按 start_date 请求的数据源补取
+                head = None if complete else tier.leading_gap(gap_start, klines)
+                if head is not None:
+                    head_klines, _ = self._fetch_remote_kline_from(
+                        code, *head, frequency, adjust_flag, honours_start_date=True
+                    )
+                    if head_klines:
+                        tier.write(code, *head, head_klines)
+            except Exception as e:
+                # 写回失败不影响本次查询，整段改为直接请求远程数据源
+                logger.warning(f"K线写回 MongoDB 失败 {code}: {e}")
+                return self._fetch_remote_kline(code, start_date, end_date, frequency, adjust_flag)
+        
+        if gaps:
+            logger.debug(f"{code} 远程补取 {len(gaps)} 段K线: {gaps}")
+        try:
+            return tier.read(code, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"从 MongoDB 读取写回K线失败，直接请求远程数据源: {e}")
+            return self._fetch_remote_kline(code, start_date, end_date, frequency, adjust_flag)
     
     def get_stock_info(self, code: str, provider: str = None) -> Optional[StockInfo]:
         """获取股票信息"""
@@ -189,26 +362,58 @@ class DataSourceManager:
         if provider:
             adapter = self._adapters.get(provider)
             if adapter:
-                return adapter.get_realtime_data(code)
-        else:
-            for adapter in self._adapters.values():
-                data = adapter.get_realtime_data(code)
-                if data:
-                    return data
-        return {}
+                return self._health.call(provider, "get_realtime_data", lambda: adapter.get_realtime_data(code))
+            return {}
+        return self._query_first_valid("get_realtime_data", (code,), {})
+    
+    def get_realtime_batch(self, codes: List[str], provider: str = None) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时数据
+        
+        每个数据源一次请求：先向最健康的数据源请求全部代码，
+        缺失的代码再交给下一个数据源，直到取全或没有可用数据源
+        
+        Args:
+            codes: 股票代码列表
+            provider: 指定数据源，None则自动选择
+        
+        Returns:
+            {股票代码: 实时数据字典}，未取到的代码不出现在结果中
+        """
+        codes = list(dict.fromkeys(codes))
+        if provider:
+            adapter = self._adapters.get(provider)
+            if adapter:
+                return self._health.call(provider, "get_realtime_batch", lambda: adapter.get_realtime_batch(codes))
+            return {}
+        
+        result: Dict[str, Dict[str, Any]] = {}
+        remaining = codes
+        used = set()
+        while remaining:
+            source, data = self._first_valid("get_realtime_batch", (remaining,), exclude=used)
+            if not source:
+                break
+            used.add(source)
+            result.update(data)
+            remaining = [code for code in remaining if code not in result]
+        
+        if remaining:
+            logger.warning(f"{len(remaining)} 只股票未取到实时数据: {remaining[:10]}")
+        return result
     
     def get_capital_flow(self, code: str, days: int = 5, provider: str = None) -> List[Dict[str, Any]]:
         """获取资金流向数据"""
         if provider:
             adapter = self._adapters.get(provider)
             if adapter:
-                return adapter.get_capital_flow(code, days)
-        else:
-            for adapter in self._adapters.values():
-                data = adapter.get_capital_flow(code, days)
-                if data:
-                    return data
-        return []
+                return self._health.call(provider, "get_capital_flow", lambda: adapter.get_capital_flow(code, days))
+            return []
+        return self._query_first_valid("get_capital_flow", (code, days), [])
+    
+    def health_stats(self) -> Dict[str, Any]:
+        """各数据源的滚动耗时、失败率和熔断状态"""
+        return self._health.stats()
     
     def close_all(self):
         """关闭所有数据源连接"""
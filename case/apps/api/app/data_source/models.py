@@ -60,6 +60,7 @@ class DataSourceConfig(BaseModel):
     name: str = Field(..., description="数据源名称")
     enabled: bool = Field(True, description="是否启用")
     priority: int = Field(1, description="优先级，数字越小优先级越高")
+    timeout_ms: Optional[int] = Field(None, description="并发对冲时的截止时间（毫秒），None 使用全局配置")
     config: Dict[str, Any] = Field(default_factory=dict, description=" provider-specific配置")
     
     class Config:
@@ -0,0 +1,141 @@
+"""
+全市场实时行情快照
+
+东方财富 stock_zh_a_spot_em 每次返回全部 A 股（约 5000 行），单只股票查询也要拉整张表。
+这里按刷新间隔最多拉取一次，按代码建成字典，所有 Akshare 实时查询都从快照读取：
+- 刷新是单飞的 (single-flight)，并发查询只触发一次拉取，其余等待结果
+- 拉取失败时继续提供旧快照并标记 stale，间隔一个刷新周期后再重试
+- 每条返回的行情带 snapshot_time / snapshot_age / stale，调用方可自行判断是否可用
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 快照的代码列（6位数字）
+CODE_COLUMN = "代码"
+
+
+def _fetch_spot_em() -> pd.DataFrame:
+    import akshare as ak
+
+    return ak.stock_zh_a_spot_em()
+
+
+class SpotSnapshot:
+    """按刷新间隔缓存的全市场行情表（线程安全）"""
+
+    def __init__(self, fetch: Callable[[], pd.DataFrame] = None, ttl: float = 5.0):
+        """
+        Args:
+            fetch: 拉取全市场行情表的函数，默认 akshare.stock_zh_a_spot_em
+            ttl: 刷新间隔（秒）
+        """
+        self._fetch = fetch or _fetch_spot_em
+        self.ttl = ttl
+        # (代码 -> 行字典, 拉取时刻 monotonic, 拉取时刻 wall clock)，整体替换保证读取一致
+        self._state: Tuple[Dict[str, Dict[str, Any]], Optional[float], Optional[float]] = ({}, None, None)
+        self._retry_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.fetches = 0
+
+    def _is_fresh(self, now: float) -> bool:
+        fetched_at = self._state[1]
+        return fetched_at is not None and now - fetched_at < self.ttl
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        快照过期时重新拉取
+
+        Args:
+            force: 忽略刷新间隔立即拉取
+
+        Returns:
+            当前是否有可用快照（可能是旧快照）
+        """
+        now = time.monotonic()
+        if not force and (self._is_fresh(now) or now < self._retry_at):
+            return self._state[1] is not None
+
+        with self._refresh_lock:
+            # 等锁期间其它线程可能已经刷新完成
+            now = time.monotonic()
+            if not force and (self._is_fresh(now) or now < self._retry_at):
+                return self._state[1] is not None
+
+            self.fetches += 1
+            try:
+                df = self._fetch()
+                if df is None or df.empty:
+                    raise ValueError("行情表为空")
+                rows = {
+                    str(record[CODE_COLUMN]): record
+                    for record in df.to_dict("records")
+                }
+            except Exception as e:
+                self._retry_at = time.monotonic() + self.ttl
+                if self._state[1] is not None:
+                    logger.warning(f"刷新全市场行情快照失败，继续使用旧快照: {e}")
+                else:
+                    logger.error(f"获取全市场行情快照失败: {e}")
+                return self._state[1] is not None
+
+            self._state = (rows, time.monotonic(), time.time())
+            logger.debug(f"全市场行情快照已刷新: {len(rows)} 只股票")
+            return True
+
+    def _meta(self, fetched_at: float, fetched_wall: float) -> Dict[str, Any]:
+        age = time.monotonic() - fetched_at
+        return {
+            "snapshot_time": datetime.fromtimestamp(fetched_wall).isoformat(timespec="seconds"),
+            "snapshot_age": round(age, 3),
+            "stale": age >= self.ttl,
+        }
+
+    def lookup(self, codes: Iterable[str] = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        从快照查询行情，必要时先刷新
+
+        Args:
+            codes: 6位股票代码，None 表示全部
+
+        Returns:
+            ({代码: 行字典}, 快照元数据)，没有可用快照时返回 ({}, {})
+        """
+        if not self.refresh():
+            return {}, {}
+        rows, fetched_at, fetched_wall = self._state
+        if codes is None:
+            found = dict(rows)
+        else:
+            found = {code: rows[code] for code in codes if code in rows}
+        return found, self._meta(fetched_at, fetched_wall)
+
+    def stats(self) -> Dict[str, Any]:
+        rows, fetched_at, fetched_wall = self._state
+        stats = {"size": len(rows), "ttl": self.ttl, "fetches": self.fetches}
+        if fetched_at is not None:
+            stats.update(self._meta(fetched_at, fetched_wall))
+        return stats
+
+
+_spot_snapshot: Optional[SpotSnapshot] = None
+_spot_snapshot_lock = threading.Lock()
+
+
+def get_spot_snapshot() -> SpotSnapshot:
+    """进程级共享快照，统一数据源适配器和盯盘数据源共用"""
+    global _spot_snapshot
+    if _spot_snapshot is None:
+        with _spot_snapshot_lock:
+            if _spot_snapshot is None:
+                from app.core.config import settings
+
+                _spot_snapshot = SpotSnapshot(ttl=settings.data_source_spot_snapshot_ttl)
+    return _spot_snapshot
@@ -0,0 +1,196 @@
+"""
+通达信（mootdx）长连接池
+
+Quotes.factory 每次都会选择服务器、建立 TCP 连接并启动心跳线程，开销远大于一次行情请求。
+连接池保持若干条长连接：
+- 首次连接时选择最快的服务器并缓存，之后的连接直接连到该服务器
+- 借出/归还线程安全，连接全部借出时等待归还，不超过 max_size 条
+- 请求异常时关闭并丢弃该连接，清除缓存的服务器，用新连接重试一次
+- close() 关闭全部空闲连接，借出中的连接归还时关闭
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(TimeoutError):
+    """连接全部借出且等待归还超时"""
+
+
+def _create_quotes_client(server: Optional[Tuple[str, int]], bestip: bool):
+    """创建 mootdx 标准行情客户端；bestip 时测速选择最快服务器（mootdx 会写入其配置）"""
+    from mootdx.quotes import Quotes
+
+    if server:
+        return Quotes.factory(market="std", multithread=True, heartbeat=True, server=server)
+    return Quotes.factory(market="std", multithread=True, heartbeat=True, bestip=bestip)
+
+
+def _close_client(client):
+    try:
+        close = getattr(client, "close", None)
+        if close:
+            close()
+    except Exception as e:
+        logger.debug(f"关闭通达信连接失败: {e}")
+
+
+class TDXConnectionPool:
+    """线程安全的通达信长连接池"""
+
+    def __init__(
+        self,
+        max_size: int = 4,
+        checkout_timeout: float = 10.0,
+        factory: Callable[[Optional[Tuple[str, int]], bool], Any] = None,
+    ):
+        """
+        Args:
+            max_size: 最大连接数
+            checkout_timeout: 连接全部借出时等待归还的最长时间（秒）
+            factory: 创建连接的函数，参数为 (缓存的服务器 (ip, port) 或 None, 是否测速选服务器)
+        """
+        self.max_size = max(1, max_size)
+        self.checkout_timeout = checkout_timeout
+        self._factory = factory or _create_quotes_client
+        self._idle: List[Any] = []
+        self._size = 0  # 已创建且未丢弃的连接数（空闲 + 借出）
+        self._server: Optional[Tuple[str, int]] = None
+        self._need_bestip = True
+        self._closed = False
+        self._cond = threading.Condition()
+        self.created = 0
+
+    @classmethod
+    def from_settings(cls) -> "TDXConnectionPool":
+        from app.core.config import settings
+
+        return cls(
+            max_size=settings.data_source_tdx_pool_size,
+            checkout_timeout=settings.data_source_tdx_checkout_timeout,
+        )
+
+    @property
+    def server(self) -> Optional[Tuple[str, int]]:
+        """缓存的最快服务器"""
+        return self._server
+
+    def _connect(self):
+        with self._cond:
+            server, bestip = self._server, self._need_bestip
+        # 建立连接较慢，不持有锁
+        client = self._factory(server, bestip)
+        with self._cond:
+            self.created += 1
+            if bestip:
+                self._need_bestip = False
+            if self._server is None:
+                # mootdx 客户端记录实际连接的服务器，缓存后新连接跳过测速
+                server = getattr(client, "server", None)
+                if isinstance(server, (tuple, list)) and len(server) == 2:
+                    self._server = (server[0], int(server[1]))
+                    logger.info(f"通达信最快服务器: {self._server[0]}:{self._server[1]}")
+        return client
+
+    def checkout(self):
+        """借出一条连接，没有空闲连接且未达上限时新建"""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("通达信连接池已关闭")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"等待通达信连接超时 ({self.checkout_timeout}s)")
+                self._cond.wait(remaining)
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, client, broken: bool = False):
+        """
+        归还连接
+
+        Args:
+            broken: 连接是否已失效，失效的连接直接关闭丢弃并清除缓存的服务器
+        """
+        with self._cond:
+            if broken or self._closed:
+                self._size -= 1
+                if broken:
+                    # 服务器可能已不可用，下次连接重新测速
+                    self._server = None
+                    self._need_bestip = True
+            else:
+                self._idle.append(client)
+                client = None
+            self._cond.notify()
+        if client is not None:
+            _close_client(client)
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as client: ...，异常时丢弃连接"""
+        client = self.checkout()
+        try:
+            yield client
+        except Exception:
+            self.checkin(client, broken=True)
+            raise
+        else:
+            self.checkin(client)
+
+    def call(self, func: Callable[[Any], Any], retries: int = 1) -> Any:
+        """
+        用池中的连接执行请求，连接失效时换新连接重试
+
+        Args:
+            func: 接收客户端的请求函数
+            retries: 失败后的重试次数
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as client:
+                    return func(client)
+            except PoolTimeout:
+                # 等不到空闲连接时重试无意义；socket.timeout 等请求超时仍按失效连接重试
+                raise
+            except Exception as e:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"通达信请求失败，重新连接后重试: {e}")
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "created": self.created,
+                "server": f"{self._server[0]}:{self._server[1]}" if self._server else None,
+            }
+
+    def close(self):
+        """关闭全部空闲连接，借出中的连接归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for client in idle:
+            _close_client(client)
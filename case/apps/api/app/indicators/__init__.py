@@ -0,0 +1,16 @@
+from . import kernels
+from .kernels import NUMBA_AVAILABLE, get_backend, set_backend
+from .panel import IndicatorPanel
+from .cache import DEFAULT_PARAMS, IndicatorCache, IndicatorSeries, params_key
+
+__all__ = [
+    "kernels",
+    "NUMBA_AVAILABLE",
+    "get_backend",
+    "set_backend",
+    "IndicatorPanel",
+    "DEFAULT_PARAMS",
+    "IndicatorCache",
+    "IndicatorSeries",
+    "params_key",
+]
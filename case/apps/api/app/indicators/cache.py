@@ -0,0 +1,433 @@
+"""
+日线指标序列缓存
+
+选股、盯盘、收盘简报、看板每天多次为同一批股票从头计算同样的日线指标。
+IndicatorSeries 保存一只股票在一组参数下的指标序列，以及接着计算所需的状态：
+- 最近 context_size 根K线（滑动窗口类：均线、SMA RSI、KDJ 的高低区间、布林带）
+- 递推类指标在最后一根K线上的值（MACD 的快慢 EMA 和信号线、Wilder 平均涨跌、KDJ 的 K/D）
+新K线到来时只计算新增的尾部，结果与整段重算一致。
+
+IndicatorCache 按 (code, 参数) 把序列存在 MongoDB 的 indicator_cache 集合，文档记录 last_date，
+查询时只取 last_date 之后的K线补齐尾部。
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# context 保存的K线列
+CONTEXT_COLUMNS = ("date", "close", "high", "low")
+
+# 缓存格式版本，字段或算法变化时递增，旧缓存会被丢弃并整段重算
+CACHE_VERSION = 1
+
+DEFAULT_PARAMS = {
+    "ma": (5, 10, 20),
+    "rsi": 14,  # 涨跌幅简单平均的 RSI（选股、简报）
+    "rsi_wilder": 14,  # Wilder RSI（盯盘）
+    "macd": (12, 26, 9),
+    "kdj": 9,
+    "bollinger": (20, 2.0),
+}
+
+
+def normalize_params(params: Mapping[str, Any] = None) -> Dict[str, Any]:
+    """未指定的参数取默认值，统一类型（从 MongoDB 读回的列表转为元组）"""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    fast_period, slow_period, signal_period = params["macd"]
+    period, num_std = params["bollinger"]
+    return {
+        "ma": tuple(sorted({int(window) for window in params["ma"]})),
+        "rsi": int(params["rsi"]),
+        "rsi_wilder": int(params["rsi_wilder"]),
+        "macd": (int(fast_period), int(slow_period), int(signal_period)),
+        "kdj": int(params["kdj"]),
+        "bollinger": (int(period), float(num_std)),
+    }
+
+
+def params_key(params: Mapping[str, Any] = None) -> str:
+    """参数组的稳定文本键，如 ma=5,10,20;rsi=14;...（参数不同的序列分开缓存）"""
+    parts = []
+    for name, value in sorted(normalize_params(params).items()):
+        values = value if isinstance(value, tuple) else (value,)
+        parts.append(f"{name}={','.join(str(v) for v in values)}")
+    return ";".join(parts)
+
+
+def _column(klines, name: str):
+    if hasattr(klines, "column"):
+        return klines.column(name)
+    return klines[name] if name in klines else None
+
+
+def _bars(klines):
+    """
+    K线 -> (dates, close, high, low)，按日期升序、同一天只保留最后一条
+
+    参数:
+        klines: KLineFrame、DataFrame 或列字典（date/close，可选 high/low）；
+                date 可以是 YYYY-MM-DD 字符串或 datetime
+
+    close 为 NaN 的行（停牌）丢弃，high/low 缺失时用 close
+    """
+    if klines is None or not len(klines):
+        return np.array([], dtype=object), np.array([]), np.array([]), np.array([])
+
+    dates = pd.to_datetime(pd.Series(np.asarray(_column(klines, "date")))).dt.strftime(DATE_FORMAT).to_numpy(dtype=object)
+    close = np.asarray(_column(klines, "close"), dtype=float)
+    high, low = (_column(klines, name) for name in ("high", "low"))
+    high = close if high is None else np.where(np.isnan(np.asarray(high, dtype=float)), close, high)
+    low = close if low is None else np.where(np.isnan(np.asarray(low, dtype=float)), close, low)
+
+    order = np.argsort(dates, kind="stable")
+    dates, close, high, low = dates[order], close[order], high[order], low[order]
+    keep = ~np.isnan(close)
+    keep[:-1] &= dates[:-1] != dates[1:]
+    return dates[keep], close[keep], high[keep], low[keep]
+
+
+class IndicatorSeries:
+    """一只股票一组参数下的日线指标序列"""
+
+    def __init__(self, code: str, params: Mapping[str, Any] = None):
+        self.code = code
+        self.params = normalize_params(params)
+        self.key = params_key(self.params)
+        self.bars = 0  # 累计计算过的K线数（序列只保留最近 max_bars 根）
+        self.dates = np.array([], dtype=object)
+        self.series: Dict[str, np.ndarray] = {name: np.array([]) for name in self.names}
+        self.context = {name: np.array([], dtype=object if name == "date" else float) for name in CONTEXT_COLUMNS}
+        self.state: Dict[str, float] = {}
+
+    @property
+    def names(self) -> List[str]:
+        """序列名，均线、RSI、MACD 与 TechnicalIndicators 的列名一致"""
+        return [f"ma{window}" for window in self.params["ma"]] + [
+            "rsi", "rsi_wilder", "macd", "macd_signal", "macd_hist",
+            "k", "d", "j", "boll_upper", "boll_middle", "boll_lower",
+        ]
+
+    @property
+    def context_size(self) -> int:
+        """接着计算时需要的最近K线数：最长窗口 + 1（SMA RSI 需要窗口前一根收盘价）"""
+        params = self.params
+        return max(params["ma"] + (params["rsi"], params["rsi_wilder"], params["kdj"], params["bollinger"][0])) + 1
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return self.dates[-1] if len(self.dates) else None
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def column(self, name: str) -> np.ndarray:
+        """与 dates 等长的指标序列，预热期为 NaN"""
+        return self.series[name]
+
+    def frame(self, names: Iterable[str] = None) -> pd.DataFrame:
+        """以 date 为列的 DataFrame"""
+        names = list(names or self.names)
+        return pd.DataFrame({"date": self.dates, **{name: self.series[name] for name in names}})
+
+    def extend(self, klines, max_bars: int = None) -> Optional[int]:
+        """
+        追加 last_date 之后的K线，只计算新增部分
+
+        参数:
+            klines: 按日期升序的K线（见 _bars），可以包含已缓存的日期
+            max_bars: 序列保留的最近K线数，None 不截断
+
+        返回:
+            追加的K线数；klines 中 last_date 当天的收盘价与缓存不一致（如复权价格变化），
+            或 klines 不含 last_date 且从其之后才开始（中间可能缺K线）时返回 None，调用方应丢弃缓存整段重算
+        """
+        dates, close, high, low = _bars(klines)
+        if self.last_date is not None:
+            overlap = np.flatnonzero(dates == self.last_date)
+            if not len(overlap) and len(dates) and dates[0] > self.last_date:
+                return None
+            if len(overlap) and not np.isclose(close[overlap[-1]], self.context["close"][-1], rtol=1e-9, atol=0):
+                return None
+            new = dates > self.last_date
+            dates, close, high, low = dates[new], close[new], high[new], low[new]
+        added = len(dates)
+        if not added:
+            return 0
+
+        bars = {
+            name: np.concatenate((self.context[name], values))
+            for name, values in zip(CONTEXT_COLUMNS, (dates, close, high, low))
+        }
+        if self.bars > len(self.context["close"]):
+            series = self._resume(bars, added)
+            self.dates = np.concatenate((self.dates, dates))
+            self.series = {name: np.concatenate((self.series[name], series[name])) for name in self.names}
+        else:
+            # 缓存的K线不超过 context 时 context 就是全部历史，直接整段计算
+            self.dates = bars["date"]
+            self.series = self._compute(bars)
+        self.bars += added
+        self.context = {name: values[-self.context_size:] for name, values in bars.items()}
+
+        if max_bars and len(self.dates) > max_bars:
+            self.dates = self.dates[-max_bars:]
+            self.series = {name: values[-max_bars:] for name, values in self.series.items()}
+        return added
+
+    def _compute(self, bars: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """整段计算，同时记录递推状态"""
+        params = self.params
+        close, high, low = bars["close"], bars["high"], bars["low"]
+        series = {f"ma{window}": kernels.rolling_mean(close, window) for window in params["ma"]}
+        series["rsi"] = kernels.rsi_sma(close, params["rsi"])
+
+        avg_gain, avg_loss = kernels.wilder_averages(close, params["rsi_wilder"])
+        series["rsi_wilder"] = np.where(np.isnan(avg_gain), np.nan, kernels.rsi_from_averages(avg_gain, avg_loss))
+
+        fast_period, slow_period, signal_period = params["macd"]
+        fast, slow = kernels.ema(close, fast_period), kernels.ema(close, slow_period)
+        self._set_macd(series, fast, slow, kernels.ema(fast - slow, signal_period))
+        series["k"], series["d"], series["j"] = kernels.kdj(close, high, low, params["kdj"])
+        series["boll_upper"], series["boll_middle"], series["boll_lower"] = kernels.bollinger(close, *params["bollinger"])
+
+        self.state.update(avg_gain=float(avg_gain[-1]), avg_loss=float(avg_loss[-1]))
+        self.state.update(k=float(series["k"][-1]), d=float(series["d"][-1]))
+        return series
+
+    def _resume(self, bars: Dict[str, np.ndarray], added: int) -> Dict[str, np.ndarray]:
+        """
+        只计算最后 added 根K线：滑动窗口类在 context + 新K线上计算后取尾部，
+        递推类以上一根K线的状态为初值
+        """
+        params = self.params
+        close, high, low = bars["close"], bars["high"], bars["low"]
+        tail = slice(-added, None)
+        series = {f"ma{window}": kernels.rolling_mean(close, window)[tail] for window in params["ma"]}
+        series["rsi"] = kernels.rsi_sma(close, params["rsi"])[tail]
+
+        delta = np.diff(close)[tail]
+        alpha = 1.0 / params["rsi_wilder"]
+        avg_gain = kernels.recursive_filter(np.clip(delta, 0, None), alpha, self.state["avg_gain"])
+        avg_loss = kernels.recursive_filter(np.clip(-delta, 0, None), alpha, self.state["avg_loss"])
+        series["rsi_wilder"] = kernels.rsi_from_averages(avg_gain, avg_loss)
+
+        fast_period, slow_period, signal_period = params["macd"]
+        fast = kernels.ema(close[tail], fast_period, self.state["ema_fast"])
+        slow = kernels.ema(close[tail], slow_period, self.state["ema_slow"])
+        self._set_macd(series, fast, slow, kernels.ema(fast - slow, signal_period, self.state["macd_signal"]))
+
+        period = params["kdj"]
+        window = slice(-(added + period - 1), None)
+        k, d, j = kernels.kdj(close[window], high[window], low[window], period, (self.state["k"], self.state["d"]))
+        series["k"], series["d"], series["j"] = k[tail], d[tail], j[tail]
+        upper, middle, lower = kernels.bollinger(close, *params["bollinger"])
+        series["boll_upper"], series["boll_middle"], series["boll_lower"] = upper[tail], middle[tail], lower[tail]
+
+        self.state.update(avg_gain=float(avg_gain[-1]), avg_loss=float(avg_loss[-1]))
+        self.state.update(k=float(k[-1]), d=float(d[-1]))
+        return series
+
+    def _set_macd(self, series: Dict[str, np.ndarray], fast: np.ndarray, slow: np.ndarray, signal: np.ndarray):
+        line = fast - slow
+        series["macd"], series["macd_signal"], series["macd_hist"] = line, signal, line - signal
+        self.state.update(ema_fast=float(fast[-1]), ema_slow=float(slow[-1]), macd_signal=float(signal[-1]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为 MongoDB 文档内容（NaN 按 BSON double 原样保存）"""
+        return {
+            "version": CACHE_VERSION,
+            "code": self.code,
+            "params_key": self.key,
+            "bars": self.bars,
+            "last_date": self.last_date,
+            "dates": self.dates.tolist(),
+            "series": {name: values.tolist() for name, values in self.series.items()},
+            "context": {name: values.tolist() for name, values in self.context.items()},
+            "state": dict(self.state),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], params: Mapping[str, Any] = None) -> Optional["IndicatorSeries"]:
+        """从文档恢复，版本或参数不一致、内容损坏时返回 None"""
+        if not data or data.get("version") != CACHE_VERSION:
+            return None
+        entry = cls(data.get("code"), params)
+        if data.get("params_key") != entry.key:
+            return None
+        try:
+            entry.bars = int(data["bars"])
+            entry.dates = np.array(data["dates"], dtype=object)
+            entry.series = {name: np.asarray(data["series"][name], dtype=float) for name in entry.names}
+            entry.context = {
+                name: np.array(data["context"][name], dtype=object if name == "date" else float)
+                for name in CONTEXT_COLUMNS
+            }
+            entry.state = {name: float(value) for name, value in data["state"].items()}
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"指标缓存无效 {data.get('code')}: {e}")
+            return None
+        if any(len(values) != len(entry.dates) for values in entry.series.values()):
+            return None
+        return entry
+
+
+class IndicatorCache:
+    """
+    持久化的日线指标序列缓存
+
+    每只股票每天最多取一次K线：有缓存时只取 last_date 之后的K线补齐尾部，没有缓存时取
+    history_days 自然日的K线整段计算；补齐后写回 indicator_cache 集合。
+    调用方已经有K线时直接传入，不再另外获取。
+    """
+
+    def __init__(
+        self,
+        storage=None,
+        fetch_klines: Callable[[str, str, str], Any] = None,
+        params: Mapping[str, Any] = None,
+        max_bars: int = None,
+        history_days: int = None,
+        today: Callable[[], str] = None,
+    ):
+        """
+        参数:
+            storage: MongoStorage（需要 get_indicator_cache / save_indicator_cache），None 时只缓存在进程内
+            fetch_klines: (code, start_date, end_date) -> 按日期升序的 KLineFrame
+            params: 指标参数，未指定的取 DEFAULT_PARAMS
+            max_bars: 每只股票保留的最近K线数（0 不截断），默认读取配置
+            history_days: 没有缓存时取回的K线自然日数，默认读取配置
+            today: 返回当天日期的函数，便于测试
+        """
+        if max_bars is None or history_days is None:
+            from app.core.config import settings
+            max_bars = settings.indicator_cache_max_bars if max_bars is None else max_bars
+            history_days = settings.indicator_cache_history_days if history_days is None else history_days
+
+        self.storage = storage
+        self.fetch_klines = fetch_klines
+        self.params = normalize_params(params)
+        self.key = params_key(self.params)
+        self.max_bars = max_bars
+        self.history_days = history_days
+        self._today = today or (lambda: datetime.now().strftime(DATE_FORMAT))
+        self._entries: Dict[str, IndicatorSeries] = {}
+        self._synced: Dict[str, str] = {}  # 每只股票最近一次取K线补齐的日期
+
+    def get(self, code: str, klines=None) -> Optional[IndicatorSeries]:
+        """获取一只股票的指标序列，没有任何K线时返回 None"""
+        return self.get_many([code], None if klines is None else {code: klines}).get(code)
+
+    def get_many(self, codes: List[str], klines: Mapping[str, Any] = None) -> Dict[str, IndicatorSeries]:
+        """
+        批量获取指标序列（一次查询缓存、一次批量写回）
+
+        参数:
+            codes: 股票代码
+            klines: {code: 按日期升序的K线}，传入的股票用这些K线补齐，其余股票用 fetch_klines 获取
+
+        返回:
+            {code: IndicatorSeries}，没有任何K线的股票不出现
+        """
+        klines = klines or {}
+        self._load([code for code in codes if code not in self._entries])
+
+        result, changed = {}, {}
+        for code in dict.fromkeys(codes):
+            entry = self._entries.get(code)
+            bars = klines.get(code)
+            if entry is not None:
+                if bars is None:
+                    bars = self._fetch(code, entry.last_date)
+                added = entry.extend(bars, self.max_bars)
+                if added is None:
+                    logger.info(f"{code} 的K线与指标缓存不一致，整段重算")
+                    entry = None
+                    bars = klines.get(code)
+            if entry is None:
+                if bars is None:
+                    bars = self._fetch(code)
+                entry = IndicatorSeries(code, self.params)
+                added = entry.extend(bars, self.max_bars)
+            if not entry.bars:
+                continue
+            self._entries[code] = entry
+            result[code] = entry
+            if added:
+                changed[code] = entry
+
+        self._save(changed)
+        return result
+
+    def lookup_frame(self, df: pd.DataFrame, names: Iterable[str], symbol_column: str = "symbol") -> pd.DataFrame:
+        """
+        按长表的每一行 (symbol, date) 取缓存中的指标值，df 中的K线用于补齐各股票缓存之后的部分
+
+        参数:
+            df: 长表，含 symbol/date/close 列（可选 high/low）
+            names: 序列名
+            symbol_column: 股票代码列
+
+        返回:
+            与 df 同一 index 的 DataFrame；缓存中没有的行（早于保留范围、close 为 NaN）为 NaN
+        """
+        names = list(names)
+        columns = ["date", "close"] + [column for column in ("high", "low") if column in df.columns]
+        klines = {symbol: rows[columns] for symbol, rows in df.groupby(symbol_column, sort=False)}
+        entries = self.get_many(list(klines), klines)
+
+        index = pd.MultiIndex.from_arrays([df[symbol_column], pd.to_datetime(df["date"]).dt.strftime(DATE_FORMAT)])
+        frames = [entry.frame(names).assign(**{symbol_column: symbol}) for symbol, entry in entries.items()]
+        if frames:
+            values = pd.concat(frames).set_index([symbol_column, "date"]).reindex(index)
+        else:
+            values = pd.DataFrame(np.nan, index=index, columns=names)
+        return values.set_axis(df.index)
+
+    def _fetch(self, code: str, start_date: str = None):
+        """
+        取 start_date（含，用于校验缓存的最后一根K线）到当天的K线；没有 start_date 时取 history_days 天。
+        补齐尾部每只股票每天只取一次
+        """
+        today = self._today()
+        if self.fetch_klines is None or (start_date is not None and self._synced.get(code) == today):
+            return None
+        if start_date is None:
+            start_date = (datetime.strptime(today, DATE_FORMAT) - timedelta(days=self.history_days)).strftime(DATE_FORMAT)
+        try:
+            klines = self.fetch_klines(code, start_date, today)
+        except Exception as e:
+            logger.warning(f"获取指标缓存K线失败 {code}: {e}")
+            return None
+        self._synced[code] = today
+        return klines
+
+    def _load(self, codes: List[str]):
+        if self.storage is None or not codes:
+            return
+        try:
+            docs = self.storage.get_indicator_cache(codes, self.key)
+        except Exception as e:
+            logger.warning(f"读取指标缓存失败: {e}")
+            return
+        for code, data in docs.items():
+            entry = IndicatorSeries.from_dict(data, self.params)
+            if entry is not None:
+                self._entries[code] = entry
+
+    def _save(self, entries: Dict[str, IndicatorSeries]):
+        if self.storage is None or not entries:
+            return
+        try:
+            self.storage.save_indicator_cache({code: entry.to_dict() for code, entry in entries.items()}, self.key)
+        except Exception as e:
+            logger.warning(f"保存指标缓存失败: {e}")
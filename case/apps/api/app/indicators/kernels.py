@@ -0,0 +1,344 @@
+"""
+技术指标计算内核
+
+盯盘、选股面板、回测、收盘简报共用的一套实现。所有函数沿最后一个轴计算，
+输入可以是一只股票的一维序列，也可以是 (股票 × K线) 的二维面板，返回同形状的数组：
+- 滑动窗口类（均值、标准差、最高/最低）用 cumsum 差分或滑动窗口视图整体计算
+- 递推类（EMA、Wilder 平滑、KDJ 的 K/D）用分块闭式解：块内 cumsum 同时求解，
+  块与块之间只对块末值做标量递推；装了 numba 时改用编译后的逐元素循环
+
+EMA 与 pandas ewm(span, adjust=False).mean() 一致（含 NaN 的处理），
+滑动均值与 rolling(window, min_periods).mean() 一致。
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except Exception:
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 分块递推时块内缩放因子 (1-a)^-k 的上限（10^12），保证 cumsum 的精度
+_MAX_SCALE_LOG = 12 * np.log(10)
+
+_backend = "numba" if NUMBA_AVAILABLE else "numpy"
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str):
+    """切换递推内核的实现："numpy" 或 "numba"（需要安装 numba）"""
+    global _backend
+    if name not in ("numpy", "numba"):
+        raise ValueError(f"未知的指标内核: {name}")
+    if name == "numba" and not NUMBA_AVAILABLE:
+        raise ValueError("numba 未安装")
+    _backend = name
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+
+# ---------------------------------------------------------------- 编译内核
+
+if NUMBA_AVAILABLE:
+
+    @numba.njit(cache=True)
+    def _filter_compiled(rows, alpha, initial):
+        out = np.empty_like(rows)
+        decay = 1.0 - alpha
+        for r in range(rows.shape[0]):
+            previous = initial[r]
+            for i in range(rows.shape[1]):
+                previous = decay * previous + alpha * rows[r, i]
+                out[r, i] = previous
+        return out
+
+    @numba.njit(cache=True)
+    def _ewm_compiled(rows, alpha):
+        out = np.empty_like(rows)
+        decay = 1.0 - alpha
+        for r in range(rows.shape[0]):
+            weighted = rows[r, 0]
+            old_weight = 1.0
+            out[r, 0] = weighted
+            for i in range(1, rows.shape[1]):
+                current = rows[r, i]
+                if weighted == weighted:
+                    old_weight *= decay
+                    if current == current:
+                        weighted = (old_weight * weighted + alpha * current) / (old_weight + alpha)
+                        old_weight = 1.0
+                elif current == current:
+                    weighted = current
+                out[r, i] = weighted
+        return out
+
+
+# ---------------------------------------------------------------- 滑动窗口
+
+def rolling_mean(values, window: int, min_periods: int = None) -> np.ndarray:
+    """
+    滑动均值，窗口内非 NaN 值少于 min_periods（默认 window）时为 NaN
+
+    参数:
+        values: 一维序列或二维面板
+        window: 窗口长度
+        min_periods: 最少有效值个数
+    """
+    x = _as_array(values)
+    n = x.shape[-1]
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    zeros = np.zeros(x.shape[:-1] + (1,))
+    sums = np.concatenate((zeros, np.cumsum(np.where(valid, x, 0.0), axis=-1)), axis=-1)
+    counts = np.concatenate((zeros, np.cumsum(valid, axis=-1)), axis=-1)
+
+    upper = np.arange(1, n + 1)
+    lower = np.maximum(upper - window, 0)
+    window_sum = sums[..., upper] - sums[..., lower]
+    window_count = counts[..., upper] - counts[..., lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_count >= max(min_periods, 1), window_sum / window_count, np.nan)
+
+
+def _rolling_apply(values, window: int, reducer) -> np.ndarray:
+    x = _as_array(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = reducer(sliding_window_view(x, window, axis=-1), axis=-1)
+    return out
+
+
+def rolling_std(values, window: int) -> np.ndarray:
+    """滑动总体标准差（ddof=0），前 window-1 个位置为 NaN"""
+    return _rolling_apply(values, window, np.std)
+
+
+def rolling_max(values, window: int) -> np.ndarray:
+    """滑动窗口最大值，前 window-1 个位置为 NaN"""
+    return _rolling_apply(values, window, np.max)
+
+
+def rolling_min(values, window: int) -> np.ndarray:
+    """滑动窗口最小值，前 window-1 个位置为 NaN"""
+    return _rolling_apply(values, window, np.min)
+
+
+# ---------------------------------------------------------------- 递推
+
+def recursive_filter(values, alpha: float, initial=0.0) -> np.ndarray:
+    """
+    一阶递推 y[t] = (1 - alpha) * y[t-1] + alpha * x[t]，y[-1] = initial（输入不含 NaN）
+
+    参数:
+        values: 一维序列或二维面板
+        alpha: 平滑系数 (0, 1]
+        initial: 递推初值，二维时可以每行一个
+    """
+    x = _as_array(values)
+    n = x.shape[-1]
+    lead = x.shape[:-1]
+    initial = np.broadcast_to(_as_array(initial), lead).astype(float)
+    decay = 1.0 - alpha
+    if n == 0 or decay <= 0:
+        return x.copy()
+
+    if _backend == "numba":
+        rows = np.ascontiguousarray(x.reshape(-1, n))
+        return _filter_compiled(rows, alpha, initial.reshape(-1)).reshape(x.shape)
+
+    block = max(1, min(n, int(_MAX_SCALE_LOG / -np.log(decay))))
+    steps = np.arange(1, block + 1)
+    growth = decay ** -steps  # (1-a)^-(i+1)
+    shrink = decay ** steps   # (1-a)^(j+1)
+
+    # 所有块同时按初值 0 求解
+    blocks = -(-n // block)
+    padded = np.zeros(lead + (blocks * block,))
+    padded[..., :n] = x
+    local = shrink * (alpha * np.cumsum(growth * padded.reshape(lead + (blocks, block)), axis=-1))
+
+    # 每块的初值是上一块的末值，只需对块数做一次递推
+    starts = np.empty(lead + (blocks,))
+    previous = initial.copy()
+    for i in range(blocks):
+        starts[..., i] = previous
+        previous = shrink[-1] * previous + local[..., i, -1]
+    out = local + starts[..., None] * shrink
+    return out.reshape(lead + (blocks * block,))[..., :n]
+
+
+def _ewm_nan(rows: np.ndarray, alpha: float) -> np.ndarray:
+    """含 NaN 时逐列递推、每列对所有行同时计算（pandas ignore_na=False 的权重规则）"""
+    decay = 1.0 - alpha
+    out = np.empty(rows.shape)
+    weighted = rows[:, 0].copy()
+    old_weight = np.ones(len(rows))
+    out[:, 0] = weighted
+    for i in range(1, rows.shape[1]):
+        current = rows[:, i]
+        observed = ~np.isnan(current)
+        started = ~np.isnan(weighted)
+        old_weight[started] *= decay
+        update = started & observed
+        weighted[update] = (
+            (old_weight[update] * weighted[update] + alpha * current[update])
+            / (old_weight[update] + alpha)
+        )
+        old_weight[update] = 1.0
+        first = ~started & observed
+        weighted[first] = current[first]
+        out[:, i] = weighted
+    return out
+
+
+def ema(values, period: int, initial=None) -> np.ndarray:
+    """
+    指数移动平均，等价于 ewm(span=period, adjust=False).mean()
+
+    以第一个有效值为初值；NaN 处沿用上一个值，旧权重按间隔的K线数衰减。
+    initial 为上一根K线的 EMA 时接着已有序列计算，结果与整段计算的尾部一致
+    """
+    x = _as_array(values)
+    if initial is not None:
+        seed = np.broadcast_to(_as_array(initial), x.shape[:-1])[..., None]
+        return ema(np.concatenate((seed, x), axis=-1), period)[..., 1:]
+    n = x.shape[-1]
+    if n == 0:
+        return x.copy()
+    alpha = 2.0 / (period + 1)
+    rows = np.ascontiguousarray(x.reshape(-1, n))
+    if _backend == "numba":
+        return _ewm_compiled(rows, alpha).reshape(x.shape)
+    if not np.isnan(rows).any():
+        return recursive_filter(x, alpha, x[..., 0])
+    return _ewm_nan(rows, alpha).reshape(x.shape)
+
+
+# ---------------------------------------------------------------- 指标
+
+def _diff(x: np.ndarray) -> np.ndarray:
+    delta = np.full(x.shape, np.nan)
+    delta[..., 1:] = np.diff(x, axis=-1)
+    return delta
+
+
+def rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """没有下跌（平均跌幅为 0）时 RSI 为 100"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, values)
+
+
+def rsi_sma(close, period: int = 14) -> np.ndarray:
+    """
+    RSI（涨跌幅的简单移动平均，选股/回测/简报使用）
+
+    第一根K线和 close 为 NaN 处的涨跌按 0 计，与 pandas delta.where(delta > 0, 0) 一致；
+    前 period-1 个位置为 NaN
+    """
+    delta = _diff(_as_array(close))
+    with np.errstate(invalid="ignore"):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    return rsi_from_averages(rolling_mean(gain, period), rolling_mean(loss, period))
+
+
+def wilder_averages(close, period: int = 14) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wilder 平滑的平均涨幅、平均跌幅
+
+    前 period 个涨跌取均值作为初值，之后按 1/period 递推；前 period 个位置为 NaN
+
+    返回:
+        (avg_gain, avg_loss)
+    """
+    x = _as_array(close)
+    avg_gain, avg_loss = np.full(x.shape, np.nan), np.full(x.shape, np.nan)
+    if x.shape[-1] < period + 1:
+        return avg_gain, avg_loss
+
+    delta = np.diff(x, axis=-1)
+    gain = np.clip(delta, 0, None)
+    loss = np.clip(-delta, 0, None)
+    seed_gain = gain[..., :period].mean(axis=-1)
+    seed_loss = loss[..., :period].mean(axis=-1)
+    avg_gain[..., period] = seed_gain
+    avg_loss[..., period] = seed_loss
+    avg_gain[..., period + 1:] = recursive_filter(gain[..., period:], 1.0 / period, seed_gain)
+    avg_loss[..., period + 1:] = recursive_filter(loss[..., period:], 1.0 / period, seed_loss)
+    return avg_gain, avg_loss
+
+
+def rsi_wilder(close, period: int = 14) -> np.ndarray:
+    """
+    RSI（Wilder 平滑，盯盘使用），前 period 个位置为 NaN
+    """
+    avg_gain, avg_loss = wilder_averages(close, period)
+    return np.where(np.isnan(avg_gain), np.nan, rsi_from_averages(avg_gain, avg_loss))
+
+
+def macd(
+    close, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    MACD
+
+    返回:
+        (macd, signal, histogram)
+    """
+    x = _as_array(close)
+    line = ema(x, fast_period) - ema(x, slow_period)
+    signal = ema(line, signal_period)
+    return line, signal, line - signal
+
+
+def kdj(close, high, low, period: int = 9, initial=(50.0, 50.0)) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    KDJ：RSV 为收盘价在 N 日高低区间中的位置（区间为 0 时取 50），K、D 以 50 为初值按 1/3 递推
+
+    initial 为 (K, D) 的递推初值，接着已有序列计算时传入上一根K线的 K、D，
+    并在输入前带上 period-1 根已有K线
+
+    返回:
+        (k, d, j)，前 period-1 个位置为 NaN
+    """
+    x = _as_array(close)
+    k, d, j = (np.full(x.shape, np.nan) for _ in range(3))
+    if x.shape[-1] < period:
+        return k, d, j
+
+    highest = rolling_max(high, period)[..., period - 1:]
+    lowest = rolling_min(low, period)[..., period - 1:]
+    spread = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = np.where(spread == 0, 50.0, (x[..., period - 1:] - lowest) / spread * 100)
+
+    k[..., period - 1:] = recursive_filter(rsv, 1.0 / 3, initial[0])
+    d[..., period - 1:] = recursive_filter(k[..., period - 1:], 1.0 / 3, initial[1])
+    j[..., period - 1:] = 3 * k[..., period - 1:] - 2 * d[..., period - 1:]
+    return k, d, j
+
+
+def bollinger(close, period: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    布林带：N 日均线 ± num_std 倍总体标准差
+
+    返回:
+        (upper, middle, lower)，前 period-1 个位置为 NaN
+    """
+    x = _as_array(close)
+    middle = _rolling_apply(x, period, np.mean)
+    std = rolling_std(x, period)
+    return middle + num_std * std, middle, middle - num_std * std
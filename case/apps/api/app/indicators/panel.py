@@ -0,0 +1,81 @@
+"""
+全市场指标面板：长表 (symbol, date, close, ...) <-> (股票 × 第几根K线) 二维数组
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+
+
+class IndicatorPanel:
+    """
+    一次把长表转成二维数组，所有股票同时用 kernels 计算
+
+    每只股票的K线按其在 df 中出现的顺序左对齐，与 groupby('symbol') 逐组计算的语义一致：
+    停牌日没有K线行时窗口自然跨过停牌日；close 为 NaN 的行按 pandas rolling / ewm 的规则处理；
+    每行末尾不足最长股票的部分填 NaN，不会写回 df。
+    """
+
+    def __init__(self, df: pd.DataFrame, symbol_column: str = 'symbol'):
+        codes, self.symbols = pd.factorize(df[symbol_column])
+        self.size = len(df)
+        self.valid = codes >= 0  # symbol 为空的行不属于任何股票
+        self.rows = codes[self.valid]
+
+        # 每行在所属股票内的序号
+        order = np.argsort(self.rows, kind='stable')
+        self.lengths = np.bincount(self.rows, minlength=len(self.symbols))
+        starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1]))
+        self.cols = np.empty(len(self.rows), dtype=np.int64)
+        self.cols[order] = np.arange(len(self.rows)) - np.repeat(starts, self.lengths)
+        self.width = int(self.lengths.max()) if len(self.lengths) else 0
+
+    def pivot(self, values) -> np.ndarray:
+        """按行对齐的一列 -> 二维面板"""
+        panel = np.full((len(self.symbols), self.width), np.nan)
+        panel[self.rows, self.cols] = np.asarray(values, dtype=float)[self.valid]
+        return panel
+
+    def unpivot(self, panel: np.ndarray) -> np.ndarray:
+        """二维面板 -> 与 df 行对齐的一列"""
+        out = np.full(self.size, np.nan)
+        out[self.valid] = panel[self.rows, self.cols]
+        return out
+
+    def splice_head(self, head: np.ndarray, rest) -> np.ndarray:
+        """
+        每只股票前 head.shape[1] 根K线取 head，之后取 rest
+
+        参数:
+            head: 只在每只股票前几根K线的面板上计算的结果（预热期的值随 df 的起始日期变化）
+            rest: 与 df 行对齐的一列（如取自指标缓存）
+
+        返回:
+            与 df 行对齐的一列
+        """
+        length = head.shape[-1]
+        panel = np.full((len(self.symbols), self.width), np.nan)
+        panel[:, :length] = head
+        position = np.full(self.size, -1)
+        position[self.valid] = self.cols
+        return np.where((position >= 0) & (position < length), self.unpivot(panel), np.asarray(rest, dtype=float))
+
+    def mask_short(self, panel: np.ndarray, min_length: int) -> np.ndarray:
+        """K线数不足 min_length 的股票整行置为 NaN"""
+        panel[self.lengths < min_length] = np.nan
+        return panel
+
+    def ma(self, close: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+        return kernels.rolling_mean(close, window, min_periods)
+
+    def rsi(self, close: np.ndarray, window: int = 14) -> np.ndarray:
+        """涨跌幅简单移动平均的 RSI，K线数不足 window 的股票为 NaN"""
+        return self.mask_short(kernels.rsi_sma(close, window), window)
+
+    def macd(self, close: np.ndarray, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        """返回 (macd, signal, hist)，K线数不足 slow_period + signal_period 的股票为 NaN"""
+        line = kernels.ema(close, fast_period) - kernels.ema(close, slow_period)
+        line = self.mask_short(line, slow_period + signal_period)
+        signal = kernels.ema(line, signal_period)
+        return line, signal, line - signal
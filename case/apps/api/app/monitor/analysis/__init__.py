@@ -1,7 +1,10 @@
 from .technical import TechnicalAnalyzer
 from .signal import SignalGenerator
+from .streaming import IndicatorState, IndicatorStateCache
 
 __all__ = [
     "TechnicalAnalyzer",
-    "SignalGenerator"
+    "SignalGenerator",
+    "IndicatorState",
+    "IndicatorStateCache"
 ]
@@ -0,0 +1,382 @@
+"""
+增量技术指标状态
+
+盯盘每个周期只有当天这根K线在变化，不必每次取回历史再整段重算：
+- 每只股票一个 IndicatorState，已收盘的日K线逐根 update，每根 O(1)
+- 盘中行情作为当天未收盘的K线传给 snapshot，在状态的副本上计算，不改变状态
+- RSI 用 Wilder 平滑累加器，MACD 用三个 EMA 状态，KDJ 用长度为周期的滑动窗口，
+  布林带用滑动窗口的 Welford 均值/方差
+- 状态可以 to_dict / from_dict，IndicatorStateCache 把它检查点到 MongoDB，
+  重启后只需补齐检查点之后的K线
+
+结果与 TechnicalAnalyzer.analyze_stock 对同一组K线的计算一致，预热不足时返回同样的默认值。
+"""
+
+import copy
+import logging
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# 检查点格式版本，字段变化时递增，旧检查点会被丢弃并重新预热
+STATE_VERSION = 1
+
+
+class EMAState:
+    """指数移动平均，以第一个值为初值"""
+
+    def __init__(self, period: int):
+        self.alpha = 2.0 / (period + 1)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class RSIState:
+    """Wilder RSI：前 period 个涨跌取均值，之后按 1/period 递推"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.count = 0  # 已累计的涨跌个数
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close: float):
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            self.count += 1
+            if self.count <= self.period:
+                # 预热期先累加，满 period 个时变为均值
+                self.avg_gain += gain
+                self.avg_loss += loss
+                if self.count == self.period:
+                    self.avg_gain /= self.period
+                    self.avg_loss /= self.period
+            else:
+                self.avg_gain += (gain - self.avg_gain) / self.period
+                self.avg_loss += (loss - self.avg_loss) / self.period
+        self.prev_close = close
+
+    def current(self) -> float:
+        if self.count < self.period:
+            return 50.0
+        if self.avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class MACDState:
+    """MACD：快慢 EMA 之差及其信号线"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.warmup = slow_period + signal_period
+        self.count = 0
+        self.fast = EMAState(fast_period)
+        self.slow = EMAState(slow_period)
+        self.signal = EMAState(signal_period)
+
+    def update(self, close: float):
+        self.count += 1
+        self.signal.update(self.fast.update(close) - self.slow.update(close))
+
+    def current(self) -> Dict[str, float]:
+        if self.count < self.warmup:
+            return {"macd": 0.0, "signal": 0.0, "histogram": 0.0}
+        macd = self.fast.value - self.slow.value
+        return {"macd": macd, "signal": self.signal.value, "histogram": macd - self.signal.value}
+
+
+class KDJState:
+    """KDJ：最近 period 根K线的最高/最低价窗口，K、D 以 50 为初值按 1/3 递推"""
+
+    def __init__(self, period: int = 9):
+        self.period = period
+        self.highs: deque = deque(maxlen=period)
+        self.lows: deque = deque(maxlen=period)
+        self.k = 50.0
+        self.d = 50.0
+
+    def update(self, close: float, high: float, low: float):
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.period:
+            return
+        highest, lowest = max(self.highs), min(self.lows)
+        rsv = 50.0 if highest == lowest else (close - lowest) / (highest - lowest) * 100
+        self.k += (rsv - self.k) / 3
+        self.d += (self.k - self.d) / 3
+
+    def current(self) -> Dict[str, float]:
+        return {"k": self.k, "d": self.d, "j": 3 * self.k - 2 * self.d}
+
+
+class BollingerState:
+    """布林带：滑动窗口的 Welford 均值和平方差和"""
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        self.period = period
+        self.num_std = num_std
+        self.window: deque = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, close: float):
+        if len(self.window) < self.period:
+            self.window.append(close)
+            delta = close - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (close - self.mean)
+        else:
+            oldest = self.window[0]
+            self.window.append(close)
+            old_mean = self.mean
+            self.mean += (close - oldest) / self.period
+            self.m2 += (close - oldest) * (close - self.mean + oldest - old_mean)
+
+    def current(self) -> Dict[str, float]:
+        if len(self.window) < self.period:
+            return {"upper": 0.0, "middle": 0.0, "lower": 0.0}
+        std = math.sqrt(max(self.m2, 0.0) / self.period)
+        return {
+            "upper": self.mean + self.num_std * std,
+            "middle": self.mean,
+            "lower": self.mean - self.num_std * std,
+        }
+
+
+class IndicatorState:
+    """单只股票的增量指标状态"""
+
+    def __init__(self, code: str = None):
+        self.code = code
+        self.last_date: Optional[str] = None  # 最后一根已收盘K线的日期
+        self.rsi = RSIState()
+        self.macd = MACDState()
+        self.kdj = KDJState()
+        self.bollinger = BollingerState()
+
+    def update(self, close: float, high: float = None, low: float = None, date: str = None):
+        """
+        追加一根已收盘的K线
+
+        参数:
+            close: 收盘价
+            high: 最高价，默认收盘价
+            low: 最低价，默认收盘价
+            date: K线日期 YYYY-MM-DD
+        """
+        high = close if high is None else high
+        low = close if low is None else low
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.kdj.update(close, high, low)
+        self.bollinger.update(close)
+        if date:
+            self.last_date = date
+
+    def update_frame(self, klines, before: str = None) -> int:
+        """
+        追加 last_date 之后的K线
+
+        参数:
+            klines: 按日期升序的 KLineFrame（date/close/high/low 列）
+            before: 只追加早于该日期的K线（当天未收盘的K线不入状态）
+
+        返回:
+            追加的K线数
+        """
+        if klines is None or not len(klines):
+            return 0
+        dates = klines.column("date")
+        closes, highs, lows = (klines.column(name) for name in ("close", "high", "low"))
+        added = 0
+        for date, close, high, low in zip(dates, closes, highs, lows):
+            if (self.last_date and date <= self.last_date) or (before and date >= before):
+                continue
+            self.update(float(close), float(high), float(low), date)
+            added += 1
+        return added
+
+    def current(self) -> Dict[str, Any]:
+        """已收盘K线的指标，格式同 TechnicalAnalyzer.analyze_stock"""
+        return {
+            "rsi": self.rsi.current(),
+            "macd": self.macd.current(),
+            "kdj": self.kdj.current(),
+            "bollinger": self.bollinger.current(),
+        }
+
+    def snapshot(self, close: float = None, high: float = None, low: float = None) -> Dict[str, Any]:
+        """
+        计算加上当天未收盘K线后的指标，不改变状态
+
+        参数:
+            close: 最新价，None 时只返回已收盘K线的指标
+            high: 当天最高价
+            low: 当天最低价
+        """
+        if close is None:
+            return self.current()
+        preview = copy.deepcopy(self)
+        preview.update(close, high, low)
+        return preview.current()
+
+    def recent_closes(self) -> List[float]:
+        """最近的收盘价（布林带窗口）"""
+        return list(self.bollinger.window)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可写入 MongoDB 的字典"""
+        return {
+            "version": STATE_VERSION,
+            "code": self.code,
+            "last_date": self.last_date,
+            "rsi": {
+                "prev_close": self.rsi.prev_close,
+                "count": self.rsi.count,
+                "avg_gain": self.rsi.avg_gain,
+                "avg_loss": self.rsi.avg_loss,
+            },
+            "macd": {
+                "count": self.macd.count,
+                "fast": self.macd.fast.value,
+                "slow": self.macd.slow.value,
+                "signal": self.macd.signal.value,
+            },
+            "kdj": {
+                "highs": list(self.kdj.highs),
+                "lows": list(self.kdj.lows),
+                "k": self.kdj.k,
+                "d": self.kdj.d,
+            },
+            "bollinger": {
+                "window": list(self.bollinger.window),
+                "mean": self.bollinger.mean,
+                "m2": self.bollinger.m2,
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["IndicatorState"]:
+        """从 to_dict 的结果恢复，版本不符或字段缺失时返回 None"""
+        if not data or data.get("version") != STATE_VERSION:
+            return None
+        try:
+            state = cls(data.get("code"))
+            state.last_date = data.get("last_date")
+
+            rsi = data["rsi"]
+            state.rsi.prev_close = rsi["prev_close"]
+            state.rsi.count = rsi["count"]
+            state.rsi.avg_gain = rsi["avg_gain"]
+            state.rsi.avg_loss = rsi["avg_loss"]
+
+            macd = data["macd"]
+            state.macd.count = macd["count"]
+            state.macd.fast.value = macd["fast"]
+            state.macd.slow.value = macd["slow"]
+            state.macd.signal.value = macd["signal"]
+
+            kdj = data["kdj"]
+            state.kdj.highs.extend(kdj["highs"])
+            state.kdj.lows.extend(kdj["lows"])
+            state.kdj.k = kdj["k"]
+            state.kdj.d = kdj["d"]
+
+            bollinger = data["bollinger"]
+            state.bollinger.window.extend(bollinger["window"])
+            state.bollinger.mean = bollinger["mean"]
+            state.bollinger.m2 = bollinger["m2"]
+        except (KeyError, TypeError) as e:
+            logger.warning(f"指标状态检查点无效 {data.get('code')}: {e}")
+            return None
+        return state
+
+
+class IndicatorStateCache:
+    """
+    盯盘进程内的指标状态
+
+    每只股票每天只取一次K线：首次用检查点或预热窗口建立状态，之后只补检查点之后已收盘的K线，
+    补齐后写回检查点。其余行情周期直接在内存状态上计算。
+    """
+
+    def __init__(
+        self,
+        storage=None,
+        fetch_klines: Callable[[str, str, str], Any] = None,
+        warmup_days: int = None,
+        today: Callable[[], str] = None,
+    ):
+        """
+        参数:
+            storage: MongoStorage（需要 get_indicator_states / save_indicator_states），None 时不做检查点
+            fetch_klines: (code, start_date, end_date) -> 按日期升序的 KLineFrame
+            warmup_days: 没有检查点时预热的自然日数，默认读取配置
+            today: 返回当天日期的函数，便于测试
+        """
+        if warmup_days is None:
+            from app.core.config import settings
+            warmup_days = settings.monitor_indicator_warmup_days
+
+        self.storage = storage
+        self.fetch_klines = fetch_klines
+        self.warmup_days = warmup_days
+        self._today = today or (lambda: datetime.now().strftime(DATE_FORMAT))
+        self._states: Dict[str, IndicatorState] = {}
+        self._synced: Dict[str, str] = {}  # 每只股票最近一次补齐K线的日期
+
+    def get(self, code: str) -> IndicatorState:
+        """获取股票的指标状态，当天第一次调用时补齐已收盘的K线"""
+        today = self._today()
+        state = self._states.get(code)
+        if state is not None and self._synced.get(code) == today:
+            return state
+
+        if state is None:
+            state = self._load(code) or IndicatorState(code)
+            self._states[code] = state
+
+        if state.last_date:
+            start_date = (datetime.strptime(state.last_date, DATE_FORMAT) + timedelta(days=1)).strftime(DATE_FORMAT)
+        else:
+            start_date = (datetime.strptime(today, DATE_FORMAT) - timedelta(days=self.warmup_days)).strftime(DATE_FORMAT)
+
+        if start_date < today and self.fetch_klines is not None:
+            try:
+                klines = self.fetch_klines(code, start_date, today)
+            except Exception as e:
+                logger.warning(f"补齐指标状态K线失败 {code}: {e}")
+                return state
+            if state.update_frame(klines, before=today):
+                self._save(state)
+        # 没有任何K线时下个周期再试
+        if state.last_date:
+            self._synced[code] = today
+        return state
+
+    def _load(self, code: str) -> Optional[IndicatorState]:
+        if self.storage is None:
+            return None
+        try:
+            return IndicatorState.from_dict(self.storage.get_indicator_states([code]).get(code))
+        except Exception as e:
+            logger.warning(f"读取指标状态检查点失败 {code}: {e}")
+            return None
+
+    def _save(self, state: IndicatorState):
+        if self.storage is None:
+            return
+        try:
+            self.storage.save_indicator_states({state.code: state.to_dict()})
+        except Exception as e:
+            logger.warning(f"保存指标状态检查点失败 {state.code}: {e}")
@@ -1,12 +1,34 @@
-import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from app.indicators import IndicatorCache, kernels
+
+MACD_KEYS = ("macd", "signal", "histogram")
+KDJ_KEYS = ("k", "d", "j")
+BOLLINGER_KEYS = ("upper", "middle", "lower")
+
+# analyze_series 的字段 -> 指标缓存的序列名
+CACHE_COLUMNS = {
+    "macd": ("macd", "macd_signal", "macd_hist"),
+    "kdj": ("k", "d", "j"),
+    "bollinger": ("boll_upper", "boll_middle", "boll_lower"),
+}
+
+
+def _last(values: np.ndarray, default: float) -> float:
+    value = values[-1] if len(values) else np.nan
+    return default if np.isnan(value) else float(value)
+
 
 class TechnicalAnalyzer:
-    """技术指标分析器"""
+    """技术指标分析器，指标由 app.indicators.kernels 整段计算"""
     
-    def __init__(self):
-        pass
+    def __init__(self, cache: IndicatorCache = None):
+        """
+        参数:
+            cache: 日线指标序列缓存，lookup / lookup_series 使用，参数需与本类的默认周期一致
+        """
+        self.cache = cache
     
     def calculate_rsi(self, prices: List[float], period: int = 14) -> float:
         """
@@ -22,35 +44,7 @@ class TechnicalAnalyzer:
         if len(prices) < period + 1:
             return 50.0
         
-        deltas = np.diff(prices)
-        gains = deltas[deltas > 0]
-        losses = -deltas[deltas < 0]
-        
-        avg_gain = np.mean(gains[:period]) if len(gains) > 0 else 0
-        avg_loss = np.mean(losses[:period]) if len(losses) > 0 else 0
-        
-        if avg_loss == 0:
-            return 100.0
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        # 计算后续值
-        for i in range(period, len(deltas)):
-            delta = deltas[i]
-            gain = delta if delta > 0 else 0
-            loss = -delta if delta < 0 else 0
-            
-            avg_gain = (avg_gain * (period - 1) + gain) / period
-            avg_loss = (avg_loss * (period - 1) + loss) / period
-            
-            if avg_loss == 0:
-                return 100.0
-            
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
+        return _last(kernels.rsi_wilder(prices, period), 50.0)
     
     def calculate_macd(self, prices: List[float], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, float]:
         """
@@ -72,35 +66,8 @@ class TechnicalAnalyzer:
                 "histogram": 0.0
             }
         
-        # 计算EMA
-        def ema(values, period):
-            result = []
-            multiplier = 2 / (period + 1)
-            # 初始化第一个EMA为第一个价格
-            result.append(values[0])
-            # 计算后续EMA
-            for i in range(1, len(values)):
-                current_ema = values[i] * multiplier + result[i-1] * (1 - multiplier)
-                result.append(current_ema)
-            return result
-        
-        ema_fast = ema(prices, fast_period)
-        ema_slow = ema(prices, slow_period)
-        
-        # 计算MACD线
-        macd_line = [fast - slow for fast, slow in zip(ema_fast, ema_slow)]
-        
-        # 计算信号线
-        signal_line = ema(macd_line, signal_period)
-        
-        # 计算柱状图
-        histogram = [macd - signal for macd, signal in zip(macd_line, signal_line)]
-        
-        return {
-            "macd": macd_line[-1],
-            "signal": signal_line[-1],
-            "histogram": histogram[-1]
-        }
+        series = kernels.macd(prices, fast_period, slow_period, signal_period)
+        return {key: _last(values, 0.0) for key, values in zip(MACD_KEYS, series)}
     
     def calculate_kdj(self, prices: List[float], high_prices: List[float], low_prices: List[float], period: int = 9) -> Dict[str, float]:
         """
@@ -122,44 +89,8 @@ class TechnicalAnalyzer:
                 "j": 50.0
             }
         
-        # 计算RSV
-        rsv_list = []
-        for i in range(period - 1, len(prices)):
-            recent_high = max(high_prices[i - period + 1:i + 1])
-            recent_low = min(low_prices[i - period + 1:i + 1])
-            close = prices[i]
-            
-            if recent_high == recent_low:
-                rsv = 50.0
-            else:
-                rsv = (close - recent_low) / (recent_high - recent_low) * 100
-            
-            rsv_list.append(rsv)
-        
-        # 计算K值和D值
-        k_list = []
-        d_list = []
-        
-        # 初始化K和D
-        k = 50.0
-        d = 50.0
-        k_list.append(k)
-        d_list.append(d)
-        
-        for rsv in rsv_list:
-            k = (2/3) * k + (1/3) * rsv
-            d = (2/3) * d + (1/3) * k
-            k_list.append(k)
-            d_list.append(d)
-        
-        # 计算J值
-        j_list = [3 * k - 2 * d for k, d in zip(k_list, d_list)]
-        
-        return {
-            "k": k_list[-1],
-            "d": d_list[-1],
-            "j": j_list[-1]
-        }
+        series = kernels.kdj(prices, high_prices, low_prices, period)
+        return {key: _last(values, 50.0) for key, values in zip(KDJ_KEYS, series)}
     
     def calculate_bollinger_bands(self, prices: List[float], period: int = 20, num_std: float = 2.0) -> Dict[str, float]:
         """
@@ -180,22 +111,79 @@ class TechnicalAnalyzer:
                 "lower": 0.0
             }
         
-        # 计算移动平均线
-        middle_band = np.mean(prices[-period:])
-        
-        # 计算标准差
-        std_dev = np.std(prices[-period:])
+        series = kernels.bollinger(prices[-period:], period, num_std)
+        return {key: _last(values, 0.0) for key, values in zip(BOLLINGER_KEYS, series)}
+    
+    def analyze_series(self, stock_data: Dict[str, List[float]]) -> Dict[str, Any]:
+        """
+        计算完整的技术指标序列（用于画图或回测）
         
-        # 计算上下轨
-        upper_band = middle_band + (num_std * std_dev)
-        lower_band = middle_band - (num_std * std_dev)
+        参数:
+            stock_data: 股票数据，包含close、high、low等字段
+            
+        返回:
+            与 close 等长的 numpy 数组，预热期为 NaN：
+            {"rsi": array, "macd": {...}, "kdj": {...}, "bollinger": {...}}
+        """
+        close_prices = stock_data.get("close", [])
+        high_prices = stock_data.get("high", close_prices)
+        low_prices = stock_data.get("low", close_prices)
         
         return {
-            "upper": upper_band,
-            "middle": middle_band,
-            "lower": lower_band
+            "rsi": kernels.rsi_wilder(close_prices),
+            "macd": dict(zip(MACD_KEYS, kernels.macd(close_prices))),
+            "kdj": dict(zip(KDJ_KEYS, kernels.kdj(close_prices, high_prices, low_prices))),
+            "bollinger": dict(zip(BOLLINGER_KEYS, kernels.bollinger(close_prices)))
         }
     
+    def lookup_series(self, code: str, klines=None) -> Optional[Dict[str, Any]]:
+        """
+        从指标缓存获取日线指标序列，缓存之后新增的K线只计算尾部
+        
+        参数:
+            code: 股票代码
+            klines: 已有的日K线（KLineFrame / DataFrame），None 时由缓存自行获取
+            
+        返回:
+            格式同 analyze_series，另有 "dates" 和累计的K线数 "bars"；没有缓存或没有K线时返回 None
+        """
+        if self.cache is None:
+            return None
+        entry = self.cache.get(code, klines)
+        if entry is None:
+            return None
+        
+        result = {"dates": entry.dates, "bars": entry.bars, "rsi": entry.column("rsi_wilder")}
+        for name, keys in (("macd", MACD_KEYS), ("kdj", KDJ_KEYS), ("bollinger", BOLLINGER_KEYS)):
+            result[name] = {key: entry.column(column) for key, column in zip(keys, CACHE_COLUMNS[name])}
+        return result
+    
+    def lookup(self, code: str, klines=None) -> Optional[Dict[str, Any]]:
+        """
+        从指标缓存获取最新一根日K线的技术指标
+        
+        参数:
+            code: 股票代码
+            klines: 已有的日K线，None 时由缓存自行获取
+            
+        返回:
+            格式同 analyze_stock（预热不足时为同样的默认值）；没有缓存或没有K线时返回 None
+        """
+        series = self.lookup_series(code, klines)
+        if series is None:
+            return None
+        
+        defaults = {"macd": 0.0, "kdj": 50.0, "bollinger": 0.0}
+        result = {"rsi": _last(series["rsi"], 50.0)}
+        for name, default in defaults.items():
+            result[name] = {key: _last(values, default) for key, values in series[name].items()}
+        
+        # 与 calculate_macd 一致，K线不足 slow_period + signal_period 时取默认值
+        _, slow_period, signal_period = self.cache.params["macd"]
+        if series["bars"] < slow_period + signal_period:
+            result["macd"] = {key: 0.0 for key in MACD_KEYS}
+        return result
+    
     def analyze_stock(self, stock_data: Dict[str, List[float]]) -> Dict[str, Any]:
         """
         分析股票技术指标
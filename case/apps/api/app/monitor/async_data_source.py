@@ -0,0 +1,255 @@
+"""异步行情数据源 - 新浪 / 东方财富批量实时行情
+
+同步的 SinaDataSource 每次调用新建请求、MultiDataSourceManager 逐个数据源串行尝试。
+这里的数据源基于 httpx.AsyncClient：
+- 每个数据源一个长连接客户端，连接池复用 TCP/TLS 连接
+- 按接口单次请求的股票数上限切分，分片并发请求，信号量限制同时在途的请求数
+- 300 只股票的自选股刷新只需 1 次新浪请求或 1 次东方财富请求
+
+返回的数据格式与 monitor.data_source 中的同步数据源一致。
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from .data_source import (
+    SINA_BATCH_SIZE,
+    SINA_HEADERS,
+    SINA_QUOTE_URL,
+    _chunks,
+    _parse_sina_quotes,
+    _sina_symbols,
+    _to_symbol,
+    get_data_source_manager,
+)
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    logging.warning("httpx library not available, async data sources will not work")
+
+logger = logging.getLogger(__name__)
+
+# 东方财富 ulist 接口单次最多的股票数
+EASTMONEY_BATCH_SIZE = 500
+EASTMONEY_QUOTE_URL = "https://push2.eastmoney.com/api/qt/ulist.np/get"
+# f2 最新价 f3 涨跌幅 f4 涨跌额 f5 成交量(手) f6 成交额 f12 代码 f13 市场 f14 名称
+# f15 最高 f16 最低 f17 今开 f18 昨收
+EASTMONEY_FIELDS = "f2,f3,f4,f5,f6,f12,f13,f14,f15,f16,f17,f18"
+
+
+def _to_secid(stock_code: str) -> Optional[str]:
+    """600000 / sh600000 -> 1.600000，sz000001 -> 0.000001"""
+    symbol = _to_symbol(stock_code)
+    if not symbol:
+        return None
+    return f"{1 if symbol.startswith('sh') else 0}.{symbol[2:]}"
+
+
+def _number(value, default=0):
+    """东方财富停牌等无数据时返回 "-" """
+    return default if value in (None, "-", "") else value
+
+
+class AsyncDataSourceBase:
+    """异步批量行情数据源基类"""
+
+    batch_size = 100
+    headers: Dict[str, str] = {}
+
+    def __init__(self, name: str, concurrency: int = None, timeout: float = None, transport=None):
+        """
+        Args:
+            name: 数据源名称
+            concurrency: 同时在途的请求数，默认读取配置
+            timeout: 单次请求超时（秒），默认读取配置
+            transport: httpx 传输层（测试时传入 httpx.MockTransport）
+        """
+        from app.core.config import settings
+
+        self.name = name
+        self.concurrency = concurrency or settings.data_source_http_concurrency
+        self.timeout = timeout or settings.data_source_http_timeout
+        self.transport = transport
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self):
+        if self._client is None:
+            if not HTTPX_AVAILABLE:
+                return None
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取实时行情，按 batch_size 分片并发请求，失败的分片跳过"""
+        client = self._get_client()
+        if client is None or not stock_codes:
+            return {}
+
+        async def fetch(chunk: List[str]) -> Dict[str, Dict[str, Any]]:
+            async with self._semaphore:
+                try:
+                    return await self._fetch_chunk(client, chunk)
+                except Exception as e:
+                    logger.warning(f"{self.name} 批量获取 {len(chunk)} 只股票失败: {e}")
+                    return {}
+
+        result: Dict[str, Dict[str, Any]] = {}
+        chunks = _chunks(list(dict.fromkeys(stock_codes)), self.batch_size)
+        for data in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            result.update(data)
+        return result
+
+    async def get_stock_data(self, stock_code: str) -> Optional[Dict[str, Any]]:
+        return (await self.get_stock_data_batch([stock_code])).get(stock_code)
+
+    async def _fetch_chunk(self, client, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """一次请求获取一个分片"""
+        raise NotImplementedError
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+
+class AsyncSinaDataSource(AsyncDataSourceBase):
+    """新浪实时行情 - list=sh600000,sz000001"""
+
+    batch_size = SINA_BATCH_SIZE
+    headers = SINA_HEADERS
+
+    def __init__(self, **kwargs):
+        super().__init__("sina", **kwargs)
+
+    async def _fetch_chunk(self, client, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        symbols = _sina_symbols(stock_codes)
+        if not symbols:
+            return {}
+        response = await client.get(SINA_QUOTE_URL + ",".join(symbols))
+        response.raise_for_status()
+        return _parse_sina_quotes(response.text, symbols)
+
+
+class AsyncEastmoneyDataSource(AsyncDataSourceBase):
+    """东方财富实时行情 - ulist.np 接口，secids=1.600000,0.000001"""
+
+    batch_size = EASTMONEY_BATCH_SIZE
+    headers = {
+        "User-Agent": SINA_HEADERS["User-Agent"],
+        "Referer": "https://quote.eastmoney.com",
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__("eastmoney", **kwargs)
+
+    @staticmethod
+    def _row_to_data(stock_code: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "code": stock_code,
+            "name": row.get("f14", ""),
+            "current_price": float(_number(row.get("f2"))),
+            "open_price": float(_number(row.get("f17"))),
+            "close_price": float(_number(row.get("f18"))),
+            "high_price": float(_number(row.get("f15"))),
+            "low_price": float(_number(row.get("f16"))),
+            # 成交量单位为手，统一为股
+            "volume": int(float(_number(row.get("f5"))) * 100),
+            "amount": float(_number(row.get("f6"))),
+        }
+
+    async def _fetch_chunk(self, client, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        secids: Dict[str, List[str]] = {}
+        for stock_code in stock_codes:
+            secid = _to_secid(stock_code)
+            if secid:
+                secids.setdefault(secid, []).append(stock_code)
+        if not secids:
+            return {}
+        response = await client.get(EASTMONEY_QUOTE_URL, params={
+            "fltt": 2,
+            "invt": 2,
+            "fields": EASTMONEY_FIELDS,
+            "secids": ",".join(secids),
+        })
+        response.raise_for_status()
+        rows = ((response.json() or {}).get("data") or {}).get("diff") or []
+
+        result = {}
+        for row in rows:
+            secid = f"{row.get('f13')}.{row.get('f12')}"
+            if _number(row.get("f2"), None) is None:
+                continue
+            for stock_code in secids.get(secid, ()):
+                result[stock_code] = self._row_to_data(stock_code, row)
+        return result
+
+
+class AsyncMultiDataSourceManager:
+    """异步多数据源管理器：按优先级批量获取，缺失的代码交给下一个数据源"""
+
+    def __init__(self, sources: List[AsyncDataSourceBase] = None, fallback=None):
+        """
+        Args:
+            sources: 异步数据源，默认东方财富、新浪
+            fallback: 异步数据源都未取到时使用的同步管理器（在线程中执行），
+                      默认 get_data_source_manager()，传 False 关闭
+        """
+        self.sources = sources if sources is not None else [AsyncEastmoneyDataSource(), AsyncSinaDataSource()]
+        self._fallback = fallback
+
+    async def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        result: Dict[str, Dict[str, Any]] = {}
+        remaining = list(dict.fromkeys(stock_codes))
+        for source in self.sources:
+            if not remaining:
+                break
+            data = await source.get_stock_data_batch(remaining)
+            if data:
+                logger.info(f"从 {source.name} 获取 {len(data)}/{len(remaining)} 只股票数据")
+                result.update(data)
+                remaining = [code for code in remaining if code not in result]
+
+        if remaining and self._fallback is not False:
+            fallback = self._fallback or get_data_source_manager()
+            result.update(await asyncio.to_thread(fallback.get_stock_data_batch, remaining))
+        return result
+
+    async def get_stock_data(self, stock_code: str) -> Optional[Dict[str, Any]]:
+        return (await self.get_stock_data_batch([stock_code])).get(stock_code)
+
+    async def aclose(self):
+        for source in self.sources:
+            await source.aclose()
+
+
+# 全局实例
+_async_data_source_manager: Optional[AsyncMultiDataSourceManager] = None
+
+
+def get_async_data_source_manager() -> AsyncMultiDataSourceManager:
+    """获取异步多数据源管理器实例（在事件循环中使用）"""
+    global _async_data_source_manager
+    if _async_data_source_manager is None:
+        _async_data_source_manager = AsyncMultiDataSourceManager()
+    return _async_data_source_manager
+
+
+async def close_async_data_source_manager():
+    """关闭异步数据源的连接池（应用关闭时调用）"""
+    global _async_data_source_manager
+    if _async_data_source_manager is not None:
+        await _async_data_source_manager.aclose()
+        _async_data_source_manager = None
@@ -4,6 +4,8 @@ import numpy as np
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from app.indicators import kernels
+
 logger = logging.getLogger(__name__)
 
 class BacktestEngine:
@@ -98,8 +100,8 @@ class BacktestEngine:
         """移动平均线策略回测"""
         try:
             # 计算移动平均线
-            df['ma_fast'] = df['close'].rolling(window=fast_period).mean()
-            df['ma_slow'] = df['close'].rolling(window=slow_period).mean()
+            df['ma_fast'] = kernels.rolling_mean(df['close'], fast_period)
+            df['ma_slow'] = kernels.rolling_mean(df['close'], slow_period)
             
             # 生成信号
             df['signal'] = 0
@@ -201,13 +203,8 @@ class BacktestEngine:
             return self._get_empty_result()
     
     def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """计算RSI指标"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        """计算RSI指标（涨跌幅简单移动平均）"""
+        return pd.Series(kernels.rsi_sma(prices, period), index=prices.index)
     
     def _calculate_sharpe_ratio(self, df: pd.DataFrame, risk_free_rate: float = 0.02) -> float:
         """计算夏普比率"""
@@ -2,6 +2,7 @@ from typing import Dict, Any, List
 from datetime import datetime
 from app.core.config import settings
 from app.storage.mongo_client import MongoStorage
+from app.storage.query_cache import get_query_cache
 import json
 import os
 import logging
@@ -99,7 +100,7 @@ class MonitorConfig:
                 "password": settings.mongodb_password
             }
             
-            mongo = MongoStorage(**mongo_config)
+            mongo = MongoStorage(**mongo_config, cache=get_query_cache())
             mongo.connect()
             
             # 只获取今天的新闻分析股票
@@ -19,6 +19,64 @@ class DataSourceBase:
     def get_stock_history(self, stock_code: str, days: int = 30) -> Optional[Dict[str, List[float]]]:
         """获取股票历史数据"""
         raise NotImplementedError
+    
+    def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取股票实时数据，默认逐个获取，支持批量的数据源应覆盖为单次请求"""
+        result = {}
+        for stock_code in stock_codes:
+            data = self.get_stock_data(stock_code)
+            if data:
+                result[stock_code] = data
+        return result
+
+
+def _to_symbol(stock_code: str) -> Optional[str]:
+    """600000 -> sh600000，已带 sh/sz 前缀的原样返回"""
+    if stock_code.startswith("sh") or stock_code.startswith("sz"):
+        return stock_code
+    if len(stock_code) == 6:
+        return f"sz{stock_code}" if stock_code.startswith(("0", "3")) else f"sh{stock_code}"
+    return None
+
+
+# 新浪 list= 参数单次最多的股票数（URL 长度限制）
+SINA_BATCH_SIZE = 800
+SINA_QUOTE_URL = "https://hq.sinajs.cn/list="
+# 新浪行情接口需要 Referer，否则返回 403
+SINA_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Referer": "https://finance.sina.com.cn",
+}
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _sina_symbols(stock_codes: List[str]) -> Dict[str, List[str]]:
+    """{sh600000: [调用方代码, ...]}，同一只股票可能以不同写法出现"""
+    symbols: Dict[str, List[str]] = {}
+    for stock_code in stock_codes:
+        symbol = _to_symbol(stock_code)
+        if symbol:
+            symbols.setdefault(symbol, []).append(stock_code)
+    return symbols
+
+
+def _parse_sina_quotes(text: str, symbols: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+    """解析新浪行情响应，每行一只股票: var hq_str_sh600000="浦发银行,10.00,...";"""
+    result = {}
+    for line in text.splitlines():
+        if "var hq_str_" not in line or "=" not in line:
+            continue
+        name, data_str = line.split("=", 1)
+        symbol = name.rsplit("hq_str_", 1)[-1].strip()
+        fields = data_str.strip().strip('";').split(",")
+        if symbol not in symbols or len(fields) < 10:
+            continue
+        for stock_code in symbols[symbol]:
+            result[stock_code] = SinaDataSource._fields_to_data(stock_code, fields)
+    return result
 
 
 class AkshareDataSource(DataSourceBase):
@@ -39,49 +97,49 @@ class AkshareDataSource(DataSourceBase):
                 return None
         return self._client
     
+    @staticmethod
+    def _row_to_data(stock_code: str, row) -> Dict[str, Any]:
+        return {
+            "code": stock_code,
+            "name": row.get("名称", ""),
+            "current_price": float(row.get("最新价", 0)),
+            "high_price": float(row.get("最高", 0)),
+            "low_price": float(row.get("最低", 0)),
+            "open_price": float(row.get("今开", 0)),
+            "close_price": float(row.get("昨收", 0)),
+            "change": float(row.get("涨跌额", 0)),
+            "change_pct": float(row.get("涨跌幅", 0)),
+            "volume": int(row.get("成交量", 0)),
+            "amount": float(row.get("成交额", 0))
+        }
+    
     def get_stock_data(self, stock_code: str) -> Optional[Dict[str, Any]]:
         """获取股票实时数据"""
+        return self.get_stock_data_batch([stock_code]).get(stock_code)
+    
+    def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取股票实时数据 - 从共享的全市场行情快照读取，附带快照时间和是否过期"""
         try:
-            client = self._get_client()
-            if not client:
-                return None
-            
-            # 转换股票代码格式
-            if stock_code.startswith("sh") or stock_code.startswith("sz"):
-                symbol = stock_code
-            elif len(stock_code) == 6:
-                if stock_code.startswith(("0", "3")):
-                    symbol = f"sz{stock_code}"
-                else:
-                    symbol = f"sh{stock_code}"
-            else:
-                return None
+            from app.data_source.spot_snapshot import get_spot_snapshot
             
-            # 获取实时行情
-            df = client.stock_zh_a_spot_em()
+            # 行情表的代码列为6位数字
+            wanted = {}
+            for stock_code in stock_codes:
+                if _to_symbol(stock_code):
+                    wanted.setdefault(stock_code[-6:], []).append(stock_code)
+            if not wanted:
+                return {}
             
-            # 过滤指定股票
-            stock_row = df[df["代码"] == stock_code]
-            if stock_row.empty:
-                return None
+            rows, meta = get_spot_snapshot().lookup(wanted)
             
-            row = stock_row.iloc[0]
-            return {
-                "code": stock_code,
-                "name": row.get("名称", ""),
-                "current_price": float(row.get("最新价", 0)),
-                "high_price": float(row.get("最高", 0)),
-                "low_price": float(row.get("最低", 0)),
-                "open_price": float(row.get("今开", 0)),
-                "close_price": float(row.get("昨收", 0)),
-                "change": float(row.get("涨跌额", 0)),
-                "change_pct": float(row.get("涨跌幅", 0)),
-                "volume": int(row.get("成交量", 0)),
-                "amount": float(row.get("成交额", 0))
-            }
+            result = {}
+            for code, row in rows.items():
+                for stock_code in wanted[code]:
+                    result[stock_code] = {**self._row_to_data(stock_code, row), **meta}
+            return result
         except Exception as e:
-            logger.warning(f"Akshare东方财富获取股票数据失败 {stock_code}: {e}")
-            return None
+            logger.warning(f"Akshare东方财富获取股票数据失败 {stock_codes}: {e}")
+            return {}
     
     def get_stock_history(self, stock_code: str, days: int = 30) -> Optional[Dict[str, List[float]]]:
         """获取股票历史K线数据"""
@@ -139,69 +197,52 @@ class SinaDataSource(DataSourceBase):
             try:
                 import requests
                 self._session = requests.Session()
-                self._session.headers.update({
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                })
+                self._session.headers.update(SINA_HEADERS)
                 logger.info("新浪数据源初始化成功")
             except ImportError as e:
                 logger.error(f"requests库导入失败: {e}")
                 return None
         return self._session
     
+    @staticmethod
+    def _fields_to_data(stock_code: str, fields: List[str]) -> Dict[str, Any]:
+        return {
+            "code": stock_code,
+            "name": fields[0],
+            # 字段顺序: 名称,今开,昨收,最新价,最高,最低,买一,卖一,成交量,成交额
+            "current_price": float(fields[3]) if fields[3] else 0,
+            "open_price": float(fields[1]) if fields[1] else 0,
+            "close_price": float(fields[2]) if fields[2] else 0,
+            "high_price": float(fields[4]) if fields[4] else 0,
+            "low_price": float(fields[5]) if fields[5] else 0,
+            "volume": int(float(fields[8])) if fields[8] else 0,
+            "amount": float(fields[9]) if fields[9] else 0
+        }
+    
     def get_stock_data(self, stock_code: str) -> Optional[Dict[str, Any]]:
         """获取股票实时数据"""
+        return self.get_stock_data_batch([stock_code]).get(stock_code)
+    
+    def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取股票实时数据 - 每 SINA_BATCH_SIZE 只一次 list=sh600000,sz000001 请求"""
         try:
             session = self._get_session()
             if not session:
-                return None
+                return {}
             
             # 转换股票代码格式
-            if stock_code.startswith("sh"):
-                symbol = stock_code
-            elif stock_code.startswith("sz"):
-                symbol = stock_code
-            elif len(stock_code) == 6:
-                if stock_code.startswith(("0", "3")):
-                    symbol = f"sz{stock_code}"
-                else:
-                    symbol = f"sh{stock_code}"
-            else:
-                return None
-            
-            # 新浪API
-            url = f"https://hq.sinajs.cn/list={symbol}"
-            response = session.get(url, timeout=10)
-            
-            if response.status_code != 200:
-                return None
+            symbols = _sina_symbols(stock_codes)
             
-            content = response.text
-            if not content or "var hq_str" not in content:
-                return None
-            
-            # 解析数据
-            data_str = content.split("=")[1].strip('";\n')
-            if not data_str:
-                return None
-            
-            fields = data_str.split(",")
-            if len(fields) < 10:
-                return None
-            
-            return {
-                "code": stock_code,
-                "name": fields[0],
-                "current_price": float(fields[1]) if fields[1] else 0,
-                "open_price": float(fields[2]) if fields[2] else 0,
-                "close_price": float(fields[3]) if fields[3] else 0,
-                "high_price": float(fields[4]) if fields[4] else 0,
-                "low_price": float(fields[5]) if fields[5] else 0,
-                "volume": int(float(fields[8])) if fields[8] else 0,
-                "amount": float(fields[9]) if fields[9] else 0
-            }
+            result = {}
+            for chunk in _chunks(list(symbols), SINA_BATCH_SIZE):
+                response = session.get(SINA_QUOTE_URL + ",".join(chunk), timeout=10)
+                if response.status_code != 200:
+                    continue
+                result.update(_parse_sina_quotes(response.text, symbols))
+            return result
         except Exception as e:
-            logger.warning(f"新浪获取股票数据失败 {stock_code}: {e}")
-            return None
+            logger.warning(f"新浪获取股票数据失败 {stock_codes}: {e}")
+            return {}
     
     def get_stock_history(self, stock_code: str, days: int = 30) -> Optional[Dict[str, List[float]]]:
         """获取股票历史数据 - 新浪不支持历史K线，尝试其他方式"""
@@ -249,6 +290,7 @@ class MongoDBDataSource(DataSourceBase):
         """从MongoDB获取最新行情数据"""
         try:
             from app.storage.mongo_client import MongoStorage
+            from app.storage.query_cache import get_query_cache
             from app.core.config import settings
             
             mongo = MongoStorage(
@@ -256,7 +298,8 @@ class MongoDBDataSource(DataSourceBase):
                 port=settings.mongodb_port,
                 db_name=settings.mongodb_dbname,
                 username=settings.mongodb_username,
-                password=settings.mongodb_password
+                password=settings.mongodb_password,
+                cache=get_query_cache()
             )
             mongo.connect()
             
@@ -289,6 +332,7 @@ class MongoDBDataSource(DataSourceBase):
         """从MongoDB获取历史K线数据"""
         try:
             from app.storage.mongo_client import MongoStorage
+            from app.storage.query_cache import get_query_cache
             from app.core.config import settings
             from datetime import timedelta
             
@@ -297,7 +341,8 @@ class MongoDBDataSource(DataSourceBase):
                 port=settings.mongodb_port,
                 db_name=settings.mongodb_dbname,
                 username=settings.mongodb_username,
-                password=settings.mongodb_password
+                password=settings.mongodb_password,
+                cache=get_query_cache()
             )
             mongo.connect()
             
@@ -357,6 +402,27 @@ class MultiDataSourceManager:
         logger.error(f"所有数据源都无法获取股票数据: {stock_code}")
         return None
     
+    def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取股票数据，每个数据源一次请求，缺失的代码交给下一个数据源"""
+        result = {}
+        remaining = list(dict.fromkeys(stock_codes))
+        for source in self.sources:
+            if not remaining:
+                break
+            try:
+                data = source.get_stock_data_batch(remaining)
+            except Exception as e:
+                logger.warning(f"数据源 {source.name} 批量获取失败: {e}")
+                continue
+            if data:
+                logger.info(f"从 {source.name} 获取 {len(data)}/{len(remaining)} 只股票数据")
+                result.update(data)
+                remaining = [code for code in remaining if code not in result]
+        
+        if remaining:
+            logger.error(f"所有数据源都无法获取股票数据: {remaining}")
+        return result
+    
     def get_stock_history(self, stock_code: str, days: int = 30) -> Optional[Dict[str, List[float]]]:
         """获取股票历史数据，尝试多个数据源"""
         for source in self.sources:
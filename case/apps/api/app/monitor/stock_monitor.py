@@ -1,18 +1,19 @@
 import logging
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
 
 from .config import MonitorConfig
 from .analysis.technical import TechnicalAnalyzer
 from .analysis.signal import SignalGenerator
+from .analysis.streaming import IndicatorStateCache
 from .models import StockData, TechnicalData, Signal, MonitorResult, MonitorNotification
 from .brain.analyzer import BrainAnalyzer
 from .brain.unhook import UnhookEngine
 from .brain.backtest import BacktestEngine
 from app.data_source import DataSourceManager
+from app.indicators import IndicatorCache
 from .data_source import get_data_source_manager, MultiDataSourceManager
 from ..notify import DingTalkNotifier
-from ..storage import MongoStorage
+from ..storage import MongoStorage, get_query_cache
 from ..collector import AkshareClient
 
 logger = logging.getLogger(__name__)
@@ -23,7 +24,6 @@ class StockMonitor:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.monitor_config = MonitorConfig()
-        self.technical_analyzer = TechnicalAnalyzer()
         self.signal_generator = SignalGenerator()
         # Brain System
         self.brain_analyzer = BrainAnalyzer()
@@ -37,6 +37,12 @@ class StockMonitor:
         self.storage = None
         
         self._ensure_clients()
+        # 每只股票的增量指标状态，已收盘K线每天只补一次并检查点到MongoDB
+        self.indicator_states = IndicatorStateCache(self.storage, self._fetch_klines)
+        # 日线指标序列缓存（与选股、收盘简报共用 indicator_cache 集合），没有盘中行情时使用
+        from app.core.config import settings
+        indicator_cache = IndicatorCache(self.storage, self._fetch_klines) if settings.indicator_cache_enabled else None
+        self.technical_analyzer = TechnicalAnalyzer(indicator_cache)
     
     def _ensure_clients(self):
         """确保所有客户端已初始化"""
@@ -62,7 +68,8 @@ class StockMonitor:
                 db_config.get("port", 27017),
                 db_config.get("name", "after_market"),
                 db_config.get("username"),
-                db_config.get("password")
+                db_config.get("password"),
+                cache=get_query_cache()
             )
             self.storage.connect()
     
@@ -84,64 +91,56 @@ class StockMonitor:
                 logger.warning(f"Failed to get stock data for {stock_code}")
                 return None
             
-            return StockData(
-                code=stock_code,
-                name=realtime_data.get("name", stock_code),
-                current_price=realtime_data.get("close", 0.0),
-                high_price=realtime_data.get("high", 0.0),
-                low_price=realtime_data.get("low", 0.0),
-                open_price=realtime_data.get("open", 0.0),
-                close_price=realtime_data.get("close", 0.0),
-                change=realtime_data.get("change", 0.0),
-                change_pct=realtime_data.get("change_pct", 0.0),
-                volume=realtime_data.get("volume", 0),
-                amount=realtime_data.get("amount", 0.0)
-            )
+            return self._to_stock_data(stock_code, realtime_data)
         except Exception as e:
             logger.error(f"Error getting stock data for {stock_code}: {e}")
             return None
     
-    def get_stock_history_data(self, stock_code: str, days: int = 30) -> Dict[str, List[float]]:
+    def get_stock_data_batch(self, stock_codes: List[str]) -> Dict[str, StockData]:
         """
-        获取股票历史数据 - 使用统一数据源接口
+        批量获取股票数据 - 每个数据源一次请求取回整个股票池
         
         参数:
-            stock_code: 股票代码
-            days: 历史天数
+            stock_codes: 股票代码列表
             
         返回:
-            历史数据
+            {股票代码: 股票数据}，未取到的代码不出现在结果中
         """
         try:
-            # 使用统一数据源接口获取历史K线数据
-            end_date = datetime.now().strftime("%Y-%m-%d")
-            start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-            
-            klines = self.data_manager.get_kline(
-                code=stock_code,
-                start_date=start_date,
-                end_date=end_date
-            )
-            
-            if not klines:
-                logger.warning(f"Failed to get history data for {stock_code}")
-                return {}
-            
-            return {
-                "close": [k.close for k in klines],
-                "high": [k.high for k in klines],
-                "low": [k.low for k in klines]
-            }
+            realtime = self.data_manager.get_realtime_batch(stock_codes)
         except Exception as e:
-            logger.error(f"Error getting history data for {stock_code}: {e}")
+            logger.error(f"Error getting batch stock data: {e}")
             return {}
+        return {code: self._to_stock_data(code, data) for code, data in realtime.items() if data}
+    
+    @staticmethod
+    def _to_stock_data(stock_code: str, realtime_data: Dict[str, Any]) -> StockData:
+        return StockData(
+            code=stock_code,
+            name=realtime_data.get("name", stock_code),
+            current_price=realtime_data.get("close", 0.0),
+            high_price=realtime_data.get("high", 0.0),
+            low_price=realtime_data.get("low", 0.0),
+            open_price=realtime_data.get("open", 0.0),
+            close_price=realtime_data.get("close", 0.0),
+            change=realtime_data.get("change", 0.0),
+            change_pct=realtime_data.get("change_pct", 0.0),
+            volume=realtime_data.get("volume", 0),
+            amount=realtime_data.get("amount", 0.0)
+        )
+    
+    def _fetch_klines(self, stock_code: str, start_date: str, end_date: str):
+        return self.data_manager.get_kline(code=stock_code, start_date=start_date, end_date=end_date)
     
-    def analyze_stock(self, stock_config: Dict[str, Any]) -> Optional[MonitorResult]:
+    def analyze_stock(
+        self, stock_config: Dict[str, Any], stock_data: Optional[StockData] = None
+    ) -> Optional[MonitorResult]:
         """
         分析股票 - 集成Brain系统
         
         参数:
             stock_config: 股票配置
+            stock_data: 已批量获取的实时数据，None 时单独获取
             
         返回:
             监控结果
@@ -152,15 +151,23 @@ class StockMonitor:
             return None
         
         # 获取股票数据
-        stock_data = self.get_stock_data(stock_code)
+        if stock_data is None:
+            stock_data = self.get_stock_data(stock_code)
         if not stock_data:
             return None
         
-        # 获取历史数据
-        history_data = self.get_stock_history_data(stock_code)
-        
-        # 分析技术指标
-        technical_result = self.technical_analyzer.analyze_stock(history_data)
+        # 分析技术指标：已收盘K线的增量状态 + 当天行情作为未收盘的K线
+        indicator_state = self.indicator_states.get(stock_code)
+        current_price = stock_data.current_price
+        if current_price > 0:
+            technical_result = indicator_state.snapshot(
+                current_price,
+                max(stock_data.high_price, current_price),
+                min(stock_data.low_price or current_price, current_price)
+            )
+        else:
+            # 没有盘中行情时取最新一根日K线的指标，缓存未启用时用增量状态
+            technical_result = self.technical_analyzer.lookup(stock_code) or indicator_state.snapshot()
         
         # === Brain系统分析 ===
         try:
@@ -170,7 +177,7 @@ class StockMonitor:
                 "macd": technical_result.get("macd", {}),
                 "kdj": technical_result.get("kdj", {}),
                 "bollinger": technical_result.get("bollinger", {}),
-                "close": history_data.get("close", [])
+                "close": indicator_state.recent_closes() + ([current_price] if current_price > 0 else [])
             }
             
             # Brain分析
@@ -442,9 +449,13 @@ class StockMonitor:
         results = []
         stocks = self.monitor_config.get_stocks()
         
+        # 一次取回整个股票池的实时行情，未取到的再单独获取
+        codes = [stock_config.get("code") for stock_config in stocks if stock_config.get("code")]
+        prefetched = self.get_stock_data_batch(codes) if codes else {}
+        
         for stock_config in stocks:
             logger.info(f"Monitoring stock: {stock_config.get('name', stock_config.get('code'))}")
-            result = self.analyze_stock(stock_config)
+            result = self.analyze_stock(stock_config, prefetched.get(stock_config.get("code")))
             if result:
                 results.append(result)
                 
@@ -4,7 +4,7 @@ import logging
 import time
 
 from ..collector import NewsClient, LLMClient, AkshareClient
-from ..storage import MongoStorage
+from ..storage import MongoStorage, get_query_cache
 from ..notify import DingTalkNotifier
 
 logger = logging.getLogger(__name__)
@@ -48,7 +48,8 @@ class AfterMarketJob:
                 db_config.get("port", 27017),
                 db_config.get("name", "after_market"),
                 db_config.get("username"),
-                db_config.get("password")
+                db_config.get("password"),
+                cache=get_query_cache()
             )
             self.storage.connect()
         
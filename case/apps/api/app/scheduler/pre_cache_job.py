@@ -3,7 +3,7 @@ from typing import Dict, Any, List, Optional
 import logging
 
 from ..collector import NewsClient, LLMClient, AkshareClient
-from ..storage import MongoStorage
+from ..storage import MongoStorage, get_query_cache
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +48,8 @@ class PreCacheJob:
                 db_config.get("port", 27017),
                 db_config.get("name", "after_market"),
                 db_config.get("username"),
-                db_config.get("password")
+                db_config.get("password"),
+                cache=get_query_cache()
             )
             self.storage.connect()
 
@@ -1,4 +1,8 @@
-from .mongo_client import MongoStorage
+from .mongo_client import MongoStorage, get_default_storage
+from .async_mongo_client import AsyncMongoStorage, get_default_async_storage
+from .client_registry import MongoClientRegistry, client_registry, get_mongo_client
+from .query_cache import QueryCache, LRUCacheBackend, get_query_cache
+from .market_snapshot import MarketSnapshotStore
 from .models import (
     AfterMarketData,
     MarketOverview,
@@ -11,6 +15,16 @@ from .models import (
 
 __all__ = [
     "MongoStorage",
+    "get_default_storage",
+    "AsyncMongoStorage",
+    "get_default_async_storage",
+    "MongoClientRegistry",
+    "client_registry",
+    "get_mongo_client",
+    "QueryCache",
+    "LRUCacheBackend",
+    "get_query_cache",
+    "MarketSnapshotStore",
     "AfterMarketData",
     "MarketOverview",
     "StockData",
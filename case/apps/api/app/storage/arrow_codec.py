@@ -0,0 +1,184 @@
+"""
+K线数据 Arrow / Parquet 编码
+
+按批次将游标中的文档转为列数组，再编码为 Arrow IPC 流或 Parquet，
+不经过逐行 JSON/CSV 序列化，客户端可直接零拷贝读取为带类型的列。
+"""
+
+import logging
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .mongo_client import KLINE_FIELDS, _cursor_to_columns
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.warning("pyarrow library not available, Arrow/Parquet export will not work")
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# 每个 RecordBatch / Parquet row group 的行数
+ARROW_BATCH_SIZE = 50000
+
+# 数值型K线字段，其余字段一律按字符串编码
+_KLINE_NUMERIC_FIELDS = frozenset(
+    ("open", "close", "high", "low", "volume", "amount", "amplitude", "pct_chg", "turnover")
+)
+
+
+def kline_schema(fields: Optional[List[str]] = None):
+    """
+    构建K线 Arrow schema
+
+    参数:
+        fields: 字段列表，默认 KLINE_FIELDS
+
+    返回:
+        pyarrow.Schema（数值字段为 float64，其余为 string）
+    """
+    fields = fields or KLINE_FIELDS
+    return pa.schema([
+        (field, pa.float64() if field in _KLINE_NUMERIC_FIELDS else pa.string())
+        for field in fields
+    ])
+
+
+def _to_arrow_array(values: list, arrow_type):
+    if pa.types.is_string(arrow_type):
+        values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def columns_to_record_batch(columns: Dict[str, list], schema=None):
+    """
+    将列式数据转换为 RecordBatch
+
+    参数:
+        columns: {字段: 列数组}
+        schema: 目标 schema，默认按字段名由 kline_schema 生成
+
+    返回:
+        pyarrow.RecordBatch
+    """
+    schema = schema or kline_schema(list(columns))
+    arrays = [_to_arrow_array(columns[field.name], field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(
+    rows: Iterable[Dict],
+    fields: Optional[List[str]] = None,
+    batch_size: int = ARROW_BATCH_SIZE,
+) -> Iterator["pa.RecordBatch"]:
+    """
+    将文档迭代器按批转换为 RecordBatch
+
+    参数:
+        rows: 文档迭代器（如 MongoStorage.iter_klines）
+        fields: 字段列表，默认 KLINE_FIELDS
+        batch_size: 每批行数
+
+    返回:
+        RecordBatch 迭代器
+    """
+    fields = fields or KLINE_FIELDS
+    schema = kline_schema(fields)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        yield columns_to_record_batch(_cursor_to_columns(chunk, fields), schema)
+
+
+class _ChunkSink:
+    """只追加的写入目标，写入器每写完一批后取走已编码的字节"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_arrow_stream(
+    rows: Iterable[Dict],
+    fields: Optional[List[str]] = None,
+    batch_size: int = ARROW_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """
+    将文档迭代器编码为 Arrow IPC 流，每个 RecordBatch 编码后立即输出
+
+    返回:
+        字节块迭代器
+    """
+    fields = fields or KLINE_FIELDS
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, kline_schema(fields)) as writer:
+        for batch in iter_record_batches(rows, fields, batch_size):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(
+    rows: Iterable[Dict],
+    fields: Optional[List[str]] = None,
+    batch_size: int = ARROW_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """
+    将文档迭代器编码为 Parquet 文件，每批写一个 row group 后立即输出
+
+    返回:
+        字节块迭代器（最后一块包含文件尾）
+    """
+    fields = fields or KLINE_FIELDS
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, kline_schema(fields), compression="zstd") as writer:
+        for batch in iter_record_batches(rows, fields, batch_size):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def columns_to_arrow_stream(columns: Dict[str, list]) -> bytes:
+    """
+    将列式数据（如 get_klines_bulk(as_frame=False) 的结果）编码为 Arrow IPC 流
+
+    参数:
+        columns: {字段: 列数组}
+
+    返回:
+        Arrow IPC 流字节
+    """
+    batch = columns_to_record_batch(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,746 @@
+"""
+异步 MongoDB 存储
+
+AsyncMongoStorage 与 MongoStorage 提供相同的读写方法，但全部是协程，
+基于 pymongo 原生的 AsyncMongoClient，供 async def 的 FastAPI 端点使用：
+慢聚合、全市场查询在事件循环上等待 I/O，不再占用 Starlette 线程池，
+并发的看板请求不会排在导出或全市场查询后面。
+
+查询条件、排序键、分页游标和返回格式与 MongoStorage 完全一致，
+K线/资金流向读缓存与同步存储共用同一个 QueryCache。
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pandas as pd
+from pymongo.errors import PyMongoError
+
+from .client_registry import client_registry
+from .query_cache import (
+    QueryCache,
+    cached_query,
+    get_query_cache,
+    KLINE_NAMESPACE,
+    CAPITAL_FLOW_NAMESPACE,
+    INVALIDATION_COLLECTION,
+)
+from .market_snapshot import MARKET_SNAPSHOT_COLLECTION, MarketSnapshotStore
+from .mongo_client import (
+    KLINE_FIELDS,
+    KLINE_UNIQUE_INDEX,
+    BULK_BATCH_SIZE,
+    KLINE_PAGE_SORT_BY_CODE,
+    KLINE_PAGE_SORT_BY_DATE,
+    KLINE_PAGE_SORT_ALL,
+    encode_page_cursor,
+    decode_page_cursor,
+    _seek_query,
+    _date_range_query,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _stringify(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """与 MongoStorage 一致：_id 转字符串，crawl_time 转 ISO 格式"""
+    if "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    if doc.get("crawl_time"):
+        doc["crawl_time"] = doc["crawl_time"].isoformat()
+    return doc
+
+
+async def _cursor_to_columns(cursor, fields: Optional[List[str]] = None) -> Dict[str, list]:
+    """
+    将异步游标直接解码为列数组（与 mongo_client._cursor_to_columns 相同的列规则）
+
+    参数:
+        cursor: AsyncCursor
+        fields: 固定字段列表；为 None 时按文档中出现的字段动态建列
+    """
+    if fields:
+        columns = {field: [] for field in fields}
+        appenders = [(field, columns[field].append) for field in fields]
+        async for doc in cursor:
+            get = doc.get
+            for field, append in appenders:
+                append(get(field))
+        return columns
+
+    columns: Dict[str, list] = {}
+    row_count = 0
+    async for doc in cursor:
+        for field, value in doc.items():
+            column = columns.get(field)
+            if column is None:
+                column = columns[field] = [None] * row_count
+            column.append(value)
+        row_count += 1
+        for column in columns.values():
+            if len(column) < row_count:
+                column.append(None)
+    return columns
+
+
+class AsyncMongoStorage:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        db_name: str,
+        username: str = None,
+        password: str = None,
+        cache: Optional[QueryCache] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.db_name = db_name
+        self.username = username
+        self.password = password
+        self.client = None
+        self.db = None
+        self.collection = None
+        self.kline_collection = None
+        self.capital_flow_collection = None
+        self.news_stocks_collection = None
+        self.monitor_stocks_collection = None
+        self.market_snapshot_collection = None
+        self.cache = cache
+        self._kline_unique_index = None
+
+    def connect(self):
+        """
+        从共享注册表获取异步客户端（不发起网络请求）
+
+        缓存失效事件的拉取和市场快照重建仍走同步驱动（在线程中执行），
+        因此同时绑定一份同步客户端的集合
+        """
+        try:
+            self.client = client_registry.get_async_client(
+                self.host, self.port, self.username, self.password
+            )
+            self.db = self.client[self.db_name]
+            self.collection = self.db["after_market"]
+            self.kline_collection = self.db["stock_kline"]
+            self.capital_flow_collection = self.db["capital_flow"]
+            self.news_stocks_collection = self.db["news_stocks"]
+            self.monitor_stocks_collection = self.db["monitor_stocks"]
+            self.market_snapshot_collection = self.db[MARKET_SNAPSHOT_COLLECTION]
+            if self.cache is not None:
+                sync_db = client_registry.get_client(
+                    self.host, self.port, self.username, self.password, ping=False
+                )[self.db_name]
+                self.cache.attach_invalidation_log(sync_db[INVALIDATION_COLLECTION])
+            logger.debug(f"MongoDB async storage ready: {self.host}:{self.port}/{self.db_name}")
+        except PyMongoError as e:
+            logger.error(f"MongoDB connection failed: {e}")
+            raise
+
+    def close(self):
+        """释放对共享客户端的引用，真正的关闭由 client_registry.aclose_all() 负责"""
+        if self.client:
+            self.client = None
+            self.db = None
+            self.collection = None
+            self.kline_collection = None
+            self.capital_flow_collection = None
+            self.news_stocks_collection = None
+            self.monitor_stocks_collection = None
+            self.market_snapshot_collection = None
+            logger.debug("MongoDB async connection released")
+
+    # ---------------------------------------------------------------- after_market
+
+    async def save(self, data: Any) -> Optional[str]:
+        if self.collection is None:
+            self.connect()
+        save_data = {"created_at": datetime.now(), "data": data}
+
+        try:
+            result = await self.collection.update_one(
+                {"date": save_data.get("created_at")}, {"$set": save_data}, upsert=True
+            )
+            if result.upserted_id:
+                return str(result.upserted_id)
+            return str(result.modified_count)
+        except PyMongoError as e:
+            logger.error(f"MongoDB save failed: {e}")
+            raise
+
+    async def load(self, date_str: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        根据日期字符串加载数据
+
+        参数:
+            date_str: 日期字符串，格式为 YYYY-MM-DD
+
+        返回:
+            数据字典，如果未找到返回None
+        """
+        if self.collection is None:
+            self.connect()
+
+        try:
+            if not date_str:
+                start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            else:
+                start_date = datetime.strptime(date_str, "%Y-%m-%d")
+            end_date = start_date + timedelta(days=1)
+
+            doc = await self.collection.find_one(
+                {"created_at": {"$gte": start_date, "$lt": end_date}},
+                sort=[("created_at", -1)],
+            )
+            return doc.get("data") if doc else None
+        except PyMongoError as e:
+            logger.error(f"MongoDB load failed: {e}")
+            raise
+
+    async def get_by_date(self, date: str) -> Optional[Dict]:
+        if self.collection is None:
+            self.connect()
+
+        try:
+            return await self.collection.find_one({"date": date})
+        except PyMongoError as e:
+            logger.error(f"MongoDB query failed: {e}")
+            raise
+
+    async def get_all(self, limit: int = 50) -> List[Dict]:
+        if self.collection is None:
+            self.connect()
+
+        try:
+            cursor = self.collection.find().sort("date", -1).limit(limit)
+            results = []
+            async for doc in cursor:
+                doc["_id"] = str(doc["_id"])
+                if doc.get("created_at"):
+                    doc["created_at"] = doc["created_at"].isoformat()
+                results.append(doc)
+            return results
+        except PyMongoError as e:
+            logger.error(f"MongoDB query failed: {e}")
+            raise
+
+    async def delete(self, date: str) -> int:
+        if self.collection is None:
+            self.connect()
+
+        try:
+            result = await self.collection.delete_one({"date": date})
+            return result.deleted_count
+        except PyMongoError as e:
+            logger.error(f"MongoDB delete failed: {e}")
+            raise
+
+    # ---------------------------------------------------------------- stock_kline
+
+    async def _find_klines(self, query: Dict[str, Any], sort, limit: int = None) -> List[Dict]:
+        cursor = self.kline_collection.find(query).sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [_stringify(doc) async for doc in cursor]
+
+    @cached_query(KLINE_NAMESPACE, ["name"])
+    async def get_kline_by_name(
+        self, name: str, start_date: str = None, end_date: str = None, limit: int = 100
+    ) -> List[Dict]:
+        """根据股票名称获取K线数据"""
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            query = {"name": name}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+            return await self._find_klines(query, [("date", -1)], limit)
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline by name query failed: {e}")
+            raise
+
+    @cached_query(KLINE_NAMESPACE, ["code"])
+    async def get_kline(
+        self, code: str, start_date: str = None, end_date: str = None, limit: int = 100
+    ) -> List[Dict]:
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            query = {"code": code}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+            return await self._find_klines(query, [("date", -1)], limit)
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline query failed: {e}")
+            raise
+
+    async def get_kline_by_date(self, code: str, date: str) -> Optional[Dict]:
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            doc = await self.kline_collection.find_one({"code": code, "date": date})
+            return _stringify(doc) if doc else doc
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline query failed: {e}")
+            raise
+
+    async def has_kline_unique_index(self) -> bool:
+        """stock_kline 上是否已有 (code, date) 唯一索引（结果按实例缓存）"""
+        if self._kline_unique_index is None:
+            if self.kline_collection is None:
+                self.connect()
+            try:
+                indexes = await self.kline_collection.index_information()
+            except PyMongoError as e:
+                logger.error(f"MongoDB index query failed: {e}")
+                return False
+            self._kline_unique_index = any(
+                spec.get("unique") and list(spec.get("key", [])) == KLINE_UNIQUE_INDEX
+                for spec in indexes.values()
+            )
+        return self._kline_unique_index
+
+    @cached_query(KLINE_NAMESPACE, ["date"])
+    async def get_all_kline_by_date(
+        self, date: str, limit: int = 5000, deduplicate: bool = True
+    ) -> List[Dict]:
+        """
+        获取某一天所有股票的K线
+
+        与 MongoStorage 相同：唯一索引存在时直接走索引查询，缺失时按 crawl_time 聚合去重
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            if deduplicate and not await self.has_kline_unique_index():
+                pipeline = [
+                    {"$match": {"date": date}},
+                    {"$sort": {"crawl_time": -1}},
+                    {"$group": {"_id": "$code", "doc": {"$first": "$$ROOT"}}},
+                    {"$replaceRoot": {"newRoot": "$doc"}},
+                    {"$limit": limit},
+                ]
+                cursor = await self.kline_collection.aggregate(pipeline, allowDiskUse=True)
+                return [_stringify(doc) async for doc in cursor]
+            return await self._find_klines({"date": date}, [("code", 1)], limit)
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline query failed: {e}")
+            raise
+
+    async def get_all_klines(
+        self, start_date: str = None, end_date: str = None, limit: int = None
+    ) -> List[Dict]:
+        """获取所有股票的 K 线数据"""
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            query = {}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+            return await self._find_klines(query, [("date", -1)], limit)
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline query failed: {e}")
+            raise
+
+    async def _get_kline_page(
+        self,
+        query: Dict[str, Any],
+        sort_keys: List[tuple],
+        page_size: int,
+        cursor: str = None,
+    ) -> Dict[str, Any]:
+        """
+        游标(seek)分页查询K线
+
+        返回:
+            {"data": [...], "next_cursor": str 或 None}
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        if cursor:
+            query = {"$and": [query, _seek_query(sort_keys, decode_page_cursor(cursor))]}
+
+        try:
+            docs = await self.kline_collection.find(query).sort(sort_keys).limit(page_size + 1).to_list()
+            has_next = len(docs) > page_size
+            docs = docs[:page_size]
+            next_cursor = encode_page_cursor(docs[-1]) if has_next else None
+            return {"data": [_stringify(doc) for doc in docs], "next_cursor": next_cursor}
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline page query failed: {e}")
+            raise
+
+    async def get_kline_page(
+        self,
+        code: str,
+        start_date: str = None,
+        end_date: str = None,
+        page_size: int = 100,
+        cursor: str = None,
+    ) -> Dict[str, Any]:
+        """单只股票K线游标分页（按日期降序）"""
+        query = {"code": code}
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+        return await self._get_kline_page(query, KLINE_PAGE_SORT_BY_CODE, page_size, cursor)
+
+    async def get_all_kline_by_date_page(
+        self, date: str, page_size: int = 100, cursor: str = None
+    ) -> Dict[str, Any]:
+        """指定日期全部股票K线游标分页（按代码升序）"""
+        return await self._get_kline_page({"date": date}, KLINE_PAGE_SORT_BY_DATE, page_size, cursor)
+
+    async def get_all_klines_page(
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        page_size: int = 100,
+        cursor: str = None,
+    ) -> Dict[str, Any]:
+        """全部股票K线游标分页（按日期、代码降序）"""
+        query = {}
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+        return await self._get_kline_page(query, KLINE_PAGE_SORT_ALL, page_size, cursor)
+
+    async def iter_klines(
+        self,
+        code: str = None,
+        start_date: str = None,
+        end_date: str = None,
+        fields: List[str] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+    ) -> AsyncIterator[Dict]:
+        """
+        按批次从游标流式读取K线（异步迭代器）
+
+        参数:
+            code: 股票代码，None 表示全部股票
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 返回字段，默认 KLINE_FIELDS
+            batch_size: 游标每批文档数
+
+        返回:
+            K线文档异步迭代器（不含 _id）
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        query = {}
+        if code:
+            query["code"] = code
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+
+        projection = {field: 1 for field in (fields or KLINE_FIELDS)}
+        projection["_id"] = 0
+        sort_keys = KLINE_PAGE_SORT_BY_CODE if code else KLINE_PAGE_SORT_ALL
+
+        cursor = (
+            self.kline_collection.find(query, projection)
+            .sort(sort_keys)
+            .batch_size(batch_size)
+        )
+        try:
+            async for doc in cursor:
+                yield _stringify(doc)
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline stream failed: {e}")
+            raise
+        finally:
+            await cursor.close()
+
+    async def get_klines_bulk(
+        self,
+        codes: List[str],
+        start_date: str = None,
+        end_date: str = None,
+        fields: List[str] = None,
+        as_frame: bool = True,
+        batch_size: int = BULK_BATCH_SIZE,
+    ):
+        """
+        批量获取多只股票的K线数据（单次 $in 查询）
+
+        参数与返回同 MongoStorage.get_klines_bulk
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        fields = list(fields or KLINE_FIELDS)
+        if not codes:
+            columns = {field: [] for field in fields}
+            return pd.DataFrame(columns) if as_frame else columns
+
+        try:
+            query = {"code": {"$in": list(codes)}}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+
+            projection = {field: 1 for field in fields}
+            projection["_id"] = 0
+
+            cursor = (
+                self.kline_collection.find(query, projection)
+                .sort([("code", 1), ("date", 1)])
+                .batch_size(batch_size)
+            )
+            columns = await _cursor_to_columns(cursor, fields)
+            logger.info(f"批量获取K线数据: {len(codes)} 只股票, {len(columns[fields[0]])} 条记录")
+            return pd.DataFrame(columns) if as_frame else columns
+        except PyMongoError as e:
+            logger.error(f"MongoDB bulk kline query failed: {e}")
+            raise
+
+    async def get_latest_kline_date(self) -> Optional[str]:
+        """获取K线集合中最新的交易日"""
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            doc = await self.kline_collection.find_one({}, {"date": 1, "_id": 0}, sort=[("date", -1)])
+            return doc.get("date") if doc else None
+        except PyMongoError as e:
+            logger.error(f"MongoDB latest kline date query failed: {e}")
+            raise
+
+    async def get_market_snapshot(self, date: str = None) -> Optional[Dict[str, Any]]:
+        """
+        获取某日市场快照
+
+        快照新鲜时只异步读取一条文档；缺失或 dirty 时，
+        在线程中用 MarketSnapshotStore 执行聚合重建
+
+        参数:
+            date: 交易日 (YYYY-MM-DD)，默认最新交易日
+
+        返回:
+            快照字典，没有数据时返回 None
+        """
+        if self.market_snapshot_collection is None:
+            self.connect()
+
+        date = date or await self.get_latest_kline_date()
+        if not date:
+            return None
+
+        try:
+            doc = await self.market_snapshot_collection.find_one({"_id": date})
+        except PyMongoError as e:
+            logger.error(f"读取市场快照失败 {date}: {e}")
+            raise
+
+        if doc is None or doc.get("dirty"):
+            sync_db = client_registry.get_client(
+                self.host, self.port, self.username, self.password, ping=False
+            )[self.db_name]
+            store = MarketSnapshotStore(sync_db[MARKET_SNAPSHOT_COLLECTION], sync_db["stock_kline"])
+            doc = await asyncio.to_thread(store.refresh, date)
+            if doc is None:
+                return None
+
+        return {k: v for k, v in doc.items() if k not in ("_id", "dirty", "writes")}
+
+    # ---------------------------------------------------------------- capital_flow
+
+    @cached_query(CAPITAL_FLOW_NAMESPACE, ["name"])
+    async def get_capital_flow(
+        self, name: str, start_date: str = None, end_date: str = None, limit: int = 10
+    ) -> List[Dict]:
+        """获取资金流向数据"""
+        if self.capital_flow_collection is None:
+            self.connect()
+
+        try:
+            query = {"name": name}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+
+            cursor = self.capital_flow_collection.find(query).sort("date", -1).limit(limit)
+            return [_stringify(doc) async for doc in cursor]
+        except PyMongoError as e:
+            logger.error(f"MongoDB capital flow query failed: {e}")
+            raise
+
+    async def get_capital_flow_bulk(
+        self,
+        names: List[str],
+        start_date: str = None,
+        end_date: str = None,
+        fields: List[str] = None,
+        as_frame: bool = True,
+        batch_size: int = BULK_BATCH_SIZE,
+    ):
+        """
+        批量获取多只股票的资金流向数据（单次 $in 查询）
+
+        参数与返回同 MongoStorage.get_capital_flow_bulk
+        """
+        if self.capital_flow_collection is None:
+            self.connect()
+
+        if not names:
+            columns = {field: [] for field in (fields or [])}
+            return pd.DataFrame(columns) if as_frame else columns
+
+        try:
+            query = {"name": {"$in": list(names)}}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+
+            if fields:
+                projection = {field: 1 for field in fields}
+                projection["_id"] = 0
+            else:
+                projection = {"_id": 0, "crawl_time": 0}
+
+            cursor = (
+                self.capital_flow_collection.find(query, projection)
+                .sort([("name", 1), ("date", -1)])
+                .batch_size(batch_size)
+            )
+            columns = await _cursor_to_columns(cursor, fields)
+            logger.info(f"批量获取资金流向数据: {len(names)} 只股票")
+            return pd.DataFrame(columns) if as_frame else columns
+        except PyMongoError as e:
+            logger.error(f"MongoDB bulk capital flow query failed: {e}")
+            raise
+
+    # ---------------------------------------------------------------- news_stocks / monitor_stocks
+
+    async def save_news_stocks(self, stocks: List[Dict]) -> Optional[str]:
+        """保存新闻分析后的股票（覆盖当天记录）"""
+        if self.news_stocks_collection is None:
+            self.connect()
+
+        try:
+            today = datetime.now().strftime("%Y-%m-%d")
+            await self.news_stocks_collection.delete_many({"date": today})
+            result = await self.news_stocks_collection.insert_one(
+                {"date": today, "created_at": datetime.now(), "stocks": stocks}
+            )
+            logger.info(f"保存新闻分析股票成功，共 {len(stocks)} 只股票")
+            return str(result.inserted_id)
+        except PyMongoError as e:
+            logger.error(f"保存新闻分析股票失败: {e}")
+            raise
+
+    async def get_news_stocks(self, date: str = None) -> List[Dict]:
+        """获取新闻分析后的股票，date 默认今天"""
+        if self.news_stocks_collection is None:
+            self.connect()
+
+        try:
+            doc = await self.news_stocks_collection.find_one(
+                {"date": date or datetime.now().strftime("%Y-%m-%d")}
+            )
+            return doc.get("stocks", []) if doc else []
+        except PyMongoError as e:
+            logger.error(f"获取新闻分析股票失败: {e}")
+            raise
+
+    async def save_monitor_stocks(self, stocks: List[Dict]) -> Optional[str]:
+        """保存监控股票池（覆盖全部记录）"""
+        if self.monitor_stocks_collection is None:
+            self.connect()
+
+        try:
+            await self.monitor_stocks_collection.delete_many({})
+            result = await self.monitor_stocks_collection.insert_one({
+                "date": datetime.now().strftime("%Y-%m-%d"),
+                "created_at": datetime.now(),
+                "stocks": stocks,
+            })
+            logger.info(f"保存监控股票池成功，共 {len(stocks)} 只股票")
+            return str(result.inserted_id)
+        except PyMongoError as e:
+            logger.error(f"保存监控股票池失败: {e}")
+            raise
+
+    async def get_monitor_stocks(self) -> List[Dict]:
+        """获取监控股票池"""
+        if self.monitor_stocks_collection is None:
+            self.connect()
+
+        try:
+            doc = await self.monitor_stocks_collection.find_one(sort=[("created_at", -1)])
+            return doc.get("stocks", []) if doc else []
+        except PyMongoError as e:
+            logger.error(f"获取监控股票池失败: {e}")
+            raise
+
+    async def remove_monitor_stock(self, stock_code: str) -> int:
+        """从监控股票池中移除股票，返回移除数量"""
+        if self.monitor_stocks_collection is None:
+            self.connect()
+
+        try:
+            doc = await self.monitor_stocks_collection.find_one(sort=[("created_at", -1)])
+            if not doc:
+                return 0
+
+            stocks = doc.get("stocks", [])
+            filtered_stocks = [stock for stock in stocks if stock.get("code") != stock_code]
+            if len(filtered_stocks) == len(stocks):
+                return 0
+
+            await self.monitor_stocks_collection.delete_many({})
+            await self.monitor_stocks_collection.insert_one({
+                "date": datetime.now().strftime("%Y-%m-%d"),
+                "created_at": datetime.now(),
+                "stocks": filtered_stocks,
+            })
+            logger.info(f"从监控股票池移除股票: {stock_code}")
+            return 1
+        except PyMongoError as e:
+            logger.error(f"移除监控股票失败: {e}")
+            raise
+
+
+_default_async_storage: Optional[AsyncMongoStorage] = None
+_default_async_storage_lock = threading.Lock()
+
+
+def get_default_async_storage() -> AsyncMongoStorage:
+    """
+    获取按全局配置创建的进程级 AsyncMongoStorage
+
+    与 get_default_storage() 共用同一个 QueryCache，
+    异步客户端由 client_registry 管理，应用关闭时由 aclose_all() 关闭
+    """
+    global _default_async_storage
+    if _default_async_storage is None:
+        with _default_async_storage_lock:
+            if _default_async_storage is None:
+                from app.core.config import settings
+
+                storage = AsyncMongoStorage(
+                    settings.mongodb_host,
+                    settings.mongodb_port,
+                    settings.mongodb_database,
+                    settings.mongodb_username,
+                    settings.mongodb_password,
+                    cache=get_query_cache(),
+                )
+                storage.connect()
+                _default_async_storage = storage
+    return _default_async_storage
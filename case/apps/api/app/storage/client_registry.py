@@ -0,0 +1,218 @@
+"""
+MongoDB 客户端注册表
+
+进程内共享 MongoClient，按连接参数懒加载创建，
+所有 MongoStorage / MongoDB / 数据源适配器都从这里获取客户端，
+避免每次请求都重新建立 TCP 连接和认证握手。
+AsyncMongoStorage 使用的 AsyncMongoClient 按同样的参数单独缓存。
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import quote_plus
+
+from pymongo import MongoClient, AsyncMongoClient
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def _default_pool_options() -> Dict[str, Any]:
+    """从配置读取连接池参数"""
+    from app.core.config import settings
+
+    return {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+    }
+
+
+class MongoClientRegistry:
+    """进程级 MongoClient 注册表（线程安全）"""
+
+    def __init__(self, pool_options: Optional[Dict[str, Any]] = None):
+        self._pool_options = pool_options
+        self._clients: Dict[Tuple, MongoClient] = {}
+        self._labels: Dict[Tuple, str] = {}
+        self._async_clients: Dict[Tuple, AsyncMongoClient] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool_options(self) -> Dict[str, Any]:
+        if self._pool_options is None:
+            self._pool_options = _default_pool_options()
+        return self._pool_options
+
+    @staticmethod
+    def _make_key(host: str, port: int, username: str = None, password: str = None) -> Tuple:
+        return (host, int(port), username or None, password or None)
+
+    def _create_client(
+        self, host: str, port: int, username: str = None, password: str = None, client_class=None
+    ):
+        # 在调用时解析默认类，测试中 mock.patch 模块级 MongoClient 才能生效
+        client_class = client_class or MongoClient
+        options = dict(self.pool_options)
+        if username and password:
+            connection_string = f"mongodb://{quote_plus(username)}:{quote_plus(password)}@{host}:{port}"
+            return client_class(connection_string, **options)
+        return client_class(host, int(port), **options)
+
+    def get_client(
+        self,
+        host: str,
+        port: int,
+        username: str = None,
+        password: str = None,
+        ping: bool = True,
+    ) -> MongoClient:
+        """
+        获取共享客户端，首次调用时创建并 ping 一次
+
+        参数:
+            host: MongoDB 主机
+            port: MongoDB 端口
+            username: 用户名
+            password: 密码
+            ping: 首次创建时是否 ping 校验连接（模块导入时创建可设为 False，避免阻塞）
+
+        返回:
+            共享的 MongoClient
+        """
+        key = self._make_key(host, port, username, password)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                return client
+
+            client = self._create_client(host, port, username, password)
+            if ping:
+                try:
+                    client.admin.command("ping")
+                except PyMongoError as e:
+                    client.close()
+                    logger.error(f"MongoDB connection failed: {e}")
+                    raise
+
+            self._clients[key] = client
+            self._labels[key] = f"{host}:{port}"
+            logger.info(
+                f"MongoDB client created: {host}:{port} "
+                f"(maxPoolSize={self.pool_options.get('maxPoolSize')})"
+            )
+            return client
+
+    def get_async_client(
+        self,
+        host: str,
+        port: int,
+        username: str = None,
+        password: str = None,
+    ) -> AsyncMongoClient:
+        """
+        获取共享的异步客户端（pymongo 原生 asyncio 驱动）
+
+        AsyncMongoClient 在首次操作时才连接，这里不做 ping；
+        客户端绑定在首次使用它的事件循环上，应在应用的事件循环内使用
+
+        参数:
+            host: MongoDB 主机
+            port: MongoDB 端口
+            username: 用户名
+            password: 密码
+
+        返回:
+            共享的 AsyncMongoClient
+        """
+        key = self._make_key(host, port, username, password)
+        client = self._async_clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                client = self._create_client(host, port, username, password, AsyncMongoClient)
+                self._async_clients[key] = client
+                logger.info(
+                    f"MongoDB async client created: {host}:{port} "
+                    f"(maxPoolSize={self.pool_options.get('maxPoolSize')})"
+                )
+            return client
+
+    def health_check(self) -> Dict[str, Any]:
+        """
+        对所有已创建的客户端执行 ping
+
+        返回:
+            {"status": "healthy"/"unhealthy", "clients": {host:port: {...}}}
+        """
+        with self._lock:
+            items = list(self._clients.items())
+
+        clients = {}
+        healthy = True
+        for key, client in items:
+            label = self._labels.get(key, str(key[:2]))
+            start = time.perf_counter()
+            try:
+                client.admin.command("ping")
+                clients[label] = {
+                    "status": "ok",
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                }
+            except PyMongoError as e:
+                healthy = False
+                clients[label] = {"status": "error", "error": str(e)}
+
+        return {"status": "healthy" if healthy else "unhealthy", "clients": clients}
+
+    def close_all(self):
+        """关闭所有客户端（应用关闭时调用）"""
+        with self._lock:
+            items = list(self._clients.items())
+            self._clients.clear()
+            self._labels.clear()
+
+        for key, client in items:
+            try:
+                client.close()
+                logger.info(f"MongoDB client closed: {key[0]}:{key[1]}")
+            except Exception as e:
+                logger.error(f"关闭MongoDB客户端失败: {e}")
+
+    async def aclose_all(self):
+        """关闭所有客户端，包括异步客户端（在事件循环内关闭应用时调用）"""
+        with self._lock:
+            async_items = list(self._async_clients.items())
+            self._async_clients.clear()
+
+        for key, client in async_items:
+            try:
+                await client.close()
+                logger.info(f"MongoDB async client closed: {key[0]}:{key[1]}")
+            except Exception as e:
+                logger.error(f"关闭MongoDB异步客户端失败: {e}")
+
+        self.close_all()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# 全局注册表
+client_registry = MongoClientRegistry()
+
+
+def get_mongo_client(host: str, port: int, username: str = None, password: str = None) -> MongoClient:
+    """从全局注册表获取共享客户端"""
+    return client_registry.get_client(host, port, username, password)
@@ -0,0 +1,210 @@
+"""
+查询执行计划审计工具
+
+对 MongoStorage 的每种查询形态执行 explain()，标记全表扫描 (COLLSCAN)
+和内存排序 (SORT)，有问题时以非零状态退出，可在部署前的检查中运行。
+
+用法:
+    python -m app.storage.index_audit
+    python -m app.storage.index_audit --ensure-indexes --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from .mongo_client import (
+    KLINE_PAGE_SORT_BY_CODE,
+    KLINE_PAGE_SORT_BY_DATE,
+    KLINE_PAGE_SORT_ALL,
+)
+
+logger = logging.getLogger(__name__)
+
+# 需要标记的执行计划阶段
+COLLSCAN_STAGE = "COLLSCAN"
+SORT_STAGES = ("SORT", "SORT_KEY_GENERATOR")
+
+
+@dataclass
+class QueryShape:
+    """一种查询形态（与 MongoStorage 中的查询一一对应）"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+    limit: int = 0
+
+
+def _sample_values(db) -> Dict[str, Any]:
+    """从现有数据中取样本值，使 explain 的选择性接近真实查询"""
+    sample = {"code": "sh600000", "name": "浦发银行", "date": datetime.now().strftime("%Y-%m-%d")}
+    try:
+        doc = db["stock_kline"].find_one({}, {"code": 1, "name": 1, "date": 1}, sort=[("date", -1)])
+        if doc:
+            sample.update({k: doc[k] for k in ("code", "name", "date") if doc.get(k)})
+        flow = db["capital_flow"].find_one({}, {"name": 1})
+        sample["flow_name"] = flow.get("name") if flow else sample["code"]
+    except PyMongoError as e:
+        logger.warning(f"获取样本数据失败，使用默认值: {e}")
+        sample.setdefault("flow_name", sample["code"])
+    return sample
+
+
+def build_query_shapes(sample: Dict[str, Any]) -> List[QueryShape]:
+    """
+    构建 MongoStorage 的全部查询形态
+
+    参数:
+        sample: 样本值 {"code", "name", "date", "flow_name"}
+    """
+    code, name, date = sample["code"], sample["name"], sample["date"]
+    flow_name = sample.get("flow_name", code)
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return [
+        # stock_kline
+        QueryShape("get_kline", "stock_kline", {"code": code, "date": {"$gte": date}}, [("date", -1)], 100),
+        QueryShape("get_kline_by_name", "stock_kline", {"name": name}, [("date", -1)], 100),
+        QueryShape("get_kline_by_date", "stock_kline", {"code": code, "date": date}, None, 1),
+        QueryShape("get_all_kline_by_date", "stock_kline", {"date": date}, [("code", 1)], 5000),
+        QueryShape("get_all_klines", "stock_kline", {"date": {"$gte": date}}, [("date", -1)]),
+        QueryShape("get_kline_page", "stock_kline", {"code": code}, KLINE_PAGE_SORT_BY_CODE, 101),
+        QueryShape("get_all_kline_by_date_page", "stock_kline", {"date": date}, KLINE_PAGE_SORT_BY_DATE, 101),
+        QueryShape("get_all_klines_page", "stock_kline", {}, KLINE_PAGE_SORT_ALL, 101),
+        QueryShape(
+            "get_klines_bulk", "stock_kline",
+            {"code": {"$in": [code]}, "date": {"$gte": date}}, [("code", 1), ("date", 1)],
+        ),
+        # capital_flow
+        QueryShape("get_capital_flow", "capital_flow", {"name": flow_name}, [("date", -1)], 10),
+        QueryShape(
+            "get_capital_flow_bulk", "capital_flow",
+            {"name": {"$in": [flow_name]}}, [("name", 1), ("date", -1)],
+        ),
+        # after_market
+        QueryShape(
+            "load", "after_market",
+            {"created_at": {"$gte": day, "$lt": day + timedelta(days=1)}}, [("created_at", -1)], 1,
+        ),
+        QueryShape("get_by_date", "after_market", {"date": date}, None, 1),
+        QueryShape("get_all", "after_market", {}, [("date", -1)], 50),
+        # news_stocks / monitor_stocks
+        QueryShape("get_news_stocks", "news_stocks", {"date": date}, None, 1),
+        QueryShape("get_monitor_stocks", "monitor_stocks", {}, [("created_at", -1)], 1),
+    ]
+
+
+def _iter_stages(stage: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """深度优先遍历执行计划的所有阶段"""
+    if not stage:
+        return
+    yield stage
+    if "inputStage" in stage:
+        yield from _iter_stages(stage["inputStage"])
+    for child in stage.get("inputStages", []):
+        yield from _iter_stages(child)
+
+
+def analyze_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    分析 explain() 的胜出计划
+
+    返回:
+        {"plan": "LIMIT <- FETCH <- IXSCAN", "indexes": [...], "collscan": bool, "in_memory_sort": bool}
+    """
+    winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+    # 8.0+ SBE 引擎把计划放在 queryPlan 下
+    winning = winning.get("queryPlan", winning)
+
+    stages = list(_iter_stages(winning))
+    names = [s.get("stage", "?") for s in stages]
+    return {
+        "plan": " <- ".join(names),
+        "indexes": [s["indexName"] for s in stages if s.get("indexName")],
+        "collscan": COLLSCAN_STAGE in names,
+        "in_memory_sort": any(name in SORT_STAGES for name in names),
+    }
+
+
+def audit_queries(db, shapes: List[QueryShape]) -> List[Dict[str, Any]]:
+    """
+    对每种查询形态执行 explain 并标记问题
+
+    返回:
+        每个查询一项 {"query", "collection", "plan", "indexes", "collscan", "in_memory_sort", "ok"}
+    """
+    report = []
+    for shape in shapes:
+        entry = {"query": shape.name, "collection": shape.collection}
+        try:
+            cursor = db[shape.collection].find(shape.filter)
+            if shape.sort:
+                cursor = cursor.sort(shape.sort)
+            if shape.limit:
+                cursor = cursor.limit(shape.limit)
+            entry.update(analyze_plan(cursor.explain()))
+            entry["ok"] = not (entry["collscan"] or entry["in_memory_sort"])
+        except PyMongoError as e:
+            entry.update({"error": str(e), "ok": False})
+        report.append(entry)
+    return report
+
+
+def _format_report(report: List[Dict[str, Any]]) -> str:
+    lines = []
+    for entry in report:
+        if entry.get("error"):
+            status, detail = "ERROR", entry["error"]
+        else:
+            flags = []
+            if entry["collscan"]:
+                flags.append("COLLSCAN")
+            if entry["in_memory_sort"]:
+                flags.append("内存排序")
+            status = "OK" if entry["ok"] else "WARN"
+            detail = f"{entry['plan']}" + (f"  [{', '.join(flags)}]" if flags else "")
+        lines.append(f"{status:5} {entry['collection']:15} {entry['query']:28} {detail}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="审计 MongoStorage 查询的执行计划")
+    parser.add_argument("--ensure-indexes", action="store_true", help="审计前先按索引清单创建索引")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    from .mongo_client import get_default_storage
+
+    storage = get_default_storage()
+    if storage.db is None:
+        storage.connect()
+    if args.ensure_indexes:
+        storage.ensure_indexes()
+
+    report = audit_queries(storage.db, build_query_shapes(_sample_values(storage.db)))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(_format_report(report))
+
+    problems = [entry["query"] for entry in report if not entry["ok"]]
+    if problems:
+        logger.error(f"{len(problems)} 个查询存在全表扫描/内存排序: {problems}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
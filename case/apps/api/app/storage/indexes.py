@@ -0,0 +1,87 @@
+"""
+股票数据库索引清单
+
+列出 MongoStorage 各查询依赖的索引，API 启动时统一创建；
+新增查询时在这里补充索引，并用 python -m app.storage.index_audit 检查执行计划。
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from pymongo.errors import PyMongoError
+
+from .mongo_client import KLINE_UNIQUE_INDEX, KLINE_PAGE_INDEXES, KLINE_WRITEBACK_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """单个索引定义"""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    # 依赖该索引的查询，仅用于说明
+    used_by: Tuple[str, ...] = field(default=(), compare=False)
+
+    @property
+    def name(self) -> str:
+        """与 pymongo 默认规则一致的索引名"""
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+
+def _keys(spec) -> Tuple[Tuple[str, int], ...]:
+    return tuple((key, direction) for key, direction in spec)
+
+
+INDEX_MANIFEST: List[IndexSpec] = [
+    # stock_kline
+    IndexSpec("stock_kline", _keys(KLINE_UNIQUE_INDEX), unique=True,
+              used_by=("get_kline", "get_kline_by_date", "get_klines_bulk", "iter_klines")),
+    IndexSpec("stock_kline", _keys(KLINE_PAGE_INDEXES[0]),
+              used_by=("get_kline_page",)),
+    IndexSpec("stock_kline", _keys(KLINE_PAGE_INDEXES[1]),
+              used_by=("get_all_kline_by_date", "get_all_kline_by_date_page",
+                       "get_all_klines", "get_all_klines_page")),
+    IndexSpec("stock_kline", (("name", 1), ("date", -1)),
+              used_by=("get_kline_by_name",)),
+    # stock_kline_unadjusted（远程数据源写回）
+    IndexSpec(KLINE_WRITEBACK_COLLECTION, _keys(KLINE_UNIQUE_INDEX), unique=True,
+              used_by=("upsert_klines", "get_writeback_klines")),
+    # capital_flow
+    IndexSpec("capital_flow", (("name", 1), ("date", -1)),
+              used_by=("get_capital_flow", "get_capital_flow_bulk")),
+    # after_market
+    IndexSpec("after_market", (("created_at", -1),), used_by=("load",)),
+    IndexSpec("after_market", (("date", -1),), used_by=("get_by_date", "get_all", "delete", "save")),
+    # news_stocks / monitor_stocks
+    IndexSpec("news_stocks", (("date", 1),), used_by=("get_news_stocks", "save_news_stocks")),
+    IndexSpec("monitor_stocks", (("created_at", -1),), used_by=("get_monitor_stocks",)),
+]
+
+
+def apply_index_manifest(db, manifest: List[IndexSpec] = None) -> Dict[str, Any]:
+    """
+    按清单创建索引（已存在的索引 create_index 为空操作）
+
+    参数:
+        db: pymongo Database
+        manifest: 索引清单，默认 INDEX_MANIFEST
+
+    返回:
+        {"collection.index_name": "ok" 或错误信息}
+    """
+    results = {}
+    for spec in manifest or INDEX_MANIFEST:
+        label = f"{spec.collection}.{spec.name}"
+        try:
+            db[spec.collection].create_index(list(spec.keys), unique=spec.unique, background=True)
+            results[label] = "ok"
+        except PyMongoError as e:
+            logger.error(f"创建索引失败 {label}: {e}")
+            results[label] = str(e)
+
+    failed = [label for label, status in results.items() if status != "ok"]
+    logger.info(f"索引清单已应用: {len(results) - len(failed)} 成功, {len(failed)} 失败")
+    return results
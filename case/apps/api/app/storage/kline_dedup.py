@@ -0,0 +1,218 @@
+"""
+K线历史重复数据清理工具
+
+早期爬虫没有 (code, date) 唯一索引，同一只股票同一天可能存在多条记录。
+本工具对每个 (code, date) 保留 crawl_time 最新的一条、删除其余记录，
+清理完成后可直接创建唯一索引，之后 get_all_kline_by_date 只需普通索引查询。
+
+用法:
+    python -m app.storage.kline_dedup                     # 只统计重复，不修改
+    python -m app.storage.kline_dedup --apply --create-index
+    python -m app.storage.kline_dedup --benchmark 2026-03-02
+"""
+
+import argparse
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from .mongo_client import KLINE_UNIQUE_INDEX, _date_range_query
+
+logger = logging.getLogger(__name__)
+
+# 单次 delete_many 的 _id 数量
+DELETE_BATCH_SIZE = 1000
+
+
+def find_duplicate_groups(collection, start_date: str = None, end_date: str = None):
+    """
+    查找重复的 (code, date) 分组
+
+    参数:
+        collection: stock_kline 集合
+        start_date: 开始日期 (YYYY-MM-DD)，用于分段清理
+        end_date: 结束日期 (YYYY-MM-DD)
+
+    返回:
+        聚合游标，每项为 {"_id": {"code", "date"}, "keep": _id, "ids": [_id...], "count": n}
+    """
+    match = {}
+    date_query = _date_range_query(start_date, end_date)
+    if date_query:
+        match["date"] = date_query
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"code": 1, "date": 1, "crawl_time": -1}},
+        {"$group": {
+            "_id": {"code": "$code", "date": "$date"},
+            "keep": {"$first": "$_id"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    return collection.aggregate(pipeline, allowDiskUse=True)
+
+
+def dedup_klines(
+    collection,
+    apply: bool = False,
+    start_date: str = None,
+    end_date: str = None,
+    batch_size: int = DELETE_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    清理重复K线，每个 (code, date) 保留 crawl_time 最新的一条
+
+    参数:
+        collection: stock_kline 集合
+        apply: False 时只统计不删除
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        batch_size: 单次删除的文档数
+
+    返回:
+        {"groups": 重复分组数, "duplicates": 多余文档数, "deleted": 实际删除数}
+    """
+    stats = {"groups": 0, "duplicates": 0, "deleted": 0}
+    pending: List[Any] = []
+
+    def flush():
+        if apply and pending:
+            result = collection.delete_many({"_id": {"$in": pending}})
+            stats["deleted"] += result.deleted_count
+        pending.clear()
+
+    for group in find_duplicate_groups(collection, start_date, end_date):
+        keep = group["keep"]
+        extra = [_id for _id in group["ids"] if _id != keep]
+        stats["groups"] += 1
+        stats["duplicates"] += len(extra)
+        pending.extend(extra)
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+
+    logger.info(
+        f"K线去重{'完成' if apply else '统计（未修改）'}: "
+        f"重复分组 {stats['groups']}, 多余记录 {stats['duplicates']}, 已删除 {stats['deleted']}"
+    )
+    return stats
+
+
+def create_unique_index(collection) -> bool:
+    """创建 (code, date) 唯一索引，存在重复时失败返回 False"""
+    try:
+        collection.create_index(KLINE_UNIQUE_INDEX, unique=True)
+        logger.info("已创建 stock_kline (code, date) 唯一索引")
+        return True
+    except PyMongoError as e:
+        logger.error(f"创建唯一索引失败: {e}")
+        return False
+
+
+def benchmark_date_query(collection, date: str, repeat: int = 5) -> Dict[str, Any]:
+    """
+    对比按日期查询全市场K线时聚合去重与索引查询的耗时
+
+    参数:
+        collection: stock_kline 集合
+        date: 交易日 (YYYY-MM-DD)，建议选择约 5000 只股票的完整交易日
+        repeat: 每种方式执行次数，取中位数
+
+    返回:
+        {"date", "rows", "aggregate_ms", "find_ms", "speedup", "find_plan"}
+    """
+    pipeline = [
+        {"$match": {"date": date}},
+        {"$sort": {"crawl_time": -1}},
+        {"$group": {"_id": "$code", "doc": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$doc"}},
+    ]
+
+    def median_ms(run):
+        timings = []
+        rows = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = sum(1 for _ in run())
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return round(timings[len(timings) // 2], 2), rows
+
+    aggregate_ms, aggregate_rows = median_ms(
+        lambda: collection.aggregate(pipeline, allowDiskUse=True)
+    )
+    find_ms, find_rows = median_ms(lambda: collection.find({"date": date}).sort("code", 1))
+
+    plan = collection.find({"date": date}).sort("code", 1).explain()
+    winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+
+    return {
+        "date": date,
+        "rows": find_rows,
+        "aggregate_rows": aggregate_rows,
+        "aggregate_ms": aggregate_ms,
+        "find_ms": find_ms,
+        "speedup": round(aggregate_ms / find_ms, 2) if find_ms else None,
+        "find_plan": _summarize_plan(winning),
+    }
+
+
+def _summarize_plan(stage: Dict[str, Any]) -> str:
+    """将执行计划压缩为 "FETCH <- IXSCAN(date_1_code_1__id_1)" 形式"""
+    parts = []
+    while stage:
+        name = stage.get("stage", "?")
+        if stage.get("indexName"):
+            name = f"{name}({stage['indexName']})"
+        parts.append(name)
+        stage = stage.get("inputStage")
+    return " <- ".join(parts)
+
+
+def _build_collection():
+    from .mongo_client import get_default_storage
+
+    storage = get_default_storage()
+    if storage.kline_collection is None:
+        storage.connect()
+    return storage.kline_collection
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="清理 stock_kline 中重复的 (code, date) 记录")
+    parser.add_argument("--apply", action="store_true", help="实际删除重复记录（默认只统计）")
+    parser.add_argument("--start-date", help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end-date", help="结束日期 YYYY-MM-DD")
+    parser.add_argument("--create-index", action="store_true", help="清理后创建 (code, date) 唯一索引")
+    parser.add_argument("--benchmark", metavar="DATE", help="对比指定交易日聚合去重与索引查询的耗时")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    collection = _build_collection()
+
+    if args.benchmark:
+        result = benchmark_date_query(collection, args.benchmark)
+        logger.info(
+            f"{result['date']}: {result['rows']} 条, 聚合去重 {result['aggregate_ms']}ms, "
+            f"索引查询 {result['find_ms']}ms, 提升 {result['speedup']}x, 计划 {result['find_plan']}"
+        )
+        return
+
+    stats = dedup_klines(collection, args.apply, args.start_date, args.end_date)
+    if args.create_index:
+        if stats["duplicates"] and not args.apply:
+            logger.error("仍存在重复记录，请加 --apply 后再创建唯一索引")
+            return
+        create_unique_index(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+每日市场快照
+
+market_snapshot 集合以交易日为 _id，保存当天的涨跌家数、涨跌停数、成交额、
+涨幅/跌幅/成交额榜和行业均值。盘后报告和 API 直接读取一条文档，
+不再把当天约 5000 条K线拉进 pandas 重新统计。
+
+维护方式:
+- 爬虫每写入一批K线，对涉及的日期执行 $set dirty=True / $inc writes（O(1)，
+  见 python-web-scraper 的 MongoStorage._mark_snapshot_dirty）
+- 读取时若快照缺失或为 dirty，用一次服务端 $facet 聚合重建该日期的快照；
+  重建期间又有新写入时保留 dirty，下次读取继续刷新
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+MARKET_SNAPSHOT_COLLECTION = "market_snapshot"
+
+# 榜单长度
+SNAPSHOT_TOP_N = 20
+
+# 涨跌停判定阈值（%），与盘后分析保持一致
+LIMIT_UP_PCT = 9.9
+LIMIT_DOWN_PCT = -9.9
+
+_RANK_FIELDS = {"_id": 0, "code": 1, "name": 1, "close": 1, "pct_chg": 1, "amount": 1, "volume": 1}
+
+
+def _snapshot_pipeline(date: str, top_n: int) -> List[Dict]:
+    ranked = {"pct_chg": {"$ne": None}}
+    return [
+        {"$match": {"date": date}},
+        {"$facet": {
+            "overview": [
+                {"$group": {
+                    "_id": None,
+                    "total_stocks": {"$sum": 1},
+                    "up_stocks": {"$sum": {"$cond": [{"$gt": ["$pct_chg", 0]}, 1, 0]}},
+                    "down_stocks": {"$sum": {"$cond": [{"$and": [
+                        {"$lt": ["$pct_chg", 0]}, {"$ne": ["$pct_chg", None]}
+                    ]}, 1, 0]}},
+                    "flat_stocks": {"$sum": {"$cond": [{"$eq": ["$pct_chg", 0]}, 1, 0]}},
+                    "limit_up": {"$sum": {"$cond": [{"$gte": ["$pct_chg", LIMIT_UP_PCT]}, 1, 0]}},
+                    "limit_down": {"$sum": {"$cond": [{"$and": [
+                        {"$lte": ["$pct_chg", LIMIT_DOWN_PCT]}, {"$ne": ["$pct_chg", None]}
+                    ]}, 1, 0]}},
+                    "avg_change": {"$avg": "$pct_chg"},
+                    "avg_amplitude": {"$avg": "$amplitude"},
+                    "avg_turnover": {"$avg": "$turnover"},
+                    "total_amount": {"$sum": "$amount"},
+                    "total_volume": {"$sum": "$volume"},
+                }},
+            ],
+            # 中位数：服务端排序后只取 pct_chg 列
+            "changes": [
+                {"$match": ranked},
+                {"$sort": {"pct_chg": 1}},
+                {"$group": {"_id": None, "values": {"$push": "$pct_chg"}}},
+            ],
+            "top_gainers": [
+                {"$match": ranked}, {"$sort": {"pct_chg": -1}}, {"$limit": top_n},
+                {"$project": _RANK_FIELDS},
+            ],
+            "top_losers": [
+                {"$match": ranked}, {"$sort": {"pct_chg": 1}}, {"$limit": top_n},
+                {"$project": _RANK_FIELDS},
+            ],
+            "top_amount": [
+                {"$match": {"amount": {"$gt": 0}}}, {"$sort": {"amount": -1}}, {"$limit": top_n},
+                {"$project": _RANK_FIELDS},
+            ],
+            "sectors": [
+                {"$project": {"pct_chg": 1, "amount": 1, "sector": {"$ifNull": ["$industry", "$sector"]}}},
+                {"$match": {"sector": {"$nin": [None, ""]}}},
+                {"$group": {
+                    "_id": "$sector",
+                    "avg_change": {"$avg": "$pct_chg"},
+                    "stock_count": {"$sum": 1},
+                    "up_count": {"$sum": {"$cond": [{"$gt": ["$pct_chg", 0]}, 1, 0]}},
+                    "total_amount": {"$sum": "$amount"},
+                    "changes": {"$push": "$pct_chg"},
+                }},
+                {"$sort": {"avg_change": -1}},
+            ],
+        }},
+    ]
+
+
+def _median(values: List[float]) -> Optional[float]:
+    if not values:
+        return None
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2
+
+
+def compute_snapshot(kline_collection, date: str, top_n: int = SNAPSHOT_TOP_N) -> Optional[Dict[str, Any]]:
+    """
+    用一次服务端聚合计算某日的市场快照
+
+    参数:
+        kline_collection: stock_kline 集合
+        date: 交易日 (YYYY-MM-DD)
+        top_n: 榜单长度
+
+    返回:
+        快照字段字典，当天没有K线时返回 None
+    """
+    result = next(iter(kline_collection.aggregate(_snapshot_pipeline(date, top_n), allowDiskUse=True)), None)
+    if not result or not result["overview"]:
+        return None
+
+    overview = {k: v for k, v in result["overview"][0].items() if k != "_id"}
+    changes = result["changes"][0]["values"] if result["changes"] else []
+    overview["median_change"] = _median(changes)
+
+    sectors = []
+    for item in result["sectors"]:
+        sector = {k: v for k, v in item.items() if k not in ("_id", "changes")}
+        sector_changes = sorted(v for v in item["changes"] if v is not None)
+        sectors.append({"sector": item["_id"], **sector, "median_change": _median(sector_changes)})
+
+    return {
+        "date": date,
+        "overview": overview,
+        "top_gainers": result["top_gainers"],
+        "top_losers": result["top_losers"],
+        "top_amount": result["top_amount"],
+        "sectors": sectors,
+    }
+
+
+class MarketSnapshotStore:
+    """market_snapshot 的读取与按需刷新"""
+
+    def __init__(self, snapshot_collection, kline_collection, top_n: int = SNAPSHOT_TOP_N):
+        self.snapshot_collection = snapshot_collection
+        self.kline_collection = kline_collection
+        self.top_n = top_n
+
+    def refresh(self, date: str) -> Optional[Dict[str, Any]]:
+        """
+        重建某日快照
+
+        只有在计算期间没有新写入（writes 未变化）时才清除 dirty 标记
+
+        返回:
+            最新快照，当天没有K线时返回 None
+        """
+        try:
+            # 先占位，保证计算期间的写入都能 $inc 到这条文档
+            try:
+                current = self.snapshot_collection.find_one_and_update(
+                    {"_id": date},
+                    {"$setOnInsert": {"writes": 0, "dirty": True}},
+                    projection={"writes": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            except DuplicateKeyError:
+                current = self.snapshot_collection.find_one({"_id": date}, {"writes": 1})
+            writes = current.get("writes", 0)
+
+            snapshot = compute_snapshot(self.kline_collection, date, self.top_n)
+            if snapshot is None:
+                return None
+            snapshot["computed_at"] = datetime.now()
+
+            result = self.snapshot_collection.update_one(
+                {"_id": date, "writes": writes}, {"$set": dict(snapshot, dirty=False)}
+            )
+            if result.matched_count == 0:
+                # 计算期间有新K线写入，保存结果但保留 dirty，下次读取继续刷新
+                self.snapshot_collection.update_one({"_id": date}, {"$set": snapshot})
+
+            logger.info(
+                f"市场快照已刷新: {date}, {snapshot['overview']['total_stocks']} 只股票"
+            )
+            return snapshot
+        except PyMongoError as e:
+            logger.error(f"刷新市场快照失败 {date}: {e}")
+            raise
+
+    def get(self, date: str, top_n: int = None) -> Optional[Dict[str, Any]]:
+        """
+        读取某日快照，缺失或 dirty 时先刷新
+
+        参数:
+            date: 交易日 (YYYY-MM-DD)
+            top_n: 需要的榜单长度，超过快照保存的长度时直接聚合计算（不写回快照）
+
+        返回:
+            快照文档（不含内部的 dirty/writes 字段），当天没有K线时返回 None
+        """
+        if top_n is not None and top_n > self.top_n:
+            try:
+                return compute_snapshot(self.kline_collection, date, top_n)
+            except PyMongoError as e:
+                logger.error(f"计算市场快照失败 {date}: {e}")
+                raise
+
+        try:
+            doc = self.snapshot_collection.find_one({"_id": date})
+        except PyMongoError as e:
+            logger.error(f"读取市场快照失败 {date}: {e}")
+            raise
+
+        if doc is None or doc.get("dirty"):
+            doc = self.refresh(date)
+            if doc is None:
+                return None
+
+        return {k: v for k, v in doc.items() if k not in ("_id", "dirty", "writes")}
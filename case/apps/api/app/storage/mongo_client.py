@@ -1,12 +1,143 @@
-from pymongo import MongoClient
+from pymongo import UpdateOne
 from pymongo.errors import PyMongoError
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from datetime import datetime, timedelta
-from urllib.parse import quote_plus
+import base64
+import json
+import threading
 import logging
 
+import pandas as pd
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from .client_registry import client_registry
+from .query_cache import (
+    QueryCache,
+    cached_query,
+    get_query_cache,
+    KLINE_NAMESPACE,
+    CAPITAL_FLOW_NAMESPACE,
+    INVALIDATION_COLLECTION,
+)
+from .market_snapshot import MARKET_SNAPSHOT_COLLECTION, MarketSnapshotStore
+
 logger = logging.getLogger(__name__)
 
+# 批量读取默认返回的K线字段
+KLINE_FIELDS = [
+    "code", "name", "date", "open", "close", "high", "low",
+    "volume", "amount", "amplitude", "pct_chg", "turnover",
+]
+
+# 批量读取游标每批文档数
+BULK_BATCH_SIZE = 5000
+
+
+# 游标分页排序键，与 KLINE_PAGE_INDEXES 对应（同向或整体反向遍历）
+KLINE_PAGE_SORT_BY_CODE = [("date", -1), ("_id", -1)]
+KLINE_PAGE_SORT_BY_DATE = [("code", 1), ("_id", 1)]
+KLINE_PAGE_SORT_ALL = [("date", -1), ("code", -1), ("_id", -1)]
+
+# 游标分页依赖的复合索引
+KLINE_PAGE_INDEXES = [
+    [("code", 1), ("date", 1), ("_id", 1)],
+    [("date", 1), ("code", 1), ("_id", 1)],
+]
+
+# 远程数据源写回的日线不复权K线。爬虫向 stock_kline 写入前复权K线，两者分开存放，
+# 避免同一序列中混入不同复权方式的价格
+KLINE_WRITEBACK_COLLECTION = "stock_kline_unadjusted"
+
+# KLINE_WRITEBACK_COLLECTION 已覆盖的日期区间（每只股票一条文档）
+KLINE_COVERAGE_COLLECTION = "kline_writeback_coverage"
+
+# 盯盘增量指标状态检查点（每只股票一条文档）
+INDICATOR_STATE_COLLECTION = "monitor_indicator_state"
+
+# 日线指标序列缓存（每只股票每组指标参数一条文档）
+INDICATOR_CACHE_COLLECTION = "indicator_cache"
+
+# 每只股票每天一条K线，与爬虫端建立的唯一索引一致
+KLINE_UNIQUE_INDEX = [("code", 1), ("date", 1)]
+
+
+def encode_page_cursor(doc: Dict[str, Any]) -> str:
+    """将最后一条记录的 (date, code, _id) 编码为不透明游标"""
+    payload = {"date": doc.get("date"), "code": doc.get("code"), "_id": str(doc.get("_id"))}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    解码分页游标
+
+    异常:
+        ValueError: 游标格式错误
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload.get("date"), str) or not isinstance(payload.get("code"), str):
+            raise ValueError("cursor requires string date and code")
+        payload["_id"] = ObjectId(payload["_id"])
+        return payload
+    except (ValueError, KeyError, TypeError, AttributeError, InvalidId) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def _seek_query(sort_keys: List[tuple], last: Dict[str, Any]) -> Dict[str, Any]:
+    """根据排序键构建 seek 条件: (k1 > v1) or (k1 == v1 and k2 > v2) ..."""
+    branches = []
+    for i, (field, direction) in enumerate(sort_keys):
+        branch = {prev_field: last[prev_field] for prev_field, _ in sort_keys[:i]}
+        branch[field] = {"$gt" if direction == 1 else "$lt": last[field]}
+        branches.append(branch)
+    return {"$or": branches}
+
+
+def _date_range_query(start_date: str = None, end_date: str = None) -> Dict[str, str]:
+    """构建日期范围条件"""
+    date_query = {}
+    if start_date:
+        date_query["$gte"] = start_date
+    if end_date:
+        date_query["$lte"] = end_date
+    return date_query
+
+
+def _cursor_to_columns(cursor, fields: Optional[List[str]] = None) -> Dict[str, list]:
+    """
+    将游标直接解码为列数组，不做逐文档的 _id / crawl_time 字符串化
+
+    参数:
+        cursor: pymongo 游标
+        fields: 固定字段列表；为 None 时按文档中出现的字段动态建列
+    """
+    if fields:
+        columns = {field: [] for field in fields}
+        appenders = [(field, columns[field].append) for field in fields]
+        for doc in cursor:
+            get = doc.get
+            for field, append in appenders:
+                append(get(field))
+        return columns
+
+    columns: Dict[str, list] = {}
+    row_count = 0
+    for doc in cursor:
+        for field, value in doc.items():
+            column = columns.get(field)
+            if column is None:
+                column = columns[field] = [None] * row_count
+            column.append(value)
+        row_count += 1
+        for column in columns.values():
+            if len(column) < row_count:
+                column.append(None)
+    return columns
+
 
 class MongoStorage:
     def __init__(
@@ -16,6 +147,7 @@ class MongoStorage:
         db_name: str,
         username: str = None,
         password: str = None,
+        cache: Optional[QueryCache] = None,
     ):
         self.host = host
         self.port = port
@@ -29,31 +161,54 @@ class MongoStorage:
         self.capital_flow_collection = None
         self.news_stocks_collection = None
         self.monitor_stocks_collection = None
+        self.market_snapshot_collection = None
+        self.kline_writeback_collection = None
+        self.kline_coverage_collection = None
+        self.indicator_state_collection = None
+        self.indicator_cache_collection = None
+        self.cache = cache
+        self._kline_unique_index = None
 
     def connect(self):
+        """从共享注册表获取客户端，首次创建时会 ping 一次"""
         try:
-            if self.username and self.password:
-                encoded_password = quote_plus(self.password)
-                connection_string = f"mongodb://{self.username}:{encoded_password}@{self.host}:{self.port}"
-                self.client = MongoClient(connection_string)
-            else:
-                self.client = MongoClient(self.host, self.port)
+            self.client = client_registry.get_client(
+                self.host, self.port, self.username, self.password
+            )
             self.db = self.client[self.db_name]
             self.collection = self.db["after_market"]
             self.kline_collection = self.db["stock_kline"]
             self.capital_flow_collection = self.db["capital_flow"]
             self.news_stocks_collection = self.db["news_stocks"]
             self.monitor_stocks_collection = self.db["monitor_stocks"]
-            self.client.admin.command("ping")
-            logger.info(f"MongoDB connected: {self.host}:{self.port}/{self.db_name}")
+            self.market_snapshot_collection = self.db[MARKET_SNAPSHOT_COLLECTION]
+            self.kline_writeback_collection = self.db[KLINE_WRITEBACK_COLLECTION]
+            self.kline_coverage_collection = self.db[KLINE_COVERAGE_COLLECTION]
+            self.indicator_state_collection = self.db[INDICATOR_STATE_COLLECTION]
+            self.indicator_cache_collection = self.db[INDICATOR_CACHE_COLLECTION]
+            if self.cache is not None:
+                self.cache.attach_invalidation_log(self.db[INVALIDATION_COLLECTION])
+            logger.debug(f"MongoDB connected: {self.host}:{self.port}/{self.db_name}")
         except PyMongoError as e:
             logger.error(f"MongoDB connection failed: {e}")
             raise
 
     def close(self):
+        """释放对共享客户端的引用，真正的关闭由 client_registry.close_all() 负责"""
         if self.client:
-            self.client.close()
-            logger.info("MongoDB connection closed")
+            self.client = None
+            self.db = None
+            self.collection = None
+            self.kline_collection = None
+            self.capital_flow_collection = None
+            self.news_stocks_collection = None
+            self.monitor_stocks_collection = None
+            self.market_snapshot_collection = None
+            self.kline_writeback_collection = None
+            self.kline_coverage_collection = None
+            self.indicator_state_collection = None
+            self.indicator_cache_collection = None
+            logger.debug("MongoDB connection released")
 
     def save(self, data: Any) -> Optional[str]:
         if self.collection is None:
@@ -147,6 +302,7 @@ class MongoStorage:
         except PyMongoError as e:
             logger.error(f"MongoDB delete failed: {e}")
             raise
+    @cached_query(KLINE_NAMESPACE, ["name"])
     def get_kline_by_name(self, name: str, start_date: str = None, end_date: str = None, limit: int = 100
     ) -> List[Dict]:
         """根据股票名称获取K线数据"""
@@ -175,6 +331,7 @@ class MongoStorage:
             logger.error(f"MongoDB kline by name query failed: {e}")
             raise
 
+    @cached_query(KLINE_NAMESPACE, ["code"])
     def get_kline(
         self, code: str, start_date: str = None, end_date: str = None, limit: int = 100
     ) -> List[Dict]:
@@ -218,14 +375,22 @@ class MongoStorage:
             logger.error(f"MongoDB kline query failed: {e}")
             raise
 
+    @cached_query(KLINE_NAMESPACE, ["date"])
     def get_all_kline_by_date(
         self, date: str, limit: int = 5000, deduplicate: bool = True
     ) -> List[Dict]:
+        """
+        获取某一天所有股票的K线
+
+        (code, date) 唯一索引存在时每只股票只有一条记录，直接走索引查询；
+        仅当唯一索引缺失（历史重复数据尚未清理）且 deduplicate=True 时，
+        才退回按 crawl_time 取最新记录的聚合去重
+        """
         if self.kline_collection is None:
             self.connect()
 
         try:
-            if deduplicate:
+            if deduplicate and not self.has_kline_unique_index():
                 pipeline = [
                     {"$match": {"date": date}},
                     {"$sort": {"crawl_time": -1}},
@@ -233,9 +398,9 @@ class MongoStorage:
                     {"$replaceRoot": {"newRoot": "$doc"}},
                     {"$limit": limit},
                 ]
-                cursor = self.kline_collection.aggregate(pipeline)
+                cursor = self.kline_collection.aggregate(pipeline, allowDiskUse=True)
             else:
-                cursor = self.kline_collection.find({"date": date}).limit(limit)
+                cursor = self.kline_collection.find({"date": date}).sort("code", 1).limit(limit)
 
             results = []
             for doc in cursor:
@@ -280,6 +445,7 @@ class MongoStorage:
             logger.error(f"MongoDB kline query failed: {e}")
             raise
 
+    @cached_query(CAPITAL_FLOW_NAMESPACE, ["name"])
     def get_capital_flow(
         self, name: str, start_date: str = None, end_date: str = None, limit: int = 10
     ) -> List[Dict]:
@@ -309,6 +475,536 @@ class MongoStorage:
             logger.error(f"MongoDB capital flow query failed: {e}")
             raise
 
+    def _get_kline_page(
+        self,
+        query: Dict[str, Any],
+        sort_keys: List[tuple],
+        page_size: int,
+        cursor: str = None,
+    ) -> Dict[str, Any]:
+        """
+        游标(seek)分页查询K线
+
+        返回:
+            {"data": [...], "next_cursor": str 或 None}
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        if cursor:
+            query = {"$and": [query, _seek_query(sort_keys, decode_page_cursor(cursor))]}
+
+        try:
+            docs = list(
+                self.kline_collection.find(query).sort(sort_keys).limit(page_size + 1)
+            )
+            has_next = len(docs) > page_size
+            docs = docs[:page_size]
+            next_cursor = encode_page_cursor(docs[-1]) if has_next else None
+
+            for doc in docs:
+                doc["_id"] = str(doc["_id"])
+                if doc.get("crawl_time"):
+                    doc["crawl_time"] = doc["crawl_time"].isoformat()
+            return {"data": docs, "next_cursor": next_cursor}
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline page query failed: {e}")
+            raise
+
+    def get_kline_page(
+        self,
+        code: str,
+        start_date: str = None,
+        end_date: str = None,
+        page_size: int = 100,
+        cursor: str = None,
+    ) -> Dict[str, Any]:
+        """单只股票K线游标分页（按日期降序）"""
+        query = {"code": code}
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+        return self._get_kline_page(query, KLINE_PAGE_SORT_BY_CODE, page_size, cursor)
+
+    def get_all_kline_by_date_page(
+        self, date: str, page_size: int = 100, cursor: str = None
+    ) -> Dict[str, Any]:
+        """指定日期全部股票K线游标分页（按代码升序）"""
+        return self._get_kline_page({"date": date}, KLINE_PAGE_SORT_BY_DATE, page_size, cursor)
+
+    def get_all_klines_page(
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        page_size: int = 100,
+        cursor: str = None,
+    ) -> Dict[str, Any]:
+        """全部股票K线游标分页（按日期、代码降序）"""
+        query = {}
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+        return self._get_kline_page(query, KLINE_PAGE_SORT_ALL, page_size, cursor)
+
+    def ensure_kline_page_indexes(self):
+        """创建游标分页依赖的复合索引"""
+        if self.kline_collection is None:
+            self.connect()
+
+        for keys in KLINE_PAGE_INDEXES:
+            try:
+                self.kline_collection.create_index(keys, background=True)
+            except PyMongoError as e:
+                logger.error(f"创建K线分页索引失败 {keys}: {e}")
+
+    def ensure_indexes(self) -> Dict[str, Any]:
+        """
+        按 app.storage.indexes.INDEX_MANIFEST 创建全部查询索引
+
+        返回:
+            {"collection.index_name": "ok" 或错误信息}
+        """
+        from .indexes import apply_index_manifest
+
+        if self.db is None:
+            self.connect()
+
+        results = apply_index_manifest(self.db)
+        self._kline_unique_index = results.get("stock_kline.code_1_date_1") == "ok"
+        return results
+
+    def get_latest_kline_date(self) -> Optional[str]:
+        """获取K线集合中最新的交易日"""
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            doc = self.kline_collection.find_one({}, {"date": 1, "_id": 0}, sort=[("date", -1)])
+            return doc.get("date") if doc else None
+        except PyMongoError as e:
+            logger.error(f"MongoDB latest kline date query failed: {e}")
+            raise
+
+    def get_market_snapshot(self, date: str = None) -> Optional[Dict[str, Any]]:
+        """
+        获取某日市场快照（涨跌家数、涨跌停、成交额、榜单、行业均值）
+
+        快照缺失或有新K线写入时按需用服务端聚合重建，否则直接读取一条文档
+
+        参数:
+            date: 交易日 (YYYY-MM-DD)，默认最新交易日
+
+        返回:
+            快照字典，没有数据时返回 None
+        """
+        if self.market_snapshot_collection is None:
+            self.connect()
+
+        date = date or self.get_latest_kline_date()
+        if not date:
+            return None
+        store = MarketSnapshotStore(self.market_snapshot_collection, self.kline_collection)
+        return store.get(date)
+
+    def has_kline_unique_index(self) -> bool:
+        """stock_kline 上是否已有 (code, date) 唯一索引（结果按实例缓存）"""
+        if self._kline_unique_index is None:
+            if self.kline_collection is None:
+                self.connect()
+            try:
+                indexes = self.kline_collection.index_information()
+            except PyMongoError as e:
+                logger.error(f"MongoDB index query failed: {e}")
+                return False
+            self._kline_unique_index = any(
+                spec.get("unique") and list(spec.get("key", [])) == KLINE_UNIQUE_INDEX
+                for spec in indexes.values()
+            )
+            if not self._kline_unique_index:
+                logger.warning(
+                    "stock_kline 缺少 (code, date) 唯一索引，按日期查询将使用聚合去重，"
+                    "请运行 python -m app.storage.kline_dedup --apply --create-index"
+                )
+        return self._kline_unique_index
+
+    def ensure_kline_unique_index(self) -> bool:
+        """
+        创建 (code, date) 唯一索引
+
+        存在重复数据时创建会失败，此时记录错误并返回 False，需要先运行去重工具
+
+        返回:
+            唯一索引是否可用
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        try:
+            self.kline_collection.create_index(KLINE_UNIQUE_INDEX, unique=True, background=True)
+            self._kline_unique_index = True
+        except PyMongoError as e:
+            logger.error(
+                f"创建K线唯一索引失败（可能存在重复数据，请先运行 python -m app.storage.kline_dedup）: {e}"
+            )
+            self._kline_unique_index = False
+        return self._kline_unique_index
+
+    def upsert_klines(self, code: str, klines: List[Dict[str, Any]]) -> int:
+        """
+        按 (code, date) 批量写入远程数据源的日线不复权K线（一次 bulk_write）
+
+        写入 KLINE_WRITEBACK_COLLECTION 而不是爬虫的 stock_kline（前复权），
+        stock_kline 的查询缓存和市场快照不受影响
+
+        参数:
+            code: 股票代码
+            klines: K线字典列表，必须包含 date
+
+        返回:
+            新增或更新的条数
+        """
+        if not klines:
+            return 0
+        if self.kline_writeback_collection is None:
+            self.connect()
+
+        now = datetime.now()
+        operations = [
+            UpdateOne(
+                {"code": code, "date": kline["date"]},
+                {"$set": dict(kline, code=code, crawl_time=now)},
+                upsert=True,
+            )
+            for kline in klines
+        ]
+        try:
+            result = self.kline_writeback_collection.bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline upsert failed: {e}")
+            raise
+        return result.upserted_count + result.modified_count
+
+    def get_writeback_klines(self, code: str, start_date: str = None, end_date: str = None) -> List[Dict]:
+        """
+        读取 upsert_klines 写回的K线
+
+        返回:
+            按日期升序的K线文档（不含 _id / crawl_time）
+        """
+        if self.kline_writeback_collection is None:
+            self.connect()
+
+        query = {"code": code}
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+        try:
+            return list(
+                self.kline_writeback_collection.find(query, {"_id": 0, "crawl_time": 0}).sort("date", 1)
+            )
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline writeback query failed: {e}")
+            raise
+
+    def get_kline_coverage(self, code: str) -> List[List[str]]:
+        """
+        获取某只股票已写回的日期区间
+
+        返回:
+            [[start_date, end_date], ...]，按开始日期排序
+        """
+        if self.kline_coverage_collection is None:
+            self.connect()
+
+        try:
+            doc = self.kline_coverage_collection.find_one({"_id": code})
+            return doc.get("ranges", []) if doc else []
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline coverage query failed: {e}")
+            raise
+
+    def set_kline_coverage(self, code: str, ranges: List[List[str]]):
+        """
+        保存某只股票已写回的日期区间（调用方负责合并）
+
+        参数:
+            code: 股票代码
+            ranges: [[start_date, end_date], ...]
+        """
+        if self.kline_coverage_collection is None:
+            self.connect()
+
+        try:
+            self.kline_coverage_collection.update_one(
+                {"_id": code},
+                {"$set": {"ranges": ranges, "updated_at": datetime.now()}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline coverage update failed: {e}")
+            raise
+
+    def get_indicator_states(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取盯盘指标状态检查点（一次查询）
+
+        返回:
+            {code: state}，没有检查点的代码不出现
+        """
+        if self.indicator_state_collection is None:
+            self.connect()
+
+        try:
+            cursor = self.indicator_state_collection.find({"_id": {"$in": list(codes)}}, {"state": 1})
+            return {doc["_id"]: doc["state"] for doc in cursor if doc.get("state")}
+        except PyMongoError as e:
+            logger.error(f"MongoDB indicator state query failed: {e}")
+            raise
+
+    def save_indicator_states(self, states: Dict[str, Dict[str, Any]]) -> int:
+        """
+        批量保存盯盘指标状态检查点
+
+        参数:
+            states: {code: IndicatorState.to_dict()}
+
+        返回:
+            写入的文档数
+        """
+        if not states:
+            return 0
+        if self.indicator_state_collection is None:
+            self.connect()
+
+        now = datetime.now()
+        operations = [
+            UpdateOne({"_id": code}, {"$set": {"state": state, "updated_at": now}}, upsert=True)
+            for code, state in states.items()
+        ]
+        try:
+            result = self.indicator_state_collection.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+        except PyMongoError as e:
+            logger.error(f"MongoDB indicator state update failed: {e}")
+            raise
+
+    def get_indicator_cache(self, codes: List[str], params_key: str) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取指标序列缓存（一次查询）
+
+        参数:
+            codes: 股票代码
+            params_key: 指标参数键（app.indicators.cache.params_key）
+
+        返回:
+            {code: IndicatorSeries.to_dict()}，没有缓存的代码不出现
+        """
+        if self.indicator_cache_collection is None:
+            self.connect()
+
+        ids = [f"{code}:{params_key}" for code in codes]
+        try:
+            cursor = self.indicator_cache_collection.find({"_id": {"$in": ids}}, {"code": 1, "entry": 1})
+            return {doc["code"]: doc["entry"] for doc in cursor if doc.get("entry")}
+        except PyMongoError as e:
+            logger.error(f"MongoDB indicator cache query failed: {e}")
+            raise
+
+    def save_indicator_cache(self, entries: Dict[str, Dict[str, Any]], params_key: str) -> int:
+        """
+        批量保存指标序列缓存，文档以 code:params_key 为 _id，并记录 last_date
+
+        参数:
+            entries: {code: IndicatorSeries.to_dict()}
+            params_key: 指标参数键
+
+        返回:
+            写入的文档数
+        """
+        if not entries:
+            return 0
+        if self.indicator_cache_collection is None:
+            self.connect()
+
+        now = datetime.now()
+        operations = [
+            UpdateOne(
+                {"_id": f"{code}:{params_key}"},
+                {"$set": {
+                    "code": code,
+                    "params_key": params_key,
+                    "last_date": entry.get("last_date"),
+                    "entry": entry,
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+            for code, entry in entries.items()
+        ]
+        try:
+            result = self.indicator_cache_collection.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+        except PyMongoError as e:
+            logger.error(f"MongoDB indicator cache update failed: {e}")
+            raise
+
+    def iter_klines(
+        self,
+        code: str = None,
+        start_date: str = None,
+        end_date: str = None,
+        fields: List[str] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+    ) -> Iterator[Dict]:
+        """
+        按批次从游标流式读取K线，不在内存中物化整个结果集
+
+        参数:
+            code: 股票代码，None 表示全部股票
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 返回字段，默认 KLINE_FIELDS
+            batch_size: 游标每批文档数
+
+        返回:
+            K线文档迭代器（不含 _id）
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        query = {}
+        if code:
+            query["code"] = code
+        date_query = _date_range_query(start_date, end_date)
+        if date_query:
+            query["date"] = date_query
+
+        projection = {field: 1 for field in (fields or KLINE_FIELDS)}
+        projection["_id"] = 0
+        sort_keys = KLINE_PAGE_SORT_BY_CODE if code else KLINE_PAGE_SORT_ALL
+
+        cursor = (
+            self.kline_collection.find(query, projection)
+            .sort(sort_keys)
+            .batch_size(batch_size)
+        )
+        try:
+            for doc in cursor:
+                if doc.get("crawl_time"):
+                    doc["crawl_time"] = doc["crawl_time"].isoformat()
+                yield doc
+        except PyMongoError as e:
+            logger.error(f"MongoDB kline stream failed: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def get_klines_bulk(
+        self,
+        codes: List[str],
+        start_date: str = None,
+        end_date: str = None,
+        fields: List[str] = None,
+        as_frame: bool = True,
+        batch_size: int = BULK_BATCH_SIZE,
+    ):
+        """
+        批量获取多只股票的K线数据（单次 $in 查询）
+
+        参数:
+            codes: 股票代码列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 返回字段，默认 KLINE_FIELDS
+            as_frame: True 返回 DataFrame，False 返回 {字段: 列数组}
+            batch_size: 游标每批文档数
+
+        返回:
+            按 (code, date) 升序排列的 DataFrame 或列字典
+        """
+        if self.kline_collection is None:
+            self.connect()
+
+        fields = list(fields or KLINE_FIELDS)
+        if not codes:
+            columns = {field: [] for field in fields}
+            return pd.DataFrame(columns) if as_frame else columns
+
+        try:
+            query = {"code": {"$in": list(codes)}}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+
+            projection = {field: 1 for field in fields}
+            projection["_id"] = 0
+
+            cursor = (
+                self.kline_collection.find(query, projection)
+                .sort([("code", 1), ("date", 1)])
+                .batch_size(batch_size)
+            )
+            columns = _cursor_to_columns(cursor, fields)
+            logger.info(f"批量获取K线数据: {len(codes)} 只股票, {len(columns[fields[0]])} 条记录")
+            return pd.DataFrame(columns) if as_frame else columns
+        except PyMongoError as e:
+            logger.error(f"MongoDB bulk kline query failed: {e}")
+            raise
+
+    def get_capital_flow_bulk(
+        self,
+        names: List[str],
+        start_date: str = None,
+        end_date: str = None,
+        fields: List[str] = None,
+        as_frame: bool = True,
+        batch_size: int = BULK_BATCH_SIZE,
+    ):
+        """
+        批量获取多只股票的资金流向数据（单次 $in 查询）
+
+        参数:
+            names: 股票名称/代码列表（对应 capital_flow.name 字段）
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fields: 返回字段，默认返回除 _id、crawl_time 外的全部字段
+            as_frame: True 返回 DataFrame，False 返回 {字段: 列数组}
+            batch_size: 游标每批文档数
+
+        返回:
+            按 (name, date) 降序排列的 DataFrame 或列字典
+        """
+        if self.capital_flow_collection is None:
+            self.connect()
+
+        if not names:
+            columns = {field: [] for field in (fields or [])}
+            return pd.DataFrame(columns) if as_frame else columns
+
+        try:
+            query = {"name": {"$in": list(names)}}
+            date_query = _date_range_query(start_date, end_date)
+            if date_query:
+                query["date"] = date_query
+
+            if fields:
+                projection = {field: 1 for field in fields}
+                projection["_id"] = 0
+            else:
+                projection = {"_id": 0, "crawl_time": 0}
+
+            cursor = (
+                self.capital_flow_collection.find(query, projection)
+                .sort([("name", 1), ("date", -1)])
+                .batch_size(batch_size)
+            )
+            columns = _cursor_to_columns(cursor, fields)
+            logger.info(f"批量获取资金流向数据: {len(names)} 只股票")
+            return pd.DataFrame(columns) if as_frame else columns
+        except PyMongoError as e:
+            logger.error(f"MongoDB bulk capital flow query failed: {e}")
+            raise
+
     def save_news_stocks(self, stocks: List[Dict]) -> Optional[str]:
         """
         保存新闻分析后的股票到单独的collection
@@ -454,3 +1150,33 @@ class MongoStorage:
         except PyMongoError as e:
             logger.error(f"移除监控股票失败: {e}")
             raise
+
+
+_default_storage: Optional[MongoStorage] = None
+_default_storage_lock = threading.Lock()
+
+
+def get_default_storage() -> MongoStorage:
+    """
+    获取按全局配置创建的进程级 MongoStorage
+
+    FastAPI 依赖和后台任务共用同一个实例，底层连接池由 client_registry 管理，
+    K线/资金流向读缓存由 query_cache 配置决定是否启用
+    """
+    global _default_storage
+    if _default_storage is None:
+        with _default_storage_lock:
+            if _default_storage is None:
+                from app.core.config import settings
+
+                storage = MongoStorage(
+                    settings.mongodb_host,
+                    settings.mongodb_port,
+                    settings.mongodb_database,
+                    settings.mongodb_username,
+                    settings.mongodb_password,
+                    cache=get_query_cache(),
+                )
+                storage.connect()
+                _default_storage = storage
+    return _default_storage
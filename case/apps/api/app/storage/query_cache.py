@@ -0,0 +1,441 @@
+"""
+MongoStorage 读缓存
+
+K线 / 资金流向查询会被盯盘循环、Brain 分析器、选股任务和看板以相同参数反复调用，
+这里提供一层读穿透缓存：
+- 按规范化后的查询参数生成键，每个集合独立的容量上限和 TTL
+- 默认进程内 LRU，可配置 Redis 作为多进程共享后端
+- 爬虫写入 (code, date) 时向 cache_invalidations 集合追加失效事件，
+  读取前按间隔拉取并按 code/date/name 标签精确失效
+"""
+
+import json
+import time
+import asyncio
+import pickle
+import logging
+import threading
+import functools
+import inspect
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+KLINE_NAMESPACE = "kline"
+CAPITAL_FLOW_NAMESPACE = "capital_flow"
+
+# 失效事件集合（爬虫写入，API 拉取）
+INVALIDATION_COLLECTION = "cache_invalidations"
+
+# 集合名 -> 缓存命名空间
+COLLECTION_NAMESPACES = {
+    "stock_kline": KLINE_NAMESPACE,
+    "capital_flow": CAPITAL_FLOW_NAMESPACE,
+}
+
+
+def make_cache_key(method: str, params: Dict[str, Any]) -> str:
+    """按方法名和规范化参数生成缓存键"""
+    return f"{method}:{json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)}"
+
+
+def make_tag(namespace: str, field: str, value: Any) -> str:
+    return f"{namespace}:{field}:{value}"
+
+
+def _copy_result(value: Any) -> Any:
+    """返回结果的浅拷贝，避免调用方修改缓存中的文档"""
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class LRUCacheBackend:
+    """进程内 LRU + TTL 缓存（线程安全）"""
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: Dict[str, OrderedDict] = {}
+        self._tags: Dict[str, Dict[str, set]] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _remove(self, namespace: str, key: str):
+        entry = self._entries[namespace].pop(key, None)
+        if entry is None:
+            return
+        tag_index = self._tags[namespace]
+        for tag in entry[2]:
+            keys = tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del tag_index[tag]
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entries = self._entries.get(namespace)
+            if not entries or key not in entries:
+                return False, None
+            expires_at, value, _ = entries[key]
+            if expires_at <= time.monotonic():
+                self._remove(namespace, key)
+                return False, None
+            entries.move_to_end(key)
+            return True, value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with self._lock:
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            tag_index = self._tags.setdefault(namespace, {})
+            if key in entries:
+                self._remove(namespace, key)
+            entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                tag_index.setdefault(tag, set()).add(key)
+            while len(entries) > self.max_size:
+                oldest = next(iter(entries))
+                self._remove(namespace, oldest)
+                self.evictions += 1
+
+    def invalidate_tags(self, namespace: str, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            tag_index = self._tags.get(namespace)
+            if not tag_index:
+                return 0
+            for tag in tags:
+                for key in list(tag_index.get(tag, ())):
+                    self._remove(namespace, key)
+                    removed += 1
+        return removed
+
+    def clear(self, namespace: str = None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._tags.clear()
+            else:
+                self._entries.pop(namespace, None)
+                self._tags.pop(namespace, None)
+
+    def size(self, namespace: str) -> int:
+        return len(self._entries.get(namespace, ()))
+
+
+class RedisCacheBackend:
+    """
+    Redis 共享缓存后端
+
+    多个 API / 任务进程共享同一份缓存，容量上限由 Redis 的 maxmemory 策略控制，
+    标签以 Redis set 保存，失效时删除集合内的所有键。
+    """
+
+    def __init__(self, url: str, prefix: str = "qc"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis library not available")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _tag_key(self, namespace: str, tag: str) -> str:
+        return f"{self.prefix}:{namespace}:tag:{tag}"
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        raw = self.client.get(self._key(namespace, key))
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        full_key = self._key(namespace, key)
+        pipe = self.client.pipeline()
+        pipe.setex(full_key, int(ttl), pickle.dumps(value))
+        for tag in tags:
+            tag_key = self._tag_key(namespace, tag)
+            pipe.sadd(tag_key, full_key)
+            pipe.expire(tag_key, int(ttl))
+        pipe.execute()
+
+    def invalidate_tags(self, namespace: str, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self._tag_key(namespace, tag)
+            keys = self.client.smembers(tag_key)
+            if keys:
+                removed += self.client.delete(*keys)
+            self.client.delete(tag_key)
+        return removed
+
+    def clear(self, namespace: str = None):
+        pattern = f"{self.prefix}:{namespace}:*" if namespace else f"{self.prefix}:*"
+        for key in self.client.scan_iter(pattern):
+            self.client.delete(key)
+
+    def size(self, namespace: str) -> int:
+        return -1
+
+
+class QueryCache:
+    """按集合划分命名空间的查询缓存，统计命中/未命中/失效次数"""
+
+    def __init__(
+        self,
+        backend=None,
+        ttls: Optional[Dict[str, float]] = None,
+        poll_interval: float = 2.0,
+    ):
+        self.backend = backend or LRUCacheBackend()
+        self.ttls = ttls or {KLINE_NAMESPACE: 300, CAPITAL_FLOW_NAMESPACE: 300}
+        self.poll_interval = poll_interval
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._invalidation_log = None
+        self._last_event_id = None
+        self._last_poll = 0.0
+
+    def _count(self, namespace: str, name: str, n: int = 1):
+        with self._lock:
+            counters = self._counters.setdefault(
+                namespace, {"hits": 0, "misses": 0, "invalidations": 0}
+            )
+            counters[name] += n
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        self.poll_invalidations()
+        try:
+            hit, value = self.backend.get(namespace, key)
+        except Exception as e:
+            logger.warning(f"读取查询缓存失败: {e}")
+            hit, value = False, None
+        self._count(namespace, "hits" if hit else "misses")
+        return hit, value
+
+    def set(self, namespace: str, key: str, value: Any, tags: Iterable[str] = ()):
+        ttl = self.ttls.get(namespace)
+        if not ttl:
+            return
+        try:
+            self.backend.set(namespace, key, value, ttl, tags)
+        except Exception as e:
+            logger.warning(f"写入查询缓存失败: {e}")
+
+    def invalidate(
+        self,
+        namespace: str,
+        code: str = None,
+        dates: Iterable[str] = (),
+        name: str = None,
+    ) -> int:
+        """
+        按写入的 (code, date) 失效相关查询
+
+        参数:
+            namespace: 缓存命名空间（kline / capital_flow）
+            code: 股票代码
+            dates: 写入的日期列表
+            name: 股票名称
+
+        返回:
+            失效的缓存条目数
+        """
+        tags = [make_tag(namespace, "date", date) for date in dates]
+        if code:
+            tags.append(make_tag(namespace, "code", code))
+        if name:
+            tags.append(make_tag(namespace, "name", name))
+        try:
+            removed = self.backend.invalidate_tags(namespace, tags)
+        except Exception as e:
+            logger.warning(f"失效查询缓存失败，清空命名空间 {namespace}: {e}")
+            self.backend.clear(namespace)
+            removed = 0
+        self._count(namespace, "invalidations", removed)
+        return removed
+
+    def attach_invalidation_log(self, collection):
+        """
+        绑定失效事件集合，只处理绑定之后产生的事件
+
+        游标从集合中已有的最新 _id 开始，而不是用本机时钟生成 ObjectId：
+        写入方的时钟与本机不一致时，按本机时间生成的游标会跳过或重放事件
+        """
+        if self._invalidation_log is not None:
+            return
+        self._invalidation_log = collection
+        try:
+            latest = list(collection.find().sort("_id", -1).limit(1))
+        except PyMongoError as e:
+            logger.warning(f"读取缓存失效事件游标失败，按本机时间开始: {e}")
+            self._last_event_id = ObjectId.from_datetime(datetime.now(timezone.utc))
+            return
+        self._last_event_id = latest[0]["_id"] if latest else ObjectId("0" * 24)
+
+    def poll_due(self) -> bool:
+        """是否到了拉取失效事件的时间（异步调用方据此决定是否放到线程中拉取）"""
+        return (
+            self._invalidation_log is not None
+            and time.monotonic() - self._last_poll >= self.poll_interval
+        )
+
+    def poll_invalidations(self, force: bool = False) -> int:
+        """
+        拉取并应用新的失效事件（按 poll_interval 节流）
+
+        返回:
+            应用的事件数
+        """
+        if self._invalidation_log is None:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return 0
+        self._last_poll = now
+
+        try:
+            events = list(
+                self._invalidation_log.find({"_id": {"$gt": self._last_event_id}}).sort("_id", 1)
+            )
+        except PyMongoError as e:
+            logger.warning(f"拉取缓存失效事件失败: {e}")
+            return 0
+
+        for event in events:
+            namespace = COLLECTION_NAMESPACES.get(event.get("collection"))
+            if namespace:
+                self.invalidate(
+                    namespace,
+                    code=event.get("code"),
+                    dates=event.get("dates") or (),
+                    name=event.get("name"),
+                )
+            self._last_event_id = event["_id"]
+        return len(events)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """各命名空间的命中/未命中/失效计数"""
+        with self._lock:
+            counters = {ns: dict(c) for ns, c in self._counters.items()}
+        for namespace in self.ttls:
+            c = counters.setdefault(namespace, {"hits": 0, "misses": 0, "invalidations": 0})
+            total = c["hits"] + c["misses"]
+            c["hit_rate"] = round(c["hits"] / total, 4) if total else 0.0
+            c["size"] = self.backend.size(namespace)
+            c["ttl"] = self.ttls[namespace]
+        return {
+            "backend": type(self.backend).__name__,
+            "evictions": self.backend.evictions,
+            "namespaces": counters,
+        }
+
+
+def cached_query(namespace: str, tag_params: List[str]):
+    """
+    MongoStorage / AsyncMongoStorage 查询方法的读穿透缓存装饰器
+
+    实例的 cache 属性为 None 时直接查询；否则以数据库名、方法名和绑定后的参数作为键
+    （连接不同数据库的实例可以共用同一个缓存），并用 tag_params 中参数的取值打标签，供写入时按 code/date/name 失效。
+    协程方法同样适用，失效事件的拉取放到线程中执行，不阻塞事件循环。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cache_key(self, args, kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop("self", None)
+            tags = [make_tag(namespace, p, params[p]) for p in tag_params if params.get(p)]
+            method = f"{getattr(self, 'db_name', '')}.{func.__name__}"
+            return make_cache_key(method, params), tags
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                cache = getattr(self, "cache", None)
+                if cache is None:
+                    return await func(self, *args, **kwargs)
+
+                key, tags = cache_key(self, args, kwargs)
+                if cache.poll_due():
+                    await asyncio.to_thread(cache.poll_invalidations)
+
+                hit, value = cache.get(namespace, key)
+                if hit:
+                    return _copy_result(value)
+
+                value = await func(self, *args, **kwargs)
+                cache.set(namespace, key, _copy_result(value), tags)
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+
+            key, tags = cache_key(self, args, kwargs)
+            hit, value = cache.get(namespace, key)
+            if hit:
+                return _copy_result(value)
+
+            value = func(self, *args, **kwargs)
+            cache.set(namespace, key, _copy_result(value), tags)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+_query_cache: Optional[QueryCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    """按配置创建进程级查询缓存，未启用时返回 None"""
+    global _query_cache
+    from app.core.config import settings
+
+    if not settings.query_cache_enabled:
+        return None
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                backend = None
+                if settings.query_cache_redis_url:
+                    try:
+                        backend = RedisCacheBackend(settings.query_cache_redis_url)
+                    except Exception as e:
+                        logger.warning(f"Redis缓存不可用，使用进程内缓存: {e}")
+                _query_cache = QueryCache(
+                    backend or LRUCacheBackend(settings.query_cache_max_size),
+                    ttls={
+                        KLINE_NAMESPACE: settings.query_cache_kline_ttl,
+                        CAPITAL_FLOW_NAMESPACE: settings.query_cache_capital_flow_ttl,
+                    },
+                    poll_interval=settings.query_cache_invalidation_poll_interval,
+                )
+    return _query_cache
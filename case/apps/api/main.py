@@ -4,6 +4,9 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from app.api.endpoints import auth, news, aftermarket, stock
 from app.core.config import settings
 from app.core.error import setup_error_handlers
+from app.storage import client_registry, get_default_storage
+from app.data_source import get_health_tracker, get_spot_snapshot
+from app.monitor.async_data_source import close_async_data_source_manager
 import logging
 from logging.handlers import TimedRotatingFileHandler
 import os
@@ -214,8 +217,22 @@ def setup_scheduler():
         logging.info(f"Monitor scheduler configured to run every {monitor_interval} seconds")
 
 
+def ensure_indexes():
+    """创建API查询依赖的索引"""
+    try:
+        results = get_default_storage().ensure_indexes()
+        failed = [name for name, status in results.items() if status != "ok"]
+        if failed:
+            logging.warning(f"Indexes not created: {failed}")
+        else:
+            logging.info(f"{len(results)} indexes ensured")
+    except Exception as e:
+        logging.error(f"Failed to ensure indexes: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
+    ensure_indexes()
     setup_scheduler()
     scheduler.start()
     logging.info("Scheduler started")
@@ -225,6 +242,8 @@ async def startup_event():
 async def shutdown_event():
     scheduler.shutdown()
     logging.info("Scheduler stopped, application shutting down")
+    await client_registry.aclose_all()
+    await close_async_data_source_manager()
 
 
 @app.get("/")
@@ -235,3 +254,25 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/mongodb")
+def mongodb_health_check():
+    """检查共享MongoDB连接池状态"""
+    return client_registry.health_check()
+
+
+@app.get("/health/datasources")
+def datasource_health_check():
+    """各数据源的滚动耗时、失败率、熔断器状态和全市场行情快照"""
+    tracker = get_health_tracker()
+    return {
+        "breaker": {
+            "window": tracker.config.window,
+            "min_calls": tracker.config.min_calls,
+            "failure_rate": tracker.config.failure_rate,
+            "cooldown": tracker.config.cooldown,
+        },
+        "providers": tracker.stats(),
+        "spot_snapshot": get_spot_snapshot().stats(),
+    }
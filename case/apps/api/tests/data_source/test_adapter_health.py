@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据源健康统计、熔断器和按健康度路由
+"""
+
+import sys
+import os
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source import DataSourceManager, DataSourceConfig, HedgeConfig, HealthTracker, BreakerConfig
+
+
+class FakeAdapter:
+    def __init__(self, data=None, delay=0.0):
+        self.data = data
+        self.delay = delay
+        self.calls = 0
+
+    def get_realtime_data(self, code):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.data
+
+    def close(self):
+        pass
+
+
+def make_manager(adapters, health, hedge=None):
+    config = [DataSourceConfig(provider=name, name=name, priority=i + 1) for i, name in enumerate(adapters)]
+    manager = DataSourceManager(config, hedge=hedge or HedgeConfig(enabled=False), health=health)
+    for name, adapter in adapters.items():
+        manager.register_adapter(name, adapter)
+    return manager
+
+
+def test_failing_primary_is_demoted():
+    broken = FakeAdapter(data={})
+    good = FakeAdapter(data={"price": 10.0})
+    health = HealthTracker(BreakerConfig(window=10, min_calls=3, failure_rate=0.5, cooldown=60))
+    manager = make_manager({"tdx": broken, "akshare": good}, health)
+
+    for _ in range(5):
+        assert manager.get_realtime_data("600000") == {"price": 10.0}
+
+    assert broken.calls == 1
+    stats = manager.health_stats()
+    assert stats["tdx"]["get_realtime_data"]["failures"]["empty"] == 1
+    assert stats["akshare"]["get_realtime_data"]["calls"] == 5
+    assert manager.get_best_adapter("realtime") is good
+
+
+def test_half_open_probe_closes_on_success():
+    adapter = FakeAdapter(data={})
+    health = HealthTracker(BreakerConfig(window=10, min_calls=2, failure_rate=0.5, cooldown=0.05))
+    manager = make_manager({"tdx": adapter}, health)
+
+    manager.get_realtime_data("600000")
+    manager.get_realtime_data("600000")
+    assert manager.health_stats()["tdx"]["get_realtime_data"]["state"] == "open"
+    assert manager.get_realtime_data("600000") == {}
+    assert adapter.calls == 2
+
+    time.sleep(0.06)
+    adapter.data = {"price": 1.0}
+    assert manager.get_realtime_data("600000") == {"price": 1.0}
+    assert manager.health_stats()["tdx"]["get_realtime_data"]["state"] == "closed"
+
+
+def test_slow_source_is_demoted_and_timeouts_recorded():
+    health = HealthTracker(BreakerConfig(window=10, min_calls=100))
+    slow = FakeAdapter(data={"price": 1.0}, delay=0.2)
+    fast = FakeAdapter(data={"price": 2.0})
+    manager = make_manager({"slow": slow, "fast": fast}, health, HedgeConfig(fanout=2, hedge_delay=0.0, timeout=0.05))
+
+    assert manager.get_realtime_data("600000") == {"price": 2.0}
+    # 被丢弃的慢调用返回后按超时记录
+    time.sleep(0.3)
+    assert health.stats()["slow"]["get_realtime_data"]["failures"]["timeout"] == 1
+    assert [p for p, _ in manager._ranked_adapters("get_realtime_data")] == ["fast", "slow"]
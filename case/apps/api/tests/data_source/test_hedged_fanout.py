@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试统一数据源的并发对冲查询
+"""
+
+import sys
+import os
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source import DataSourceManager, DataSourceConfig, HedgeConfig, HealthTracker
+
+
+class FakeAdapter:
+    def __init__(self, delay=0.0, data=None, error=None):
+        self.delay = delay
+        self.data = data
+        self.error = error
+        self.calls = 0
+
+    def get_realtime_data(self, code):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.data
+
+    def get_capital_flow(self, code, days=5):
+        return self.get_realtime_data(code)
+
+    def close(self):
+        pass
+
+
+def make_manager(adapters, hedge, timeouts=None):
+    timeouts = timeouts or {}
+    config = [
+        DataSourceConfig(provider=name, name=name, priority=i + 1, timeout_ms=timeouts.get(name))
+        for i, name in enumerate(adapters)
+    ]
+    manager = DataSourceManager(config, hedge=hedge, health=HealthTracker())
+    for name, adapter in adapters.items():
+        manager.register_adapter(name, adapter)
+    return manager
+
+
+def test_slow_primary_is_hedged():
+    slow = FakeAdapter(delay=1.0, data={"price": 1})
+    fast = FakeAdapter(delay=0.01, data={"price": 2})
+    manager = make_manager({"slow": slow, "fast": fast}, HedgeConfig(fanout=2, hedge_delay=0.05, timeout=2.0))
+
+    start = time.monotonic()
+    assert manager.get_realtime_data("600000") == {"price": 2}
+    assert time.monotonic() - start < 0.5
+
+
+def test_failure_and_empty_result_fall_through_immediately():
+    broken = FakeAdapter(error=RuntimeError("mootdx missing"))
+    empty = FakeAdapter(data=[])
+    good = FakeAdapter(data=[{"date": "2026-03-02"}])
+    manager = make_manager(
+        {"broken": broken, "empty": empty, "good": good},
+        HedgeConfig(fanout=1, hedge_delay=5.0, timeout=5.0),
+    )
+
+    start = time.monotonic()
+    assert manager.get_capital_flow("600000") == [{"date": "2026-03-02"}]
+    assert time.monotonic() - start < 1.0
+    assert (broken.calls, empty.calls, good.calls) == (1, 1, 1)
+
+
+def test_per_adapter_deadline_bounds_latency():
+    hanging = FakeAdapter(delay=2.0, data={"price": 1})
+    manager = make_manager({"hanging": hanging}, HedgeConfig(timeout=5.0), timeouts={"hanging": 100})
+
+    start = time.monotonic()
+    assert manager.get_realtime_data("600000") == {}
+    assert time.monotonic() - start < 0.5
+
+
+def test_disabled_hedging_is_sequential():
+    first = FakeAdapter(data={"price": 1})
+    second = FakeAdapter(data={"price": 2})
+    manager = make_manager({"first": first, "second": second}, HedgeConfig(enabled=False))
+
+    assert manager.get_realtime_data("600000") == {"price": 1}
+    assert second.calls == 0
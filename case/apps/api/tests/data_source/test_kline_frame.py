@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试列式K线转换
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source import KLineFrame, StockKLine
+from app.data_source.adapters.tdx_adapter import TDXAdapter
+from app.data_source.kline_tier import MONGO_KLINE_FIELDS
+
+
+def mootdx_bars(days):
+    """mootdx bars 的返回格式：datetime 为 'YYYY-MM-DD 15:00'，按时间升序"""
+    dates = pd.bdate_range("2016-01-04", periods=days)
+    close = np.linspace(10, 20, days)
+    return pd.DataFrame({
+        "open": close - 0.1, "close": close, "high": close + 0.2, "low": close - 0.3,
+        "vol": np.full(days, 1000.0), "volume": np.full(days, 1000.0), "amount": close * 1000,
+        "datetime": dates.strftime("%Y-%m-%d 15:00"),
+    })
+
+
+class FakePool:
+    def __init__(self, df):
+        self.df = df
+
+    def call(self, func):
+        class Client:
+            def bars(inner, symbol, frequency, market):
+                return self.df
+        return func(Client())
+
+
+def test_tdx_bars_are_filtered_and_typed_without_iterrows():
+    adapter = TDXAdapter(pool=FakePool(mootdx_bars(2500)))
+
+    start = time.perf_counter()
+    klines = adapter.get_kline("sh.600000", "2020-01-01", "2020-12-31")
+    elapsed = time.perf_counter() - start
+
+    assert isinstance(klines, KLineFrame)
+    assert klines[0].date >= "2020-01-01" and klines[-1].date <= "2020-12-31"
+    assert klines.frame["volume"].dtype == np.int64
+    assert elapsed < 0.5
+
+    first = klines[0]
+    assert isinstance(first, StockKLine) and first.code == "sh.600000"
+    assert first.turnover_rate is None
+    assert [k.close for k in klines[:3]] == klines.column("close")[:3].tolist()
+
+
+def test_mongo_docs_round_trip():
+    docs = [
+        {"_id": "x2", "code": "sh600000", "date": "2026-03-03", "open": 1, "high": 2, "low": 0.5,
+         "close": 1.5, "volume": 10.0, "amount": 15.0, "turnover": 0.8, "pct_chg": None},
+        {"_id": "x1", "code": "sh600000", "date": "2026-03-02", "open": 1, "high": 2, "low": 0.5,
+         "close": 1.4, "volume": 12.0, "amount": None, "turnover": None, "pct_chg": 1.2},
+    ]
+
+    frame = KLineFrame.from_records(docs, "sh600000", rename=MONGO_KLINE_FIELDS)
+
+    assert [k.date for k in frame] == ["2026-03-02", "2026-03-03"]
+    assert frame[0].change_pct == 1.2 and frame[0].amount == 0.0
+    assert frame[1].turnover_rate == 0.8 and frame[1].change_pct is None
+    records = frame.to_records(rename={"change_pct": "pct_chg"}, drop=["code"])
+    assert records[1]["pct_chg"] is None and "code" not in records[1]
+
+
+def test_list_compatibility():
+    klines = [StockKLine(code="sz.000001", date="2026-03-02", open=1, high=2, low=0.5,
+                         close=1.5, volume=100, amount=150.0)]
+    frame = KLineFrame.coerce(klines)
+
+    assert len(frame) == 1 and frame and not KLineFrame()
+    assert frame[0] == klines[0]
+    assert KLineFrame.coerce(frame) is frame
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试远程K线写回 MongoDB 与缺失区间补取
+"""
+
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source import DataSourceManager, DataSourceConfig, HedgeConfig, HealthTracker, StockKLine
+from app.data_source.kline_tier import KLineWriteBack, merge_ranges, missing_ranges
+
+TODAY = date(2026, 3, 20)  # 周五
+
+
+class FakeStorage:
+    """只实现写回用到的 MongoStorage 接口"""
+
+    def __init__(self):
+        self.docs = {}
+        self.coverage = {}
+        self.upserts = 0
+
+    def upsert_klines(self, code, klines):
+        self.upserts += 1
+        for kline in klines:
+            self.docs[(code, kline["date"])] = dict(kline, code=code)
+        return len(klines)
+
+    def get_kline_coverage(self, code):
+        return [list(r) for r in self.coverage.get(code, [])]
+
+    def set_kline_coverage(self, code, ranges):
+        self.coverage[code] = ranges
+
+    def get_writeback_klines(self, code, start_date=None, end_date=None):
+        return [
+            doc for (c, d), doc in sorted(self.docs.items())
+            if c == code and start_date <= d <= end_date
+        ]
+
+
+class FakeRemote:
+    def __init__(self):
+        self.requests = []
+
+    def get_kline(self, code, start_date, end_date, frequency="d", adjust_flag="3"):
+        self.requests.append((start_date, end_date))
+        day = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        klines = []
+        while day <= end:
+            if day.weekday() < 5:
+                klines.append(StockKLine(code=code, date=day.isoformat(), open=1, high=2, low=0.5,
+                                         close=1.5, volume=100, amount=150.0))
+            day += timedelta(days=1)
+        return klines
+
+    def close(self):
+        pass
+
+
+def make_manager():
+    remote = FakeRemote()
+    storage = FakeStorage()
+    manager = DataSourceManager(
+        [DataSourceConfig(provider="tdx", name="tdx", priority=1)],
+        hedge=HedgeConfig(enabled=False),
+        health=HealthTracker(),
+        kline_tier=KLineWriteBack(storage, today=lambda: TODAY),
+    )
+    manager.register_adapter("tdx", remote)
+    return manager, remote, storage
+
+
+def test_range_arithmetic():
+    covered = merge_ranges([("2026-03-05", "2026-03-10"), ("2026-03-01", "2026-03-04"), ("2026-03-15", "2026-03-16")])
+    assert covered == [["2026-03-01", "2026-03-10"], ["2026-03-15", "2026-03-16"]]
+    assert missing_ranges("2026-02-27", "2026-03-18", covered) == [
+        ("2026-02-27", "2026-02-28"), ("2026-03-11", "2026-03-14"), ("2026-03-17", "2026-03-18"),
+    ]
+
+
+def test_second_request_is_served_from_mongo():
+    manager, remote, storage = make_manager()
+
+    first = manager.get_kline("sh.600000", "2026-03-02", "2026-03-13")
+    second = manager.get_kline("sh.600000", "2026-03-02", "2026-03-13")
+
+    assert [k.date for k in first] == [k.date for k in second]
+    assert len(first) == 10 and first[0].date == "2026-03-02"
+    assert remote.requests == [("2026-03-02", "2026-03-13")]
+
+
+def test_only_missing_ranges_are_fetched():
+    manager, remote, storage = make_manager()
+    manager.get_kline("sh.600000", "2026-03-09", "2026-03-13")
+
+    klines = manager.get_kline("sh.600000", "2026-03-02", "2026-03-25")
+
+    # 今天的K线会重新取，未来日期不请求
+    assert remote.requests[1:] == [("2026-03-02", "2026-03-08"), ("2026-03-14", "2026-03-20")]
+    assert storage.coverage["sh.600000"] == [["2026-03-02", "2026-03-19"]]
+    assert klines[-1].date == "2026-03-20" and len(klines) == 15
+
+    manager.get_kline("sh.600000", "2026-03-02", "2026-03-20")
+    assert remote.requests[-1] == ("2026-03-20", "2026-03-20")
+
+
+def test_adjusted_klines_bypass_writeback():
+    manager, remote, storage = make_manager()
+
+    manager.get_kline("sh.600000", "2026-03-02", "2026-03-06", adjust_flag="2")
+    assert storage.upserts == 0 and remote.requests == [("2026-03-02", "2026-03-06")]
+
+
+class ListedRemote(FakeRemote):
+    """2026-03-04 上市，之前没有K线"""
+
+    def get_kline(self, code, start_date, end_date, frequency="d", adjust_flag="3"):
+        return super().get_kline(code, max(start_date, "2026-03-04"), end_date, frequency, adjust_flag)
+
+
+class LatestBarsRemote(FakeRemote):
+    """类似通达信：只返回最近几根K线，再按日期过滤"""
+
+    honours_start_date = False
+
+    def get_kline(self, code, start_date, end_date, frequency="d", adjust_flag="3"):
+        klines = super().get_kline(code, max(start_date, "2026-03-09"), end_date, frequency, adjust_flag)
+        self.requests[-1] = (start_date, end_date)
+        return klines
+
+
+def test_coverage_starts_at_first_returned_kline():
+    manager, remote, storage = make_manager()
+    manager.register_adapter("tdx", ListedRemote())
+
+    manager.get_kline("sh.600000", "2026-02-23", "2026-03-13")
+
+    assert storage.coverage["sh.600000"] == [["2026-03-04", "2026-03-13"]]
+
+
+def test_source_ignoring_start_date_covers_from_first_kline():
+    manager, remote, storage = make_manager()
+    latest = LatestBarsRemote()
+    manager.register_adapter("tdx", latest)
+
+    first = manager.get_kline("sh.600000", "2026-03-02", "2026-03-13")
+    second = manager.get_kline("sh.600000", "2026-03-09", "2026-03-13")
+
+    assert first[0].date == "2026-03-09"
+    assert [k.date for k in second] == [k.date for k in first]
+    assert storage.coverage["sh.600000"] == [["2026-03-09", "2026-03-13"]]
+    assert latest.requests == [("2026-03-02", "2026-03-13")]
+
+
+def test_earlier_dates_are_filled_from_source_honouring_start_date():
+    storage = FakeStorage()
+    manager = DataSourceManager(
+        [
+            DataSourceConfig(provider="tdx", name="tdx", priority=1),
+            DataSourceConfig(provider="baostock", name="baostock", priority=2),
+        ],
+        hedge=HedgeConfig(enabled=False),
+        health=HealthTracker(),
+        kline_tier=KLineWriteBack(storage, today=lambda: TODAY),
+    )
+    latest, full = LatestBarsRemote(), FakeRemote()
+    manager.register_adapter("tdx", latest)
+    manager.register_adapter("baostock", full)
+
+    klines = manager.get_kline("sh.600000", "2026-03-02", "2026-03-13")
+    manager.get_kline("sh.600000", "2026-03-02", "2026-03-13")
+
+    assert klines[0].date == "2026-03-02" and len(klines) == 10
+    assert storage.coverage["sh.600000"] == [["2026-03-02", "2026-03-13"]]
+    assert latest.requests == [("2026-03-02", "2026-03-13")]
+    assert full.requests == [("2026-03-02", "2026-03-08")]
+
+
+def test_mongo_read_failure_returns_remote_klines():
+    manager, remote, storage = make_manager()
+
+    def fail(*args, **kwargs):
+        raise ConnectionError("mongo down")
+
+    storage.get_writeback_klines = fail
+    klines = manager.get_kline("sh.600000", "2026-03-02", "2026-03-06")
+
+    assert [k.date for k in klines] == ["2026-03-02", "2026-03-03", "2026-03-04", "2026-03-05", "2026-03-06"]
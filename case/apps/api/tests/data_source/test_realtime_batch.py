@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量实时行情
+"""
+
+import sys
+import os
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source import DataSourceManager, DataSourceConfig, HedgeConfig, HealthTracker
+from app.data_source.interface import IDataSource
+from app.monitor.data_source import SinaDataSource
+
+
+class FakeBatchAdapter:
+    def __init__(self, quotes):
+        self.quotes = quotes
+        self.requests = []
+
+    def get_realtime_batch(self, codes):
+        self.requests.append(list(codes))
+        return {code: self.quotes[code] for code in codes if code in self.quotes}
+
+    def close(self):
+        pass
+
+
+def make_manager(adapters):
+    config = [DataSourceConfig(provider=name, name=name, priority=i + 1) for i, name in enumerate(adapters)]
+    manager = DataSourceManager(config, hedge=HedgeConfig(enabled=False), health=HealthTracker())
+    for name, adapter in adapters.items():
+        manager.register_adapter(name, adapter)
+    return manager
+
+
+def test_missing_codes_go_to_next_source_in_one_request():
+    primary = FakeBatchAdapter({"600000": {"close": 10.0}, "000001": {"close": 11.0}})
+    backup = FakeBatchAdapter({"600000": {"close": 99.0}, "300750": {"close": 180.0}})
+    manager = make_manager({"primary": primary, "backup": backup})
+
+    result = manager.get_realtime_batch(["600000", "000001", "300750", "600000"])
+
+    assert result == {"600000": {"close": 10.0}, "000001": {"close": 11.0}, "300750": {"close": 180.0}}
+    assert primary.requests == [["600000", "000001", "300750"]]
+    assert backup.requests == [["300750"]]
+
+
+def test_default_batch_loops_over_single_quotes():
+    class SingleOnly:
+        get_realtime_batch = IDataSource.get_realtime_batch
+
+        def get_realtime_data(self, code):
+            return {"close": 1.0} if code == "600000" else {}
+
+    assert SingleOnly().get_realtime_batch(["600000", "000001"]) == {"600000": {"close": 1.0}}
+
+
+def test_sina_parses_multi_symbol_response():
+    class FakeResponse:
+        status_code = 200
+        text = (
+            'var hq_str_sh600000="浦发银行,10.10,10.00,10.20,10.30,9.90,10.19,10.20,123400,1256000.00";\n'
+            'var hq_str_sz000001="";\n'
+        )
+
+    class FakeSession:
+        def __init__(self):
+            self.urls = []
+
+        def get(self, url, timeout=None):
+            self.urls.append(url)
+            return FakeResponse()
+
+    source = SinaDataSource()
+    source._session = FakeSession()
+
+    result = source.get_stock_data_batch(["600000", "000001"])
+
+    assert source._session.urls == ["https://hq.sinajs.cn/list=sh600000,sz000001"]
+    assert list(result) == ["600000"]
+    assert result["600000"]["current_price"] == 10.2
+    assert result["600000"]["open_price"] == 10.1
+    assert result["600000"]["close_price"] == 10.0
+    assert result["600000"]["volume"] == 123400
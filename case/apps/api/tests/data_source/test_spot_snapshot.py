@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试全市场行情快照
+"""
+
+import sys
+import os
+import time
+import threading
+
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source import SpotSnapshot
+from app.data_source.adapters.akshare_adapter import AkshareAdapter
+
+SPOT = pd.DataFrame([
+    {"代码": "600000", "名称": "浦发银行", "最新价": 10.2, "涨跌额": 0.2, "涨跌幅": 2.0,
+     "成交量": 1000, "成交额": 10200.0, "今开": 10.1, "最高": 10.3, "最低": 9.9},
+    {"代码": "000001", "名称": "平安银行", "最新价": 11.0, "涨跌额": -0.1, "涨跌幅": -0.9,
+     "成交量": 2000, "成交额": 22000.0, "今开": 11.1, "最高": 11.2, "最低": 10.9},
+])
+
+
+class FakeFetch:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.error = None
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SPOT
+
+
+def test_lookups_share_one_fetch_per_interval():
+    fetch = FakeFetch(delay=0.05)
+    snapshot = SpotSnapshot(fetch, ttl=60)
+
+    threads = [threading.Thread(target=snapshot.lookup, args=(["600000"],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows, meta = snapshot.lookup(["000001", "999999"])
+
+    assert fetch.calls == 1
+    assert list(rows) == ["000001"]
+    assert meta["stale"] is False
+
+
+def test_failed_refresh_serves_stale_snapshot():
+    fetch = FakeFetch()
+    snapshot = SpotSnapshot(fetch, ttl=0.05)
+    snapshot.lookup()
+
+    time.sleep(0.06)
+    fetch.error = ConnectionError("eastmoney down")
+    rows, meta = snapshot.lookup(["600000"])
+    assert rows["600000"]["名称"] == "浦发银行"
+    assert meta["stale"] is True and meta["snapshot_age"] >= 0.05
+
+    # 失败后一个刷新周期内不再重试
+    snapshot.lookup(["600000"])
+    assert fetch.calls == 2
+
+
+def test_adapter_quotes_carry_staleness_metadata():
+    fetch = FakeFetch()
+    adapter = AkshareAdapter(spot_snapshot=SpotSnapshot(fetch, ttl=60))
+
+    quotes = adapter.get_realtime_batch(["sh.600000", "000001"])
+    single = adapter.get_realtime_data("600000")
+
+    assert fetch.calls == 1
+    assert quotes["sh.600000"]["close"] == 10.2 and quotes["000001"]["open"] == 11.1
+    assert single["stale"] is False and "snapshot_time" in single
+    assert adapter.get_stock_info("600000").name == "浦发银行"
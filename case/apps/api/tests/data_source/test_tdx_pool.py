@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试通达信长连接池
+"""
+
+import sys
+import os
+import socket
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.data_source.tdx_pool import PoolTimeout, TDXConnectionPool
+from app.data_source.adapters.tdx_adapter import TDXAdapter
+
+
+class FakeClient:
+    def __init__(self, server, fail_next=False):
+        self.server = server or ("119.147.212.81", 7709)
+        self.fail_next = fail_next
+        self.closed = False
+        self.requests = 0
+
+    def quotes(self, symbol, market=None):
+        self.requests += 1
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionResetError("connection reset")
+        symbols = symbol if isinstance(symbol, list) else [symbol]
+        return pd.DataFrame([
+            {"code": code, "price": 10.5, "last_close": 10.0, "open": 10.1,
+             "high": 10.6, "low": 9.9, "volume": 100, "amount": 1050.0}
+            for code in symbols
+        ])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeFactory:
+    def __init__(self):
+        self.calls = []
+        self.clients = []
+        self.fail_first = False
+
+    def __call__(self, server, bestip):
+        self.calls.append((server, bestip))
+        client = FakeClient(server, fail_next=self.fail_first and not self.clients)
+        self.clients.append(client)
+        return client
+
+
+def test_connections_are_reused_and_server_cached():
+    factory = FakeFactory()
+    adapter = TDXAdapter(pool=TDXConnectionPool(max_size=2, factory=factory))
+
+    for _ in range(5):
+        quote = adapter.get_realtime_data("sh.600000")
+    assert quote["price"] == 10.5 and quote["change_pct"] == pytest.approx(5.0)
+    assert factory.calls == [(None, True)]
+    assert factory.clients[0].requests == 5
+
+    adapter.close()
+    assert factory.clients[0].closed
+
+
+def test_broken_connection_is_replaced_and_retried():
+    factory = FakeFactory()
+    factory.fail_first = True
+    pool = TDXConnectionPool(max_size=2, factory=factory)
+    adapter = TDXAdapter(pool=pool)
+
+    assert adapter.get_realtime_batch(["600000", "000001"])["000001"]["close"] == 10.5
+    assert factory.clients[0].closed
+    # 失效后重新测速选服务器
+    assert factory.calls == [(None, True), (None, True)]
+    assert pool.stats()["size"] == 1
+
+
+def test_checkout_waits_for_returned_connection():
+    pool = TDXConnectionPool(max_size=1, checkout_timeout=1.0, factory=FakeFactory())
+    client = pool.checkout()
+    threading.Timer(0.05, pool.checkin, args=(client,)).start()
+
+    start = time.monotonic()
+    assert pool.checkout() is client
+    assert time.monotonic() - start < 0.5
+
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+
+
+def test_request_timeout_is_retried_on_new_connection():
+    factory = FakeFactory()
+    pool = TDXConnectionPool(max_size=1, factory=factory)
+    attempts = []
+
+    def request(client):
+        attempts.append(client)
+        if len(attempts) == 1:
+            raise socket.timeout("timed out")
+        return client.quotes("600000")
+
+    assert pool.call(request)["code"].tolist() == ["600000"]
+    assert attempts[0] is not attempts[1] and attempts[0].closed
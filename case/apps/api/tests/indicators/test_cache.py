@@ -0,0 +1,189 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.collector.technical_indicators import TechnicalIndicators
+from app.indicators import IndicatorCache, IndicatorSeries, kernels
+from app.monitor.analysis.technical import TechnicalAnalyzer
+
+
+def bars(days=300, seed=1, start="2023-01-02"):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    return pd.DataFrame({
+        "date": pd.bdate_range(start, periods=days).strftime("%Y-%m-%d"),
+        "close": close,
+        "high": close * 1.01,
+        "low": close * 0.99,
+    })
+
+
+def assert_same_series(actual, expected):
+    assert list(actual.dates) == list(expected.dates)
+    for name in expected.names:
+        np.testing.assert_allclose(actual.column(name), expected.column(name), rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+class FakeStorage:
+    def __init__(self):
+        self.docs = {}
+        self.saves = []
+
+    def get_indicator_cache(self, codes, params_key):
+        return {code: self.docs[(code, params_key)] for code in codes if (code, params_key) in self.docs}
+
+    def save_indicator_cache(self, entries, params_key):
+        self.saves.append(sorted(entries))
+        for code, entry in entries.items():
+            self.docs[(code, params_key)] = entry
+        return len(entries)
+
+
+def test_tail_extension_matches_full_computation():
+    df = bars()
+    full = IndicatorSeries("600000")
+    full.extend(df)
+
+    incremental = IndicatorSeries("600000")
+    for end in range(5, len(df) + 7, 7):
+        # 每次都带上几根已缓存的K线，与按日期范围取K线的调用方式一致
+        incremental.extend(df.iloc[max(0, end - 10):end])
+
+    assert incremental.bars == full.bars == len(df)
+    assert_same_series(incremental, full)
+    close, high, low = (df[name].to_numpy() for name in ("close", "high", "low"))
+    np.testing.assert_allclose(full.column("rsi_wilder"), kernels.rsi_wilder(close))
+    np.testing.assert_allclose(full.column("macd_signal"), kernels.macd(close)[1])
+    np.testing.assert_allclose(full.column("k"), kernels.kdj(close, high, low)[0])
+    np.testing.assert_allclose(full.column("ma20"), kernels.rolling_mean(close, 20))
+
+
+def test_round_trip_and_invalidation():
+    entry = IndicatorSeries("600000")
+    entry.extend(bars(100), max_bars=60)
+    restored = IndicatorSeries.from_dict(entry.to_dict())
+
+    assert len(restored) == 60 and restored.bars == 100
+    assert_same_series(restored, entry)
+    assert IndicatorSeries.from_dict(entry.to_dict(), {"ma": (5, 30)}) is None
+    assert IndicatorSeries.from_dict({**entry.to_dict(), "version": 0}) is None
+
+    # 最后一根K线的收盘价变了（复权），不能接着计算
+    revised = bars(101).iloc[-3:].copy()
+    revised["close"] *= 1.1
+    assert entry.extend(revised) is None
+
+    # 不含 last_date 且从其之后开始的K线无法确认中间没有缺口
+    assert entry.extend(bars(110).iloc[102:]) is None
+    assert entry.last_date == bars(100)["date"].iloc[-1]
+
+
+def test_cache_fetches_only_the_missing_tail():
+    storage, calls = FakeStorage(), []
+    history = bars(260)
+
+    def fetch_klines(code, start_date, end_date):
+        calls.append((start_date, end_date))
+        return history[(history["date"] >= start_date) & (history["date"] <= end_date)]
+
+    day1, day2 = history["date"].iloc[249], history["date"].iloc[259]
+    cache = IndicatorCache(storage, fetch_klines, max_bars=500, history_days=400, today=lambda: day1)
+    first = cache.get("600000")
+    assert first.last_date == day1 and storage.saves == [["600000"]]
+    assert cache.get("600000") is first and len(calls) == 1  # 当天不再取K线
+
+    # 第二天的新进程：从 MongoDB 读回缓存，只取 last_date 之后的K线
+    cache = IndicatorCache(storage, fetch_klines, max_bars=500, history_days=400, today=lambda: day2)
+    entry = cache.get("600000")
+    expected = IndicatorSeries("600000")
+    expected.extend(history)
+
+    assert calls[-1] == (day1, day2)
+    assert entry.bars == 260
+    assert_same_series(entry, expected)
+
+
+def test_cache_recomputes_when_history_changes():
+    storage = FakeStorage()
+    history = bars(80)
+    cache = IndicatorCache(storage, max_bars=500, history_days=400)
+    cache.get("600000", history.iloc[:70])
+
+    adjusted = history.assign(close=history["close"] * 0.9, high=history["high"] * 0.9, low=history["low"] * 0.9)
+    entry = IndicatorCache(storage, max_bars=500, history_days=400).get("600000", adjusted)
+    expected = IndicatorSeries("600000")
+    expected.extend(adjusted)
+
+    assert_same_series(entry, expected)
+
+
+def test_collector_lookup_matches_calculate_all():
+    market = pd.concat([bars(120, seed=i).assign(symbol=f"sh.{600000 + i}") for i in range(5)])
+    dates = sorted(market["date"].unique())
+    # 上市较晚的股票在选股窗口内处于预热期
+    market = pd.concat([market, bars(20, seed=9, start=dates[90]).assign(symbol="sh.600009")])
+    market = market.sort_values(["date", "symbol"]).reset_index(drop=True)
+    window = lambda end: market[(market["date"] > dates[end - 60]) & (market["date"] <= dates[end])].copy()
+    columns = ["ma5", "ma10", "ma20", "rsi", "macd", "macd_signal", "macd_hist"]
+
+    storage = FakeStorage()
+    cache = IndicatorCache(storage, max_bars=500, history_days=400)
+    # 先用全部历史建立缓存，之后的选股只带最近60天的K线
+    history = market[market["date"] <= dates[100]]
+    cache.get_many([f"sh.{600000 + i}" for i in range(5)], dict(tuple(history.groupby("symbol"))))
+    for end in (100, 119):
+        pd.testing.assert_frame_equal(
+            TechnicalIndicators.calculate_cached(window(end), IndicatorCache(storage, max_bars=500, history_days=400))[columns],
+            TechnicalIndicators.calculate_all(window(end))[columns],
+            check_exact=False, rtol=1e-9, atol=1e-9,
+        )
+    assert storage.docs[("sh.600000", cache.key)]["bars"] == 120
+    assert storage.docs[("sh.600009", cache.key)]["bars"] == 20
+
+
+def test_analyzer_lookup_matches_analyze_stock():
+    df = bars(80)
+    analyzer = TechnicalAnalyzer(IndicatorCache(max_bars=500, history_days=400))
+    expected = TechnicalAnalyzer().analyze_stock({name: df[name].tolist() for name in ("close", "high", "low")})
+    actual = analyzer.lookup("600000", df)
+
+    assert abs(actual["rsi"] - expected["rsi"]) < 1e-9
+    for name in ("macd", "kdj", "bollinger"):
+        for key, value in expected[name].items():
+            assert abs(actual[name][key] - value) < 1e-9, (name, key)
+
+    short = analyzer.lookup("000001", bars(20))
+    assert short["macd"] == {"macd": 0.0, "signal": 0.0, "histogram": 0.0}
+    assert analyzer.lookup("000002", bars(0)) is None
+    assert TechnicalAnalyzer().lookup("600000", df) is None
+
+
+def test_dashboard_endpoint_serves_cached_series():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.endpoints import stock
+
+    history, calls = bars(80), []
+
+    def fetch_klines(code, start_date, end_date):
+        calls.append(code)
+        return history if code == "600000" else history.iloc[:0]
+
+    analyzer = TechnicalAnalyzer(IndicatorCache(fetch_klines=fetch_klines, max_bars=500, history_days=400))
+    app = FastAPI()
+    app.include_router(stock.router)
+    app.dependency_overrides[stock.get_indicator_analyzer] = lambda: analyzer
+    client = TestClient(app)
+
+    data = client.get("/stock/indicators/600000", params={"days": 30}).json()["data"]
+    expected = TechnicalAnalyzer().analyze_stock({name: history[name].tolist() for name in ("close", "high", "low")})
+    assert data["dates"] == history["date"].iloc[-30:].tolist() and len(data["macd"]["histogram"]) == 30
+    assert abs(data["latest"]["rsi"] - expected["rsi"]) < 1e-9
+    assert abs(data["rsi"][-1] - expected["rsi"]) < 1e-9
+    assert client.get("/stock/indicators/000001").status_code == 404
+    assert calls == ["600000", "000001"]
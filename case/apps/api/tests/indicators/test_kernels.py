@@ -0,0 +1,112 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.indicators import NUMBA_AVAILABLE, get_backend, kernels, set_backend
+
+N = None  # 预热期
+
+CLOSE = [10.0, 10.5, 10.2, 10.8, 11.0, 10.6, 10.9, 11.3, 11.1, 11.6]
+HIGH = [c + 0.3 for c in CLOSE]
+LOW = [c - 0.25 for c in CLOSE]
+
+# 用逐元素循环独立算出的基准值（保留 10 位小数）
+GOLDEN = {
+    "ema3": [10.0, 10.25, 10.225, 10.5125, 10.75625, 10.678125, 10.7890625, 11.04453125, 11.072265625, 11.3361328125],
+    "sma3": [N, N, 10.2333333333, 10.5, 10.6666666667, 10.8, 10.8333333333, 10.9333333333, 11.1, 11.3333333333],
+    "rsi_sma3": [N, N, 62.5, 78.5714285714, 72.7272727273, 66.6666666667, 55.5555555556, 63.6363636364, 77.7777777778, 81.8181818182],
+    "rsi_wilder3": [N, N, N, 78.5714285714, 82.3529411765, 53.8461538462, 66.7820069204, 78.7139689579, 62.0087336245, 78.8449848024],
+    "macd": [0.0, 0.0833333333, 0.0472222222, 0.1273148148, 0.1661265432, 0.0847093621, 0.0934520748, 0.1474576332, 0.1075498804, 0.1596556495],
+    "signal": [0.0, 0.0555555556, 0.05, 0.1015432099, 0.1445987654, 0.1046724966, 0.0971922154, 0.1307024939, 0.1152674183, 0.1448595724],
+    "k": [N, N, 47.619047619, 56.3837129055, 63.5150678629, 51.1153083998, 53.3751178806, 60.9167452537, 56.4006371867, 61.4099486007],
+    "d": [N, N, 49.2063492063, 51.5988037727, 55.5708918028, 54.0856973351, 53.8488375169, 56.2048067625, 56.2700835706, 57.9833719139],
+    "upper": [N, N, N, 10.9812177826, 11.2312177826, 11.2416079783, 11.1208039892, 11.45, 11.4922040216, 11.7422040216],
+    "lower": [N, N, N, 9.7687822174, 10.0187822174, 10.0583920217, 10.5291960108, 10.45, 10.4577959784, 10.7077959784],
+}
+
+BACKENDS = ["numpy"] + (["numba"] if NUMBA_AVAILABLE else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = get_backend()
+    set_backend(request.param)
+    yield request.param
+    set_backend(previous)
+
+
+def assert_golden(actual, name):
+    expected = np.array([np.nan if value is None else value for value in GOLDEN[name]])
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9, err_msg=name)
+
+
+def test_golden_values(backend):
+    macd, signal, _ = kernels.macd(CLOSE, 3, 5, 2)
+    k, d, _ = kernels.kdj(CLOSE, HIGH, LOW, 3)
+    upper, _, lower = kernels.bollinger(CLOSE, 4, 2.0)
+
+    assert_golden(kernels.ema(CLOSE, 3), "ema3")
+    assert_golden(kernels.rolling_mean(CLOSE, 3), "sma3")
+    assert_golden(kernels.rsi_sma(CLOSE, 3), "rsi_sma3")
+    assert_golden(kernels.rsi_wilder(CLOSE, 3), "rsi_wilder3")
+    assert_golden(macd, "macd")
+    assert_golden(signal, "signal")
+    assert_golden(k, "k")
+    assert_golden(d, "d")
+    assert_golden(upper, "upper")
+    assert_golden(lower, "lower")
+
+
+def test_panel_rows_match_single_series(backend):
+    panel = np.vstack([CLOSE, CLOSE[::-1]])
+
+    np.testing.assert_allclose(kernels.ema(panel, 3)[0], kernels.ema(CLOSE, 3))
+    np.testing.assert_allclose(kernels.rsi_wilder(panel, 3)[1], kernels.rsi_wilder(CLOSE[::-1], 3))
+    np.testing.assert_allclose(kernels.rsi_sma(panel, 3)[1], kernels.rsi_sma(CLOSE[::-1], 3))
+
+
+@pytest.mark.parametrize("alpha", [1.0, 0.999999, 2 / 3, 1 / 3, 2 / 27, 1 / 14, 0.001])
+def test_recursive_filter_matches_loop(backend, alpha):
+    x = 10 + np.cumsum(np.random.default_rng(7).normal(0, 0.2, 3000))
+    expected, previous = [], 50.0
+    for value in x:
+        previous = (1 - alpha) * previous + alpha * value
+        expected.append(previous)
+
+    np.testing.assert_allclose(kernels.recursive_filter(x, alpha, 50.0), expected, rtol=1e-9)
+
+
+def test_matches_pandas_with_gaps(backend):
+    rng = np.random.default_rng(2)
+    values = 10 + np.cumsum(rng.normal(0, 0.3, 200))
+    values[[0, 1, 30, 31, 32, 90, 150]] = np.nan
+    series = pd.Series(values)
+
+    for span in (9, 12, 26):
+        np.testing.assert_allclose(
+            kernels.ema(values, span), series.ewm(span=span, adjust=False).mean(), rtol=1e-12
+        )
+    for window, min_periods in ((5, None), (20, None), (5, 1)):
+        np.testing.assert_allclose(
+            kernels.rolling_mean(values, window, min_periods),
+            series.rolling(window, min_periods=min_periods or window).mean(),
+            rtol=1e-9,
+        )
+
+
+def test_rsi_without_losses_is_100():
+    rising = np.arange(1.0, 21.0)
+
+    assert kernels.rsi_sma(rising, 14)[-1] == 100.0
+    assert kernels.rsi_wilder(rising, 14)[-1] == 100.0
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        set_backend("cuda")
@@ -0,0 +1,68 @@
+"""
+指标内核性能基准（pytest-benchmark）
+
+    pytest tests/indicators/test_kernels_benchmark.py --benchmark-only
+    pytest tests/indicators/test_kernels_benchmark.py --benchmark-compare  # 与上次保存的结果对比
+
+未安装 pytest-benchmark 时整个文件跳过。
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.indicators import NUMBA_AVAILABLE, get_backend, kernels, set_backend
+
+BACKENDS = ["numpy"] + (["numba"] if NUMBA_AVAILABLE else [])
+
+rng = np.random.default_rng(0)
+# 全市场面板：5000 只股票 × 250 个交易日
+PANEL = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (5000, 250)), axis=1))
+# 单只股票的长序列
+SERIES = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, 100_000)))
+SPREAD = np.abs(rng.normal(0, 0.01, SERIES.shape)) * SERIES
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = get_backend()
+    set_backend(request.param)
+    # 预热编译内核
+    kernels.ema(PANEL[:2, :10], 12)
+    kernels.recursive_filter(SERIES[:10], 0.5, 0.0)
+    yield request.param
+    set_backend(previous)
+
+
+def test_panel_ema(benchmark, backend):
+    benchmark(kernels.ema, PANEL, 12)
+
+
+def test_panel_macd(benchmark, backend):
+    benchmark(kernels.macd, PANEL)
+
+
+def test_panel_rsi_sma(benchmark, backend):
+    benchmark(kernels.rsi_sma, PANEL, 14)
+
+
+def test_panel_rolling_mean(benchmark):
+    benchmark(kernels.rolling_mean, PANEL, 20)
+
+
+def test_series_rsi_wilder(benchmark, backend):
+    benchmark(kernels.rsi_wilder, SERIES, 14)
+
+
+def test_series_kdj(benchmark, backend):
+    benchmark(kernels.kdj, SERIES, SERIES + SPREAD, SERIES - SPREAD, 9)
+
+
+def test_series_bollinger(benchmark):
+    benchmark(kernels.bollinger, SERIES, 20)
@@ -0,0 +1,113 @@
+import asyncio
+import sys
+import os
+
+import httpx
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+
+from app.monitor.async_data_source import (
+    AsyncEastmoneyDataSource,
+    AsyncMultiDataSourceManager,
+    AsyncSinaDataSource,
+)
+
+
+def watchlist(count):
+    return [f"{600000 + i}" for i in range(count // 2)] + [f"sz{i:06d}" for i in range(1, count - count // 2 + 1)]
+
+
+def sina_handler(requests):
+    def handler(request):
+        requests.append(request)
+        symbols = str(request.url).split("list=")[-1]
+        lines = [
+            f'var hq_str_{symbol}="股票{symbol},10.00,9.90,10.10,10.20,9.80,10.09,10.10,123400,1246340.00";'
+            for symbol in symbols.split(",")
+        ]
+        return httpx.Response(200, text="\n".join(lines))
+    return handler
+
+
+def test_sina_watchlist_in_one_request():
+    requests = []
+    source = AsyncSinaDataSource(transport=httpx.MockTransport(sina_handler(requests)))
+    codes = watchlist(300)
+
+    async def run():
+        try:
+            return await source.get_stock_data_batch(codes)
+        finally:
+            await source.aclose()
+
+    data = asyncio.run(run())
+
+    assert len(requests) == 1
+    assert requests[0].headers["Referer"] == "https://finance.sina.com.cn"
+    assert set(data) == set(codes)
+    assert data["600000"]["current_price"] == 10.10 and data["600000"]["close_price"] == 9.90
+    assert data["sz000001"]["volume"] == 123400
+
+
+def test_sina_chunks_respect_concurrency_limit():
+    in_flight, peak, requests = 0, 0, []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return sina_handler(requests)(request)
+
+    source = AsyncSinaDataSource(concurrency=2, transport=httpx.MockTransport(handler))
+    source.batch_size = 10
+
+    async def run():
+        try:
+            return await source.get_stock_data_batch(watchlist(100))
+        finally:
+            await source.aclose()
+
+    data = asyncio.run(run())
+
+    assert len(data) == 100 and len(requests) == 10
+    assert peak <= 2
+
+
+def test_eastmoney_parses_ulist_and_falls_back():
+    def eastmoney(request):
+        secids = request.url.params["secids"].split(",")
+        diff = [
+            {"f12": secid.split(".")[1], "f13": int(secid.split(".")[0]), "f14": "名称",
+             "f2": 10.5, "f5": 1200, "f6": 1.26e6, "f15": 10.8, "f16": 10.1, "f17": 10.2, "f18": 10.0}
+            for secid in secids if secid not in ("0.000002", "0.000003")
+        ]
+        diff.append({"f12": "000003", "f13": 0, "f14": "停牌", "f2": "-"})
+        return httpx.Response(200, json={"rc": 0, "data": {"total": len(diff), "diff": diff}})
+
+    class Fallback:
+        def __init__(self):
+            self.calls = []
+
+        def get_stock_data_batch(self, codes):
+            self.calls.append(codes)
+            return {code: {"code": code, "current_price": 1.0} for code in codes}
+
+    fallback = Fallback()
+    manager = AsyncMultiDataSourceManager(
+        sources=[AsyncEastmoneyDataSource(transport=httpx.MockTransport(eastmoney))], fallback=fallback
+    )
+
+    async def run():
+        try:
+            return await manager.get_stock_data_batch(["600000", "sz000001", "sz000002", "sz000003"])
+        finally:
+            await manager.aclose()
+
+    data = asyncio.run(run())
+
+    assert data["600000"]["current_price"] == 10.5 and data["600000"]["volume"] == 120000
+    assert data["sz000001"]["close_price"] == 10.0
+    assert fallback.calls == [["sz000002", "sz000003"]]
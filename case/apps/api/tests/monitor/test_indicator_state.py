@@ -0,0 +1,99 @@
+import json
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+sys.path.insert(0, current_dir)
+
+from app.data_source.kline_frame import KLineFrame
+from app.monitor.analysis.streaming import IndicatorState, IndicatorStateCache
+from app.monitor.analysis.technical import TechnicalAnalyzer
+from bench_indicators import random_walk
+
+
+def assert_same(actual, expected):
+    assert actual["rsi"] == pytest.approx(expected["rsi"], rel=1e-9)
+    for key in ("macd", "kdj", "bollinger"):
+        assert actual[key] == pytest.approx(expected[key], rel=1e-9, abs=1e-9), key
+
+
+@pytest.mark.parametrize("bars", [5, 12, 30, 40, 300])
+def test_streaming_matches_batch(bars):
+    data = {key: values.tolist() for key, values in random_walk(bars).items()}
+    state = IndicatorState("600000")
+    for close, high, low in zip(data["close"][:-1], data["high"][:-1], data["low"][:-1]):
+        state.update(close, high, low)
+
+    snapshot = state.snapshot(data["close"][-1], data["high"][-1], data["low"][-1])
+
+    assert_same(snapshot, TechnicalAnalyzer().analyze_stock(data))
+    # snapshot 不改变状态
+    assert_same(state.current(), TechnicalAnalyzer().analyze_stock({key: values[:-1] for key, values in data.items()}))
+
+
+def test_checkpoint_round_trip_continues_identically():
+    data = random_walk(80)
+    state = IndicatorState("600000")
+    for close, high, low in zip(data["close"][:60], data["high"][:60], data["low"][:60]):
+        state.update(float(close), float(high), float(low), "2024-03-01")
+
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    for close, high, low in zip(data["close"][60:], data["high"][60:], data["low"][60:]):
+        state.update(float(close), float(high), float(low))
+        restored.update(float(close), float(high), float(low))
+
+    assert restored.last_date == "2024-03-01"
+    assert restored.current() == state.current()
+    assert IndicatorState.from_dict({**state.to_dict(), "version": 0}) is None
+
+
+class FakeStorage:
+    def __init__(self):
+        self.states = {}
+
+    def get_indicator_states(self, codes):
+        return {code: self.states[code] for code in codes if code in self.states}
+
+    def save_indicator_states(self, states):
+        self.states.update(json.loads(json.dumps(states)))
+        return len(states)
+
+
+def make_frame(code, dates):
+    data = random_walk(len(dates))
+    return KLineFrame.from_frame(pd.DataFrame({"date": dates, **data, "open": data["close"]}), code)
+
+
+def test_cache_fetches_once_per_day_and_resumes_from_checkpoint():
+    dates = pd.bdate_range("2024-01-01", "2024-03-05").strftime("%Y-%m-%d").tolist()
+    frame = make_frame("600000", dates)
+    calls, today = [], ["2024-03-05"]
+
+    def fetch(code, start_date, end_date):
+        calls.append((start_date, end_date))
+        return KLineFrame.from_frame(frame.frame, code, start_date=start_date, end_date=end_date)
+
+    storage = FakeStorage()
+    cache = IndicatorStateCache(storage, fetch, warmup_days=120, today=lambda: today[0])
+    state = cache.get("600000")
+    cache.get("600000")
+
+    assert calls == [("2023-11-06", "2024-03-05")]
+    # 当天的K线未收盘，不入状态
+    assert state.last_date == "2024-03-04"
+    assert storage.states["600000"]["last_date"] == "2024-03-04"
+
+    # 重启后从检查点继续，只请求检查点之后的K线
+    today[0] = "2024-03-06"
+    restarted = IndicatorStateCache(storage, fetch, warmup_days=120, today=lambda: today[0])
+    resumed = restarted.get("600000")
+
+    assert calls[-1] == ("2024-03-05", "2024-03-06")
+    assert resumed.last_date == "2024-03-05"
+    expected = IndicatorState("600000")
+    expected.update_frame(frame)
+    assert_same(resumed.current(), expected.current())
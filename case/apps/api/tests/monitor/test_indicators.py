@@ -0,0 +1,63 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+sys.path.insert(0, current_dir)
+
+from app.monitor.analysis.technical import TechnicalAnalyzer
+from bench_indicators import LegacyTechnicalAnalyzer, compare, random_walk
+
+
+def wilder_rsi(prices, period=14):
+    """逐元素的标准 Wilder RSI，作为对照"""
+    deltas = np.diff(prices)
+    gains, losses = np.clip(deltas, 0, None), np.clip(-deltas, 0, None)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    for i in range(period, len(deltas)):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+    return 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+@pytest.mark.parametrize("bars", [35, 250, 5000])
+def test_matches_legacy_implementation(bars):
+    data = random_walk(bars)
+    close, high, low = (data[key].tolist() for key in ("close", "high", "low"))
+    legacy, engine = LegacyTechnicalAnalyzer(), TechnicalAnalyzer()
+
+    assert engine.calculate_macd(close) == pytest.approx(legacy.calculate_macd(close), rel=1e-9, abs=1e-12)
+    assert engine.calculate_kdj(close, high, low) == pytest.approx(legacy.calculate_kdj(close, high, low), rel=1e-9)
+    assert engine.calculate_bollinger_bands(close) == pytest.approx(legacy.calculate_bollinger_bands(close), rel=1e-12)
+    assert engine.calculate_rsi(close) == pytest.approx(wilder_rsi(close), rel=1e-9)
+
+
+def test_flat_window_and_short_input_defaults():
+    engine = TechnicalAnalyzer()
+    flat = [10.0] * 30
+
+    assert engine.calculate_kdj(flat, flat, flat) == pytest.approx({"k": 50.0, "d": 50.0, "j": 50.0})
+    assert engine.calculate_rsi(flat) == 100.0
+    assert engine.calculate_rsi([1.0, 2.0]) == 50.0
+    assert engine.calculate_macd(flat[:10]) == {"macd": 0.0, "signal": 0.0, "histogram": 0.0}
+    assert engine.analyze_stock({"close": []})["kdj"] == {"k": 50.0, "d": 50.0, "j": 50.0}
+
+
+def test_analyze_series_returns_full_length_with_warmup():
+    data = random_walk(120)
+    series = TechnicalAnalyzer().analyze_series(data)
+    latest = TechnicalAnalyzer().analyze_stock({key: values.tolist() for key, values in data.items()})
+
+    assert len(series["rsi"]) == 120 and np.isnan(series["rsi"][:14]).all() and not np.isnan(series["rsi"][14:]).any()
+    assert np.isnan(series["kdj"]["k"][:8]).all() and not np.isnan(series["kdj"]["j"][8:]).any()
+    assert np.isnan(series["bollinger"]["middle"][:19]).all()
+    assert series["macd"]["histogram"][-1] == pytest.approx(latest["macd"]["histogram"])
+    assert series["kdj"]["d"][-1] == pytest.approx(latest["kdj"]["d"])
+
+
+def test_faster_than_legacy_loops():
+    for name, timing in compare(20000).items():
+        assert timing["numpy"] * 2 < timing["legacy"], name
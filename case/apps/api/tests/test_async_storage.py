@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试异步存储与异步端点
+"""
+
+import sys
+import os
+import asyncio
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.endpoints import stock
+from app.storage.async_mongo_client import AsyncMongoStorage
+from app.storage.query_cache import QueryCache, LRUCacheBackend
+
+DOCS = [
+    {"_id": ObjectId(), "code": "sh600000", "date": f"2026-03-0{day}", "close": 10.0 + day}
+    for day in range(1, 6)
+]
+
+
+class FakeAsyncCursor:
+    """只实现存储层用到的 AsyncCursor 接口，排序只支持首个排序键"""
+
+    def __init__(self, docs, projection=None):
+        self.docs = [dict(doc) for doc in docs]
+        self.projection = projection
+        self.n = None
+
+    def sort(self, keys, direction=None):
+        if isinstance(keys, str):
+            keys = [(keys, direction or 1)]
+        field, order = keys[0]
+        self.docs.sort(key=lambda doc: doc.get(field), reverse=order == -1)
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        docs = self.docs[:self.n] if self.n else self.docs
+        if self.projection:
+            keep = [k for k, v in self.projection.items() if v]
+            docs = [{k: doc.get(k) for k in keep} for doc in docs]
+        return docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list():
+            yield doc
+
+    async def close(self):
+        pass
+
+
+class FakeAsyncCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query)
+        docs = [doc for doc in self.docs if all(doc.get(k) == v for k, v in (query or {}).items()
+                                                if not isinstance(v, dict))]
+        return FakeAsyncCursor(docs, projection)
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = await self.find(query).to_list()
+        return dict(docs[0]) if docs else None
+
+    async def index_information(self):
+        return {"code_1_date_1": {"key": [("code", 1), ("date", 1)], "unique": True}}
+
+
+def make_storage(cache=None):
+    storage = AsyncMongoStorage("localhost", 27017, "stock_db", cache=cache)
+    storage.kline_collection = FakeAsyncCollection(DOCS)
+    return storage
+
+
+def test_get_kline_is_cached():
+    cache = QueryCache(LRUCacheBackend())
+    storage = make_storage(cache)
+
+    async def run():
+        first = await storage.get_kline("sh600000", limit=2)
+        second = await storage.get_kline("sh600000", limit=2)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [doc["date"] for doc in first] == ["2026-03-05", "2026-03-04"]
+    assert isinstance(first[0]["_id"], str)
+    assert second == first
+    assert len(storage.kline_collection.queries) == 1
+    assert cache.stats()["namespaces"]["kline"]["hits"] == 1
+
+
+def test_bulk_and_stream_match_sync_shape():
+    storage = make_storage()
+
+    async def run():
+        columns = await storage.get_klines_bulk(["sh600000"], fields=["date", "close"], as_frame=False)
+        rows = [row async for row in storage.iter_klines("sh600000", fields=["date", "close"])]
+        return columns, rows
+
+    columns, rows = asyncio.run(run())
+    assert columns["close"] == [11.0, 12.0, 13.0, 14.0, 15.0]
+    assert rows[0] == {"date": "2026-03-05", "close": 15.0}
+
+
+def test_async_endpoint_uses_async_storage():
+    app = FastAPI()
+    app.include_router(stock.router)
+    storage = make_storage()
+    app.dependency_overrides[stock.get_async_storage] = lambda: storage
+    client = TestClient(app)
+
+    response = client.get("/stock/kline/all/2026-03-03")
+    assert response.status_code == 200
+    assert [doc["close"] for doc in response.json()["data"]] == [13.0]
+
+    response = client.get("/stock/kline/sh600000/2026-03-09")
+    assert response.status_code == 404
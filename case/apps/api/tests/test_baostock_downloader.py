@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 baostock 会话与批量下载
+"""
+
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collector import baostock_session
+from app.collector.baostock_downloader import BaostockBatchDownloader, shard_codes
+from app.collector.baostock_session import BaostockError, BaostockSession
+
+
+class FakeResultSet:
+    def __init__(self, rows, error_code="0", error_msg=""):
+        self.rows = list(rows)
+        self.fields = ["code", "industry"]
+        self.error_code = error_code
+        self.error_msg = error_msg
+
+    def next(self):
+        return bool(self.rows)
+
+    def get_row_data(self):
+        return self.rows.pop(0)
+
+
+class FakeBaostock:
+    def __init__(self, results):
+        self.results = list(results)
+        self.logins = 0
+        self.logouts = 0
+
+    def login(self):
+        self.logins += 1
+        return FakeResultSet([])
+
+    def logout(self):
+        self.logouts += 1
+
+    def query_stock_industry(self):
+        return self.results.pop(0)
+
+
+def test_session_logs_in_once_and_relogins_on_error(monkeypatch):
+    fake = FakeBaostock([
+        FakeResultSet([["sh.600000", "银行"], ["sz.000001", "银行"]]),
+        FakeResultSet([], error_code="10001001", error_msg="用户未登录"),
+        FakeResultSet([["sh.600519", "食品饮料"]]),
+    ])
+    monkeypatch.setattr(baostock_session, "bs", fake)
+    session = BaostockSession()
+
+    first = session.query(fake.query_stock_industry)
+    second = session.query(fake.query_stock_industry)
+
+    assert first["code"].tolist() == ["sh.600000", "sz.000001"]
+    assert second["industry"].tolist() == ["食品饮料"]
+    assert fake.logins == 2 and fake.logouts == 0
+
+    session.logout()
+    session.logout()
+    assert fake.logouts == 1 and not session.logged_in
+
+
+def test_session_raises_after_retry(monkeypatch):
+    fake = FakeBaostock([FakeResultSet([], "1", "网络错误"), FakeResultSet([], "1", "网络错误")])
+    monkeypatch.setattr(baostock_session, "bs", fake)
+
+    with pytest.raises(BaostockError):
+        BaostockSession().query(fake.query_stock_industry)
+
+
+class FlakyFetch:
+    """sz.000002 第一次失败；sz.000003 一直失败；sh.600000 无数据"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, code, start_date, end_date, frequency, adjustflag):
+        self.calls.append(code)
+        if code == "sz.000003" or (code == "sz.000002" and self.calls.count(code) == 1):
+            raise BaostockError("网络错误")
+        if code == "sh.600000":
+            return None
+        return pd.DataFrame({"date": [start_date, end_date], "symbol": [code, code], "close": [1.0, 2.0]})
+
+
+def test_download_shards_retries_and_merges():
+    fetch = FlakyFetch()
+    progress = []
+    downloader = BaostockBatchDownloader(
+        workers=1, rate_limit=0, retries=2, shard_size=2, progress=lambda *args: progress.append(args), fetch=fetch
+    )
+    codes = ["sz.000001", "sz.000002", "sz.000003", "sh.600000", "sz.000001"]
+
+    result = downloader.download(codes, "2026-03-02", "2026-03-03")
+
+    assert sorted(result["name"].unique()) == ["sz.000001", "sz.000002"]
+    assert (result["name"] == result["symbol"]).all()
+    assert len(result) == 4
+    # 去重后 4 只，sz.000003 重试两轮后放弃
+    assert fetch.calls.count("sz.000001") == 1
+    assert fetch.calls.count("sz.000003") == 3
+    assert progress[0] == (1, 4, 1) and progress[-1] == (3, 4, 1)
+
+
+def test_download_all_failed_returns_empty_frame():
+    downloader = BaostockBatchDownloader(workers=1, rate_limit=0, retries=0, fetch=FlakyFetch())
+
+    assert downloader.download(["sz.000003"], "2026-03-02", "2026-03-03").empty
+
+
+def test_shard_codes():
+    assert shard_codes(list("abcde"), 2) == [["a", "b"], ["c", "d"], ["e"]]
+    assert shard_codes(list("ab"), 0) == [["a"], ["b"]]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试MongoStorage批量K线/资金流向读取
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.mongo_client import MongoStorage, _cursor_to_columns
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.sort_spec = None
+        self.batch = None
+
+    def sort(self, spec):
+        self.sort_spec = spec
+        return self
+
+    def batch_size(self, n):
+        self.batch = n
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def find(self, query, projection=None):
+        self.calls.append((query, projection))
+        cursor = FakeCursor(self.docs)
+        self.last_cursor = cursor
+        return cursor
+
+
+def make_storage(kline_docs=None, capital_docs=None):
+    storage = MongoStorage("localhost", 27017, "test_db")
+    storage.kline_collection = FakeCollection(kline_docs or [])
+    storage.capital_flow_collection = FakeCollection(capital_docs or [])
+    return storage
+
+
+def test_cursor_to_columns_fixed_fields():
+    docs = [{"code": "sh600000", "close": 10.0}, {"code": "sz000001"}]
+    columns = _cursor_to_columns(docs, ["code", "close"])
+    assert columns == {"code": ["sh600000", "sz000001"], "close": [10.0, None]}
+
+
+def test_cursor_to_columns_dynamic_fields():
+    docs = [{"a": 1}, {"a": 2, "b": 3}, {"b": 4}]
+    columns = _cursor_to_columns(docs)
+    assert columns == {"a": [1, 2, None], "b": [None, 3, 4]}
+
+
+def test_get_klines_bulk_single_in_query():
+    docs = [
+        {"code": "sh600000", "date": "2026-03-02", "close": 10.0},
+        {"code": "sz000001", "date": "2026-03-02", "close": 12.5},
+    ]
+    storage = make_storage(kline_docs=docs)
+
+    df = storage.get_klines_bulk(
+        ["sh600000", "sz000001"], "2026-03-01", "2026-03-10", fields=["code", "date", "close"]
+    )
+
+    assert len(storage.kline_collection.calls) == 1
+    query, projection = storage.kline_collection.calls[0]
+    assert query == {
+        "code": {"$in": ["sh600000", "sz000001"]},
+        "date": {"$gte": "2026-03-01", "$lte": "2026-03-10"},
+    }
+    assert projection == {"code": 1, "date": 1, "close": 1, "_id": 0}
+    assert storage.kline_collection.last_cursor.sort_spec == [("code", 1), ("date", 1)]
+    assert list(df.columns) == ["code", "date", "close"]
+    assert df["close"].tolist() == [10.0, 12.5]
+
+
+def test_get_klines_bulk_columns_and_empty_codes():
+    storage = make_storage(kline_docs=[{"code": "sh600000", "close": 1.0}])
+
+    columns = storage.get_klines_bulk(["sh600000"], fields=["code", "close"], as_frame=False)
+    assert columns == {"code": ["sh600000"], "close": [1.0]}
+
+    empty = storage.get_klines_bulk([])
+    assert empty.empty
+    assert len(storage.kline_collection.calls) == 1
+
+
+def test_get_capital_flow_bulk_excludes_internal_fields():
+    docs = [{"name": "sh.600000", "date": "2026-03-02", "main_net_inflow": 1.0}]
+    storage = make_storage(capital_docs=docs)
+
+    df = storage.get_capital_flow_bulk(["sh.600000"], start_date="2026-03-01")
+
+    query, projection = storage.capital_flow_collection.calls[0]
+    assert query == {"name": {"$in": ["sh.600000"]}, "date": {"$gte": "2026-03-01"}}
+    assert projection == {"_id": 0, "crawl_time": 0}
+    assert df["main_net_inflow"].tolist() == [1.0]
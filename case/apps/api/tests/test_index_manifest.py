@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试索引清单与执行计划审计
+"""
+
+import sys
+import os
+
+from pymongo.errors import OperationFailure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.indexes import INDEX_MANIFEST, apply_index_manifest
+from app.storage.index_audit import analyze_plan, audit_queries, build_query_shapes
+
+IXSCAN_PLAN = {
+    "queryPlanner": {"winningPlan": {
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "code_1_date_1"}},
+    }}
+}
+COLLSCAN_SORT_PLAN = {
+    "queryPlanner": {"winningPlan": {"queryPlan": {
+        "stage": "SORT", "inputStage": {"stage": "COLLSCAN"},
+    }}}
+}
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def sort(self, keys):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def explain(self):
+        return self.plan
+
+
+class FakeCollection:
+    def __init__(self, name, db):
+        self.name = name
+        self.db = db
+
+    def create_index(self, keys, unique=False, background=False):
+        if self.db.fail_unique and unique:
+            raise OperationFailure("E11000 duplicate key error")
+        self.db.created.append((self.name, keys, unique))
+
+    def find(self, query):
+        return FakeCursor(COLLSCAN_SORT_PLAN if self.name in self.db.unindexed else IXSCAN_PLAN)
+
+
+class FakeDB:
+    def __init__(self, unindexed=(), fail_unique=False):
+        self.unindexed = set(unindexed)
+        self.fail_unique = fail_unique
+        self.created = []
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self)
+
+
+def test_manifest_covers_query_collections():
+    collections = {spec.collection for spec in INDEX_MANIFEST}
+    shapes = build_query_shapes({"code": "sh600000", "name": "浦发银行", "date": "2026-03-02"})
+    assert {shape.collection for shape in shapes} <= collections
+    assert any(spec.name == "name_1_date_-1" for spec in INDEX_MANIFEST if spec.collection == "stock_kline")
+
+
+def test_apply_manifest_reports_failures():
+    db = FakeDB(fail_unique=True)
+    results = apply_index_manifest(db)
+
+    assert results["stock_kline.code_1_date_1"].startswith("E11000")
+    assert results["capital_flow.name_1_date_-1"] == "ok"
+    assert len(db.created) == len(INDEX_MANIFEST) - sum(spec.unique for spec in INDEX_MANIFEST)
+
+
+def test_analyze_plan_flags_collscan_and_sort():
+    good = analyze_plan(IXSCAN_PLAN)
+    assert good == {
+        "plan": "LIMIT <- FETCH <- IXSCAN",
+        "indexes": ["code_1_date_1"],
+        "collscan": False,
+        "in_memory_sort": False,
+    }
+    bad = analyze_plan(COLLSCAN_SORT_PLAN)
+    assert bad["collscan"] and bad["in_memory_sort"]
+
+
+def test_audit_queries_marks_unindexed_collection():
+    shapes = build_query_shapes({"code": "sh600000", "name": "浦发银行", "date": "2026-03-02"})
+    report = audit_queries(FakeDB(unindexed={"after_market"}), shapes)
+
+    flagged = {entry["query"] for entry in report if not entry["ok"]}
+    assert flagged == {"load", "get_by_date", "get_all"}
@@ -0,0 +1,84 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collector.technical_indicators import TechnicalIndicators
+
+INDICATOR_COLUMNS = ["amplitude", "ma5", "ma10", "ma20", "rsi", "macd", "macd_signal", "macd_hist"]
+
+
+def market(symbols=50, days=60, seed=3):
+    """随机长度的多只股票K线，行顺序打乱到按日期排列，部分股票停牌缺行"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2024-01-02", periods=days).strftime("%Y-%m-%d")
+    frames = []
+    for i in range(symbols):
+        length = int(rng.integers(1, days + 1))
+        keep = np.sort(rng.choice(days, size=length, replace=False))  # 缺失的日期即停牌
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        frames.append(pd.DataFrame({
+            "symbol": f"sh.{600000 + i}",
+            "date": dates[keep],
+            "close": close,
+            "high": close * 1.02,
+            "low": close * 0.98,
+        }))
+    return pd.concat(frames).sort_values(["date", "symbol"]).reset_index(drop=True)
+
+
+def grouped_reference(df, ma_windows=(5, 10, 20), rsi_window=14):
+    """逐股票 groupby + pandas rolling / ewm 计算的参考结果"""
+    expected = pd.DataFrame(index=df.index)
+    expected["amplitude"] = (df["high"] - df["low"]) / df["low"] * 100
+    groups = df.groupby("symbol")["close"]
+    lengths = groups.transform("size")
+    for window in ma_windows:
+        expected[f"ma{window}"] = groups.transform(lambda s: s.rolling(window).mean())
+
+    delta = groups.diff()
+    gain = delta.where(delta > 0, 0).groupby(df["symbol"]).transform(lambda s: s.rolling(rsi_window).mean())
+    loss = (-delta).where(delta < 0, 0).groupby(df["symbol"]).transform(lambda s: s.rolling(rsi_window).mean())
+    rsi = (100 - 100 / (1 + gain / loss)).mask(loss == 0, 100.0).where(gain.notna())
+    expected["rsi"] = rsi.where(lengths >= rsi_window)
+
+    ema = lambda span: groups.transform(lambda s: s.ewm(span=span, adjust=False).mean())
+    macd = (ema(12) - ema(26)).where(lengths >= 35)
+    signal = macd.groupby(df["symbol"]).transform(lambda s: s.ewm(span=9, adjust=False).mean())
+    expected["macd"], expected["macd_signal"], expected["macd_hist"] = macd, signal, macd - signal
+    return expected
+
+
+def assert_parity(df):
+    expected = grouped_reference(df)
+    actual = TechnicalIndicators.calculate_all(df.copy())
+    pd.testing.assert_frame_equal(
+        actual[expected.columns], expected, check_exact=False, rtol=1e-9, atol=1e-9, check_dtype=False
+    )
+
+
+def test_panel_matches_grouped_functions():
+    assert_parity(market())
+
+
+def test_panel_handles_nan_close_and_missing_symbol():
+    df = market(symbols=20, days=80, seed=5)
+    rows = df.index[df["symbol"] == df["symbol"].value_counts().index[0]]
+    df.loc[rows[[0, 30, 31, 50]], "close"] = np.nan  # 停牌日有行但无价格
+    df.loc[rows[40], "symbol"] = None
+
+    assert_parity(df)
+
+
+def test_panel_with_too_little_history():
+    df = market(symbols=5, days=8)
+
+    expected = grouped_reference(df)
+    actual = TechnicalIndicators.calculate_all(df.copy())
+
+    for column in ("ma10", "ma20", "rsi", "macd", "macd_signal", "macd_hist"):
+        assert actual[column].isna().all() and expected[column].isna().all(), column
+    pd.testing.assert_series_equal(actual["ma5"], expected["ma5"], check_dtype=False)
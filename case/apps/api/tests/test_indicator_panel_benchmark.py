@@ -0,0 +1,31 @@
+"""
+全市场指标计算性能基准（pytest-benchmark）：面板计算 vs 逐股票 groupby
+
+    pytest tests/test_indicator_panel_benchmark.py --benchmark-only
+
+未安装 pytest-benchmark 时整个文件跳过。
+"""
+import sys
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collector.technical_indicators import TechnicalIndicators
+from test_indicator_panel import grouped_reference, market
+
+# 600 只股票 × 60 个交易日
+MARKET = market(symbols=600, days=60, seed=11)
+
+
+@pytest.mark.benchmark(group="whole-market")
+def test_grouped_reference(benchmark):
+    benchmark(grouped_reference, MARKET)
+
+
+@pytest.mark.benchmark(group="whole-market")
+def test_panel_calculate_all(benchmark):
+    benchmark(lambda: TechnicalIndicators.calculate_all(MARKET.copy()))
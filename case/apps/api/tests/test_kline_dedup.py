@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试K线去重工具与按日期查询路径
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.mongo_client import MongoStorage
+from app.storage.kline_dedup import dedup_klines
+
+
+class FakeCursor(list):
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        return self
+
+
+class FakeKlineCollection:
+    def __init__(self, groups=None, unique=False):
+        self.groups = groups or []
+        self.unique = unique
+        self.deleted = []
+        self.aggregated = False
+        self.found = False
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.aggregated = True
+        return iter(self.groups)
+
+    def find(self, query):
+        self.found = True
+        return FakeCursor([{"_id": 1, "code": "sh600000", "date": query["date"]}])
+
+    def delete_many(self, query):
+        ids = query["_id"]["$in"]
+        self.deleted.extend(ids)
+        return SimpleNamespace(deleted_count=len(ids))
+
+    def index_information(self):
+        info = {"_id_": {"key": [("_id", 1)]}}
+        if self.unique:
+            info["code_1_date_1"] = {"key": [("code", 1), ("date", 1)], "unique": True}
+        return info
+
+
+GROUPS = [
+    {"_id": {"code": "sh600000", "date": "2026-03-02"}, "keep": "a", "ids": ["a", "b", "c"], "count": 3},
+    {"_id": {"code": "sz000001", "date": "2026-03-02"}, "keep": "d", "ids": ["e", "d"], "count": 2},
+]
+
+
+def test_dedup_dry_run_only_counts():
+    collection = FakeKlineCollection(GROUPS)
+    stats = dedup_klines(collection)
+    assert stats == {"groups": 2, "duplicates": 3, "deleted": 0}
+    assert collection.deleted == []
+
+
+def test_dedup_apply_keeps_newest_in_batches():
+    collection = FakeKlineCollection(GROUPS)
+    stats = dedup_klines(collection, apply=True, batch_size=2)
+    assert stats["deleted"] == 3
+    assert sorted(collection.deleted) == ["b", "c", "e"]
+
+
+def test_get_all_kline_by_date_uses_find_with_unique_index():
+    storage = MongoStorage("localhost", 27017, "test_db")
+    storage.kline_collection = FakeKlineCollection(unique=True)
+    rows = storage.get_all_kline_by_date("2026-03-02")
+    assert rows[0]["code"] == "sh600000"
+    assert storage.kline_collection.found and not storage.kline_collection.aggregated
+
+
+def test_get_all_kline_by_date_falls_back_without_unique_index():
+    storage = MongoStorage("localhost", 27017, "test_db")
+    storage.kline_collection = FakeKlineCollection(unique=False)
+    storage.get_all_kline_by_date("2026-03-02")
+    assert storage.kline_collection.aggregated and not storage.kline_collection.found
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试K线游标(seek)分页
+"""
+
+import base64
+import json
+import sys
+import os
+
+import pytest
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.mongo_client import (
+    MongoStorage,
+    encode_page_cursor,
+    decode_page_cursor,
+)
+
+
+def _match(doc, query):
+    """极简查询匹配，支持 $and/$or/$gt/$lt/$gte/$lte/等值"""
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(_match(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(_match(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            for op, target in cond.items():
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[field], reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return FakeCursor([dict(d) for d in self.docs if _match(d, query)])
+
+
+def make_storage():
+    docs = []
+    for date in ["2026-03-02", "2026-03-03", "2026-03-04"]:
+        for code in ["sh600000", "sh600001", "sz000001"]:
+            docs.append({"_id": ObjectId(), "code": code, "date": date, "close": 1.0})
+    storage = MongoStorage("localhost", 27017, "test_db")
+    storage.kline_collection = FakeCollection(docs)
+    return storage, docs
+
+
+def _collect(fetch, page_size):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page = fetch(page_size=page_size, cursor=cursor)
+        rows.extend(page["data"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            return rows, pages
+
+
+def test_cursor_roundtrip():
+    oid = ObjectId()
+    cursor = encode_page_cursor({"date": "2026-03-02", "code": "sh600000", "_id": oid})
+    assert "=" not in cursor
+    payload = decode_page_cursor(cursor)
+    assert payload == {"date": "2026-03-02", "code": "sh600000", "_id": oid}
+
+
+def test_invalid_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_page_cursor("not-a-cursor")
+
+
+@pytest.mark.parametrize("payload", [
+    {"_id": str(ObjectId())},
+    {"date": "2026-03-02", "_id": str(ObjectId())},
+    {"date": 20260302, "code": "sh600000", "_id": str(ObjectId())},
+    ["2026-03-02", "sh600000"],
+])
+def test_cursor_missing_or_mistyped_keys_raises_value_error(payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+    with pytest.raises(ValueError):
+        decode_page_cursor(cursor)
+
+
+def test_all_klines_pages_cover_everything_once():
+    storage, docs = make_storage()
+    rows, pages = _collect(storage.get_all_klines_page, page_size=4)
+
+    assert pages == 3
+    assert len(rows) == len(docs)
+    assert len({r["_id"] for r in rows}) == len(docs)
+    keys = [(r["date"], r["code"]) for r in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_kline_by_date_and_code_pages():
+    storage, _ = make_storage()
+
+    rows, _ = _collect(
+        lambda **kw: storage.get_all_kline_by_date_page("2026-03-03", **kw), page_size=2
+    )
+    assert [r["code"] for r in rows] == ["sh600000", "sh600001", "sz000001"]
+
+    rows, _ = _collect(
+        lambda **kw: storage.get_kline_page("sh600001", start_date="2026-03-03", **kw), page_size=1
+    )
+    assert [r["date"] for r in rows] == ["2026-03-04", "2026-03-03"]
+
+
+def test_last_page_has_no_cursor():
+    storage, _ = make_storage()
+    page = storage.get_all_kline_by_date_page("2026-03-02", page_size=3)
+    assert len(page["data"]) == 3
+    assert page["next_cursor"] is None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试市场快照的读取与按需刷新
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.market_snapshot import SNAPSHOT_TOP_N, MarketSnapshotStore, compute_snapshot
+
+FACET_RESULT = {
+    "overview": [{
+        "_id": None, "total_stocks": 3, "up_stocks": 2, "down_stocks": 1, "flat_stocks": 0,
+        "limit_up": 1, "limit_down": 0, "avg_change": 3.0, "avg_amplitude": 4.2,
+        "avg_turnover": 1.5, "total_amount": 3e8, "total_volume": 3000,
+    }],
+    "changes": [{"_id": None, "values": [-1.0, 0.5, 9.95, 10.0]}],
+    "top_gainers": [{"code": "sh600000", "pct_chg": 10.0}],
+    "top_losers": [{"code": "sz000001", "pct_chg": -1.0}],
+    "top_amount": [],
+    "sectors": [{"_id": "银行", "avg_change": 4.0, "stock_count": 3, "up_count": 2,
+                 "total_amount": 3e8, "changes": [10.0, None, -1.0, 0.5]}],
+}
+
+
+class FakeKlines:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.calls += 1
+        self.pipeline = pipeline
+        return iter([self.result] if self.result else [])
+
+
+class FakeSnapshots:
+    """按 _id 保存文档，支持 refresh 用到的原子操作"""
+
+    def __init__(self):
+        self.docs = {}
+        self.on_compute = None
+
+    def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=None):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], **update["$setOnInsert"]})
+        return dict(doc)
+
+    def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is None or any(doc.get(k) != v for k, v in query.items()):
+            return SimpleNamespace(matched_count=0)
+        doc.update(update["$set"])
+        return SimpleNamespace(matched_count=1)
+
+    def update_many(self, query, update):
+        for date in query["_id"]["$in"]:
+            doc = self.docs.get(date)
+            if doc is not None:
+                doc.update(update["$set"])
+                doc["writes"] = doc.get("writes", 0) + update["$inc"]["writes"]
+
+
+def mark_snapshot_dirty(snapshots, dates):
+    """模拟爬虫写入K线后的标记（python-web-scraper MongoStorage._mark_snapshot_dirty）"""
+    snapshots.update_many(
+        {"_id": {"$in": sorted(set(dates))}},
+        {"$set": {"dirty": True}, "$inc": {"writes": 1}},
+    )
+
+
+def test_compute_snapshot_medians():
+    snapshot = compute_snapshot(FakeKlines(FACET_RESULT), "2026-03-02")
+    assert snapshot["overview"]["median_change"] == (0.5 + 9.95) / 2
+    assert "_id" not in snapshot["overview"]
+    assert snapshot["sectors"][0]["sector"] == "银行"
+    assert snapshot["sectors"][0]["median_change"] == 0.5
+    assert "changes" not in snapshot["sectors"][0]
+
+
+def test_snapshot_read_is_cached_until_marked_dirty():
+    klines = FakeKlines(FACET_RESULT)
+    snapshots = FakeSnapshots()
+    store = MarketSnapshotStore(snapshots, klines)
+
+    first = store.get("2026-03-02")
+    store.get("2026-03-02")
+    assert klines.calls == 1
+    assert first["overview"]["total_stocks"] == 3
+    assert "dirty" not in first and "writes" not in first
+
+    mark_snapshot_dirty(snapshots, ["2026-03-02"])
+    assert snapshots.docs["2026-03-02"]["dirty"] is True
+    store.get("2026-03-02")
+    assert klines.calls == 2
+    assert snapshots.docs["2026-03-02"]["dirty"] is False
+
+
+def test_write_during_refresh_keeps_dirty():
+    snapshots = FakeSnapshots()
+
+    class RacingKlines(FakeKlines):
+        def aggregate(self, pipeline, allowDiskUse=False):
+            mark_snapshot_dirty(snapshots, ["2026-03-02"])
+            return super().aggregate(pipeline, allowDiskUse)
+
+    store = MarketSnapshotStore(snapshots, RacingKlines(FACET_RESULT))
+    snapshot = store.refresh("2026-03-02")
+
+    assert snapshot["overview"]["total_stocks"] == 3
+    assert snapshots.docs["2026-03-02"]["dirty"] is True
+
+
+def test_missing_date_returns_none():
+    store = MarketSnapshotStore(FakeSnapshots(), FakeKlines(None))
+    assert store.get("2026-03-02") is None
+
+
+def test_longer_ranking_than_snapshot_is_computed_live():
+    klines = FakeKlines(FACET_RESULT)
+    snapshots = FakeSnapshots()
+    store = MarketSnapshotStore(snapshots, klines)
+
+    snapshot = store.get("2026-03-02", top_n=SNAPSHOT_TOP_N + 10)
+    assert snapshot["top_gainers"] == FACET_RESULT["top_gainers"]
+    assert "2026-03-02" not in snapshots.docs
+    assert {"$limit": SNAPSHOT_TOP_N + 10} in klines.pipeline[1]["$facet"]["top_gainers"]
+
+    store.get("2026-03-02", top_n=SNAPSHOT_TOP_N)
+    assert klines.calls == 2 and "2026-03-02" in snapshots.docs
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试MongoDB共享客户端注册表
+"""
+
+import sys
+import os
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.client_registry import MongoClientRegistry
+from app.storage.mongo_client import MongoStorage
+
+POOL_OPTIONS = {"maxPoolSize": 10}
+
+
+def test_registry_reuses_client():
+    """相同连接参数只创建一个客户端"""
+    with mock.patch("app.storage.client_registry.MongoClient") as client_cls:
+        registry = MongoClientRegistry(POOL_OPTIONS)
+        first = registry.get_client("localhost", 27017, "admin", "p@ss")
+        second = registry.get_client("localhost", 27017, "admin", "p@ss")
+
+        assert first is second
+        assert client_cls.call_count == 1
+        assert client_cls.call_args.kwargs["maxPoolSize"] == 10
+        # 密码需要转义
+        assert "p%40ss" in client_cls.call_args.args[0]
+        first.admin.command.assert_called_once_with("ping")
+
+
+def test_registry_separates_credentials():
+    """不同连接参数使用不同客户端"""
+    with mock.patch("app.storage.client_registry.MongoClient") as client_cls:
+        client_cls.side_effect = lambda *args, **kwargs: mock.MagicMock()
+        registry = MongoClientRegistry(POOL_OPTIONS)
+        a = registry.get_client("localhost", 27017)
+        b = registry.get_client("localhost", 27017, "admin", "secret")
+
+        assert a is not b
+        assert len(registry) == 2
+
+
+def test_registry_close_all_and_health_check():
+    """健康检查与关闭"""
+    with mock.patch("app.storage.client_registry.MongoClient"):
+        registry = MongoClientRegistry(POOL_OPTIONS)
+        client = registry.get_client("localhost", 27017)
+
+        health = registry.health_check()
+        assert health["status"] == "healthy"
+        assert health["clients"]["localhost:27017"]["status"] == "ok"
+
+        registry.close_all()
+        client.close.assert_called_once()
+        assert len(registry) == 0
+
+
+def test_storage_close_keeps_shared_client_open():
+    """MongoStorage.close 只释放引用，不关闭共享客户端"""
+    with mock.patch("app.storage.client_registry.MongoClient"):
+        registry = MongoClientRegistry(POOL_OPTIONS)
+        with mock.patch("app.storage.mongo_client.client_registry", registry):
+            storage = MongoStorage("localhost", 27017, "test_db")
+            storage.connect()
+            client = storage.client
+            storage.close()
+
+            assert storage.client is None
+            client.close.assert_not_called()
+
+            other = MongoStorage("localhost", 27017, "test_db")
+            other.connect()
+            assert other.client is client
@@ -184,10 +184,6 @@ def test_stock_monitor():
         stock_data = monitor.get_stock_data(stock_code)
         logger.info(f"股票 {stock_code} 实时数据: {stock_data}")
         
-        # 测试获取股票历史数据
-        history_data = monitor.get_stock_history_data(stock_code, days=30)
-        logger.info(f"股票 {stock_code} 历史数据长度: {len(history_data) if history_data else 0}")
-        
         # 测试分析单只股票
         stock_config = {
             "code": stock_code,
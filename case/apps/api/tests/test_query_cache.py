@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试MongoStorage查询缓存
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.mongo_client import MongoStorage
+from app.storage.query_cache import QueryCache, LRUCacheBackend
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key=None, direction=1):
+        if key == "_id":
+            self.docs = sorted(self.docs, key=lambda d: d["_id"], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter([dict(d) for d in self.docs])
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.find_calls = 0
+
+    def find(self, query):
+        self.find_calls += 1
+        return FakeCursor([d for d in self.docs if all(d.get(k) == v for k, v in query.items() if k != "date")])
+
+
+class FakeEventLog:
+    def __init__(self):
+        self.events = []
+
+    def find(self, query=None):
+        if query is None:
+            return FakeCursor(list(self.events))
+        last = query["_id"]["$gt"]
+        return FakeCursor([e for e in self.events if e["_id"] > last])
+
+
+def make_storage(ttl=60, max_size=100):
+    docs = [
+        {"_id": ObjectId(), "code": "sh600000", "name": "浦发银行", "date": "2026-03-02", "close": 10.0},
+        {"_id": ObjectId(), "code": "sz000001", "name": "平安银行", "date": "2026-03-02", "close": 12.0},
+    ]
+    cache = QueryCache(LRUCacheBackend(max_size), ttls={"kline": ttl, "capital_flow": ttl}, poll_interval=0)
+    storage = MongoStorage("localhost", 27017, "test_db", cache=cache)
+    storage.kline_collection = FakeCollection(docs)
+    storage.capital_flow_collection = FakeCollection(docs)
+    return storage, cache
+
+
+def test_repeated_query_hits_cache_and_returns_copies():
+    storage, cache = make_storage()
+
+    first = storage.get_kline("sh600000", start_date="2026-03-01")
+    first[0]["close"] = 999
+    second = storage.get_kline("sh600000", "2026-03-01")
+
+    assert storage.kline_collection.find_calls == 1
+    assert second[0]["close"] == 10.0
+    stats = cache.stats()["namespaces"]["kline"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_ttl_and_lru_limits():
+    storage, _ = make_storage(ttl=0.01)
+    storage.get_kline("sh600000")
+    time.sleep(0.02)
+    storage.get_kline("sh600000")
+    assert storage.kline_collection.find_calls == 2
+
+    storage, cache = make_storage(max_size=1)
+    storage.get_kline("sh600000")
+    storage.get_kline("sz000001")
+    storage.get_kline("sh600000")
+    assert storage.kline_collection.find_calls == 3
+    assert cache.backend.evictions == 2
+
+
+def test_write_invalidation_by_code_date_and_name():
+    storage, cache = make_storage()
+    storage.get_kline("sh600000")
+    storage.get_kline("sz000001")
+    storage.get_capital_flow("浦发银行")
+
+    assert cache.invalidate("kline", code="sh600000", dates=["2026-03-02"]) == 1
+    storage.get_kline("sz000001")
+    storage.get_kline("sh600000")
+    assert storage.kline_collection.find_calls == 3
+
+    cache.invalidate("capital_flow", code="sh600000", dates=["2026-03-02"], name="浦发银行")
+    storage.get_capital_flow("浦发银行")
+    assert storage.capital_flow_collection.find_calls == 2
+
+
+def test_storages_on_different_databases_share_cache_without_collisions():
+    storage, cache = make_storage()
+    other = MongoStorage("localhost", 27017, "other_db", cache=cache)
+    other.kline_collection = FakeCollection([{"_id": ObjectId(), "code": "sh600000", "close": 20.0}])
+
+    assert storage.get_kline("sh600000")[0]["close"] == 10.0
+    assert other.get_kline("sh600000")[0]["close"] == 20.0
+    assert storage.get_kline("sh600000")[0]["close"] == 10.0
+    assert storage.kline_collection.find_calls == 1
+    assert other.kline_collection.find_calls == 1
+
+
+def test_invalidation_events_from_log():
+    storage, cache = make_storage()
+    log = FakeEventLog()
+    cache.attach_invalidation_log(log)
+
+    storage.get_all_kline_by_date("2026-03-02", deduplicate=False)
+    log.events.append({"_id": ObjectId(), "collection": "stock_kline", "code": "sh600000", "dates": ["2026-03-02"]})
+    storage.get_all_kline_by_date("2026-03-02", deduplicate=False)
+
+    assert storage.kline_collection.find_calls == 2
+    assert cache.stats()["namespaces"]["kline"]["invalidations"] == 1
+
+
+def test_event_cursor_starts_from_latest_logged_event():
+    storage, cache = make_storage()
+    log = FakeEventLog()
+    # 写入方时钟比本机慢一小时：游标不能按本机时间生成
+    writer_time = datetime.now(timezone.utc) - timedelta(hours=1)
+    log.events.append({"_id": ObjectId.from_datetime(writer_time), "collection": "stock_kline", "code": "sh600000", "dates": ["2026-03-02"]})
+    cache.attach_invalidation_log(log)
+
+    storage.get_kline("sh600000")
+    cache.poll_invalidations(force=True)
+    storage.get_kline("sh600000")
+    assert storage.kline_collection.find_calls == 1
+
+    log.events.append({"_id": ObjectId.from_datetime(writer_time + timedelta(seconds=1)), "collection": "stock_kline", "code": "sh600000", "dates": ["2026-03-02"]})
+    cache.poll_invalidations(force=True)
+    storage.get_kline("sh600000")
+    assert storage.kline_collection.find_calls == 2
+
+
+def test_storage_without_cache_queries_directly():
+    storage = MongoStorage("localhost", 27017, "test_db")
+    storage.kline_collection = FakeCollection([])
+    storage.get_kline("sh600000")
+    storage.get_kline("sh600000")
+    assert storage.kline_collection.find_calls == 2
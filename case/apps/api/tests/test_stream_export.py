@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试K线流式导出
+"""
+
+import sys
+import os
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.endpoints import stock
+
+ROWS = [
+    {"code": "sh600000", "name": "浦发银行", "date": "2026-03-02", "close": 10.0},
+    {"code": "sh600000", "name": "浦发银行", "date": "2026-03-03", "close": 10.5},
+]
+
+
+class FakeStorage:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def iter_klines(self, code=None, start_date=None, end_date=None, fields=None):
+        self.calls.append((code, start_date, end_date))
+        return iter(self.rows)
+
+    async def get_klines_bulk(self, codes, start_date=None, end_date=None, fields=None, as_frame=True):
+        fields = fields or ["code", "date", "close"]
+        return {f: [row.get(f) for row in self.rows] for f in fields}
+
+
+def make_client(rows):
+    app = FastAPI()
+    app.include_router(stock.router)
+    storage = FakeStorage(rows)
+    app.dependency_overrides[stock.get_storage] = lambda: storage
+    app.dependency_overrides[stock.get_async_storage] = lambda: storage
+    return TestClient(app), storage
+
+
+def test_csv_export_streams_rows_and_trailer():
+    client, storage = make_client(ROWS)
+    response = client.get("/stock/kline/sh600000/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"\xef\xbb\xbf")
+    lines = response.content.decode("utf-8-sig").splitlines()
+    assert lines[0].split(",")[:3] == ["code", "name", "date"]
+    assert len(lines) == 4
+    assert lines[-1] == "# row_count=2"
+    assert storage.calls == [("sh600000", None, None)]
+
+
+def test_ndjson_export_trailer_optional():
+    client, _ = make_client(ROWS)
+    response = client.get("/stock/klines/export", params={"format": "ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[:2] == ROWS
+    assert lines[-1] == {"_meta": {"row_count": 2}}
+
+    response = client.get("/stock/klines/export", params={"format": "ndjson", "trailer": False})
+    assert [json.loads(line) for line in response.text.splitlines()] == ROWS
+
+
+def test_json_export_is_valid_array():
+    client, _ = make_client(ROWS)
+    response = client.get("/stock/klines/export", params={"format": "json"})
+    assert response.json() == ROWS
+
+
+def test_empty_export_returns_404():
+    client, _ = make_client([])
+    response = client.get("/stock/klines/export", params={"format": "csv"})
+    assert response.status_code == 404
+
+
+def test_arrow_and_parquet_exports_are_typed():
+    import io
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    client, _ = make_client(ROWS)
+    response = client.get("/stock/klines/export", params={"format": "arrow"})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 2
+    assert table.schema.field("close").type == pa.float64()
+    assert table.column("close").to_pylist() == [10.0, 10.5]
+
+    response = client.get("/stock/kline/sh600000/export", params={"format": "parquet"})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("date").to_pylist() == ["2026-03-02", "2026-03-03"]
+
+
+def test_bulk_read_negotiates_arrow():
+    import pyarrow as pa
+
+    client, _ = make_client(ROWS)
+    response = client.get(
+        "/stock/klines/bulk",
+        params={"codes": "sh600000"},
+        headers={"Accept": "application/vnd.apache.arrow.stream"},
+    )
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.to_pydict() == {
+        "code": ["sh600000", "sh600000"],
+        "date": ["2026-03-02", "2026-03-03"],
+        "close": [10.0, 10.5],
+    }
+
+    assert client.get("/stock/klines/bulk", params={"codes": "sh600000"}).json()["count"] == 2
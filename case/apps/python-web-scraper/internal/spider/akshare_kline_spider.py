@@ -6,6 +6,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 from ..utils.config import load_config
 from ..storage.mongo_storage import MongoStorage
+from .kline_sync import KlineSyncPlanner
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,7 @@ class AkshareKlineSpider(scrapy.Spider):
         collector_config = self.config.get('akshare_kline', {})
         self.batch_size = collector_config.get('batch_size', 50)
         self.default_days = collector_config.get('default_days', 30)
+        self.planner = KlineSyncPlanner(self.storage, lookback_days=self.default_days, source='akshare')
     
     def start_requests(self):
         stock_list = self._load_stock_list()
@@ -47,6 +49,9 @@ class AkshareKlineSpider(scrapy.Spider):
             logger.error("没有股票代码，退出")
             return
         
+        # 按交易日历和同步水位计算缺口，只请求缺失的日期段
+        plans = self.planner.plan(stock_list['symbol'].tolist(), self.today)
+        
         logger.info(f"开始处理 {len(stock_list)} 只股票，每批 {self.batch_size} 只")
         
         total = len(stock_list)
@@ -58,40 +63,33 @@ class AkshareKlineSpider(scrapy.Spider):
                 symbol = row['symbol']
                 name = row['name']
                 
+                if symbol not in plans:
+                    self.skip_count += 1
+                    continue
+                
                 # 直接处理每只股票，不使用 scrapy.Request
-                self._process_stock(symbol, name)
+                self._process_stock(symbol, name, plans[symbol])
             
             logger.info(f"采集任务进度: 已处理 {self.processed_count} 只, 跳过 {self.skip_count} 只, 错误 {self.error_count} 只")
             
             # 每批处理完后延迟，避免请求过快
             time.sleep(2)
     
-    def _process_stock(self, symbol, name):
-        """处理单个股票"""
+    def _process_stock(self, symbol, name, date_ranges):
+        """处理单个股票：逐个请求缺失的日期段"""
+        for date_range in date_ranges:
+            if not self._fetch_range(symbol, name, date_range):
+                self.planner.fail(symbol, date_range)
+                self.error_count += 1
+                return
+    
+    def _fetch_range(self, symbol, name, date_range):
+        """请求并保存一个日期段，返回是否成功"""
         import akshare as ak  # 延迟导入，避免 atexit 冲突
         try:
-            # 获取数据库中最新的日期
-            latest_date = self.storage.get_latest_kline_date(symbol)
-            
-            # 确定开始和结束日期
-            if latest_date:
-                latest_date_obj = datetime.strptime(latest_date, "%Y-%m-%d")
-                
-                # 如果最新日期已经是今天，跳过
-                if latest_date_obj.strftime('%Y-%m-%d') >= self.today:
-                    logger.info(f"跳过 {symbol}({name}): 已采集到最新日期 {latest_date}")
-                    self.skip_count += 1
-                    return
-                
-                # 从最新日期的下一天开始
-                start_date = (latest_date_obj + timedelta(days=1)).strftime('%Y%m%d')
-                end_date = self.today_str
-                logger.info(f"增量更新 {symbol}({name}): {start_date} - {end_date}")
-            else:
-                # 没有历史数据，获取最近一个月的数据
-                start_date = (datetime.now() - timedelta(days=self.default_days)).strftime('%Y%m%d')
-                end_date = self.today_str
-                logger.info(f"首次采集 {symbol}({name}): {start_date} - {end_date}")
+            start_date = date_range[0].replace('-', '')
+            end_date = date_range[1].replace('-', '')
+            logger.info(f"增量更新 {symbol}({name}): {start_date} - {end_date}")
             
             # 转换股票代码格式
             ak_symbol = symbol.replace('.', '')
@@ -105,26 +103,28 @@ class AkshareKlineSpider(scrapy.Spider):
             )
             
             if historical_df.empty:
+                # 停牌等情况没有数据，同样视为已同步
                 logger.warning(f"无K线数据 {symbol}({name})")
-                self.skip_count += 1
-                return
+                self.planner.complete(symbol, date_range)
+                return True
             
             # 转换数据格式
             klines = self._convert_to_klines(symbol, name, historical_df)
             
             # 保存到数据库
             inserted, skipped = self.storage.save_kline(symbol, klines)
+            self.planner.complete(symbol, date_range, [kline.split(',', 1)[0] for kline in klines])
             
             if inserted > 0:
                 self.processed_count += 1
                 logger.info(f"成功采集 {symbol}({name}): {len(klines)} 条数据, 新增: {inserted}, 跳过: {skipped}")
             else:
                 logger.info(f"数据已存在 {symbol}({name}): 跳过 {skipped} 条")
-                self.skip_count += 1
+            return True
                 
         except Exception as e:
             logger.error(f"处理股票失败 {symbol}({name}): {e}")
-            self.error_count += 1
+            return False
     
     def _load_stock_list(self):
         """从 stock_zh_a_spot.csv 文件中读取股票列表"""
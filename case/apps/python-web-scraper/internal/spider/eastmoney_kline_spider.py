@@ -8,6 +8,7 @@ from urllib.parse import urlencode
 from ..utils.config import load_config
 from ..storage.mongo_storage import MongoStorage
 from .baostock_stock_codes import load_stock_codes
+from .kline_sync import KlineSyncPlanner
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,7 @@ class EastMoneyKlineSpider(scrapy.Spider):
         self.batch_size = kline_config.get('batch_size', 50)
         self.batch_delay = kline_config.get('batch_delay', 10)
         self.default_days = kline_config.get('default_days', 60)
+        self.planner = KlineSyncPlanner(self.storage, lookback_days=self.default_days, source='eastmoney')
         
         # 获取 User-Agent 列表
         spider_config = self.config.get('spider', {})
@@ -42,32 +44,27 @@ class EastMoneyKlineSpider(scrapy.Spider):
             logger.error("没有股票代码，退出")
             return
         
-        logger.info(f"开始处理 {len(df)} 只股票，每批 {self.batch_size} 只")
+        secids = {}
+        for code in df['code'].astype(str):
+            market = 1 if code.startswith('sh') else 0
+            secids[f"{market}.{code.split('.')[1]}"] = code
         
-        total = len(df)
+        # 按交易日历和同步水位计算缺口，只请求缺失的日期段
+        plans = self.planner.plan(list(secids))
+        self.skip_count += len(secids) - len(plans)
+        
+        logger.info(f"开始处理 {len(df)} 只股票，其中 {len(plans)} 只需要同步，每批 {self.batch_size} 只")
+        
+        pending = [(secid, date_range) for secid, ranges in plans.items() for date_range in ranges]
+        total = len(pending)
         for i in range(0, total, self.batch_size):
-            batch = df.iloc[i:min(i+self.batch_size, total)]
-            logger.info(f"处理第 {i//self.batch_size + 1} 批股票 ({i+1}-{min(i+self.batch_size, total)})")
-            for _, row in batch.iterrows():
-                code = str(row['code'])
-                stock_code = code.split('.')[1]
-                market = 1 if code.startswith('sh') else 0
-                
-                secid = f"{market}.{stock_code}"
-                
-                latest_date = self.storage.get_latest_kline_date(secid)
-                
-                if latest_date:
-                    if latest_date >= self.today:
-                        logger.info(f"跳过 {secid}: 已采集到最新日期 {latest_date}")
-                        self.skip_count += 1
-                        continue
-                    beg = latest_date
-                    end_date = self.today
-                else:
-                    # 没有历史数据时，只获取默认天数前的数据
-                    beg = (datetime.now() - timedelta(days=self.default_days)).strftime('%Y%m%d')
-                    end_date = self.today
+            batch = pending[i:min(i+self.batch_size, total)]
+            logger.info(f"处理第 {i//self.batch_size + 1} 批请求 ({i+1}-{min(i+self.batch_size, total)})")
+            for secid, date_range in batch:
+                code = secids[secid]
+                stock_code = secid.split('.')[1]
+                beg = date_range[0].replace('-', '')
+                end_date = date_range[1].replace('-', '')
                 params = {
                     'secid': secid,
                     'klt': self.kline_params['klt'],
@@ -91,7 +88,7 @@ class EastMoneyKlineSpider(scrapy.Spider):
                 yield scrapy.Request(
                     url=url,
                     callback=self.parse_kline,
-                    meta={'secid': secid, 'stock_code': stock_code},
+                    meta={'secid': secid, 'stock_code': stock_code, 'date_range': date_range},
                     headers=headers,
                     dont_filter=True,
                     errback=self.errback
@@ -100,6 +97,7 @@ class EastMoneyKlineSpider(scrapy.Spider):
             # 每批处理完后延迟1秒，避免请求过快
     def errback(self, failure):
         secid = failure.request.meta.get('secid', 'unknown')
+        self.planner.fail(secid, failure.request.meta.get('date_range'))
         self.error_count += 1
         
         error_type = failure.type.__name__
@@ -109,6 +107,7 @@ class EastMoneyKlineSpider(scrapy.Spider):
     def parse_kline(self, response):
         secid = response.meta['secid']
         stock_code = response.meta['stock_code']
+        date_range = response.meta['date_range']
         
         try:
             data = json.loads(response.text)
@@ -119,17 +118,22 @@ class EastMoneyKlineSpider(scrapy.Spider):
                 name = kline_data.get('name', '')
                 if klines:
                     inserted, skipped = self.storage.save_kline(secid, klines, name)
+                    self.planner.complete(secid, date_range, [kline.split(',', 1)[0] for kline in klines])
                     self.processed_count += 1
                     logger.info(f"成功采集 {secid}: {len(klines)} 条数据")
                 else:
+                    # 停牌等情况没有数据，同样视为已同步
                     logger.debug(f"无K线数据 {secid}")
+                    self.planner.complete(secid, date_range)
                     self.skip_count += 1
             else:
                 logger.warning(f"API返回错误 {secid}: {data.get('msg', '')}")
+                self.planner.fail(secid, date_range)
                 self.error_count += 1
                 
         except Exception as e:
             logger.error(f"解析K线数据失败 {secid}: {e}")
+            self.planner.fail(secid, date_range)
             self.error_count += 1
         
         if (self.processed_count + self.skip_count + self.error_count) % 50 == 0:
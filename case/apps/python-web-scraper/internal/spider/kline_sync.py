@@ -0,0 +1,159 @@
+"""
+K线增量同步计划
+
+按交易日历和 kline_sync 集合里的同步水位计算每只股票缺失的日期段：
+- 有水位的股票只请求水位之后的交易日，水位已是最新交易日的直接跳过
+- 没有水位的股票一次聚合读出窗口内已存储的日期，只请求缺失的连续交易日段
+- 一只股票的全部日期段都成功后才推进水位；当天K线收盘后且已取到才算定型
+
+akshare / eastmoney 两个K线爬虫共用本模块。
+"""
+
+import logging
+from datetime import datetime, time as dtime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# 收盘后多久当天K线视为定型
+MARKET_SETTLE_TIME = dtime(15, 30)
+
+
+def load_trading_dates(start_date, end_date):
+    """从 baostock 获取交易日历（升序 YYYY-MM-DD），失败时退化为工作日"""
+    try:
+        import baostock as bs
+        lg = bs.login()
+        if lg.error_code != '0':
+            raise Exception(lg.error_msg)
+        try:
+            rs = bs.query_trade_dates(start_date=start_date, end_date=end_date)
+            rows = []
+            while (rs.error_code == '0') & rs.next():
+                rows.append(rs.get_row_data())
+        finally:
+            bs.logout()
+        if rs.error_code != '0':
+            raise Exception(rs.error_msg)
+        if rows:
+            return [row[0] for row in rows if row[1] == '1']
+    except Exception as e:
+        logger.warning(f"获取交易日历失败，按工作日计算: {e}")
+    return pd.bdate_range(start_date, end_date).strftime(DATE_FORMAT).tolist()
+
+
+def group_runs(dates, calendar):
+    """把缺失的交易日按日历连续性合并成 [(start, end), ...]"""
+    position = {day: i for i, day in enumerate(calendar)}
+    runs = []
+    last = None
+    for day in sorted(dates):
+        index = position[day]
+        if runs and last == index - 1:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+        last = index
+    return [(start, end) for start, end in runs]
+
+
+class KlineSyncPlanner:
+    """基于交易日历和同步水位的增量计划"""
+
+    def __init__(self, storage, trading_dates=None, lookback_days=60, source=None, now=None):
+        """
+        storage: MongoStorage（get_kline_watermarks / set_kline_watermark / get_kline_dates）
+        trading_dates: (start_date, end_date) -> 交易日列表，默认 load_trading_dates
+        lookback_days: 首次同步时回看的自然日数
+        source: 写入水位的数据来源
+        now: 返回当前时间的函数，便于测试
+        """
+        self.storage = storage
+        self.trading_dates = trading_dates or load_trading_dates
+        self.lookback_days = lookback_days
+        self.source = source
+        self._now = now or datetime.now
+        self._calendar = []
+        self._pending = {}
+        self._last = {}
+        self._failed = set()
+
+    def plan(self, codes, end_date=None):
+        """返回 {code: [(start_date, end_date), ...]}，无缺口的股票不出现"""
+        codes = list(dict.fromkeys(codes))
+        today = self._now().strftime(DATE_FORMAT)
+        end_date = min(end_date or today, today)
+        window_start = (datetime.strptime(end_date, DATE_FORMAT) - timedelta(days=self.lookback_days)).strftime(DATE_FORMAT)
+
+        watermarks = self.storage.get_kline_watermarks(codes) if codes else {}
+        calendar_start = min([window_start] + [self._next_day(w) for w in watermarks.values()])
+        self._calendar = self.trading_dates(calendar_start, end_date)
+
+        plans = {}
+        for code, last_date in watermarks.items():
+            missing = [day for day in self._calendar if last_date < day]
+            if missing:
+                plans[code] = [(missing[0], missing[-1])]
+
+        fresh = [code for code in codes if code not in watermarks]
+        if fresh:
+            window = [day for day in self._calendar if day >= window_start]
+            stored = self.storage.get_kline_dates(fresh, window_start, end_date)
+            for code in fresh:
+                have = set(stored.get(code, ()))
+                missing = [day for day in window if day not in have]
+                if missing:
+                    plans[code] = group_runs(missing, window)
+                elif window:
+                    # 已有完整数据但没有水位（升级前采集的数据），直接补记水位
+                    self._set_watermark(code, self._settled(window[-1], have))
+
+        self._pending = {code: list(ranges) for code, ranges in plans.items()}
+        self._last = {code: (ranges[-1], set()) for code, ranges in plans.items()}
+        self._failed = set()
+        logger.info(
+            f"K线增量计划: {len(codes)} 只股票，需同步 {len(plans)} 只，"
+            f"共 {sum(len(ranges) for ranges in plans.values())} 个日期段"
+        )
+        return plans
+
+    def complete(self, code, date_range, dates=()):
+        """某个日期段同步成功（dates 为实际取回的K线日期），全部完成后推进水位"""
+        pending = self._pending.get(code)
+        if pending is None or date_range not in pending:
+            return
+        pending.remove(date_range)
+        last_range, last_dates = self._last[code]
+        if date_range == last_range:
+            last_dates.update(dates)
+        if pending or code in self._failed:
+            return
+        del self._pending[code]
+        self._set_watermark(code, self._settled(last_range[1], last_dates))
+
+    def fail(self, code, date_range=None):
+        """某个日期段同步失败，该股票本轮不推进水位"""
+        self._failed.add(code)
+        self._pending.pop(code, None)
+
+    def _settled(self, end_date, dates):
+        """end_date 之前已定型的最后一个交易日"""
+        now = self._now()
+        today = now.strftime(DATE_FORMAT)
+        if end_date < today:
+            return end_date
+        if today in dates and now.time() >= MARKET_SETTLE_TIME:
+            return today
+        previous = [day for day in self._calendar if day < today]
+        return previous[-1] if previous else None
+
+    def _set_watermark(self, code, last_date):
+        if last_date:
+            self.storage.set_kline_watermark(code, last_date, self.source)
+
+    @staticmethod
+    def _next_day(value):
+        return (datetime.strptime(value, DATE_FORMAT) + timedelta(days=1)).strftime(DATE_FORMAT)
@@ -1,10 +1,21 @@
 from pymongo import MongoClient
+from pymongo.errors import CollectionInvalid
 import logging
 from ..utils.config import load_config
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# API 端查询缓存的失效事件集合（capped，只保留最近的事件）
+CACHE_INVALIDATION_COLLECTION = 'cache_invalidations'
+CACHE_INVALIDATION_SIZE = 4 * 1024 * 1024
+
+# API 端按日期汇总的市场快照集合
+MARKET_SNAPSHOT_COLLECTION = 'market_snapshot'
+
+# K线增量同步水位：每只股票一条文档，last_date 及之前的交易日都已同步
+KLINE_SYNC_COLLECTION = 'kline_sync'
+
 class MongoStorage:
     def __init__(self):
         config = load_config()
@@ -22,6 +33,31 @@ class MongoStorage:
         self.collection.create_index('code', unique=True)
         self.kline_collection.create_index([('code', 1), ('date', 1)], unique=True)
         self.capital_flow_collection.create_index([('code', 1), ('date', 1)], unique=True)
+        
+        try:
+            self.db.create_collection(
+                CACHE_INVALIDATION_COLLECTION, capped=True, size=CACHE_INVALIDATION_SIZE
+            )
+        except CollectionInvalid:
+            pass
+        self.invalidation_collection = self.db[CACHE_INVALIDATION_COLLECTION]
+        self.snapshot_collection = self.db[MARKET_SNAPSHOT_COLLECTION]
+        self.kline_sync_collection = self.db[KLINE_SYNC_COLLECTION]
+    
+    def _publish_invalidation(self, collection, code, dates, name=''):
+        """通知API端失效 (code, date) 相关的查询缓存"""
+        if not dates:
+            return
+        try:
+            self.invalidation_collection.insert_one({
+                'collection': collection,
+                'code': code,
+                'dates': sorted(set(dates)),
+                'name': name or None,
+                'time': datetime.now()
+            })
+        except Exception as e:
+            logger.warning(f"发布缓存失效事件失败: {collection} {code}: {e}")
     
     def save_news(self, news_item):
         """保存新闻到mongodb"""
@@ -32,10 +68,23 @@ class MongoStorage:
             logger.error(f"保存新闻失败: {e}")
             return None
     
+    def _mark_snapshot_dirty(self, dates):
+        """标记涉及日期的市场快照需要重建，API 下次读取时刷新"""
+        if not dates:
+            return
+        try:
+            self.snapshot_collection.update_many(
+                {'_id': {'$in': sorted(set(dates))}},
+                {'$set': {'dirty': True}, '$inc': {'writes': 1}}
+            )
+        except Exception as e:
+            logger.warning(f"标记市场快照失败: {e}")
+    
     def save_kline(self, code, klines, name=''):
         """保存K线数据到mongodb（去重）"""
         inserted_count = 0
         skipped_count = 0
+        written_dates = []
         for kline in klines:
             parts = kline.split(',')
             if len(parts) >= 8:
@@ -63,9 +112,12 @@ class MongoStorage:
                         upsert=True
                     )
                     inserted_count += 1
+                    written_dates.append(date)
                 except Exception as e:
                     logger.error(f"保存K线数据失败: {code} - {date}: {e}")
                     skipped_count += 1
+        self._publish_invalidation(self.kline_collection.name, code, written_dates, name)
+        self._mark_snapshot_dirty(written_dates)
         logger.info(f"K线数据保存完成: {code}, 新增: {inserted_count}, 跳过: {skipped_count}")
         return inserted_count, skipped_count
     
@@ -81,6 +133,47 @@ class MongoStorage:
             logger.error(f"获取最新K线日期失败: {e}")
             return None
     
+    def get_kline_watermarks(self, codes):
+        """批量获取增量同步水位，返回 {code: last_date}"""
+        try:
+            cursor = self.kline_sync_collection.find({'_id': {'$in': list(codes)}}, {'last_date': 1})
+            return {doc['_id']: doc['last_date'] for doc in cursor if doc.get('last_date')}
+        except Exception as e:
+            # 查询失败时不能当作“从未同步”，否则会按回看窗口全量重拉
+            logger.error(f"获取同步水位失败: {e}")
+            raise
+    
+    def set_kline_watermark(self, code, last_date, source=None):
+        """推进同步水位（只前进不后退）"""
+        try:
+            self.kline_sync_collection.update_one(
+                {'_id': code},
+                {'$max': {'last_date': last_date}, '$set': {'source': source, 'updated_at': datetime.now()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"更新同步水位失败: {code}: {e}")
+    
+    def get_kline_dates(self, codes, start_date=None, end_date=None):
+        """批量获取日期范围内已存储的K线日期（一次聚合），返回 {code: [date, ...]}"""
+        match = {'code': {'$in': list(codes)}}
+        date_query = {}
+        if start_date:
+            date_query['$gte'] = start_date
+        if end_date:
+            date_query['$lte'] = end_date
+        if date_query:
+            match['date'] = date_query
+        try:
+            cursor = self.kline_collection.aggregate([
+                {'$match': match},
+                {'$group': {'_id': '$code', 'dates': {'$push': '$date'}}}
+            ])
+            return {doc['_id']: doc['dates'] for doc in cursor}
+        except Exception as e:
+            logger.error(f"获取已存储K线日期失败: {e}")
+            raise
+    
     def get_kline(self, code, start_date=None, end_date=None):
         """获取K线数据"""
         try:
@@ -107,6 +200,12 @@ class MongoStorage:
                 {'$set': capital_flow_data},
                 upsert=True
             )
+            self._publish_invalidation(
+                self.capital_flow_collection.name,
+                capital_flow_data['code'],
+                [capital_flow_data['date']],
+                capital_flow_data.get('name', '')
+            )
             return result
         except Exception as e:
             logger.error(f"保存资金流向数据失败: {capital_flow_data.get('code')} - {capital_flow_data.get('date')}: {e}")
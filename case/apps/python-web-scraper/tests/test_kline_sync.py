@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from internal.spider.kline_sync import KlineSyncPlanner, group_runs
+
+# 2026-03-02 ~ 2026-03-06 为周一到周五，03-04 休市
+CALENDAR = ['2026-02-26', '2026-02-27', '2026-03-02', '2026-03-03', '2026-03-05', '2026-03-06']
+
+
+def trading_dates(start_date, end_date):
+    return [day for day in CALENDAR if start_date <= day <= end_date]
+
+
+class FakeStorage:
+    def __init__(self, watermarks=None, stored=None):
+        self.watermarks = dict(watermarks or {})
+        self.stored = {code: list(dates) for code, dates in (stored or {}).items()}
+
+    def get_kline_watermarks(self, codes):
+        return {code: self.watermarks[code] for code in codes if code in self.watermarks}
+
+    def set_kline_watermark(self, code, last_date, source=None):
+        self.watermarks[code] = max(self.watermarks.get(code, ''), last_date)
+
+    def get_kline_dates(self, codes, start_date=None, end_date=None):
+        return {
+            code: [d for d in self.stored.get(code, []) if start_date <= d <= end_date]
+            for code in codes if code in self.stored
+        }
+
+
+def planner(storage, now='2026-03-06 16:00'):
+    return KlineSyncPlanner(
+        storage, trading_dates=trading_dates, lookback_days=10,
+        now=lambda: datetime.strptime(now, '%Y-%m-%d %H:%M'),
+    )
+
+
+class TestKlineSyncPlanner(unittest.TestCase):
+    def test_plan_uses_watermarks_and_stored_dates(self):
+        """测试按水位和已存储日期计算缺口"""
+        storage = FakeStorage(
+            watermarks={'600000': '2026-03-06', '000001': '2026-03-02'},
+            stored={'000002': ['2026-02-26', '2026-02-27', '2026-03-05'], '000003': CALENDAR},
+        )
+        sync = planner(storage)
+
+        plans = sync.plan(['600000', '000001', '000002', '000003', '000004'])
+
+        self.assertNotIn('600000', plans)
+        self.assertEqual(plans['000001'], [('2026-03-03', '2026-03-06')])
+        self.assertEqual(plans['000002'], [('2026-03-02', '2026-03-03'), ('2026-03-06', '2026-03-06')])
+        self.assertEqual(plans['000004'], [('2026-02-26', '2026-03-06')])
+        # 已有完整数据的股票直接补记水位
+        self.assertNotIn('000003', plans)
+        self.assertEqual(storage.watermarks['000003'], '2026-03-06')
+
+    def test_watermark_advances_only_after_all_ranges_and_settles_today(self):
+        """测试全部日期段完成后才推进水位，盘中K线不算定型"""
+        storage = FakeStorage(stored={'000002': ['2026-02-26', '2026-02-27', '2026-03-05']})
+        sync = planner(storage, now='2026-03-06 10:00')
+        plans = sync.plan(['000002', '000004'])
+
+        first, last = plans['000002']
+        sync.complete('000002', last, ['2026-03-06'])
+        self.assertNotIn('000002', storage.watermarks)
+        sync.complete('000002', first, ['2026-03-02', '2026-03-03'])
+        self.assertEqual(storage.watermarks['000002'], '2026-03-05')
+
+        sync.fail('000004')
+        sync.complete('000004', plans['000004'][0], CALENDAR)
+        self.assertNotIn('000004', storage.watermarks)
+
+    def test_group_runs_follows_calendar(self):
+        """测试缺失日期按交易日历合并成连续段"""
+        self.assertEqual(
+            group_runs(['2026-03-03', '2026-03-05', '2026-02-26'], CALENDAR),
+            [('2026-02-26', '2026-02-26'), ('2026-03-03', '2026-03-05')],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,7 @@
 import argparse
 from pathlib import Path
 from scripts.data_collector.baostock_5min.collector import BaostockCollectorALL1d
-from scripts.daily_brief_analyzer import DailyBriefAnalyzer
+from scripts.daily_brief_analyzer import DailyBriefAnalyzer, create_indicator_cache
 from scripts.dingtalk_bot import DingTalkBot
 from scripts.config import Config
 from datetime import datetime, timedelta
@@ -57,6 +57,8 @@ class DailyCloseBrief:
     def __init__(self):
         self.csv_dir = Path('~/.qlib/stock_data/source/all_1d_original').expanduser()
         self.scheduled_run_time = "20:00"
+        # 定时模式下进程常驻，指标缓存跨天保留，每天只计算新增的K线
+        self.indicator_cache = create_indicator_cache()
     
     def get_trade_calendar(self, start_date: str = None, end_date: str = None) -> list:
         """获取交易日历"""
@@ -159,7 +161,7 @@ class DailyCloseBrief:
     def analyze_data(self, date: str):
         """步骤2: 分析数据并生成简报"""
         logger.info("【步骤2】开始分析数据...")
-        analyzer = DailyBriefAnalyzer(str(self.csv_dir))
+        analyzer = DailyBriefAnalyzer(str(self.csv_dir), self.indicator_cache)
         logger.info(f"分析日期: {date}")
         analyzer.print_brief(date)
         logger.info("【步骤2】数据分析完成！\n")
@@ -275,7 +277,7 @@ class DailyCloseBrief:
         logger.info("【步骤3】发送简报到钉钉机器人...")
         
         # 生成 Markdown 格式的简报
-        analyzer = DailyBriefAnalyzer(str(self.csv_dir))
+        analyzer = DailyBriefAnalyzer(str(self.csv_dir), self.indicator_cache)
         markdown_text = analyzer.format_brief_for_dingtalk(date)
         
         # 发送到钉钉
@@ -8,14 +8,28 @@ import baostock as bs
 from datetime import datetime, timedelta
 import json
 import os
+import sys
+
+# 指标计算与 API 服务共用 apps/api/app/indicators
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "apps" / "api"))
+from app.collector.baostock_session import get_baostock_session
+from app.indicators import IndicatorCache, IndicatorPanel
+
+
+def create_indicator_cache() -> IndicatorCache:
+    """常驻进程共用的日线指标缓存：K线都由 CSV 传入，保留全部历史（max_bars=0 不截断）"""
+    return IndicatorCache(max_bars=0, history_days=0)
 
 
 class DailyBriefAnalyzer:
-    def __init__(self, csv_dir: str):
+    def __init__(self, csv_dir: str, indicator_cache: IndicatorCache = None):
         self.csv_dir = Path(csv_dir).expanduser()
+        # 日线指标缓存，常驻进程每天只计算新增的K线；None 时整段计算
+        self.indicator_cache = indicator_cache
         self._data = None
         self.stock_names = {}
         self._indicators_calculated = False
+        self._industry_df = None  # 行业分类不随交易日变化，整个分析过程只查询一次
         self.stock_names_cache_file = self.csv_dir / "stock_names_cache.json"
     
     @property
@@ -33,9 +47,10 @@ class DailyBriefAnalyzer:
             print("正在计算指标...")
             self.calculate_change_pct(self.data)
             self.calculate_amplitude(self.data)
-            self.calculate_ma(5, self.data)
-            self.calculate_ma(20, self.data)
-            self.calculate_rsi(14, self.data)
+            cached = self._lookup_cached(self.data, ["ma5", "ma20", "rsi"])
+            self.calculate_ma(5, self.data, cached)
+            self.calculate_ma(20, self.data, cached)
+            self.calculate_rsi(14, self.data, cached)
             self._indicators_calculated = True
             print("指标计算完成")
     
@@ -158,22 +173,19 @@ class DailyBriefAnalyzer:
     
     def get_industry_data(self, date: str = None) -> pd.DataFrame:
         """获取行业分类数据"""
-        lg = bs.login()
-        if lg.error_code != '0':
-            print(f"baostock login failed: {lg.error_msg}")
-            return pd.DataFrame()
-        
-        if date is None:
-            date = self.get_latest_date()
+        if self._industry_df is not None:
+            return self._industry_df
         
-        # 获取行业分类
-        rs = bs.query_stock_industry()
-        bs.logout()
+        try:
+            # 复用进程级 baostock 会话，不再每次登录/登出
+            industry_df = get_baostock_session().query(bs.query_stock_industry)
+        except Exception as e:
+            print(f"baostock query failed: {e}")
+            return pd.DataFrame()
         
-        if rs.error_code == '0' and len(rs.data) > 0:
-            industry_df = pd.DataFrame(rs.data, columns=rs.fields)
-            return industry_df
-        return pd.DataFrame()
+        if not industry_df.empty:
+            self._industry_df = industry_df
+        return industry_df
     
     def analyze_sector_performance(self, date: str = None, top_n: int = 20) -> Dict:
         """维度2: 板块热点与轮动"""
@@ -351,31 +363,39 @@ class DailyBriefAnalyzer:
             "top_amount": top_amount.to_dict('records')
         }
     
-    def calculate_ma(self, window: int = 5, df: pd.DataFrame = None) -> pd.DataFrame:
-        """计算移动平均线"""
+    def _lookup_cached(self, df: pd.DataFrame, names: List[str]) -> pd.DataFrame:
+        """从指标缓存取与 df 行对齐的指标列，没有缓存时返回 None"""
+        if self.indicator_cache is None or not {'symbol', 'date', 'close'}.issubset(df.columns):
+            return None
+        return self.indicator_cache.lookup_frame(df, names)
+    
+    def calculate_ma(self, window: int = 5, df: pd.DataFrame = None, cached: pd.DataFrame = None) -> pd.DataFrame:
+        """计算移动平均线（cached 中有该列时只计算每只股票前 window-1 根K线）"""
         if df is None:
             df = self.data
-        if 'close' in df.columns and f'ma{window}' not in df.columns:
-            df[f'ma{window}'] = df.groupby('symbol')['close'].transform(
-                lambda x: x.rolling(window=window, min_periods=1).mean()
-            )
+        column = f'ma{window}'
+        if 'close' in df.columns and column not in df.columns:
+            panel = IndicatorPanel(df)
+            close = panel.pivot(df['close'])
+            if cached is not None and column in cached.columns:
+                df[column] = panel.splice_head(panel.ma(close[:, :window - 1], window, min_periods=1), cached[column])
+            else:
+                df[column] = panel.unpivot(panel.ma(close, window, min_periods=1))
         return df
     
-    def calculate_rsi(self, window: int = 14, df: pd.DataFrame = None) -> pd.DataFrame:
-        """计算RSI指标"""
+    def calculate_rsi(self, window: int = 14, df: pd.DataFrame = None, cached: pd.DataFrame = None) -> pd.DataFrame:
+        """计算RSI指标（cached 中有同周期的 rsi 列时只计算每只股票前 window 根K线）"""
         if df is None:
             df = self.data
         if 'close' not in df.columns or 'rsi' in df.columns:
             return df
         
-        def rsi_series(series, period=14):
-            delta = series.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            return 100 - (100 / (1 + rs))
-        
-        df['rsi'] = df.groupby('symbol')['close'].transform(rsi_series)
+        panel = IndicatorPanel(df)
+        close = panel.pivot(df['close'])
+        if cached is not None and 'rsi' in cached.columns and window == self.indicator_cache.params['rsi']:
+            df['rsi'] = panel.splice_head(panel.rsi(close[:, :window], window), cached['rsi'])
+        else:
+            df['rsi'] = panel.unpivot(panel.rsi(close, window))
         return df
     
     def analyze_technical_signals(self, date: str = None, top_n: int = 20) -> Dict: